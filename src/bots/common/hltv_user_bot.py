@@ -20,6 +20,7 @@ import re
 from src.bots.config import load_config
 from src.scripts.live_matches_parser import handle_new_subscription, load_json, save_json, SUBS_JSON, LIVE_JSON, subscriber_event, move_future_subscribers_to_live, subscribe_user, unsubscribe_user, load_subs_json
 from src.bots.common.hltv_user_bot_texts import BOT_TEXTS
+from src.db.connection import PROFILE_READ, get_connection
 
 # Отключаем лишние логи Telegram API и httpx/urllib3
 logging.getLogger("httpx").setLevel(logging.WARNING)
@@ -56,6 +57,16 @@ class HLTVUserBot:
         self._last_ok_log = 0
         self._ok_log_interval = 5 * 60  # 5 минут
 
+    def _cursor(self):
+        """
+        Курсор для чтения из базы со строками sqlite3.Row. Соединение общее для потока
+        (src.db.connection, профиль PROFILE_READ) и не закрывается, поэтому row_factory
+        задается только курсору, а не соединению, которым пользуются и другие
+        """
+        cursor = get_connection(self.db_path, PROFILE_READ).cursor()
+        cursor.row_factory = sqlite3.Row
+        return cursor
+
     def _get_safe_user_info(self, user):
         try:
             first_name = user.first_name if user.first_name else ""
@@ -359,9 +370,7 @@ class HLTVUserBot:
         self.logger.info(BOT_TEXTS['log']['events_list_request'].format(user_info=user_info))
         today = datetime.now(self.MOSCOW_TIMEZONE)
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+            cursor = self._cursor()
             if event_type == self.MENU_COMPLETED_MATCHES:
                 start_date = today - timedelta(days=7)
                 start_timestamp = start_date.timestamp()
@@ -387,7 +396,6 @@ class HLTVUserBot:
                     ORDER BY event_name
                 ''', (start_timestamp, end_timestamp))
             events = cursor.fetchall()
-            conn.close()
             if not events:
                 period_str = BOT_TEXTS['no_events_week'] if event_type == self.MENU_COMPLETED_MATCHES else BOT_TEXTS['no_events_14days']
                 await update.message.reply_text(period_str, reply_markup=self.markup)
@@ -414,16 +422,13 @@ class HLTVUserBot:
         self.logger.info(BOT_TEXTS['log']['matches_for_event_request'].format(user_info=user_info, event_id=event_id))
         event_type = context.user_data.get('showing_menu', self.MENU_COMPLETED_MATCHES)
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+            cursor = self._cursor()
             if event_type == self.MENU_COMPLETED_MATCHES:
                 cursor.execute('SELECT event_name FROM result_match WHERE event_id = ? LIMIT 1', (event_id,))
                 event_result = cursor.fetchone()
                 if not event_result:
                     message = BOT_TEXTS['event_not_found']
                     await update.message.reply_text(message, reply_markup=self.markup)
-                    conn.close()
                     return
                 event_name = event_result['event_name']
                 cursor.execute('''
@@ -433,7 +438,6 @@ class HLTVUserBot:
                     ORDER BY datetime
                 ''', (event_id,))
                 matches = cursor.fetchall()
-                conn.close()
                 if not matches:
                     message = BOT_TEXTS['no_matches_event_completed'].format(event_name=event_name)
                     await update.message.reply_text(message, reply_markup=self.markup)
@@ -475,7 +479,6 @@ class HLTVUserBot:
                 if not event_result:
                     message = BOT_TEXTS['event_not_found']
                     await update.message.reply_text(message, reply_markup=self.markup)
-                    conn.close()
                     return
                 event_name = event_result['event_name']
                 cursor.execute('''
@@ -485,7 +488,6 @@ class HLTVUserBot:
                     ORDER BY datetime
                 ''', (event_id,))
                 matches = cursor.fetchall()
-                conn.close()
                 if not matches:
                     message = BOT_TEXTS['no_matches_event_upcoming'].format(event_name=event_name)
                     await update.message.reply_text(message, reply_markup=self.markup)
@@ -522,9 +524,7 @@ class HLTVUserBot:
         user_info = self._get_safe_user_info(user)
         self.logger.info(BOT_TEXTS['log']['match_details_request'].format(user_info=user_info, match_id=match_id))
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+            cursor = self._cursor()
             cursor.execute('''
                 SELECT m.match_id, m.datetime, m.team1_id, m.team1_name, m.team1_score, m.team1_rank,
                        m.team2_id, m.team2_name, m.team2_score, m.team2_rank, m.event_id, m.event_name, m.demo_id, 'completed' as match_type
@@ -540,7 +540,6 @@ class HLTVUserBot:
                 match = cursor.fetchone()
             if not match:
                 await update.message.reply_text(BOT_TEXTS['match_not_found'].format(match_id=match_id), reply_markup=self.markup)
-                conn.close()
                 return
             player_stats = []
             match_type = match['match_type']
@@ -556,7 +555,6 @@ class HLTVUserBot:
                     FROM upcoming_match_players p WHERE p.match_id = ? ORDER BY p.team_id
                 ''', (match_id,))
                 player_stats = cursor.fetchall()
-            conn.close()
             match_datetime = datetime.fromtimestamp(match['datetime'], tz=self.MOSCOW_TIMEZONE)
             team1_name = match['team1_name']
             team2_name = match['team2_name']
@@ -569,15 +567,12 @@ class HLTVUserBot:
                 t2 = f"<b>{team2_name}</b>" if team2_score > team1_score else team2_name
                 message += BOT_TEXTS['match_score'].format(team1=t1, score1=team1_score, score2=team2_score, team2=t2)
                 try:
-                    conn2 = sqlite3.connect(self.db_path)
-                    conn2.row_factory = sqlite3.Row
-                    cursor2 = conn2.cursor()
+                    cursor2 = self._cursor()
                     cursor2.execute('''
                         SELECT map_name, team1_rounds, team2_rounds, rounds
                         FROM result_match_maps WHERE match_id = ? ORDER BY id
                     ''', (match_id,))
                     maps = cursor2.fetchall()
-                    conn2.close()
                     if maps:
                         message += BOT_TEXTS['maps_stats_header']
                         for m in maps:
@@ -646,12 +641,9 @@ class HLTVUserBot:
                 message += BOT_TEXTS['no_lineups']
             if match_type == 'upcoming':
                 try:
-                    conn2 = sqlite3.connect(self.db_path)
-                    conn2.row_factory = sqlite3.Row
-                    cursor2 = conn2.cursor()
+                    cursor2 = self._cursor()
                     cursor2.execute('SELECT name, lang, url FROM upcoming_match_streamers WHERE match_id = ?', (match_id,))
                     streams = cursor2.fetchall()
-                    conn2.close()
                     if streams:
                         message += BOT_TEXTS['where_to_watch']
                         # Сначала ищем cmarty
@@ -713,9 +705,7 @@ class HLTVUserBot:
         user_info = self._get_safe_user_info(user)
         self.logger.info(BOT_TEXTS['log']['search_team'].format(user_info=user_info, team_name=team_name))
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+            cursor = self._cursor()
             cursor.execute('''
                 SELECT match_id, datetime, team1_id, team1_name, team1_score, team2_id, team2_name, team2_score, event_name, 'completed' as match_type
                 FROM result_match
@@ -732,7 +722,6 @@ class HLTVUserBot:
                 LIMIT 10
             ''', (team_name, team_name))
             upcoming_matches = cursor.fetchall()
-            conn.close()
             all_matches = list(upcoming_matches) + list(completed_matches)
             if not all_matches:
                 await update.message.reply_text('Ничего не найдено. Нашли баг, вопросы, предложения? Пишите: @TarAn0o', reply_markup=self.markup)
@@ -775,9 +764,7 @@ class HLTVUserBot:
 
     def get_matches_by_date(self, date_start, date_end):
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+            cursor = self._cursor()
             cursor.execute('''
                 SELECT m.match_id, m.datetime, m.team1_id, m.team1_name, m.team1_score, m.team1_rank,
                        m.team2_id, m.team2_name, m.team2_score, m.team2_rank, m.event_id, m.event_name
@@ -805,7 +792,6 @@ class HLTVUserBot:
                     'team2_name': match['team2_name'],
                     'team2_score': match['team2_score']
                 })
-            conn.close()
             return events
         except Exception as e:
             self.logger.error(BOT_TEXTS['error_getting_matches_period'].format(error=str(e)))
@@ -890,9 +876,7 @@ class HLTVUserBot:
 
     def get_upcoming_matches_by_date(self, date_start, date_end):
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+            cursor = self._cursor()
             cursor.execute('''
                 SELECT m.match_id, m.datetime, m.team1_id, m.team1_name, m.team1_rank,
                        m.team2_id, m.team2_name, m.team2_rank, m.event_id, m.event_name
@@ -920,7 +904,6 @@ class HLTVUserBot:
                     'team2_name': match['team2_name'],
                     'team2_rank': match['team2_rank']
                 })
-            conn.close()
             return events
         except Exception as e:
             self.logger.error(f"Ошибка при получении предстоящих матчей: {str(e)}")
@@ -961,9 +944,7 @@ class HLTVUserBot:
         upcoming_match_mapping = {}
         keyboard = [[KeyboardButton("Назад")]]  # Кнопка "Назад" теперь первая
         if matches:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+            cursor = self._cursor()
             for match in matches:
                 match_id = match['match_id']
                 t1 = match['team_names'][0] if match['team_names'] else '?'
@@ -974,16 +955,13 @@ class HLTVUserBot:
                 if db_match:
                     live_match_mapping[match_text] = match_id
                     keyboard.append([KeyboardButton(match_text)])
-            conn.close()
         # Будущие матчи, на которые подписан пользователь
         user_future_matches = []
         for match_id_str, users in subs_data['upcoming_live'].items():
             if any(s['id'] == user_id for s in users):
                 user_future_matches.append(int(match_id_str))
         if user_future_matches:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+            cursor = self._cursor()
             q_marks = ','.join(['?'] * len(user_future_matches))
             cursor.execute(f'SELECT match_id, team1_name, team2_name FROM upcoming_match WHERE match_id IN ({q_marks})', tuple(user_future_matches))
             rows = cursor.fetchall()
@@ -995,7 +973,6 @@ class HLTVUserBot:
                 if match_text not in live_match_mapping and match_text not in upcoming_match_mapping:
                     upcoming_match_mapping[match_text] = match_id
                     keyboard.append([KeyboardButton(match_text)])
-            conn.close()
         context.user_data['live_match_mapping'] = live_match_mapping
         context.user_data['upcoming_match_mapping'] = upcoming_match_mapping
         reply_markup_kb = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
@@ -1031,13 +1008,10 @@ class HLTVUserBot:
             await update.message.reply_text(match_text, reply_markup=inline_markup, parse_mode="HTML", disable_web_page_preview=True)
         # --- Inline-кнопки для будущих матчей ---
         if user_future_matches:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+            cursor = self._cursor()
             q_marks = ','.join(['?'] * len(user_future_matches))
             cursor.execute(f'SELECT match_id, datetime, team1_name, team2_name FROM upcoming_match WHERE match_id IN ({q_marks})', tuple(user_future_matches))
             rows = cursor.fetchall()
-            conn.close()
             if rows:
                 await update.message.reply_text("Ваши подписки на будущие Live-матчи.\nВам будут приходить уведомления кода матч начнется.", reply_markup=reply_markup_kb)
                 msg = ''
@@ -1098,12 +1072,9 @@ class HLTVUserBot:
         elif data.startswith("subscribe_upcoming_"):
             sub_type, match_id = data.split(":")[0].split("_")[-1], int(data.split(":")[1])
             # Получаем информацию о матче из базы данных
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+            cursor = self._cursor()
             cursor.execute('SELECT team1_name, team2_name FROM upcoming_match WHERE match_id = ?', (match_id,))
             match = cursor.fetchone()
-            conn.close()
             if match:
                 t1 = match['team1_name']
                 t2 = match['team2_name']
@@ -1114,12 +1085,9 @@ class HLTVUserBot:
         elif data.startswith("unsubscribe_upcoming:"):
             match_id = int(data.split(":")[1])
             # Получаем информацию о матче из базы данных
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+            cursor = self._cursor()
             cursor.execute('SELECT team1_name, team2_name FROM upcoming_match WHERE match_id = ?', (match_id,))
             match = cursor.fetchone()
-            conn.close()
             if match:
                 t1 = match['team1_name']
                 t2 = match['team2_name']
@@ -4,9 +4,10 @@
 """
 
 import os
-import json
 import logging
 
+from src.utils import json_io
+
 logger = logging.getLogger(__name__)
 
 # Путь к директории с конфигурационными файлами
@@ -47,8 +48,7 @@ def create_default_config(bot_type):
     
     if not os.path.exists(config_path):
         try:
-            with open(config_path, 'w', encoding='utf-8') as f:
-                json.dump(DEFAULT_CONFIG, f, indent=4, ensure_ascii=False)
+            json_io.save_file(config_path, DEFAULT_CONFIG, indent=4)
             logger.info(f"Создан конфигурационный файл по умолчанию: {config_path}")
         except Exception as e:
             logger.error(f"Ошибка при создании конфигурационного файла: {str(e)}")
@@ -73,8 +73,7 @@ def load_config(bot_type):
         logger.warning(f"Конфигурационный файл {bot_type}_bot_config.json не найден. Создан файл с настройками по умолчанию.")
     
     try:
-        with open(config_path, 'r', encoding='utf-8') as f:
-            config = json.load(f)
+        config = json_io.load_file(config_path)
         
         # Проверяем, что все обязательные параметры присутствуют
         for key in DEFAULT_CONFIG:
@@ -105,8 +104,7 @@ def save_config(bot_type, config):
     config_path = os.path.join(CONFIG_DIR, f"{bot_type}_bot_config.json")
     
     try:
-        with open(config_path, 'w', encoding='utf-8') as f:
-            json.dump(config, f, indent=4, ensure_ascii=False)
+        json_io.save_file(config_path, config, indent=4)
         logger.info(f"Конфигурация бота {bot_type} успешно сохранена")
         return True
     
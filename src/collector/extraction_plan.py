@@ -0,0 +1,247 @@
+"""
+Скомпилированный план извлечения данных со страницы результата матча
+
+Методы _parse_match_details, _parse_player_stats и _parse_maps коллектора
+ищут каждое поле отдельным запросом по всему документу, а некоторые области
+(например, TEAM1_GRADIENT) находятся по нескольку раз. План описывает извлечение
+декларативно: области страницы (MATCH_SCOPES) и поля внутри них (MATCH_FIELDS).
+Селекторы компилируются один раз для бэкенда разбора, все вхождения областей
+находятся одним проходом по документу, а поля ищутся только внутри своих
+областей. Одинаковые запросы вычисляются один раз.
+
+Поле ищется либо в первой области, как element.select_one() коллектора, либо
+полным селектором из src.config.selectors по всем вхождениям области в порядке
+документа, как soup.select_one(). Первый компонент такого селектора - класс самой
+области, поэтому первое найденное совпадает с первым совпадением по документу.
+
+Результат совпадает с методами коллектора (tests/test_extraction_plan.py),
+замер времени:
+    python -m src.scripts.bench_extraction_plan
+"""
+import logging
+
+from src.config.selectors import (
+    TIME_EVENT, TEAM1_GRADIENT, TEAM2_GRADIENT, TEAM_NAME, TEAM1_SCORE, TEAM2_SCORE, TEAM1_RANK, TEAM2_RANK,
+    EVENT, H2H_TEAM1_WINS, H2H_TEAM2_WINS, PLAYER_LINK
+)
+from src.collector.html_backend import BACKEND_BS4, CompiledSelector
+
+logger = logging.getLogger(__name__)
+
+# Области страницы: (ключ, тег, класс, обязательный атрибут). Находятся все вхождения
+# в порядке документа
+MATCH_SCOPES = (
+    ('time_event', None, 'timeAndEvent', None),
+    ('team1', None, 'team1-gradient', None),
+    ('team2', None, 'team2-gradient', None),
+    ('lineups', None, 'lineups', None),
+    ('demo', 'a', 'stream-box', 'data-demo-link'),
+    ('head_to_head', None, 'head-to-head', None),
+    ('stats_content', None, 'stats-content', None),
+    ('maps', None, 'mapholder', None),
+)
+
+# Где искать поле: в первой области или по всем ее вхождениям
+IN_FIRST = 'first'
+IN_ALL = 'all'
+
+def _unix_seconds(value):
+    return int(value or 0) // 1000
+
+
+def _int_or_zero(value):
+    try:
+        return int(value)
+    except ValueError:
+        return 0
+
+
+# Поля деталей матча: (поле, область, где искать, селектор или None для самой
+# области, источник - 'text' или имя атрибута, преобразование - функция или метод коллектора)
+MATCH_FIELDS = (
+    ('datetime', 'time_event', IN_ALL, TIME_EVENT, 'data-unix', _unix_seconds),
+    ('team1_id', 'team1', IN_FIRST, PLAYER_LINK, 'href', '_extract_id_from_url'),
+    ('team1_name', 'team1', IN_FIRST, TEAM_NAME, 'text', None),
+    ('team2_id', 'team2', IN_FIRST, PLAYER_LINK, 'href', '_extract_id_from_url'),
+    ('team2_name', 'team2', IN_FIRST, TEAM_NAME, 'text', None),
+    ('team1_score', 'team1', IN_ALL, TEAM1_SCORE, 'text', int),
+    ('team2_score', 'team2', IN_ALL, TEAM2_SCORE, 'text', int),
+    ('team1_rank', 'lineups', IN_ALL, TEAM1_RANK, 'text', '_extract_rank'),
+    ('team2_rank', 'lineups', IN_ALL, TEAM2_RANK, 'text', '_extract_rank'),
+    ('event_id', 'time_event', IN_ALL, EVENT, 'href', '_extract_id_from_url'),
+    ('event_name', 'time_event', IN_ALL, EVENT, 'text', None),
+    ('demo_id', 'demo', IN_FIRST, None, 'data-demo-link', '_extract_demo_id'),
+    ('head_to_head_team1_wins', 'head_to_head', IN_ALL, H2H_TEAM1_WINS, 'text', _int_or_zero),
+    ('head_to_head_team2_wins', 'head_to_head', IN_ALL, H2H_TEAM2_WINS, 'text', _int_or_zero),
+)
+
+# Ссылки команд для статистики игроков (как soup.select_one() в _parse_player_stats)
+TEAM_LINKS = (
+    ('team1', IN_ALL, f"{TEAM1_GRADIENT} {PLAYER_LINK}"),
+    ('team2', IN_ALL, f"{TEAM2_GRADIENT} {PLAYER_LINK}"),
+)
+
+# Селекторы внутри области статистики
+STATS_TOTAL_TABLES = '.table.totalstats, table.totalstats'
+STATS_ANY_TABLE = 'table'
+STATS_TABLE_ROWS = 'tbody tr'
+
+
+class ExtractionPlan:
+    """
+    План извлечения, скомпилированный для коллектора и бэкенда разбора
+    """
+
+    def __init__(self, collector, backend=BACKEND_BS4):
+        """
+        Args:
+            collector (MatchDetailsCollector): Коллектор, чьи методы разбирают значения
+                и строки статистики игроков
+            backend (str): Бэкенд разбора HTML, которым получен документ
+        """
+        self.collector = collector
+        self.backend = backend
+
+        # Все области ищутся одним селектором за один проход
+        scope_selectors = []
+        for key, tag, class_name, attr in MATCH_SCOPES:
+            scope_selectors.append(f"{tag or ''}.{class_name}" + (f"[{attr}]" if attr else ""))
+        self._scopes = CompiledSelector(", ".join(scope_selectors), backend)
+
+        self._lookups = {}
+        self._fields = []
+        for field, scope, where, selector, source, convert in MATCH_FIELDS:
+            if selector is not None:
+                self._add_lookup(scope, where, selector)
+            if isinstance(convert, str):
+                convert = getattr(collector, convert)
+            self._fields.append((field, scope, where, selector, source, convert))
+        for scope, where, selector in TEAM_LINKS:
+            self._add_lookup(scope, where, selector)
+
+        self._total_tables = CompiledSelector(STATS_TOTAL_TABLES, backend)
+        self._any_table = CompiledSelector(STATS_ANY_TABLE, backend)
+        self._table_rows = CompiledSelector(STATS_TABLE_ROWS, backend)
+
+    def _add_lookup(self, scope, where, selector):
+        if (scope, where, selector) not in self._lookups:
+            self._lookups[(scope, where, selector)] = CompiledSelector(selector, self.backend)
+
+    def _find_scopes(self, soup):
+        """
+        Находит все вхождения областей страницы одним проходом по документу
+
+        Returns:
+            dict: Ключ области -> список элементов в порядке документа
+        """
+        scopes = {key: [] for key, tag, class_name, attr in MATCH_SCOPES}
+        for element in self._scopes.select(soup):
+            classes = element.get('class') or []
+            for key, tag, class_name, attr in MATCH_SCOPES:
+                if class_name not in classes or (tag and element.name != tag) or (attr and element.get(attr) is None):
+                    continue
+                scopes[key].append(element)
+        return scopes
+
+    def _find_elements(self, scopes):
+        """
+        Находит элементы всех полей внутри их областей
+
+        Returns:
+            dict: (область, где искать, селектор) -> первый найденный элемент или None
+        """
+        elements = {}
+        for (scope, where, selector), compiled in self._lookups.items():
+            roots = scopes[scope][:1] if where == IN_FIRST else scopes[scope]
+            element = None
+            for root in roots:
+                element = compiled.select_one(root)
+                if element is not None:
+                    break
+            elements[(scope, where, selector)] = element
+        return elements
+
+    def _parse_match(self, scopes, elements, match_id):
+        try:
+            match_data = {
+                'match_id': match_id,
+                'datetime': None,
+                'team1_id': None,
+                'team1_name': None,
+                'team1_score': None,
+                'team1_rank': None,
+                'team2_id': None,
+                'team2_name': None,
+                'team2_score': None,
+                'team2_rank': None,
+                'event_id': None,
+                'event_name': None,
+                'demo_id': None,
+                'head_to_head_team1_wins': None,
+                'head_to_head_team2_wins': None,
+                'url': None,
+                'maps': []
+            }
+            for field, scope, where, selector, source, convert in self._fields:
+                if selector is None:
+                    element = scopes[scope][0] if scopes[scope] else None
+                else:
+                    element = elements[(scope, where, selector)]
+                if element is None:
+                    continue
+                value = element.text.strip() if source == 'text' else element.get(source)
+                match_data[field] = convert(value) if convert else value
+            return match_data
+
+        except Exception as e:
+            logger.error(f"Ошибка при парсинге деталей матча {match_id}: {str(e)}")
+            return None
+
+    def _parse_players(self, soup, scopes, elements, match_id):
+        collector = self.collector
+        try:
+            stats_tables = None
+            if scopes['stats_content']:
+                stats_content = scopes['stats_content'][0]
+                stats_tables = self._total_tables.select(stats_content) or self._any_table.select(stats_content)
+            if not stats_tables or len(stats_tables) < 2:
+                # Редкие форматы таблиц (одна таблица, без .stats-content) разбирает коллектор
+                return collector._parse_player_stats(soup, match_id)
+
+            team_ids = []
+            for scope, where, selector in TEAM_LINKS:
+                link = elements[(scope, where, selector)]
+                team_ids.append(collector._extract_id_from_url(link.get('href')) if link is not None else None)
+
+            players_data = []
+            for stats_table, team_id in zip(stats_tables, team_ids):
+                for row in self._table_rows.select(stats_table):
+                    player_data = collector._extract_player_stats_from_new_format(row, match_id, team_id)
+                    if player_data:
+                        players_data.append(player_data)
+
+            logger.info(f"Извлечена статистика для {len(players_data)} игроков из обеих команд")
+            return players_data
+
+        except Exception as e:
+            logger.error(f"Ошибка при парсинге статистики игроков матча {match_id}: {str(e)}")
+            return []
+
+    def extract(self, soup, match_id):
+        """
+        Извлекает детали матча, статистику игроков и карты за один проход
+
+        Args:
+            soup: HTML-документ, разобранный бэкендом плана
+            match_id (int): ID матча
+
+        Returns:
+            tuple: (детали матча или None, список игроков, список карт) -
+                то же, что возвращают _parse_match_details, _parse_player_stats и _parse_maps
+        """
+        scopes = self._find_scopes(soup)
+        elements = self._find_elements(scopes)
+        match_data = self._parse_match(scopes, elements, match_id)
+        players_data = self._parse_players(soup, scopes, elements, match_id)
+        maps = self.collector._parse_map_holders(scopes['maps'])
+        return match_data, players_data, maps
@@ -0,0 +1,229 @@
+"""
+Сменные бэкенды разбора HTML для коллекторов
+
+Эталонный путь - BeautifulSoup с html.parser и soupsieve - написан на чистом
+Python и занимает основное время --write-json-match-page. Быстрые бэкенды
+(lxml + cssselect, selectolax/lexbor) оборачиваются в тонкий адаптер с тем же
+подмножеством API тегов BeautifulSoup, которым пользуются коллекторы:
+select(), select_one(), .name, .text и get(). Поэтому код извлечения данных
+не меняется, а совпадение результатов проверяют tests/test_parser_backends.py
+и python -m src.scripts.check_parser_backends.
+
+Отличия, которые учитывает адаптер:
+    - select() на элементе, как в soupsieve, не включает сам элемент;
+    - элемент, подходящий нескольким селекторам группы "a, b", возвращается один раз;
+    - get('class') возвращает список классов;
+    - атрибут без значения возвращается как пустая строка.
+"""
+import logging
+
+from src.config import HTML_PARSER_BACKEND
+
+logger = logging.getLogger(__name__)
+
+BACKEND_BS4 = "bs4"
+BACKEND_LXML = "lxml"
+BACKEND_SELECTOLAX = "selectolax"
+
+
+class _LxmlElement:
+    """Элемент lxml с API тега BeautifulSoup"""
+    __slots__ = ("_el",)
+
+    # Скомпилированные селекторы общие для всех документов
+    _selectors = {}
+
+    def __init__(self, el):
+        self._el = el
+
+    @classmethod
+    def _compile(cls, selector):
+        compiled = cls._selectors.get(selector)
+        if compiled is None:
+            compiled = CSSSelector(selector, translator="html")
+            cls._selectors[selector] = compiled
+        return compiled
+
+    def select(self, selector):
+        el = self._el
+        return [_LxmlElement(found) for found in self._compile(selector)(el) if found is not el]
+
+    def select_one(self, selector):
+        el = self._el
+        for found in self._compile(selector)(el):
+            if found is not el:
+                return _LxmlElement(found)
+        return None
+
+    @property
+    def name(self):
+        return self._el.tag
+
+    @property
+    def text(self):
+        return str(self._el.text_content())
+
+    def get_text(self):
+        return self.text
+
+    def get(self, name, default=None):
+        value = self._el.get(name)
+        if value is None:
+            return default
+        if name == "class":
+            return value.split()
+        return value
+
+
+class _SelectolaxNode:
+    """Узел selectolax (lexbor) с API тега BeautifulSoup"""
+    __slots__ = ("_node",)
+
+    def __init__(self, node):
+        self._node = node
+
+    def select(self, selector):
+        node = self._node
+        found_nodes = node.css(selector)
+        if "," in selector:
+            # lexbor возвращает элемент группы селекторов столько раз, сколько селекторов он подходит
+            seen = {node.mem_id}
+            result = []
+            for found in found_nodes:
+                if found.mem_id not in seen:
+                    seen.add(found.mem_id)
+                    result.append(_SelectolaxNode(found))
+            return result
+        return [_SelectolaxNode(found) for found in found_nodes if found.mem_id != node.mem_id]
+
+    def select_one(self, selector):
+        node = self._node
+        for found in node.css(selector):
+            if found.mem_id != node.mem_id:
+                return _SelectolaxNode(found)
+        return None
+
+    @property
+    def name(self):
+        return self._node.tag
+
+    @property
+    def text(self):
+        return self._node.text(deep=True)
+
+    def get_text(self):
+        return self.text
+
+    def get(self, name, default=None):
+        attributes = self._node.attributes
+        if name not in attributes:
+            return default
+        value = attributes[name] or ""
+        if name == "class":
+            return value.split()
+        return value
+
+
+try:
+    import lxml.html
+    from lxml.cssselect import CSSSelector
+except ImportError:
+    lxml = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+
+def available_backends():
+    """
+    Бэкенды, для которых установлены зависимости
+
+    Returns:
+        list: Имена бэкендов, первым эталонный bs4
+    """
+    backends = [BACKEND_BS4]
+    if lxml is not None:
+        backends.append(BACKEND_LXML)
+    if LexborHTMLParser is not None:
+        backends.append(BACKEND_SELECTOLAX)
+    return backends
+
+
+def resolve_backend(backend=None):
+    """
+    Выбирает бэкенд: заданный, а если его зависимости не установлены - bs4
+
+    Args:
+        backend (str, optional): Имя бэкенда (по умолчанию HTML_PARSER_BACKEND из конфига)
+
+    Returns:
+        str: Имя доступного бэкенда
+    """
+    backend = backend or HTML_PARSER_BACKEND
+    if backend not in available_backends():
+        if backend != BACKEND_BS4:
+            logger.warning(f"Бэкенд разбора HTML '{backend}' недоступен, используется {BACKEND_BS4}")
+        return BACKEND_BS4
+    return backend
+
+
+def parse_html(html, backend=BACKEND_BS4):
+    """
+    Разбирает HTML-документ выбранным бэкендом
+
+    Args:
+        html (str): HTML-содержимое
+        backend (str): Имя бэкенда (см. resolve_backend)
+
+    Returns:
+        Корень документа с API select()/select_one() как у BeautifulSoup
+    """
+    if backend == BACKEND_LXML:
+        return _LxmlElement(lxml.html.document_fromstring(html))
+    if backend == BACKEND_SELECTOLAX:
+        return _SelectolaxNode(LexborHTMLParser(html).root)
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(html, 'html.parser')
+
+
+class CompiledSelector:
+    """
+    CSS-селектор, скомпилированный один раз для выбранного бэкенда
+
+    Применяется к узлу документа того же бэкенда: compiled.select(node)
+    равносильно node.select(selector), но без разбора селектора на каждом вызове.
+    """
+    __slots__ = ("selector", "backend", "_compiled")
+
+    def __init__(self, selector, backend=BACKEND_BS4):
+        self.selector = selector
+        self.backend = backend
+        if backend == BACKEND_LXML:
+            self._compiled = _LxmlElement._compile(selector)
+        elif backend == BACKEND_SELECTOLAX:
+            # lexbor не хранит разобранные селекторы, передаем строку
+            self._compiled = selector
+        else:
+            import soupsieve
+            self._compiled = soupsieve.compile(selector)
+
+    def select(self, node):
+        if self.backend == BACKEND_LXML:
+            el = node._el
+            return [_LxmlElement(found) for found in self._compiled(el) if found is not el]
+        if self.backend == BACKEND_SELECTOLAX:
+            return node.select(self._compiled)
+        return self._compiled.select(node)
+
+    def select_one(self, node):
+        if self.backend == BACKEND_LXML:
+            el = node._el
+            for found in self._compiled(el):
+                if found is not el:
+                    return _LxmlElement(found)
+            return None
+        if self.backend == BACKEND_SELECTOLAX:
+            return node.select_one(self._compiled)
+        return self._compiled.select_one(node)
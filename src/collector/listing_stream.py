@@ -0,0 +1,190 @@
+"""
+Потоковое извлечение матчей из страниц-списков results.html и matches.html
+
+MatchesCollector раньше читал страницу целиком в строку и строил полное дерево
+BeautifulSoup, хотя из каждого элемента матча нужны только ссылка и время.
+Здесь страница читается кусками и подается в html.parser.HTMLParser (стандартная
+библиотека), который разбирает ее по тегам без построения дерева. Сканер
+держит только стек открытых тегов и матчи, элементы которых еще не закрыты,
+и отдает матч, как только закрывается его элемент. Память ограничена размером
+куска и глубиной вложенности, а не размером страницы.
+
+Правила поиска повторяют select() по дереву BeautifulSoup с html.parser:
+    - matches: элементы .match внутри первого .mainContent, ссылка - первый <a>
+      внутри элемента, время - первый потомок с атрибутом data-unix;
+    - results: элементы .result-con внутри первого .results, ссылка - первый
+      a.a-reset внутри элемента.
+Незакрытые теги закрываются так же, как в BeautifulSoup: закрывающий тег
+снимает со стека все теги до ближайшего открытого с тем же именем, а
+закрывающий тег без открытого игнорируется.
+
+Совпадение с разбором через BeautifulSoup проверяет tests/test_listing_stream.py
+"""
+import logging
+from collections import deque
+from html.parser import HTMLParser
+
+logger = logging.getLogger(__name__)
+
+LISTING_MATCHES = "matches"
+LISTING_RESULTS = "results"
+
+# Размер куска, которым читается страница (символов)
+CHUNK_SIZE = 64 * 1024
+
+# Теги без закрывающего тега
+VOID_TAGS = frozenset((
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+    'link', 'meta', 'param', 'source', 'track', 'wbr'
+))
+
+# Классы элемента времени, если у первого data-unix пустое значение
+TIME_CLASSES = frozenset(('time', 'date', 'matchTime'))
+
+# Вид страницы: (класс области, класс элемента матча, класс ссылки или None для любой <a>, нужно ли время)
+LISTING_RULES = {
+    LISTING_MATCHES: ('mainContent', 'match', None, True),
+    LISTING_RESULTS: ('results', 'result-con', 'a-reset', False),
+}
+
+
+class _Item:
+    """Элемент матча, который еще читается"""
+    __slots__ = ('depth', 'url', 'unix_time', 'time_fallback', 'closed')
+
+    def __init__(self, depth):
+        self.depth = depth
+        self.url = None
+        self.unix_time = None
+        self.time_fallback = None
+        self.closed = False
+
+
+class ListingScanner(HTMLParser):
+    """
+    Потоковый сканер страницы-списка
+
+    Страница подается кусками через feed(), готовые матчи забираются pop_ready()
+    в порядке документа - так же, как их возвращает select().
+    """
+
+    def __init__(self, kind):
+        """
+        Args:
+            kind (str): Вид страницы (LISTING_MATCHES или LISTING_RESULTS)
+        """
+        super().__init__(convert_charrefs=True)
+        self.scope_class, self.item_class, self.link_class, self.want_time = LISTING_RULES[kind]
+        self._stack = []
+        # Глубина стека, на которой открыта область; None - область еще не найдена или уже закрыта
+        self._scope_depth = None
+        self.scope_found = False
+        self.items_found = 0
+        self._open_items = []
+        self._pending = deque()
+
+    def _on_element(self, tag, attrs, classes):
+        for item in self._open_items:
+            if item.url is None and tag == 'a' and (self.link_class is None or self.link_class in classes):
+                item.url = attrs.get('href') or ''
+            if not self.want_time:
+                continue
+            if item.unix_time is None and 'data-unix' in attrs:
+                item.unix_time = attrs['data-unix'] or ''
+            if item.time_fallback is None and TIME_CLASSES.intersection(classes):
+                item.time_fallback = attrs.get('data-unix') or ''
+
+    def _close_to(self, depth):
+        """Закрывает элементы стека начиная с глубины depth"""
+        del self._stack[depth:]
+        while self._open_items and self._open_items[-1].depth >= depth:
+            self._open_items.pop().closed = True
+        if self._scope_depth is not None and self._scope_depth >= depth:
+            self._scope_depth = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        classes = (attrs.get('class') or '').split()
+        depth = len(self._stack)
+        self._stack.append(tag)
+
+        # Сначала элемент видят уже открытые матчи: select() ищет ссылку и время
+        # только среди потомков, не в самом элементе матча
+        if self._open_items:
+            self._on_element(tag, attrs, classes)
+        if self._scope_depth is None:
+            if not self.scope_found and self.scope_class in classes:
+                self.scope_found = True
+                self._scope_depth = depth
+        elif self.item_class in classes:
+            item = _Item(depth)
+            self._open_items.append(item)
+            self._pending.append(item)
+            self.items_found += 1
+
+        if tag in VOID_TAGS:
+            self._close_to(depth)
+
+    def handle_startendtag(self, tag, attrs):
+        # Как в BeautifulSoup: <div/> открывает и сразу закрывает элемент
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        for depth in range(len(self._stack) - 1, -1, -1):
+            if self._stack[depth] == tag:
+                self._close_to(depth)
+                return
+
+    def finish(self):
+        """Дочитывает страницу и закрывает все незакрытые элементы"""
+        self.close()
+        self._close_to(0)
+
+    def pop_ready(self):
+        """
+        Забирает матчи, элементы которых закрыты
+
+        Returns:
+            list: (url, data-unix первого потомка с ним, data-unix первого
+                элемента .time/.date/.matchTime) - время None, если элемента нет
+        """
+        ready = []
+        while self._pending and self._pending[0].closed:
+            item = self._pending.popleft()
+            if item.url is not None:
+                ready.append((item.url, item.unix_time, item.time_fallback))
+        return ready
+
+
+def iter_listing(file_path, kind, chunk_size=CHUNK_SIZE):
+    """
+    Потоково перебирает матчи страницы-списка
+
+    Args:
+        file_path (str): Путь к results.html или matches.html
+        kind (str): Вид страницы (LISTING_MATCHES или LISTING_RESULTS)
+        chunk_size (int): Размер куска чтения
+
+    Yields:
+        tuple: (url, время, запасное время) в порядке документа, как pop_ready();
+            элементы матчей без ссылки пропускаются
+    """
+    scanner = ListingScanner(kind)
+    with open(file_path, 'r', encoding='utf-8') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            scanner.feed(chunk)
+            yield from scanner.pop_ready()
+    scanner.finish()
+    yield from scanner.pop_ready()
+
+    if not scanner.scope_found:
+        logger.error(f"Не найдена область .{scanner.scope_class} на странице {file_path}")
+    elif not scanner.items_found:
+        logger.error(f"Не найдены элементы матчей (.{scanner.item_class}) на странице {file_path}")
+    else:
+        logger.info(f"Всего найдено {scanner.items_found} элементов матчей на странице {file_path}")
@@ -0,0 +1,146 @@
+"""
+Манифест обработанных коллекторами страниц
+
+Для каждой обработанной страницы хранятся размер, mtime, SHA-256 содержимого
+и версия парсера, которая ее обработала (таблица collect_manifest). Страница
+пропускается, если не изменилась с прошлой обработки той же версией парсера:
+сначала сравниваются размер и mtime, хэш считается только когда они разошлись.
+Увеличение PARSER_VERSION коллектора заставляет заново обработать все страницы.
+"""
+import os
+import hashlib
+import logging
+from datetime import datetime
+from typing import List, Tuple
+
+from src.db.connection import connect
+from src.db.migrations import migrate
+from src.utils.page_archive import get_archive
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(html: str) -> str:
+    """SHA-256 HTML-содержимого (совпадает с хэшем в архиве страниц)"""
+    return hashlib.sha256(html.encode("utf-8")).hexdigest()
+
+
+class CollectManifest:
+    """
+    Манифест страниц в таблице collect_manifest
+    """
+
+    def __init__(self, db_path: str = "hltv.db"):
+        self.db_path = db_path
+        # Таблицей владеют миграции схемы
+        migrate(db_path)
+
+    def _connect(self):
+        return connect(self.db_path)
+
+    def _load(self, kind: str) -> dict:
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                'SELECT file_name, size, mtime_ns, content_hash, parser_version FROM collect_manifest WHERE kind = ?',
+                (kind,)
+            ).fetchall()
+        finally:
+            conn.close()
+        return {row[0]: row[1:] for row in rows}
+
+    def _touch(self, kind: str, file_name: str, size: int, mtime_ns: int):
+        """Запоминает новый mtime страницы с прежним содержимым"""
+        conn = self._connect()
+        try:
+            conn.execute(
+                'UPDATE collect_manifest SET size = ?, mtime_ns = ? WHERE kind = ? AND file_name = ?',
+                (size, mtime_ns, kind, file_name)
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _is_unchanged(self, kind: str, file_path: str, entry: tuple, parser_version: int) -> bool:
+        size, mtime_ns, saved_hash, saved_version = entry
+        if saved_version != parser_version:
+            return False
+        file_name = os.path.basename(file_path)
+
+        if not os.path.exists(file_path):
+            # Страница только в архиве: сравниваем хэш из индекса архива
+            archive = get_archive()
+            return bool(archive) and archive.latest_hash(kind, file_name) == saved_hash
+
+        stat = os.stat(file_path)
+        if stat.st_size == size and stat.st_mtime_ns == mtime_ns:
+            return True
+        # Файл перезаписан: содержимое могло не измениться
+        with open(file_path, 'r', encoding='utf-8') as f:
+            if content_hash(f.read()) != saved_hash:
+                return False
+        self._touch(kind, file_name, stat.st_size, stat.st_mtime_ns)
+        return True
+
+    def filter_changed(self, kind: str, file_paths: List[str], parser_version: int) -> Tuple[List[str], List[str]]:
+        """
+        Разделяет страницы на новые/измененные и уже обработанные
+
+        Args:
+            kind (str): Вид страницы (result, upcoming)
+            file_paths (list): Пути к страницам
+            parser_version (int): Текущая версия парсера коллектора
+
+        Returns:
+            tuple: (страницы для обработки, неизменные страницы)
+        """
+        entries = self._load(kind)
+        changed, unchanged = [], []
+        for file_path in file_paths:
+            entry = entries.get(os.path.basename(file_path))
+            if entry and self._is_unchanged(kind, file_path, entry, parser_version):
+                unchanged.append(file_path)
+            else:
+                changed.append(file_path)
+        return changed, unchanged
+
+    def record(self, kind: str, file_path: str, html: str, parser_version: int):
+        """
+        Запоминает обработанную страницу
+
+        Args:
+            kind (str): Вид страницы
+            file_path (str): Путь к странице (файла может не быть, если она прочитана из архива)
+            html (str): Обработанное содержимое
+            parser_version (int): Версия парсера коллектора
+        """
+        self.record_hash(kind, file_path, content_hash(html), parser_version)
+
+    def record_hash(self, kind: str, file_path: str, digest: str, parser_version: int):
+        """
+        Запоминает обработанную страницу по уже посчитанному хэшу содержимого
+        (страницу разбирал процесс пула, а записывает родительский процесс)
+
+        Args:
+            kind (str): Вид страницы
+            file_path (str): Путь к странице
+            digest (str): SHA-256 содержимого (content_hash)
+            parser_version (int): Версия парсера коллектора
+        """
+        size, mtime_ns = None, None
+        if os.path.exists(file_path):
+            stat = os.stat(file_path)
+            size, mtime_ns = stat.st_size, stat.st_mtime_ns
+        conn = self._connect()
+        try:
+            conn.execute('''
+                INSERT INTO collect_manifest (kind, file_name, size, mtime_ns, content_hash, parser_version, processed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(kind, file_name) DO UPDATE SET
+                    size = excluded.size, mtime_ns = excluded.mtime_ns, content_hash = excluded.content_hash,
+                    parser_version = excluded.parser_version, processed_at = excluded.processed_at
+            ''', (kind, os.path.basename(file_path), size, mtime_ns, digest,
+                  parser_version, datetime.now().isoformat()))
+            conn.commit()
+        finally:
+            conn.close()
@@ -5,21 +5,29 @@
 import os
 import re
 import logging
-import sqlite3
-from bs4 import BeautifulSoup
 import glob
 from datetime import datetime
 import time
-import json
 import os.path
 from src.config.constants import MATCH_DETAILS_DIR, BASE_URL
 from src.config.selectors import *
+from src.utils.page_archive import KIND_RESULT, get_archive, read_page
+from src.collector.html_backend import parse_html, resolve_backend
+from src.collector.parallel import iter_process_results
+from src.collector.manifest import CollectManifest, content_hash
+from src.collector.extraction_plan import ExtractionPlan
+from src.db.connection import connect
+from src.config import COLLECT_DIRECT_TO_DB, COLLECT_DB_BATCH_SIZE, COLLECT_DIRECT_KEEP_JSON, JSONL_INTERMEDIATE_ENABLED
+from src.utils import json_io
+from src.utils.jsonl_segments import append_record, commit_all
 
 # Директории для JSON файлов
 JSON_OUTPUT_DIR = "storage/json"
 MATCH_DETAILS_JSON_DIR = os.path.join(JSON_OUTPUT_DIR, "result_match")
 PLAYER_STATS_JSON_DIR = os.path.join(JSON_OUTPUT_DIR, "player_stats")
 RESULT_MAPS_JSON_DIR = os.path.join(JSON_OUTPUT_DIR, "result_maps")
+# Извлеченные данные в режиме прямой записи в БД (только для отладки, загрузчик их не читает)
+RESULT_AUDIT_JSON_DIR = os.path.join(JSON_OUTPUT_DIR, "audit", "result_match")
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
@@ -28,16 +36,41 @@ class MatchDetailsCollector:
     """
     Класс для извлечения данных из HTML-файлов матчей и их сохранения в БД
     """
-    def __init__(self, html_dir="storage/html/result", db_path="hltv.db"):
+    # Увеличивается при изменении извлечения данных: все страницы будут обработаны заново
+    PARSER_VERSION = 1
+    
+    def __init__(self, html_dir="storage/html/result", db_path="hltv.db", from_archive=False, parser_backend=None,
+                 workers=None, direct_db=None):
         """
         Инициализация коллектора деталей матчей
         
         Args:
             html_dir (str): Путь к директории с HTML-файлами прошедших матчей
             db_path (str): Путь к файлу базы данных
+            from_archive (bool): Обработать также все страницы из архива (повторная обработка истории)
+            parser_backend (str, optional): Бэкенд разбора HTML (по умолчанию HTML_PARSER_BACKEND из конфига)
+            workers (int, optional): Количество процессов обработки (по умолчанию COLLECT_WORKERS из конфига)
+            direct_db (bool, optional): Писать извлеченные данные сразу в БД пачками, без JSON
+                для MatchDetailsLoader (по умолчанию COLLECT_DIRECT_TO_DB из конфига)
         """
         self.html_dir = html_dir
         self.db_path = db_path
+        self.from_archive = from_archive
+        self.parser_backend = resolve_backend(parser_backend)
+        self.workers = workers
+        self.direct_db = COLLECT_DIRECT_TO_DB if direct_db is None else direct_db
+        self.manifest = CollectManifest(db_path)
+        # Селекторы компилируются один раз на коллектор
+        self.extraction_plan = ExtractionPlan(self, self.parser_backend)
+        # Аргументы для создания такого же коллектора в процессах пула
+        self.init_kwargs = {
+            'html_dir': html_dir,
+            'db_path': db_path,
+            'from_archive': from_archive,
+            'parser_backend': self.parser_backend,
+            'workers': 1,
+            'direct_db': self.direct_db
+        }
         
         # Создаем директории для JSON файлов, если они не существуют
         os.makedirs(MATCH_DETAILS_JSON_DIR, exist_ok=True)
@@ -66,44 +99,53 @@ class MatchDetailsCollector:
             'errors': 0,
             'already_exists': 0,
             'updated': 0,
-            'removed_files': 0
+            'removed_files': 0,
+            'skipped_unchanged': 0
         }
         
         # Получаем файлы для обработки
         files_to_process = self.get_files_to_process()
         stats['total_files'] = len(files_to_process)
         
+        # Страницы, уже обработанные этой версией парсера, повторно не разбираем
+        files_to_process, unchanged_files = self.manifest.filter_changed(KIND_RESULT, files_to_process, self.PARSER_VERSION)
+        if unchanged_files:
+            logger.info(f"Пропущено {len(unchanged_files)} страниц без изменений с прошлой обработки")
+            for file_path in unchanged_files:
+                self._remove_processed_file(file_path)
+        stats['skipped_unchanged'] = len(unchanged_files)
+        
         if not files_to_process:
             logger.info("Нет новых файлов для обработки")
             return stats
         
         logger.info(f"Найдено {len(files_to_process)} файлов для обработки")
         
-        # Обрабатываем каждый файл
-        for file_path in files_to_process:
-            try:
-                result = self.process_file(file_path)
-                stats['processed_files'] += 1
-                
-                if result == "success":
-                    stats['successful_match_details'] += 1
-                    stats['successful_player_stats'] += 1
-                    stats['removed_files'] += 1
-                elif result == "updated":
-                    stats['updated'] += 1
-                    stats['removed_files'] += 1
-                elif result == "already_exists":
-                    stats['already_exists'] += 1
-                elif result == "error":
-                    stats['errors'] += 1
-                
-                # Логируем прогресс каждые 10 файлов
-                if stats['processed_files'] % 10 == 0:
-                    logger.info(f"Обработано {stats['processed_files']} из {stats['total_files']} файлов")
-                    
-            except Exception as e:
-                logger.error(f"Ошибка при обработке файла {file_path}: {str(e)}")
+        if self.direct_db:
+            return self._collect_direct(files_to_process, stats)
+        
+        # Обрабатываем файлы (при большом их числе - в пуле процессов)
+        for file_path, result in iter_process_results(self, files_to_process, self.workers):
+            stats['processed_files'] += 1
+            
+            if result == "success":
+                stats['successful_match_details'] += 1
+                stats['successful_player_stats'] += 1
+                stats['removed_files'] += 1
+            elif result == "updated":
+                stats['updated'] += 1
+                stats['removed_files'] += 1
+            elif result == "already_exists":
+                stats['already_exists'] += 1
+            elif result == "error":
                 stats['errors'] += 1
+            
+            # Логируем прогресс каждые 10 файлов
+            if stats['processed_files'] % 10 == 0:
+                logger.info(f"Обработано {stats['processed_files']} из {stats['total_files']} файлов")
+        
+        # Фиксируем сегменты JSONL этого процесса (процессы пула фиксируют свои при завершении)
+        commit_all()
         
         logger.info(f"Завершен сбор деталей матчей. Обработано {stats['processed_files']} из {stats['total_files']} файлов")
         logger.info(f"Успешно: {stats['successful_match_details']}, Обновлено: {stats['updated']}, Ошибок: {stats['errors']}")
@@ -111,6 +153,94 @@ class MatchDetailsCollector:
         
         return stats
     
+    def _collect_direct(self, files_to_process, stats):
+        """
+        Извлекает данные из файлов и пишет их в БД пачками по COLLECT_DB_BATCH_SIZE матчей,
+        каждая пачка - одна транзакция
+        
+        Args:
+            files_to_process (list): Пути к HTML-файлам
+            stats (dict): Статистика обработки, дополняется на месте
+            
+        Returns:
+            dict: Статистика обработки файлов
+        """
+        # Загрузчик при импорте настраивает логирование, поэтому импортируется только в этом режиме
+        from src.loader.match_details_loader import MatchDetailsLoader
+        loader = MatchDetailsLoader(db_path=self.db_path)
+        stats['written_to_db'] = 0
+        
+        batch = []
+        for file_path, (result, record) in iter_process_results(self, files_to_process, self.workers,
+                                                               method="extract_file", error_result=("error", None)):
+            stats['processed_files'] += 1
+            if result == "error":
+                stats['errors'] += 1
+            else:
+                batch.append((file_path, record))
+            
+            if len(batch) >= COLLECT_DB_BATCH_SIZE:
+                self._write_batch(loader, batch, stats)
+                batch = []
+            
+            # Логируем прогресс каждые 10 файлов
+            if stats['processed_files'] % 10 == 0:
+                logger.info(f"Обработано {stats['processed_files']} из {stats['total_files']} файлов")
+        
+        if batch:
+            self._write_batch(loader, batch, stats)
+        
+        logger.info(f"Завершен сбор деталей матчей с записью в БД. Обработано {stats['processed_files']} из {stats['total_files']} файлов")
+        logger.info(f"Записано в БД: {stats['written_to_db']}, Новых: {stats['successful_match_details']}, "
+                    f"Обновлено: {stats['updated']}, Ошибок: {stats['errors']}")
+        logger.info(f"Удалено файлов после обработки: {stats['removed_files']}")
+        
+        return stats
+    
+    def _write_batch(self, loader, batch, stats):
+        """
+        Пишет пачку извлеченных матчей в БД одной транзакцией. HTML-файлы удаляются
+        только после фиксации транзакции, при ошибке они остаются для следующего запуска
+        
+        Args:
+            loader (MatchDetailsLoader): Загрузчик, выполняющий запись
+            batch (list): Пары (путь к HTML-файлу, запись из extract_file)
+            stats (dict): Статистика обработки, дополняется на месте
+        """
+        try:
+            written = loader.load_records([record for _, record in batch])
+        except Exception as e:
+            logger.error(f"Ошибка при записи пачки из {len(batch)} матчей в БД: {str(e)}")
+            stats['errors'] += len(batch)
+            return
+        
+        stats['written_to_db'] += len(batch)
+        stats['successful_match_details'] += written['inserted']
+        stats['updated'] += written['updated']
+        stats['successful_player_stats'] += sum(1 for _, record in batch if record['players'])
+        
+        for file_path, record in batch:
+            if COLLECT_DIRECT_KEEP_JSON:
+                self._save_audit_json(record)
+            self.manifest.record_hash(KIND_RESULT, file_path, record['content_hash'], self.PARSER_VERSION)
+            if self._remove_processed_file(file_path):
+                stats['removed_files'] += 1
+    
+    def _save_audit_json(self, record):
+        """
+        Сохраняет извлеченные из страницы данные для отладки (режим прямой записи в БД)
+        
+        Args:
+            record (dict): Запись из extract_file
+        """
+        try:
+            os.makedirs(RESULT_AUDIT_JSON_DIR, exist_ok=True)
+            json_file_path = os.path.join(RESULT_AUDIT_JSON_DIR, f"{record['match']['match_id']}.json")
+            audit = {key: record[key] for key in ('match', 'players', 'maps')}
+            json_io.save_file(json_file_path, audit, indent=2)
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении отладочного JSON матча {record['match']['match_id']}: {str(e)}")
+    
     def get_files_to_process(self):
         """
         Получает список HTML-файлов для обработки
@@ -127,9 +257,86 @@ class MatchDetailsCollector:
         html_files = glob.glob(os.path.join(self.html_dir, "match_*.html"))
         logger.info(f"Найдено {len(html_files)} HTML-файлов с деталями матчей")
         
-        # Всегда возвращаем все файлы для обработки
+        # Добавляем страницы из архива, которых уже нет на диске (читаются через read_page)
+        archive = get_archive() if self.from_archive else None
+        if archive:
+            on_disk = {os.path.basename(path) for path in html_files}
+            archived = [os.path.join(self.html_dir, name) for name in archive.list_files(KIND_RESULT) if name not in on_disk]
+            logger.info(f"Из архива добавлено {len(archived)} страниц")
+            html_files.extend(archived)
+        
+        # Возвращаем все файлы в постоянном порядке; неизменные отсеивает манифест в collect()
         logger.info(f"Все {len(html_files)} файлов будут обработаны")
-        return html_files
+        return sorted(html_files)
+    
+    def _extract(self, file_path):
+        """
+        Читает HTML-файл и извлекает из него детали матча, статистику игроков и карты
+        
+        Args:
+            file_path (str): Путь к HTML-файлу
+            
+        Returns:
+            tuple or None: (HTML-содержимое, детали матча, статистика игроков, карты)
+                или None, если детали матча извлечь не удалось
+        """
+        match_id = self._extract_match_id_from_filename(os.path.basename(file_path))
+        
+        if not match_id:
+            logger.error(f"Не удалось извлечь ID матча из имени файла: {file_path}")
+            return None
+        
+        # Читаем HTML-файл (или его копию из архива)
+        html_content = read_page(file_path, KIND_RESULT)
+            
+        # Парсим HTML
+        soup = parse_html(html_content, self.parser_backend)
+        
+        # Извлекаем детали матча, статистику игроков и карты за один проход
+        match_data, players_data, maps = self.extraction_plan.extract(soup, match_id)
+        
+        if not match_data:
+            logger.error(f"Не удалось извлечь детали матча из {file_path}")
+            return None
+        
+        # Формируем url и добавляем в match_data ДО сохранения
+        filename = os.path.basename(file_path)
+        slug_match = re.match(r"match_\d+-(.+)\.html", filename)
+        if slug_match:
+            slug = slug_match.group(1)
+            match_url = f"https://www.hltv.org/matches/{match_id}/{slug}"
+        else:
+            match_url = f"https://www.hltv.org/matches/{match_id}"
+        match_data['url'] = match_url
+        
+        return html_content, match_data, players_data, maps
+    
+    def extract_file(self, file_path):
+        """
+        Извлекает данные из HTML-файла для прямой записи в БД (файл не удаляется:
+        это происходит после записи пачки)
+        
+        Args:
+            file_path (str): Путь к HTML-файлу
+            
+        Returns:
+            tuple: ("success", запись с ключами match, players, maps, content_hash) или ("error", None)
+        """
+        try:
+            extracted = self._extract(file_path)
+            if not extracted:
+                return "error", None
+            html_content, match_data, players_data, maps = extracted
+            match_data['parsed_at'] = datetime.now().isoformat()
+            return "success", {
+                'match': match_data,
+                'players': players_data,
+                'maps': maps,
+                'content_hash': content_hash(html_content)
+            }
+        except Exception as e:
+            logger.error(f"Ошибка при обработке файла {file_path}: {str(e)}")
+            return "error", None
     
     def process_file(self, file_path):
         """
@@ -144,82 +351,32 @@ class MatchDetailsCollector:
         try:
             match_id = self._extract_match_id_from_filename(os.path.basename(file_path))
             
-            if not match_id:
-                logger.error(f"Не удалось извлечь ID матча из имени файла: {file_path}")
-                return "error"
-                
             # Проверяем, существуют ли уже детали этого матча в JSON
-            json_file_exists = os.path.exists(os.path.join(MATCH_DETAILS_JSON_DIR, f"{match_id}.json"))
+            json_file_exists = bool(match_id) and os.path.exists(os.path.join(MATCH_DETAILS_JSON_DIR, f"{match_id}.json"))
             
             if json_file_exists:
                 logger.info(f"Обновление существующих деталей матча {match_id}")
-            else:
+            elif match_id:
                 logger.info(f"Обработка файла с новыми деталями матча {match_id}")
             
-            # Читаем HTML-файл
-            with open(file_path, 'r', encoding='utf-8') as f:
-                html_content = f.read()
-                
-            # Парсим HTML
-            soup = BeautifulSoup(html_content, 'html.parser')
-            
-            # Извлекаем детали матча
-            match_data = self._parse_match_details(soup, match_id)
-            
-            if not match_data:
-                logger.error(f"Не удалось извлечь детали матча из {file_path}")
+            extracted = self._extract(file_path)
+            if not extracted:
+                return "error"
+            html_content, match_data, players_data, maps = extracted
+            
+            # Сохраняем детали матча, статистику игроков и карты; HTML оставляем
+            # для повторной обработки, если хотя бы одна запись не удалась
+            saved = self._save_match_details_to_json(match_data)
+            if saved and players_data:
+                saved = self._save_player_stats_to_json(players_data)
+            if saved and maps:
+                saved = self._save_maps_to_json(match_data['match_id'], maps)
+            if not saved:
+                logger.error(f"Не удалось сохранить данные из файла {file_path}, файл оставлен для повторной обработки")
                 return "error"
-            
-            # Формируем url и добавляем в match_data ДО сохранения в JSON
-            filename = os.path.basename(file_path)
-            slug_match = re.match(r"match_\d+-(.+)\.html", filename)
-            if slug_match:
-                slug = slug_match.group(1)
-                match_url = f"https://www.hltv.org/matches/{match_id}/{slug}"
-            else:
-                match_url = f"https://www.hltv.org/matches/{match_id}"
-            match_data['url'] = match_url
-            
-            # Сохраняем детали матча в JSON
-            self._save_match_details_to_json(match_data)
-            
-            # Извлекаем статистику игроков
-            players_data = self._parse_player_stats(soup, match_id)
-            
-            if players_data:
-                # Сохраняем статистику игроков в JSON
-                self._save_player_stats_to_json(players_data)
-                
-            # --- Новый блок: парсинг сыгранных карт ---
-            maps = []
-            for map_holder in soup.select('.mapholder'):
-                results_played = map_holder.select_one('.results.played')
-                if not results_played:
-                    continue  # не сыгранная карта
-                map_name_elem = map_holder.select_one('.mapname')
-                team1_score_elem = results_played.select_one('.results-left .results-team-score')
-                team2_score_elem = results_played.select_one('.results-right .results-team-score')
-                rounds_elem = results_played.select_one('.results-center-half-score')
-                if map_name_elem and team1_score_elem and team2_score_elem:
-                    map_name = map_name_elem.text.strip()
-                    team1_rounds = int(team1_score_elem.text.strip())
-                    team2_rounds = int(team2_score_elem.text.strip())
-                    rounds = rounds_elem.text.strip() if rounds_elem else ''
-                    maps.append({
-                        'map_name': map_name,
-                        'team1_rounds': team1_rounds,
-                        'team2_rounds': team2_rounds,
-                        'rounds': rounds
-                    })
-            # --- Конец блока ---
-            
-            # Сохраняем карты в отдельный JSON, если они есть
-            if maps:
-                maps_json_path = os.path.join(RESULT_MAPS_JSON_DIR, f"{match_id}.json")
-                with open(maps_json_path, "w", encoding="utf-8") as f:
-                    json.dump(maps, f, ensure_ascii=False, indent=2)
             
             logger.info(f"Успешно обработан файл {file_path}")
+            self.manifest.record(KIND_RESULT, file_path, html_content, self.PARSER_VERSION)
             
             # Удаляем обработанный файл
             self._remove_processed_file(file_path)
@@ -230,6 +387,50 @@ class MatchDetailsCollector:
             logger.error(f"Ошибка при обработке файла {file_path}: {str(e)}")
             return "error"
     
+    def _parse_maps(self, soup):
+        """
+        Извлекает сыгранные карты матча
+        
+        Args:
+            soup: HTML-документ
+            
+        Returns:
+            list: Словари с названием карты, счетом команд и счетом по половинам
+        """
+        return self._parse_map_holders(soup.select('.mapholder'))
+
+    def _parse_map_holders(self, map_holders):
+        """
+        Извлекает сыгранные карты из найденных блоков .mapholder
+
+        Args:
+            map_holders (list): Блоки карт в порядке документа
+
+        Returns:
+            list: Словари с названием карты, счетом команд и счетом по половинам
+        """
+        maps = []
+        for map_holder in map_holders:
+            results_played = map_holder.select_one('.results.played')
+            if not results_played:
+                continue  # не сыгранная карта
+            map_name_elem = map_holder.select_one('.mapname')
+            team1_score_elem = results_played.select_one('.results-left .results-team-score')
+            team2_score_elem = results_played.select_one('.results-right .results-team-score')
+            rounds_elem = results_played.select_one('.results-center-half-score')
+            if map_name_elem and team1_score_elem and team2_score_elem:
+                map_name = map_name_elem.text.strip()
+                team1_rounds = int(team1_score_elem.text.strip())
+                team2_rounds = int(team2_score_elem.text.strip())
+                rounds = rounds_elem.text.strip() if rounds_elem else ''
+                maps.append({
+                    'map_name': map_name,
+                    'team1_rounds': team1_rounds,
+                    'team2_rounds': team2_rounds,
+                    'rounds': rounds
+                })
+        return maps
+    
     def _is_match_details_exists(self, match_id):
         """
         Проверяет, существуют ли детали матча в базе данных
@@ -241,7 +442,7 @@ class MatchDetailsCollector:
             bool: True, если детали матча уже есть в БД, иначе False
         """
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = connect(self.db_path)
             cursor = conn.cursor()
             
             # Проверяем существование таблицы match_details
@@ -1249,9 +1450,13 @@ class MatchDetailsCollector:
             # Добавляем дату обработки
             match_data['parsed_at'] = datetime.now().isoformat()
             
+            if JSONL_INTERMEDIATE_ENABLED:
+                append_record(MATCH_DETAILS_JSON_DIR, match_data)
+                logger.info(f"Детали матча {match_id} добавлены в сегмент {MATCH_DETAILS_JSON_DIR}")
+                return True
+            
             # Сохраняем данные в JSON файл
-            with open(json_file_path, 'w', encoding='utf-8') as f:
-                json.dump(match_data, f, ensure_ascii=False, indent=2)
+            json_io.save_file(json_file_path, match_data)
                 
             logger.info(f"Сохранены детали матча {match_id} в файл {json_file_path}")
             return True
@@ -1286,9 +1491,14 @@ class MatchDetailsCollector:
                 'players': players_data
             }
             
+            if JSONL_INTERMEDIATE_ENABLED:
+                # В сегменте нет имени файла, поэтому ID матча хранится в записи
+                append_record(PLAYER_STATS_JSON_DIR, dict(data_with_timestamp, match_id=match_id))
+                logger.info(f"Статистика {len(players_data)} игроков матча {match_id} добавлена в сегмент {PLAYER_STATS_JSON_DIR}")
+                return True
+            
             # Сохраняем данные в JSON файл
-            with open(json_file_path, 'w', encoding='utf-8') as f:
-                json.dump(data_with_timestamp, f, ensure_ascii=False, indent=2)
+            json_io.save_file(json_file_path, data_with_timestamp)
                 
             logger.info(f"Сохранена статистика {len(players_data)} игроков для матча {match_id} в файл {json_file_path}")
             return True
@@ -1297,6 +1507,28 @@ class MatchDetailsCollector:
             logger.error(f"Ошибка при сохранении статистики игроков в JSON: {str(e)}")
             return False
 
+    def _save_maps_to_json(self, match_id, maps):
+        """
+        Сохраняет сыгранные карты матча
+        
+        Args:
+            match_id (int): ID матча
+            maps (list): Карты из _parse_maps
+            
+        Returns:
+            bool: True если карты успешно сохранены, иначе False
+        """
+        try:
+            if JSONL_INTERMEDIATE_ENABLED:
+                append_record(RESULT_MAPS_JSON_DIR, {'match_id': match_id, 'maps': maps})
+                return True
+            maps_json_path = os.path.join(RESULT_MAPS_JSON_DIR, f"{match_id}.json")
+            json_io.save_file(maps_json_path, maps)
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении карт матча {match_id} в JSON: {str(e)}")
+            return False
+
     def _remove_processed_file(self, file_path):
         """
         Удаляет обработанный HTML-файл
@@ -1307,6 +1539,9 @@ class MatchDetailsCollector:
         Returns:
             bool: True если файл успешно удален, иначе False
         """
+        if not os.path.exists(file_path):
+            # Страница была прочитана из архива
+            return True
         try:
             os.remove(file_path)
             logger.info(f"Удален обработанный файл: {file_path}")
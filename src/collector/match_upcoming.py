@@ -12,7 +12,13 @@ from datetime import datetime
 import time
 from src.config.constants import MATCH_UPCOMING_DIR
 from src.config.selectors import *
-import json
+from src.utils.page_archive import KIND_UPCOMING, get_archive, read_page
+from src.utils.page_fingerprint import FINGERPRINT_FIELD, FingerprintStore, compute_fingerprint
+from src.collector.parallel import iter_process_results
+from src.collector.manifest import CollectManifest
+from src.config import JSONL_INTERMEDIATE_ENABLED
+from src.utils.jsonl_segments import append_record, commit_all
+from src.utils import json_io
 
 # Настройка логирования
 logger = logging.getLogger(__name__)
@@ -30,16 +36,28 @@ class MatchUpcomingCollector:
     """
     Класс для извлечения данных из HTML-файлов предстоящих матчей и их сохранения в БД
     """
-    def __init__(self, html_dir=MATCH_UPCOMING_DIR, db_path="hltv.db"):
+    # Увеличивается при изменении извлечения данных: все страницы будут обработаны заново
+    PARSER_VERSION = 1
+    
+    def __init__(self, html_dir=MATCH_UPCOMING_DIR, db_path="hltv.db", from_archive=False, workers=None):
         """
         Инициализация коллектора предстоящих матчей
         
         Args:
             html_dir (str): Путь к директории с HTML-файлами предстоящих матчей
             db_path (str): Путь к файлу базы данных
+            from_archive (bool): Обработать также все страницы из архива (повторная обработка истории)
+            workers (int, optional): Количество процессов обработки (по умолчанию COLLECT_WORKERS из конфига)
         """
         self.html_dir = html_dir
         self.db_path = db_path
+        self.from_archive = from_archive
+        self.workers = workers
+        self.manifest = CollectManifest(db_path)
+        # Аргументы для создания такого же коллектора в процессах пула
+        self.init_kwargs = {'html_dir': html_dir, 'db_path': db_path, 'from_archive': from_archive, 'workers': 1}
+        # При повторной обработке истории отпечатки не учитываются
+        self.fingerprints = None if from_archive else FingerprintStore(db_path)
     
     def collect(self):
         """
@@ -57,43 +75,53 @@ class MatchUpcomingCollector:
             'successful_match_data': 0,
             'successful_player_data': 0,
             'errors': 0,
-            'already_exists': 0
+            'already_exists': 0,
+            'unchanged': 0,
+            'skipped_unchanged': 0
         }
         
         # Получаем файлы для обработки
         files_to_process = self.get_files_to_process()
         stats['total_files'] = len(files_to_process)
         
+        # Страницы, уже обработанные этой версией парсера, повторно не разбираем
+        files_to_process, unchanged_files = self.manifest.filter_changed(KIND_UPCOMING, files_to_process, self.PARSER_VERSION)
+        if unchanged_files:
+            logger.info(f"Пропущено {len(unchanged_files)} страниц без изменений с прошлой обработки")
+            for file_path in unchanged_files:
+                self._remove_processed_file(file_path)
+        stats['skipped_unchanged'] = len(unchanged_files)
+        
         if not files_to_process:
             logger.info("Нет новых файлов для обработки")
             return stats
         
         logger.info(f"Найдено {len(files_to_process)} файлов для обработки")
         
-        # Обрабатываем каждый файл
-        for file_path in files_to_process:
-            try:
-                result = self.process_file(file_path)
-                stats['processed_files'] += 1
-                
-                if result == "success":
-                    stats['successful_match_data'] += 1
-                    stats['successful_player_data'] += 1
-                elif result == "already_exists":
-                    stats['already_exists'] += 1
-                elif result == "error":
-                    stats['errors'] += 1
-                
-                # Логируем прогресс каждые 10 файлов
-                if stats['processed_files'] % 10 == 0:
-                    logger.info(f"Обработано {stats['processed_files']} из {stats['total_files']} файлов")
-                    
-            except Exception as e:
-                logger.error(f"Ошибка при обработке файла {file_path}: {str(e)}")
+        # Обрабатываем файлы (при большом их числе - в пуле процессов)
+        for file_path, result in iter_process_results(self, files_to_process, self.workers):
+            stats['processed_files'] += 1
+            
+            if result == "success":
+                stats['successful_match_data'] += 1
+                stats['successful_player_data'] += 1
+            elif result == "already_exists":
+                stats['already_exists'] += 1
+            elif result == "unchanged":
+                stats['unchanged'] += 1
+            elif result == "error":
                 stats['errors'] += 1
+            
+            # Логируем прогресс каждые 10 файлов
+            if stats['processed_files'] % 10 == 0:
+                logger.info(f"Обработано {stats['processed_files']} из {stats['total_files']} файлов")
+        
+        # Фиксируем сегменты JSONL этого процесса (процессы пула фиксируют свои при завершении)
+        commit_all()
         
         logger.info(f"Завершен сбор данных предстоящих матчей. Обработано {stats['processed_files']} из {stats['total_files']} файлов")
-        logger.info(f"Успешно: {stats['successful_match_data']}, Уже существуют: {stats['already_exists']}, Ошибок: {stats['errors']}")
+        logger.info(f"Успешно: {stats['successful_match_data']}, Без изменений: {stats['unchanged']}, "
+                    f"Уже существуют: {stats['already_exists']}, Ошибок: {stats['errors']}")
         
         return stats
     
@@ -113,9 +141,17 @@ class MatchUpcomingCollector:
         html_files = glob.glob(os.path.join(self.html_dir, "match_*.html"))
         logger.info(f"Найдено {len(html_files)} HTML-файлов с предстоящими матчами")
         
+        # Добавляем страницы из архива, которых уже нет на диске (читаются через read_page)
+        archive = get_archive() if self.from_archive else None
+        if archive:
+            on_disk = {os.path.basename(path) for path in html_files}
+            archived = [os.path.join(self.html_dir, name) for name in archive.list_files(KIND_UPCOMING) if name not in on_disk]
+            logger.info(f"Из архива добавлено {len(archived)} страниц")
+            html_files.extend(archived)
+        
         # В отличие от прошедших матчей, для предстоящих мы всегда обрабатываем все файлы
         # так как информация может меняться
-        return html_files
+        return sorted(html_files)
     
     def process_file(self, file_path):
         """
@@ -125,7 +161,7 @@ class MatchUpcomingCollector:
             file_path (str): Путь к HTML-файлу
             
         Returns:
-            str: Статус обработки ("success", "already_exists", "error")
+            str: Статус обработки ("success", "unchanged", "already_exists", "error")
         """
         try:
             match_id = self._extract_match_id_from_filename(os.path.basename(file_path))
@@ -136,9 +172,8 @@ class MatchUpcomingCollector:
             
             logger.info(f"Обработка файла {file_path} для матча {match_id}")
             
-            # Читаем HTML-файл
-            with open(file_path, 'r', encoding='utf-8') as f:
-                html_content = f.read()
+            # Читаем HTML-файл (или его копию из архива)
+            html_content = read_page(file_path, KIND_UPCOMING)
                 
             # Парсим HTML
             soup = BeautifulSoup(html_content, 'html.parser')
@@ -153,41 +188,48 @@ class MatchUpcomingCollector:
             # Добавляем дату обработки
             match_data['parsed_at'] = datetime.now().isoformat()
             
-            # Сохраняем детали матча в JSON
-            self._save_match_details_to_json(match_data)
-            
             # Проверяем, есть ли определенные команды в матче
-            # Если обе команды TBD, игроков точно нет, пропускаем сбор
-            if match_data['team1_name'] == "TBD" and match_data['team2_name'] == "TBD":
+            # Если обе команды TBD, игроков и стримов не собираем
+            teams_defined = not (match_data['team1_name'] == "TBD" and match_data['team2_name'] == "TBD")
+            if teams_defined:
+                players_data = self._parse_player_data(soup, match_id)
+                streamers_data = self._parse_streamers_data(soup, match_id)
+            else:
                 logger.info(f"Матч {match_id} не имеет определенных команд, пропускаем сбор данных игроков")
-                # Удаляем файл после успешной обработки
-                try:
-                    os.remove(file_path)
-                    logger.info(f"Файл {file_path} успешно удален")
-                except Exception as e:
-                    logger.warning(f"Не удалось удалить файл {file_path}: {str(e)}")
-                return "success"
-            
-            # Извлекаем данные игроков
-            players_data = self._parse_player_data(soup, match_id)
-            
-            if players_data:
-                # Сохраняем данные игроков в JSON
-                self._save_players_to_json(match_id, players_data)
-                
-            # Извлекаем данные стримеров
-            streamers_data = self._parse_streamers_data(soup, match_id)
-            if streamers_data:
-                self._save_streamers_to_json(match_id, streamers_data)
+                players_data = []
+                streamers_data = []
+            
+            # Если извлекаемые данные не изменились с прошлой обработки, JSON не пишем:
+            # загрузчику нечего перезаписывать
+            fingerprint = compute_fingerprint(match_data, players_data, streamers_data)
+            if self.fingerprints:
+                saved = self.fingerprints.get(match_id)
+                if saved and saved['fingerprint'] == fingerprint:
+                    logger.info(f"Данные матча {match_id} не изменились, пропускаем сохранение")
+                    self.manifest.record(KIND_UPCOMING, file_path, html_content, self.PARSER_VERSION)
+                    self._remove_processed_file(file_path)
+                    return "unchanged"
+            
+            if self.fingerprints:
+                # Отпечаток сохранит загрузчик вместе с матчем: до загрузки данные страницы еще не в базе
+                match_data[FINGERPRINT_FIELD] = fingerprint
+            
+            # Сохраняем детали матча, игроков и стримеров; HTML оставляем
+            # для повторной обработки, если хотя бы одна запись не удалась
+            saved = self._save_match_details_to_json(match_data)
+            if saved and players_data:
+                saved = self._save_players_to_json(match_id, players_data)
+            if saved and streamers_data:
+                saved = self._save_streamers_to_json(match_id, streamers_data)
+            if not saved:
+                logger.error(f"Не удалось сохранить данные из файла {file_path}, файл оставлен для повторной обработки")
+                return "error"
             
             logger.info(f"Успешно обработан файл {file_path}")
+            self.manifest.record(KIND_UPCOMING, file_path, html_content, self.PARSER_VERSION)
             
             # Удаляем файл после успешной обработки
-            try:
-                os.remove(file_path)
-                logger.info(f"Файл {file_path} успешно удален")
-            except Exception as e:
-                logger.warning(f"Не удалось удалить файл {file_path}: {str(e)}")
+            self._remove_processed_file(file_path)
                 
             return "success"
             
@@ -195,6 +237,21 @@ class MatchUpcomingCollector:
             logger.error(f"Ошибка при обработке файла {file_path}: {str(e)}")
             return "error"
     
+    def _remove_processed_file(self, file_path):
+        """
+        Удаляет обработанный HTML-файл (страницы из архива удалять не нужно)
+        
+        Args:
+            file_path (str): Путь к HTML-файлу
+        """
+        if not os.path.exists(file_path):
+            return
+        try:
+            os.remove(file_path)
+            logger.info(f"Файл {file_path} успешно удален")
+        except Exception as e:
+            logger.warning(f"Не удалось удалить файл {file_path}: {str(e)}")
+    
     def _extract_match_id_from_filename(self, filename):
         """
         Извлекает ID матча из имени файла
@@ -521,9 +578,12 @@ class MatchUpcomingCollector:
         """
         try:
             match_id = match_data['match_id']
+            if JSONL_INTERMEDIATE_ENABLED:
+                append_record(UPCOMING_MATCH_JSON_DIR, match_data)
+                logger.info(f"Детали матча {match_id} добавлены в сегмент {UPCOMING_MATCH_JSON_DIR}")
+                return True
             json_file_path = os.path.join(UPCOMING_MATCH_JSON_DIR, f"{match_id}.json")
-            with open(json_file_path, 'w', encoding='utf-8') as f:
-                json.dump(match_data, f, ensure_ascii=False, indent=2)
+            json_io.save_file(json_file_path, match_data)
             logger.info(f"Сохранены детали матча {match_id} в файл {json_file_path}")
             return True
         except Exception as e:
@@ -540,8 +600,11 @@ class MatchUpcomingCollector:
                 'match_id': match_id,
                 'players': players_data
             }
-            with open(json_file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            if JSONL_INTERMEDIATE_ENABLED:
+                append_record(UPCOMING_PLAYERS_JSON_DIR, data)
+                logger.info(f"Игроки матча {match_id} добавлены в сегмент {UPCOMING_PLAYERS_JSON_DIR}")
+                return True
+            json_io.save_file(json_file_path, data)
             logger.info(f"Сохранены игроки для матча {match_id} в файл {json_file_path}")
             return True
         except Exception as e:
@@ -601,8 +664,11 @@ class MatchUpcomingCollector:
                 'match_id': match_id,
                 'streams': streamers_data
             }
-            with open(json_file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            if JSONL_INTERMEDIATE_ENABLED:
+                append_record(UPCOMING_STREAMERS_JSON_DIR, data)
+                logger.info(f"Стримеры матча {match_id} добавлены в сегмент {UPCOMING_STREAMERS_JSON_DIR}")
+                return True
+            json_io.save_file(json_file_path, data)
             logger.info(f"Сохранены стримеры для матча {match_id} в файл {json_file_path}")
             return True
         except Exception as e:
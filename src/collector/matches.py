@@ -1,12 +1,17 @@
 import os
 from bs4 import BeautifulSoup
-import sqlite3
 from datetime import datetime
 import re
 import logging
-import json
+from src.utils import json_io
 from src.config.constants import HTML_DIR, MATCHES_HTML_FILE, RESULTS_HTML_FILE, DATABASE_FILE
 import time
+from itertools import islice
+from src.config import LISTING_STREAM_ENABLED
+from src.collector.listing_stream import LISTING_MATCHES, LISTING_RESULTS, iter_listing
+from src.db.connection import connect
+from src.db.migrations import migrate
+from src.db.natural_keys import existing_ids
 
 # Директории для JSON файлов
 JSON_OUTPUT_DIR = "storage/json"
@@ -55,55 +60,18 @@ class MatchesCollector:
                 if not match_link:
                     logger.debug("Пропущен матч: не найдена ссылка на матч")
                     continue
-                    
-                url = match_link.get('href', '')
-                match_id = self._get_match_id(url)
-                
-                if not match_id:
-                    logger.debug(f"Пропущен матч: не удалось извлечь ID из ссылки {url}")
-                    continue
-                
-                # Извлекаем имена команд из URL
-                team_names = self._extract_team_names_from_url(url)
-                if not team_names or len(team_names) < 2:
-                    logger.debug(f"Пропущен матч {match_id}: не удалось извлечь имена команд из URL {url}")
-                    continue
-                
-                # Проверяем, что команды определены (не TBD)
-                team1_name = team_names[0].strip()
-                team2_name = team_names[1].strip()
-                
-                if team1_name.lower() == "tbd" or team2_name.lower() == "tbd" or not team1_name or not team2_name:
-                    logger.debug(f"Пропущен матч {match_id}: найдены неопределенные команды - {team1_name} vs {team2_name}")
-                    continue
                 
                 # Ищем элемент времени с data-unix атрибутом
-                unix_time = None
-                for el in match.find_all(lambda tag: tag.has_attr('data-unix')):
-                    unix_time = el.get('data-unix', '')
-                    break
-                
-                # Если не нашли через data-unix, ищем через класс времени
-                if not unix_time:
-                    time_element = match.select_one('.time, .date, .matchTime')
-                    if time_element:
-                        unix_time = time_element.get('data-unix', '')
+                time_element = match.select_one('[data-unix]')
+                unix_time = time_element.get('data-unix', '') if time_element else None
                 
-                if not unix_time:
-                    # Если время не найдено, используем текущее время
-                    logger.debug(f"Матч {match_id}: время не найдено, используем текущее время")
-                    unix_time = str(int(time.time()))
+                # Запасной элемент времени по классу
+                fallback_element = match.select_one('.time, .date, .matchTime')
+                time_fallback = fallback_element.get('data-unix', '') if fallback_element else None
                 
-                # Формируем данные матча
-                match_data = {
-                    'id': match_id,
-                    'url': url,
-                    'date': int(unix_time),
-                    'toParse': 1
-                }
-                
-                logger.debug(f"Добавлен матч {match_id}: {team1_name} vs {team2_name}")
-                matches.append(match_data)
+                match_data = self._build_upcoming_match(match_link.get('href', ''), unix_time, time_fallback)
+                if match_data:
+                    matches.append(match_data)
                 
             except Exception as e:
                 logger.error(f"Ошибка при парсинге матча: {str(e)}")
@@ -112,6 +80,71 @@ class MatchesCollector:
         logger.info(f"Найдено предстоящих матчей с определенными командами: {len(matches)}")
         return matches
         
+    def _build_upcoming_match(self, url: str, unix_time, time_fallback):
+        """
+        Формирует предстоящий матч из ссылки и времени элемента .match
+        
+        Args:
+            url (str): Ссылка на матч
+            unix_time (str): data-unix первого потомка с этим атрибутом или None
+            time_fallback (str): data-unix элемента .time/.date/.matchTime или None
+            
+        Returns:
+            dict: Данные матча или None, если матч пропускается
+        """
+        match_id = self._get_match_id(url)
+        
+        if not match_id:
+            logger.debug(f"Пропущен матч: не удалось извлечь ID из ссылки {url}")
+            return None
+        
+        # Извлекаем имена команд из URL
+        team_names = self._extract_team_names_from_url(url)
+        if not team_names or len(team_names) < 2:
+            logger.debug(f"Пропущен матч {match_id}: не удалось извлечь имена команд из URL {url}")
+            return None
+        
+        # Проверяем, что команды определены (не TBD)
+        team1_name = team_names[0].strip()
+        team2_name = team_names[1].strip()
+        
+        if team1_name.lower() == "tbd" or team2_name.lower() == "tbd" or not team1_name or not team2_name:
+            logger.debug(f"Пропущен матч {match_id}: найдены неопределенные команды - {team1_name} vs {team2_name}")
+            return None
+        
+        # Если у data-unix пустое значение, берем время элемента по классу
+        if not unix_time:
+            unix_time = time_fallback
+        
+        if not unix_time:
+            # Если время не найдено, используем текущее время
+            logger.debug(f"Матч {match_id}: время не найдено, используем текущее время")
+            unix_time = str(int(time.time()))
+        
+        logger.debug(f"Добавлен матч {match_id}: {team1_name} vs {team2_name}")
+        return {
+            'id': match_id,
+            'url': url,
+            'date': int(unix_time),
+            'toParse': 1
+        }
+        
+    def _build_result_match(self, url: str):
+        """
+        Формирует результат матча из ссылки элемента .result-con
+        
+        Returns:
+            dict: Данные матча или None, если ID не извлекается
+        """
+        match_id = self._get_match_id(url)
+        if not match_id:
+            return None
+        return {
+            'id': match_id,
+            'url': url,
+            'toParse': 1  # Для новых записей ставим флаг необходимости парсинга
+        }
+        
     def _extract_team_names_from_url(self, url: str) -> list:
         """Извлекает имена команд из URL матча"""
         try:
@@ -166,19 +199,9 @@ class MatchesCollector:
                 if not match_link:
                     continue
                     
-                url = match_link.get('href', '')
-                match_id = self._get_match_id(url)
-                
-                if not match_id:
-                    continue
-                
-                # Формируем данные матча
-                match_data = {
-                    'id': match_id,
-                    'url': url,
-                    'toParse': 1  # Для новых записей ставим флаг необходимости парсинга
-                }
-                matches.append(match_data)
+                match_data = self._build_result_match(match_link.get('href', ''))
+                if match_data:
+                    matches.append(match_data)
                 
             except Exception as e:
                 logger.error(f"Ошибка при парсинге результата: {str(e)}")
@@ -186,50 +209,67 @@ class MatchesCollector:
                 
         return matches
 
-    def _parse_html_file(self, file_path: str) -> list:
-        """Парсит HTML файл и возвращает список матчей"""
+    def _iter_listing_matches(self, file_path: str, kind: str):
+        """
+        Потоково перебирает матчи страницы-списка, не строя дерево документа
+        
+        Args:
+            file_path (str): Путь к HTML файлу
+            kind (str): LISTING_MATCHES или LISTING_RESULTS
+            
+        Yields:
+            dict: Данные матча, как в _parse_matches_file/_parse_results_file
+        """
+        for url, unix_time, time_fallback in iter_listing(file_path, kind):
+            try:
+                if kind == LISTING_MATCHES:
+                    match_data = self._build_upcoming_match(url, unix_time, time_fallback)
+                else:
+                    match_data = self._build_result_match(url)
+            except Exception as e:
+                logger.error(f"Ошибка при парсинге матча: {str(e)}")
+                continue
+            if match_data:
+                yield match_data
+    
+    def _parse_html_file(self, file_path: str, limit=None) -> list:
+        """Парсит HTML файл и возвращает список матчей (не больше limit)"""
+        if LISTING_STREAM_ENABLED:
+            # Определяем тип страницы по имени файла
+            if 'matches' in file_path.lower():
+                kind = LISTING_MATCHES
+            elif 'results' in file_path.lower():
+                kind = LISTING_RESULTS
+            else:
+                return []
+            try:
+                # С limit чтение страницы останавливается на limit-м матче
+                matches = list(islice(self._iter_listing_matches(file_path, kind), limit))
+                if kind == LISTING_MATCHES:
+                    logger.info(f"Найдено предстоящих матчей с определенными командами: {len(matches)}")
+                return matches
+            except Exception as e:
+                logger.error(f"Ошибка при чтении файла {file_path}: {str(e)}")
+                return []
+        
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
                 soup = BeautifulSoup(f.read(), 'html.parser')
 
             # Определяем тип страницы по имени файла
             if 'matches' in file_path.lower():
-                return self._parse_matches_file(soup)
+                return self._parse_matches_file(soup)[:limit]
             elif 'results' in file_path.lower():
-                return self._parse_results_file(soup)
+                return self._parse_results_file(soup)[:limit]
             return []
         except Exception as e:
             logger.error(f"Ошибка при чтении файла {file_path}: {str(e)}")
             return []
         
     def _create_tables(self):
-        """Создает необходимые таблицы в базе данных"""
+        """Создает необходимые таблицы в базе данных (схемой владеет src.db.migrations)"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Создаем таблицу для предстоящих матчей
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS upcoming_urls (
-                    id INTEGER PRIMARY KEY,
-                    url TEXT NOT NULL,
-                    date INTEGER NOT NULL,
-                    toParse INTEGER NOT NULL DEFAULT 1,
-                    reParse INTEGER NOT NULL DEFAULT 0
-                )
-            ''')
-            
-            # Создаем таблицу для результатов матчей
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS result_urls (
-                    id INTEGER PRIMARY KEY,
-                    url TEXT NOT NULL,
-                    toParse INTEGER NOT NULL DEFAULT 1
-                )
-            ''')
-            
-            conn.commit()
-            conn.close()
+            migrate(self.db_path)
             logger.info("Таблицы успешно созданы")
             
         except Exception as e:
@@ -241,30 +281,23 @@ class MatchesCollector:
             return {"new": 0, "updated": 0, "deleted": 0}
         stats = {"new": 0, "updated": 0, "deleted": 0}
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = connect(self.db_path)
             cursor = conn.cursor()
             current_match_ids = [match['id'] for match in matches]
             cursor.execute('SELECT id FROM upcoming_urls')
             db_match_ids = [row[0] for row in cursor.fetchall()]
-            obsolete_ids = [match_id for match_id in db_match_ids if match_id not in current_match_ids]
-            for obsolete_id in obsolete_ids:
-                cursor.execute('DELETE FROM upcoming_urls WHERE id = ?', (obsolete_id,))
-                stats["deleted"] += 1
-            for match in matches:
-                cursor.execute('SELECT toParse FROM upcoming_urls WHERE id = ?', (match['id'],))
-                result = cursor.fetchone()
-                if result is not None:
-                    current_to_parse = result[0]
-                    cursor.execute('''
-                        UPDATE upcoming_urls SET url = ?, date = ? WHERE id = ?
-                    ''', (match['url'], match['date'], match['id']))
-                    stats["updated"] += 1
-                else:
-                    cursor.execute('''
-                        INSERT INTO upcoming_urls (id, url, date, toParse)
-                        VALUES (?, ?, ?, ?)
-                    ''', (match['id'], match['url'], match['date'], 1))
-                    stats["new"] += 1
+            current_ids = set(current_match_ids)
+            obsolete_ids = [match_id for match_id in db_match_ids if match_id not in current_ids]
+            cursor.executemany('DELETE FROM upcoming_urls WHERE id = ?', [(obsolete_id,) for obsolete_id in obsolete_ids])
+            stats["deleted"] = len(obsolete_ids)
+            # Существующие матчи уже известны из выборки выше; toParse существующих не меняется
+            db_ids = set(db_match_ids)
+            stats["updated"] = len(current_ids & db_ids)
+            stats["new"] = len(current_ids - db_ids)
+            cursor.executemany('''
+                INSERT INTO upcoming_urls (id, url, date, toParse) VALUES (?, ?, ?, 1)
+                ON CONFLICT(id) DO UPDATE SET url = excluded.url, date = excluded.date
+            ''', [(match['id'], match['url'], match['date']) for match in matches])
             conn.commit()
             conn.close()
             logger.info(f"Сохранение предстоящих матчей завершено: новых - {stats['new']}, обновлено - {stats['updated']}, удалено - {stats['deleted']}")
@@ -281,31 +314,21 @@ class MatchesCollector:
         stats = {"new": 0, "updated": 0}
         
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = connect(self.db_path)
             cursor = conn.cursor()
             
-            # Обрабатываем каждый матч
-            for match in matches:
-                # Проверяем, существует ли матч в базе данных
-                cursor.execute('SELECT toParse FROM result_urls WHERE id = ?', (match['id'],))
-                result = cursor.fetchone()
-                if result is not None:
-                    # Обновляем существующий матч, но не меняем флаг toParse
-                    cursor.execute('''
-                        UPDATE result_urls 
-                        SET url = ?
-                        WHERE id = ?
-                    ''', (match['url'], match['id']))
-                    stats["updated"] += 1
-                else:
-                    # Добавляем новый матч с toParse=1
-                    cursor.execute('''
-                        INSERT INTO result_urls (id, url, toParse)
-                        VALUES (?, ?, ?)
-                    ''', (match['id'], match['url'], 1))
-                    stats["new"] += 1
-                    # Удаляем матч из предстоящих, если он перешел в результаты
-                    cursor.execute('DELETE FROM upcoming_urls WHERE id = ?', (match['id'],))
+            # Новые матчи определяются одним запросом на пачку ID, а не SELECT на каждый матч
+            existing = existing_ids(cursor, 'result_urls', 'id', [match['id'] for match in matches])
+            new_ids = [match['id'] for match in matches if match['id'] not in existing]
+            stats["updated"] = len(matches) - len(new_ids)
+            stats["new"] = len(new_ids)
+            # Новый матч добавляется с toParse=1, у существующего обновляется только url
+            cursor.executemany('''
+                INSERT INTO result_urls (id, url, toParse) VALUES (?, ?, 1)
+                ON CONFLICT(id) DO UPDATE SET url = excluded.url
+            ''', [(match['id'], match['url']) for match in matches])
+            # Удаляем новые матчи из предстоящих, если они перешли в результаты
+            cursor.executemany('DELETE FROM upcoming_urls WHERE id = ?', [(match_id,) for match_id in new_ids])
             
             conn.commit()
             conn.close()
@@ -325,7 +348,7 @@ class MatchesCollector:
             
         try:
             # Получаем актуальные значения toParse из базы данных
-            conn = sqlite3.connect(self.db_path)
+            conn = connect(self.db_path)
             cursor = conn.cursor()
             
             # Создаем копию списка матчей для JSON
@@ -350,8 +373,7 @@ class MatchesCollector:
                 'matches': matches_with_to_parse
             }
             
-            with open(UPCOMING_MATCHES_JSON_FILE, 'w', encoding='utf-8') as f:
-                json.dump(data_to_save, f, ensure_ascii=False, indent=2)
+            json_io.save_file(UPCOMING_MATCHES_JSON_FILE, data_to_save)
                 
             logger.info(f"Сохранено {len(matches_with_to_parse)} предстоящих матчей в JSON файл")
             
@@ -368,7 +390,7 @@ class MatchesCollector:
             
         try:
             # Получаем актуальные значения toParse из базы данных
-            conn = sqlite3.connect(self.db_path)
+            conn = connect(self.db_path)
             cursor = conn.cursor()
             
             # Создаем копию списка матчей для JSON с актуальными toParse
@@ -390,15 +412,14 @@ class MatchesCollector:
             # Загружаем существующие данные, если файл существует
             existing_matches = {}
             if os.path.exists(PAST_MATCHES_JSON_FILE):
-                with open(PAST_MATCHES_JSON_FILE, 'r', encoding='utf-8') as f:
-                    try:
-                        data = json.load(f)
-                        if 'matches' in data:
-                            # Преобразуем список в словарь для быстрого доступа по ID
-                            for match in data['matches']:
-                                existing_matches[match['id']] = match
-                    except json.JSONDecodeError:
-                        logger.warning(f"Невозможно прочитать существующий JSON файл: {PAST_MATCHES_JSON_FILE}")
+                try:
+                    data = json_io.load_file(PAST_MATCHES_JSON_FILE)
+                    if 'matches' in data:
+                        # Преобразуем список в словарь для быстрого доступа по ID
+                        for match in data['matches']:
+                            existing_matches[match['id']] = match
+                except json_io.JSONDecodeError:
+                    logger.warning(f"Невозможно прочитать существующий JSON файл: {PAST_MATCHES_JSON_FILE}")
             
             # Обновляем или добавляем матчи
             updated_matches = matches_with_to_parse.copy()
@@ -415,8 +436,7 @@ class MatchesCollector:
                 'matches': updated_matches
             }
             
-            with open(PAST_MATCHES_JSON_FILE, 'w', encoding='utf-8') as f:
-                json.dump(data_to_save, f, ensure_ascii=False, indent=2)
+            json_io.save_file(PAST_MATCHES_JSON_FILE, data_to_save)
                 
             logger.info(f"Сохранено {len(updated_matches)} прошедших матчей в JSON файл")
             
@@ -442,9 +462,7 @@ class MatchesCollector:
                 logger.error(f"Файл не найден: {file_path}")
                 stats["failed"] = 1
                 return stats
-            matches = self._parse_html_file(file_path)
-            if limit:
-                matches = matches[:limit]
+            matches = self._parse_html_file(file_path, limit or None)
             stats["total"] = len(matches)
             logger.info(f"Найдено предстоящих матчей: {stats['total']}")
             if matches:
@@ -479,9 +497,7 @@ class MatchesCollector:
                 logger.error(f"Файл не найден: {file_path}")
                 stats["failed"] = 1
                 return stats
-            matches = self._parse_html_file(file_path)
-            if limit:
-                matches = matches[:limit]
+            matches = self._parse_html_file(file_path, limit or None)
             stats["total"] = len(matches)
             logger.info(f"Найдено результатов матчей: {stats['total']}")
             if matches:
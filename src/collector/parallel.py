@@ -0,0 +1,91 @@
+"""
+Параллельная обработка HTML-файлов коллекторами в пуле процессов
+
+Разбор HTML упирается в CPU, поэтому после массовой загрузки файлы
+распределяются по процессам пачками по COLLECT_CHUNK_SIZE. Каждый процесс
+создает свой экземпляр коллектора один раз. Результаты возвращаются в порядке
+входного списка, ошибка одного файла не прерывает обработку остальных.
+"""
+import os
+import logging
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+
+from src.config import COLLECT_WORKERS, COLLECT_CHUNK_SIZE, COLLECT_PARALLEL_MIN_FILES
+
+logger = logging.getLogger(__name__)
+
+# Коллектор текущего процесса пула
+_worker_collector = None
+
+
+def resolve_workers(workers, files_count):
+    """
+    Количество процессов для обработки
+
+    Args:
+        workers (int or None): Заданное количество (None - из конфига, 0 - по числу ядер)
+        files_count (int): Количество файлов
+
+    Returns:
+        int: 1 для последовательной обработки
+    """
+    if workers is None:
+        workers = COLLECT_WORKERS
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    # На малом числе файлов запуск процессов дороже самой обработки
+    if files_count < COLLECT_PARALLEL_MIN_FILES:
+        return 1
+    return max(1, min(workers, files_count))
+
+
+def _init_worker(collector_cls, collector_kwargs):
+    global _worker_collector
+    _worker_collector = collector_cls(**collector_kwargs)
+
+
+def _process_in_worker(method, error_result, file_path):
+    try:
+        return getattr(_worker_collector, method)(file_path)
+    except Exception as e:
+        logger.error(f"Ошибка при обработке файла {file_path}: {str(e)}")
+        return error_result
+
+
+def iter_process_results(collector, files, workers=None, chunk_size=COLLECT_CHUNK_SIZE, method="process_file",
+                         error_result="error"):
+    """
+    Обрабатывает файлы коллектором последовательно или в пуле процессов
+
+    Args:
+        collector: Коллектор с методом обработки файла и атрибутом init_kwargs
+            (аргументы для создания такого же коллектора в процессе пула)
+        files (list): Пути к HTML-файлам
+        workers (int, optional): Количество процессов (см. resolve_workers)
+        chunk_size (int): Сколько файлов передается процессу за раз
+        method (str): Имя метода коллектора, обрабатывающего один файл
+        error_result: Результат для файла, обработка которого упала с исключением
+
+    Yields:
+        tuple: (путь к файлу, результат метода) в порядке входного списка
+    """
+    workers = resolve_workers(workers, len(files))
+    if workers <= 1:
+        process = getattr(collector, method)
+        for file_path in files:
+            try:
+                yield file_path, process(file_path)
+            except Exception as e:
+                logger.error(f"Ошибка при обработке файла {file_path}: {str(e)}")
+                yield file_path, error_result
+        return
+
+    logger.info(f"Параллельная обработка: {workers} процессов, пачки по {chunk_size} файлов")
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(type(collector), collector.init_kwargs)
+    ) as executor:
+        worker = partial(_process_in_worker, method, error_result)
+        yield from zip(files, executor.map(worker, files, chunksize=chunk_size))
@@ -53,18 +53,21 @@ class CollectorManager:
             "results": results_stats
         }
         
-    def collect_match_details(self, force=False, remove_processed=False):
+    def collect_match_details(self, force=False, remove_processed=False, from_archive=False, direct_db=None):
         """
         Collect data from match details HTML files and store in database
         
         Args:
             force (bool): Deprecated parameter, not used
             remove_processed (bool): Deprecated parameter, not used
+            from_archive (bool): Also reprocess pages stored in the page archive
+            direct_db (bool, optional): Write records straight to the DB instead of JSON
+                (defaults to COLLECT_DIRECT_TO_DB)
         
         Returns:
             dict: Statistics about the collection process
         """
-        detail_collector = MatchDetailsCollector()
+        detail_collector = MatchDetailsCollector(from_archive=from_archive, direct_db=direct_db)
         stats = detail_collector.collect()
         
         # Convert to the expected format for backward compatibility
@@ -74,10 +77,11 @@ class CollectorManager:
             "failed": stats['errors'],
             "already_exists": stats['already_exists'],
             "updated": stats.get('updated', 0),
-            "removed_files": stats.get('removed_files', 0)
+            "removed_files": stats.get('removed_files', 0),
+            "written_to_db": stats.get('written_to_db', 0)
         }
     
-    def collect_results_details(self, force=False, remove_processed=False):
+    def collect_results_details(self, force=False, remove_processed=False, from_archive=False, direct_db=None):
         """
         Collect data from match details HTML files and store in database.
         New name for collect_match_details for better naming consistency.
@@ -85,19 +89,25 @@ class CollectorManager:
         Args:
             force (bool): Deprecated parameter, not used
             remove_processed (bool): Deprecated parameter, not used
+            from_archive (bool): Also reprocess pages stored in the page archive
+            direct_db (bool, optional): Write records straight to the DB instead of JSON
             
         Returns:
             dict: Statistics about the collection process
         """
-        return self.collect_match_details()
+        return self.collect_match_details(from_archive=from_archive, direct_db=direct_db)
     
-    def collect_upcoming_match_details(self):
+    def collect_upcoming_match_details(self, from_archive=False):
         """
         Collect data from upcoming match HTML files and store in JSON/DB
+        
+        Args:
+            from_archive (bool): Also reprocess pages stored in the page archive
+            
         Returns:
             int: Number of successfully parsed upcoming matches
         """
         from src.collector.match_upcoming import MatchUpcomingCollector
-        collector = MatchUpcomingCollector()
+        collector = MatchUpcomingCollector(from_archive=from_archive)
         stats = collector.collect()
         return stats.get('successful_match_data', 0) 
\ No newline at end of file
@@ -1,9 +1,10 @@
 """
 Конфигурационный файл проекта HLTV Parser
 """
+import os
 
-# URLs
-HLTV_BASE_URL = "https://www.hltv.org"
+# URLs (HLTV_BASE_URL из окружения направляет все парсеры на локальный стенд src.scripts.hltv_replay)
+HLTV_BASE_URL = os.environ.get("HLTV_BASE_URL", "https://www.hltv.org").rstrip("/")
 MATCHES_URL = f"{HLTV_BASE_URL}/matches"
 RESULTS_URL = f"{HLTV_BASE_URL}/results"
 
@@ -34,6 +35,125 @@ MAX_RETRIES = 3
 CLOUDFLARE_WAIT_TIME = 15  # Время ожидания после загрузки страницы
 MIN_PAGE_SIZE = 50000  # Минимальный размер страницы в байтах
 
+# Browser session (переиспользование одного браузера для многих страниц)
+BROWSER_SESSION_REUSE = True  # Не перезапускать Chrome для каждой страницы
+BROWSER_SESSION_MAX_PAGES = 50  # Перезапуск браузера после N загруженных страниц
+BROWSER_SESSION_MAX_AGE = 1800  # Перезапуск браузера после N секунд жизни
+BROWSER_SESSION_RECYCLE_ON_CLOUDFLARE = True  # Перезапуск браузера после страницы-проверки Cloudflare
+BROWSER_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36'
+
+# Профили загрузки страниц в браузере
+# blocked_urls - шаблоны URL, которые блокируются через CDP (Network.setBlockedURLs)
+# ready_selector - CSS-селектор нужного контента: снимок HTML делается, как только он появился
+BLOCKED_MEDIA_URLS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico',
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+    '*.mp4', '*.webm', '*.m3u8', '*.mp3'
+]
+BLOCKED_TRACKER_URLS = [
+    '*googletagmanager.com*', '*google-analytics.com*', '*doubleclick.net*',
+    '*googlesyndication.com*', '*adservice.google.*', '*amazon-adsystem.com*',
+    '*facebook.net*', '*scorecardresearch.com*', '*hotjar.com*', '*criteo.*',
+    '*quantserve.com*', '*adnxs.com*', '*pubmatic.com*', '*rubiconproject.com*'
+]
+FETCH_PROFILES = {
+    'default': {'blocked_urls': BLOCKED_MEDIA_URLS + BLOCKED_TRACKER_URLS, 'ready_selector': None},
+    'results': {'blocked_urls': BLOCKED_MEDIA_URLS + BLOCKED_TRACKER_URLS + ['*.css'], 'ready_selector': '.results-all'},
+    # На странице матчей нужен клик по сортировке, стили не блокируем
+    'matches': {'blocked_urls': BLOCKED_MEDIA_URLS + BLOCKED_TRACKER_URLS, 'ready_selector': None},
+    'match_result': {'blocked_urls': BLOCKED_MEDIA_URLS + BLOCKED_TRACKER_URLS + ['*.css'], 'ready_selector': '.mapholder, .stats-content'},
+    'match_upcoming': {'blocked_urls': BLOCKED_MEDIA_URLS + BLOCKED_TRACKER_URLS + ['*.css'], 'ready_selector': '.lineups'},
+    'player': {'blocked_urls': BLOCKED_MEDIA_URLS + BLOCKED_TRACKER_URLS + ['*.css'], 'ready_selector': '.playerpage-container-attributes, .playerRealname'},
+    'live': {'blocked_urls': BLOCKED_MEDIA_URLS + BLOCKED_TRACKER_URLS + ['*.css'], 'ready_selector': '.liveMatches .current-map-score'},
+}
+
+# Бэкенд разбора HTML в коллекторах: "lxml", "selectolax" или "bs4" (эталонный BeautifulSoup + html.parser)
+# Совпадение результатов с bs4 проверяют tests/test_parser_backends.py и python -m src.scripts.check_parser_backends;
+# lxml/cssselect и selectolax - необязательные зависимости из requirements.txt, без них используется bs4
+HTML_PARSER_BACKEND = "lxml"
+
+# Страницы-списки results.html и matches.html разбираются потоково, без построения дерева
+# (src/collector/listing_stream.py); False - прежний разбор через BeautifulSoup
+LISTING_STREAM_ENABLED = True
+
+# Параллельная обработка HTML коллекторами (пул процессов)
+COLLECT_WORKERS = 0  # Количество процессов, 0 - по числу ядер, 1 - последовательно
+COLLECT_CHUNK_SIZE = 16  # Сколько файлов передается процессу за раз
+COLLECT_PARALLEL_MIN_FILES = 50  # Меньше файлов обрабатываются в одном процессе
+
+# Прямая запись страниц результатов в БД (без промежуточных JSON для MatchDetailsLoader)
+COLLECT_DIRECT_TO_DB = False
+COLLECT_DB_BATCH_SIZE = 50  # Матчей в одной транзакции
+COLLECT_DIRECT_KEEP_JSON = False  # Сохранять извлеченные данные в storage/json/audit для отладки
+
+# Прямая запись профилей игроков в таблицу players (без storage/json/player и load_players_json_to_db)
+PLAYERS_DIRECT_TO_DB = False
+PLAYERS_DB_BATCH_SIZE = 200  # Профилей в одной транзакции
+
+# Промежуточные данные коллекторов для загрузчиков: сегменты JSONL вместо файла на каждую запись
+JSONL_INTERMEDIATE_ENABLED = True
+JSONL_SEGMENT_MAX_RECORDS = 1000  # Записей в сегменте до ротации
+JSONL_COMPRESS = False  # Сжимать сегменты gzip
+JSONL_STALE_SEGMENT_SECONDS = 3600  # Незафиксированный сегмент старше этого считается брошенным
+
+# Загрузка деталей матчей, статистики игроков и карт из storage/json (MatchDetailsLoader)
+LOADER_BATCH_SIZE = 500  # Записей в одной транзакции
+LOADER_ARCHIVE_DIR = None  # Куда переносить загруженные файлы и сегменты (None - удалять)
+LOAD_JOURNAL_KEEP_DAYS = 30  # Сколько дней хранить записи журнала загрузки (src/db/load_journal.py)
+
+# Соединения с SQLite (src/db/connection.py)
+SQLITE_WAL_ENABLED = True  # Журнал WAL: чтение бота не ждет ежечасных загрузчиков
+SQLITE_BUSY_TIMEOUT = 30  # Сколько ждать блокировку записи в секундах
+SQLITE_BULK_SYNCHRONOUS = 'NORMAL'  # Загрузчики: NORMAL или OFF (быстрее, но последние пачки теряются при сбое питания)
+SQLITE_BULK_CACHE_MB = 256  # Загрузчики: кэш страниц
+SQLITE_READ_CACHE_MB = 32  # Бот: кэш страниц
+SQLITE_READ_MMAP_MB = 256  # Бот: чтение базы через mmap
+
+# Сериализация JSON (src/utils/json_io.py): orjson, если установлен, иначе стандартный json
+JSON_PRETTY_MACHINE_FILES = False  # Писать служебные JSON-файлы с отступами (для отладки)
+
+# HTTP-first загрузка (requests.Session пробуется раньше Selenium)
+HTTP_FIRST_ENABLED = True
+HTTP_TIMEOUT = 20  # Таймаут HTTP-запроса в секундах
+HTTP_POOL_SIZE = 10  # Размер пула keep-alive соединений
+
+# Параллельная загрузка страниц (общий бюджет запросов на процесс)
+DOWNLOAD_REQUESTS_PER_MINUTE = 30  # Бюджет запросов к HLTV в минуту
+DOWNLOAD_BURST = 3  # Сколько запросов можно выполнить подряд без паузы
+DOWNLOAD_MAX_IN_FLIGHT = 4  # Максимум одновременных загрузок
+DOWNLOAD_JITTER = 1.0  # Случайная добавка к паузе между запросами в секундах
+DOWNLOAD_RETRIES = 3  # Попыток загрузки одной страницы
+DOWNLOAD_BACKOFF_BASE = 5  # Задержка перед повтором, удваивается с каждой попыткой
+DOWNLOAD_BACKOFF_MAX = 120  # Максимальная задержка перед повтором
+PLAYER_DOWNLOAD_REQUESTS_PER_MINUTE = 2.4  # Страницы игроков (раньше фиксированная пауза 25 секунд)
+
+# Приоритетная очередь загрузки страниц предстоящих матчей
+FETCH_SCHEDULER_ENABLED = True
+# Интервал обновления страницы в зависимости от времени до начала матча: (до начала, сек), интервал, сек
+FETCH_REFRESH_INTERVALS = [
+    (3600, 600),  # Меньше часа до начала - раз в 10 минут
+    (6 * 3600, 1800),
+    (24 * 3600, 2 * 3600),
+    (3 * 24 * 3600, 6 * 3600),
+    (None, 24 * 3600),  # Дальние матчи - раз в сутки
+]
+FETCH_TBD_INTERVAL_FACTOR = 0.5  # Составы еще TBD - обновляем чаще
+
+# Общий для всех процессов бюджет запросов и пауза после проверки Cloudflare
+SHARED_RATE_LIMIT_ENABLED = True
+SHARED_REQUESTS_PER_MINUTE = 40  # Суммарно для live-парсера, загрузчика игроков и ежечасных парсеров
+SHARED_BURST = 3
+CIRCUIT_COOLDOWN_BASE = 300  # Пауза после первой проверки Cloudflare, удваивается с каждой следующей
+CIRCUIT_COOLDOWN_MAX = 4 * 3600  # Максимальная пауза
+CIRCUIT_PROBE_TIMEOUT = 120  # Сколько ждать результата пробного запроса другого процесса
+CIRCUIT_MAX_WAIT = 120  # Паузу дольше этого процесс не выжидает, а прекращает загрузку
+
+# Резидентный браузерный демон (python -m src.parser.browser_daemon)
+BROWSER_DAEMON_ENABLED = True  # Парсеры используют демон, если он запущен, иначе свой браузер
+BROWSER_DAEMON_POOL_SIZE = 2  # Количество заранее запущенных сессий Chrome
+BROWSER_DAEMON_PORT = 8766  # TCP-порт на системах без Unix-сокетов
+BROWSER_DAEMON_TIMEOUT = 120  # Таймаут загрузки страницы через демон в секундах
+
 # Cloudflare detection
 CLOUDFLARE_INDICATORS = [
     "cf-browser-verification",
@@ -1,8 +1,10 @@
 """
 HLTV Parser Constants
 """
-# URLs
-BASE_URL = "https://www.hltv.org"
+import os
+
+# URLs (HLTV_BASE_URL из окружения направляет все парсеры на локальный стенд src.scripts.hltv_replay)
+BASE_URL = os.environ.get("HLTV_BASE_URL", "https://www.hltv.org").rstrip("/")
 RESULTS_URL = f"{BASE_URL}/results"
 MATCHES_URL = f"{BASE_URL}/matches"
 MATCH_URL = f"{BASE_URL}/matches/"
@@ -14,6 +16,27 @@ RESULTS_HTML_FILE = f"{HTML_DIR}/results.html"
 MATCHES_HTML_FILE = f"{HTML_DIR}/matches.html"
 MATCH_DETAILS_DIR = f"{HTML_DIR}/match_details"
 MATCH_UPCOMING_DIR = f"{HTML_DIR}/upcoming"
+MATCH_RESULT_DIR = f"{HTML_DIR}/result"
+PLAYER_HTML_DIR = f"{HTML_DIR}/player"
+
+# Page archive (сжатые копии скачанных страниц, адресуемые по хэшу содержимого)
+PAGE_ARCHIVE_ENABLED = True
+PAGE_ARCHIVE_DIR = f"{STORAGE_DIR}/archive"
+PAGE_ARCHIVE_COMPRESSION = "zstd"  # zstd (если установлен zstandard) или gzip
+PAGE_ARCHIVE_KEEP_VERSIONS = 3  # Сколько последних версий каждой страницы хранить (0 - все)
+
+# Записанные ответы HLTV для локального стенда
+REPLAY_FIXTURES_DIR = f"{STORAGE_DIR}/fixtures/hltv"
+
+# Сокет браузерного демона
+BROWSER_DAEMON_SOCKET = f"{STORAGE_DIR}/browser_daemon.sock"
+
+# Общее состояние парсеров (бюджет запросов и пауза после Cloudflare)
+SCRAPER_STATE_FILE = f"{STORAGE_DIR}/state/scraper_state.json"
+
+# Замороженный корпус страниц и базовая производительность для бенчмарка парсеров
+BENCH_CORPUS_DIR = "benchmarks/corpus"
+BENCH_BASELINE_FILE = "benchmarks/baseline.json"
 
 # Logging
 LOG_DIR = "logs"
@@ -4,6 +4,7 @@
 import sqlite3
 import logging
 from src.config import DATABASE_NAME, LOG_LEVEL, LOG_FORMAT, LOG_FILE
+from src.db.connection import connect
 
 # Настройка логирования
 logging.basicConfig(
@@ -19,7 +20,7 @@ logger = logging.getLogger(__name__)
 def get_connection():
     """Получение соединения с базой данных"""
     try:
-        conn = sqlite3.connect(DATABASE_NAME)
+        conn = connect(DATABASE_NAME)
         conn.row_factory = sqlite3.Row
         return conn
     except sqlite3.Error as e:
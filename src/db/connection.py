@@ -0,0 +1,125 @@
+"""
+Соединения с SQLite: журнал WAL и профили PRAGMA под вид нагрузки
+
+В режиме журнала по умолчанию (rollback journal) запись блокирует чтение:
+пока ежечасный загрузчик фиксирует пачку, запросы бота ждут. В WAL читатели
+видят последнее зафиксированное состояние и не ждут писателя, а писатель не
+ждет читателей. Режим WAL хранится в файле базы, его достаточно включить
+одним соединением; здесь он включается на каждом новом соединении (для базы
+уже в WAL это пустая операция).
+
+Профили:
+    PROFILE_DEFAULT - обычные чтение и запись (synchronous=NORMAL, безопасно в WAL)
+    PROFILE_BULK_LOAD - загрузчики: большой кэш страниц, synchronous из
+        SQLITE_BULK_SYNCHRONOUS, временные таблицы и сортировки в памяти
+    PROFILE_READ - бот: чтение через mmap и query_only (соединение не может
+        ничего записать по ошибке)
+
+connect() открывает новое соединение с профилем, get_connection() отдает
+соединение, общее для потока (и процесса): бот и DatabaseService не открывают
+базу заново на каждый запрос.
+"""
+import os
+import sqlite3
+import logging
+import threading
+
+from src.config import (
+    SQLITE_WAL_ENABLED, SQLITE_BUSY_TIMEOUT, SQLITE_BULK_SYNCHRONOUS, SQLITE_BULK_CACHE_MB,
+    SQLITE_READ_CACHE_MB, SQLITE_READ_MMAP_MB
+)
+from src.config.constants import DATABASE_FILE
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DEFAULT = 'default'
+PROFILE_BULK_LOAD = 'bulk_load'
+PROFILE_READ = 'read'
+
+# PRAGMA профилей в порядке применения (query_only - последней: после нее PRAGMA с записью не пройдут).
+# Отрицательный cache_size - размер в КБ
+PRAGMA_PROFILES = {
+    PROFILE_DEFAULT: (
+        ('synchronous', 'NORMAL' if SQLITE_WAL_ENABLED else 'FULL'),
+    ),
+    PROFILE_BULK_LOAD: (
+        ('synchronous', SQLITE_BULK_SYNCHRONOUS),
+        ('cache_size', -SQLITE_BULK_CACHE_MB * 1024),
+        ('temp_store', 'MEMORY'),
+    ),
+    PROFILE_READ: (
+        ('cache_size', -SQLITE_READ_CACHE_MB * 1024),
+        ('mmap_size', SQLITE_READ_MMAP_MB * 1024 * 1024),
+        ('temp_store', 'MEMORY'),
+        ('query_only', 1),
+    ),
+}
+
+# Соединения потока: (путь, профиль) -> (pid, соединение)
+_local = threading.local()
+
+
+def _enable_wal(conn, db_path):
+    mode = conn.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+    if mode.lower() != 'wal':
+        logger.warning(f"{db_path}: журнал WAL не включен (режим {mode})")
+
+
+def connect(db_path=DATABASE_FILE, profile=PROFILE_DEFAULT):
+    """
+    Открывает новое соединение с профилем PRAGMA (закрывает вызывающий)
+
+    Args:
+        db_path (str): Путь к файлу базы данных
+        profile (str): Профиль из PRAGMA_PROFILES
+
+    Returns:
+        sqlite3.Connection: Соединение
+    """
+    pragmas = PRAGMA_PROFILES[profile]
+    conn = sqlite3.connect(db_path, timeout=SQLITE_BUSY_TIMEOUT)
+    try:
+        if SQLITE_WAL_ENABLED:
+            _enable_wal(conn, db_path)
+        for name, value in pragmas:
+            conn.execute(f"PRAGMA {name} = {value}")
+    except Exception:
+        conn.close()
+        raise
+    return conn
+
+
+def get_connection(db_path=DATABASE_FILE, profile=PROFILE_DEFAULT):
+    """
+    Соединение потока с профилем PRAGMA: открывается при первом вызове и
+    переиспользуется следующими (не закрывать; транзакцию фиксирует или
+    откатывает тот, кто ее начал)
+
+    После fork процесс-потомок получает свое соединение, унаследованное не используется.
+
+    Args:
+        db_path (str): Путь к файлу базы данных
+        profile (str): Профиль из PRAGMA_PROFILES
+
+    Returns:
+        sqlite3.Connection: Соединение
+    """
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+    key = (os.path.abspath(db_path), profile)
+    entry = connections.get(key)
+    if entry is not None and entry[0] == os.getpid():
+        return entry[1]
+    conn = connect(db_path, profile)
+    connections[key] = (os.getpid(), conn)
+    return conn
+
+
+def close_connections():
+    """Закрывает соединения текущего потока, открытые get_connection()"""
+    connections = getattr(_local, 'connections', None) or {}
+    for pid, conn in connections.values():
+        if pid == os.getpid():
+            conn.close()
+    connections.clear()
@@ -7,6 +7,8 @@ import logging
 from typing import List, Dict, Any, Optional, Tuple
 
 from src.config.constants import DATABASE_FILE
+from src.db.connection import get_connection
+from src.db.migrations import migrate
 
 logger = logging.getLogger(__name__)
 
@@ -21,102 +23,33 @@ class DatabaseService:
         self.cursor = None
         
     def connect(self):
-        """Connect to the database"""
+        """Connect to the database (the connection is shared within the thread, see src.db.connection)"""
         try:
-            self.conn = sqlite3.connect(self.db_file)
-            self.conn.row_factory = sqlite3.Row
+            self.conn = get_connection(self.db_file)
             self.cursor = self.conn.cursor()
+            # Row factory on the cursor only: the shared connection keeps returning tuples to other callers
+            self.cursor.row_factory = sqlite3.Row
             return True
         except sqlite3.Error as e:
             logger.error(f"Database connection error: {e}")
             return False
             
     def close(self):
-        """Close the database connection"""
+        """Release the database connection (an unfinished transaction is rolled back, the connection stays open for reuse)"""
         if self.conn:
-            self.conn.close()
+            if self.conn.in_transaction:
+                self.conn.rollback()
             self.conn = None
             self.cursor = None
             
     def init_db(self):
-        """Initialize the database with tables if they don't exist"""
-        if not self.connect():
-            return False
-        
+        """Initialize the database schema (see src.db.migrations)"""
         try:
-            # Удаляю создание лишних таблиц
-            # Оставьте только нужные CREATE TABLE ... если они реально нужны для работы других функций
-            self.conn.commit()
-            # Проверяем, нужно ли добавить колонки миграции
-            # self._migrate_db_if_needed()  # Можно закомментировать, если не нужно
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS result_match_maps (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    match_id INTEGER NOT NULL,
-                    map_name TEXT NOT NULL,
-                    team1_rounds INTEGER,
-                    team2_rounds INTEGER,
-                    rounds TEXT
-                )
-            ''')
+            migrate(self.db_file)
             return True
         except sqlite3.Error as e:
             logger.error(f"Database initialization error: {e}")
             return False
-        finally:
-            self.close()
-            
-    def _migrate_db_if_needed(self):
-        """
-        Проверяет необходимость миграции БД и добавляет отсутствующие колонки
-        """
-        try:
-            # Проверяем существование таблицы
-            self.cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='upcoming_match'")
-            if not self.cursor.fetchone():
-                logger.warning("Table upcoming_match does not exist yet, skipping migration")
-                return
-                
-            # Получаем список колонок в таблице upcoming_match
-            self.cursor.execute("PRAGMA table_info(upcoming_match)")
-            columns_info = self.cursor.fetchall()
-            columns = [column[1] for column in columns_info]
-            
-            logger.info(f"Existing columns in upcoming_match: {columns}")
-            
-            # Проверяем отсутствующие колонки и добавляем их
-            if "parsed" not in columns:
-                logger.info("Adding 'parsed' column to upcoming_match table")
-                self.cursor.execute("ALTER TABLE upcoming_match ADD COLUMN parsed INTEGER DEFAULT 0")
-                logger.info("'parsed' column added successfully")
-            else:
-                logger.info("'parsed' column already exists")
-            
-            if "last_updated" not in columns:
-                logger.info("Adding 'last_updated' column to upcoming_match table")
-                # SQLite не поддерживает DEFAULT CURRENT_TIMESTAMP при ALTER TABLE
-                self.cursor.execute("ALTER TABLE upcoming_match ADD COLUMN last_updated TEXT")
-                # Устанавливаем начальное значение для last_updated
-                self.cursor.execute("UPDATE upcoming_match SET last_updated = datetime('now') WHERE last_updated IS NULL")
-                logger.info("'last_updated' column added successfully")
-            else:
-                logger.info("'last_updated' column already exists")
-            
-            self.conn.commit()
-            
-            # Проверяем после миграции
-            self.cursor.execute("PRAGMA table_info(upcoming_match)")
-            columns_after = [column[1] for column in self.cursor.fetchall()]
-            logger.info(f"Columns after migration: {columns_after}")
-            
-            logger.info("Database migration completed successfully")
-        except sqlite3.Error as e:
-            logger.error(f"Database migration error: {e}")
-            # Добавляем вывод запроса для отладки
-            self.cursor.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name='upcoming_match'")
-            table_def = self.cursor.fetchone()
-            if table_def:
-                logger.error(f"Current table definition: {table_def[0]}")
             
     def get_match_ids_for_parsing(self, is_past: bool = True, limit: Optional[int] = None) -> List[int]:
         """
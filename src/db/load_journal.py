@@ -0,0 +1,285 @@
+"""
+Журнал загрузки промежуточных данных в базу
+
+Загрузчики читают потоки storage/json/<вид> (сегменты JSONL и файлы прежнего
+формата) и раньше удаляли каждый файл сразу после его отдельной фиксации: сбой
+посреди загрузки оставлял часть пачки в базе, а файлы - на диске, и повторный
+запуск загружал их заново с начала сегмента.
+
+Теперь каждая пачка фиксируется одной транзакцией вместе с записью журнала:
+номер пачки, сколько записей, строк и ошибок, и для каждого источника (сегмента
+или файла) - сколько его записей загружено с начала и прочитан ли он целиком.
+Файлы и сегменты удаляются (или переносятся в LOADER_ARCHIVE_DIR) только после
+фиксации. При следующем запуске load_stream() продолжает с места остановки:
+дочищает источники пачек, зафиксированных до сбоя, и пропускает в сегментах уже
+загруженные записи. Записи, на которых загрузка упала, переносятся в новый
+сегмент до фиксации пачки, поэтому не теряются; повтор записи безопасен -
+строки пишутся через UPSERT по естественным ключам (src.db.natural_keys).
+
+Таблицы журнала создает миграция схемы 5 (src.db.migrations).
+"""
+import os
+import glob
+import shutil
+import logging
+
+from src.config import LOADER_ARCHIVE_DIR, LOADER_BATCH_SIZE, LOAD_JOURNAL_KEEP_DAYS
+from src.utils import json_io
+from src.utils.jsonl_segments import SegmentWriter, committed_segments, read_segment
+
+logger = logging.getLogger(__name__)
+
+
+class LoadJournal:
+    """
+    Журнал загрузки одного потока (таблицы load_batches и load_batch_files)
+    """
+
+    def __init__(self, conn, stream_dir):
+        """
+        Args:
+            conn: Открытое соединение
+            stream_dir (str): Директория потока
+        """
+        self.conn = conn
+        self.stream_dir = stream_dir
+        self.stream = os.path.abspath(stream_dir)
+
+    def resume(self):
+        """
+        Дочищает источники пачек, зафиксированных до сбоя, и забывает пропавшие с диска
+
+        Returns:
+            dict: Имя сегмента -> количество уже загруженных записей
+        """
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT DISTINCT source FROM load_batch_files WHERE stream = ? AND complete = 1', (self.stream,))
+        pending = [row[0] for row in cursor.fetchall()]
+        if pending:
+            logger.warning(f"{self.stream_dir}: удаляются {len(pending)} источников, загруженных до сбоя")
+            self._dispose(pending)
+        cursor.execute('SELECT source, MAX(records) FROM load_batch_files WHERE stream = ? GROUP BY source', (self.stream,))
+        offsets = {}
+        missing = []
+        for source, records in cursor.fetchall():
+            if os.path.exists(os.path.join(self.stream_dir, source)):
+                offsets[source] = records
+            else:
+                missing.append(source)
+        self._forget(missing)
+        cursor.execute(
+            "DELETE FROM load_batches WHERE stream = ? AND cleaned_at < datetime('now', ?)",
+            (self.stream, f'-{LOAD_JOURNAL_KEEP_DAYS} days')
+        )
+        self.conn.commit()
+        if offsets:
+            logger.info(f"{self.stream_dir}: продолжение загрузки {len(offsets)} сегментов")
+        return offsets
+
+    def record(self, sources, records, rows, errors):
+        """
+        Записывает пачку в журнал в текущей транзакции (фиксирует вызывающий вместе с данными)
+
+        Args:
+            sources (dict): Имя источника -> (загружено записей с начала, прочитан целиком)
+            records (int): Записей в пачке
+            rows (int): Записано строк
+            errors (int): Записей с ошибкой
+
+        Returns:
+            int: Номер пачки
+        """
+        cursor = self.conn.cursor()
+        cursor.execute(
+            'INSERT INTO load_batches (stream, records, rows, errors) VALUES (?, ?, ?, ?)',
+            (self.stream, records, rows, errors)
+        )
+        batch_id = cursor.lastrowid
+        cursor.executemany(
+            'INSERT INTO load_batch_files (batch_id, stream, source, records, complete) VALUES (?, ?, ?, ?, ?)',
+            [(batch_id, self.stream, source, offset, int(complete)) for source, (offset, complete) in sources.items()]
+        )
+        return batch_id
+
+    def cleanup(self, batch_id, sources):
+        """
+        Удаляет источники, загруженные целиком, после фиксации пачки
+
+        Args:
+            batch_id (int): Номер пачки
+            sources (list): Имена источников
+        """
+        self._dispose(sources)
+        self.conn.execute('UPDATE load_batches SET cleaned_at = CURRENT_TIMESTAMP WHERE batch_id = ?', (batch_id,))
+        self.conn.commit()
+
+    def _dispose(self, sources):
+        for source in sources:
+            path = os.path.join(self.stream_dir, source)
+            if not os.path.exists(path):
+                continue
+            if LOADER_ARCHIVE_DIR:
+                archive_dir = os.path.join(LOADER_ARCHIVE_DIR, os.path.basename(self.stream))
+                os.makedirs(archive_dir, exist_ok=True)
+                shutil.move(path, os.path.join(archive_dir, source))
+            else:
+                os.remove(path)
+        self._forget(sources)
+
+    def _forget(self, sources):
+        # Имена файлов прежнего формата (<match_id>.json) повторяются, записи о них не должны пережить файл
+        self.conn.executemany('DELETE FROM load_batch_files WHERE stream = ? AND source = ?',
+                              [(self.stream, source) for source in sources])
+
+
+def execute_batch(conn, write_batch, batch):
+    """
+    Пишет пачку в текущей транзакции; если пачка не прошла, пишет записи по одной
+    (каждую в своей точке сохранения), чтобы сохранить хорошие и найти плохие
+
+    Args:
+        conn: Открытое соединение с начатой транзакцией
+        write_batch (callable): (cursor, список записей) -> количество строк
+        batch (list): Записи
+
+    Returns:
+        tuple: (записано строк, множество индексов записей с ошибкой)
+    """
+    if not batch:
+        return 0, set()
+    cursor = conn.cursor()
+    conn.execute('SAVEPOINT load_batch')
+    try:
+        rows = write_batch(cursor, batch)
+        conn.execute('RELEASE load_batch')
+        return rows, set()
+    except Exception as e:
+        _rollback_to(conn, 'load_batch')
+        logger.warning(f"Пачка из {len(batch)} записей не записана ({str(e)}), запись по одной")
+
+    rows = 0
+    failed = set()
+    for index, entry in enumerate(batch):
+        conn.execute('SAVEPOINT load_record')
+        try:
+            rows += write_batch(cursor, [entry])
+            conn.execute('RELEASE load_record')
+        except Exception as e:
+            _rollback_to(conn, 'load_record')
+            logger.error(f"Ошибка при загрузке записи {index + 1} из {len(batch)}: {str(e)}")
+            failed.add(index)
+    return rows, failed
+
+
+def _rollback_to(conn, savepoint):
+    if not conn.in_transaction:
+        # SQLite откатил транзакцию целиком (например, диск заполнен) - загрузка прерывается,
+        # следующий запуск продолжит с последней зафиксированной пачки
+        raise RuntimeError("Транзакция загрузки откачена SQLite")
+    conn.execute(f'ROLLBACK TO {savepoint}')
+    conn.execute(f'RELEASE {savepoint}')
+
+
+def load_stream(conn, stream_dir, write_batch, normalize=None, batch_size=None):
+    """
+    Загружает поток пачками с журналом: сначала сегменты JSONL, затем файлы прежнего формата
+
+    Args:
+        conn: Открытое соединение без незавершенной транзакции
+        stream_dir (str): Директория потока
+        write_batch (callable): (cursor, список записей) -> количество строк
+        normalize (callable, optional): (данные, путь к файлу прежнего формата или None
+            для записи сегмента) -> запись для write_batch; по умолчанию данные как есть
+        batch_size (int, optional): Записей в транзакции (по умолчанию LOADER_BATCH_SIZE)
+
+    Returns:
+        dict: processed, success, error, rows, segments, files
+    """
+    batch_size = batch_size or LOADER_BATCH_SIZE
+    counts = {'processed': 0, 'success': 0, 'error': 0, 'rows': 0, 'segments': 0, 'files': 0}
+    if not os.path.isdir(stream_dir):
+        return counts
+    journal = LoadJournal(conn, stream_dir)
+    offsets = journal.resume()
+    # Записи пачки и их источники: (имя источника, запись сегмента или None для файла)
+    batch = []
+    sources = []
+    # Имя источника -> записей, прочитанных с начала
+    consumed = {}
+    # Источники, прочитанные целиком с последней фиксации
+    finished = []
+    retry = SegmentWriter(stream_dir)
+
+    def flush():
+        if not batch and not finished:
+            return
+        if not conn.in_transaction:
+            conn.execute('BEGIN')
+        rows, failed = execute_batch(conn, write_batch, batch)
+        kept = set()
+        for index, (source, record) in enumerate(sources):
+            if index in failed:
+                counts['error'] += 1
+                if record is not None:
+                    retry.append(record)
+                else:
+                    kept.add(source)
+            else:
+                counts['success'] += 1
+        # Упавшие записи сохраняются в новый сегмент до фиксации пачки: после сбоя они не теряются
+        retry.commit()
+        done = [source for source in finished if source not in kept]
+        touched = {source: (consumed[source], False) for source, record in sources if source not in kept}
+        touched.update((source, (consumed[source], True)) for source in done)
+        batch_id = journal.record(touched, len(batch), rows, len(failed))
+        conn.commit()
+        counts['rows'] += rows
+        journal.cleanup(batch_id, done)
+        batch.clear()
+        sources.clear()
+        finished.clear()
+
+    def add(source, record, data, file_path=None):
+        counts['processed'] += 1
+        consumed[source] = consumed.get(source, 0) + 1
+        try:
+            batch.append(normalize(data, file_path) if normalize else data)
+            sources.append((source, record))
+        except Exception as e:
+            logger.error(f"Ошибка при чтении записи из {source}: {str(e)}")
+            counts['error'] += 1
+            if record is not None:
+                retry.append(record)
+            return False
+        return True
+
+    segments = committed_segments(stream_dir)
+    counts['segments'] = len(segments)
+    for segment in segments:
+        source = os.path.basename(segment)
+        skip = consumed[source] = offsets.get(source, 0)
+        for number, record in enumerate(read_segment(segment)):
+            if number < skip:
+                continue
+            add(source, record, record)
+            if len(batch) >= batch_size:
+                flush()
+        finished.append(source)
+
+    files = sorted(glob.glob(os.path.join(stream_dir, "*.json")))
+    counts['files'] = len(files)
+    for file_path in files:
+        source = os.path.basename(file_path)
+        try:
+            data = json_io.load_file(file_path)
+        except Exception as e:
+            logger.error(f"Ошибка при чтении {file_path}: {str(e)}")
+            counts['processed'] += 1
+            counts['error'] += 1
+            continue
+        if add(source, None, data, file_path):
+            finished.append(source)
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+    return counts
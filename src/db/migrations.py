@@ -0,0 +1,434 @@
+"""
+Версионированные миграции схемы hltv.db
+
+Схема базы создается и обновляется только здесь. Версия схемы хранится в
+PRAGMA user_version; migrate() применяет по порядку миграции с номером больше
+текущего, каждую в своей транзакции вместе с записью новой версии, поэтому
+прерванная миграция не оставляет базу в промежуточном состоянии.
+
+Первые миграции повторяют прежние CREATE TABLE (migrate_schema.py,
+DatabaseService.init_db, _create_tables загрузчиков, create_*_table) с
+IF NOT EXISTS и добавляют колонки, которых нет в базах, созданных раньше, - для
+существующей базы они ничего не ломают. Дальше идут индексы: уникальные индексы
+естественных ключей (src.db.natural_keys) и индексы под запросы бота,
+планировщика и загрузчиков. Что запросы их используют, проверяет
+python -m src.scripts.check_query_plans. Последние миграции создают таблицы
+журнала загрузки (src.db.load_journal) и служебные таблицы коллекторов, которые
+раньше создавались на месте (collect_manifest, upcoming_fingerprints).
+
+Новая миграция добавляется в конец MIGRATIONS со следующим номером; уже
+выпущенные миграции не меняются.
+
+Использование:
+    python -m src.db.migrations
+    python -m src.db.migrations --db-path hltv.db
+"""
+import os
+import sys
+import logging
+import argparse
+
+from src.config.constants import DATABASE_FILE
+from src.db.connection import connect
+from src.db.natural_keys import ensure_natural_keys
+
+logger = logging.getLogger(__name__)
+
+# Таблицы: (имя, CREATE TABLE)
+TABLES = (
+    # Результаты матчей (прошедшие)
+    ('result_match', '''
+        CREATE TABLE IF NOT EXISTS result_match (
+            match_id INTEGER PRIMARY KEY,
+            url TEXT,
+            datetime INTEGER,
+            team1_id INTEGER,
+            team1_name TEXT,
+            team1_score INTEGER,
+            team1_rank INTEGER,
+            team2_id INTEGER,
+            team2_name TEXT,
+            team2_score INTEGER,
+            team2_rank INTEGER,
+            event_id INTEGER,
+            event_name TEXT,
+            demo_id INTEGER,
+            head_to_head_team1_wins INTEGER,
+            head_to_head_team2_wins INTEGER,
+            parsed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    '''),
+    # Предстоящие матчи
+    ('upcoming_match', '''
+        CREATE TABLE IF NOT EXISTS upcoming_match (
+            match_id INTEGER PRIMARY KEY,
+            datetime INTEGER,
+            team1_id INTEGER,
+            team1_name TEXT,
+            team1_rank INTEGER,
+            team2_id INTEGER,
+            team2_name TEXT,
+            team2_rank INTEGER,
+            event_id INTEGER,
+            event_name TEXT,
+            head_to_head_team1_wins INTEGER,
+            head_to_head_team2_wins INTEGER,
+            status TEXT DEFAULT 'upcoming',
+            parsed INTEGER DEFAULT 0,
+            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    '''),
+    # Игроки в предстоящих матчах
+    ('upcoming_match_players', '''
+        CREATE TABLE IF NOT EXISTS upcoming_match_players (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            match_id INTEGER NOT NULL,
+            player_id INTEGER,
+            player_nickname TEXT,
+            team_id INTEGER,
+            team_position INTEGER,
+            FOREIGN KEY (match_id) REFERENCES upcoming_match (match_id)
+        )
+    '''),
+    # Стримы предстоящих матчей
+    ('upcoming_match_streamers', '''
+        CREATE TABLE IF NOT EXISTS upcoming_match_streamers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            match_id INTEGER NOT NULL,
+            name TEXT,
+            lang TEXT,
+            url TEXT,
+            FOREIGN KEY (match_id) REFERENCES upcoming_urls (id)
+        )
+    '''),
+    # Ссылки на страницы результатов
+    ('result_urls', '''
+        CREATE TABLE IF NOT EXISTS result_urls (
+            id INTEGER PRIMARY KEY,
+            url TEXT NOT NULL,
+            toParse INTEGER NOT NULL DEFAULT 1
+        )
+    '''),
+    # Ссылки на страницы предстоящих матчей
+    ('upcoming_urls', '''
+        CREATE TABLE IF NOT EXISTS upcoming_urls (
+            id INTEGER PRIMARY KEY,
+            url TEXT NOT NULL,
+            date INTEGER NOT NULL,
+            toParse INTEGER NOT NULL DEFAULT 1,
+            reParse INTEGER NOT NULL DEFAULT 0,
+            next_update INTEGER,
+            last_fetched INTEGER
+        )
+    '''),
+    # Статистика игроков в прошедших матчах
+    ('player_stats', '''
+        CREATE TABLE IF NOT EXISTS player_stats (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            match_id INTEGER NOT NULL,
+            team_id INTEGER,
+            player_id INTEGER,
+            player_nickname TEXT,
+            fullName TEXT,
+            nickName TEXT,
+            kills INTEGER,
+            deaths INTEGER,
+            kd_ratio REAL,
+            plus_minus INTEGER,
+            adr REAL,
+            kast REAL,
+            rating REAL,
+            FOREIGN KEY (match_id) REFERENCES result_match (match_id)
+        )
+    '''),
+    # Карты прошедших матчей
+    ('result_match_maps', '''
+        CREATE TABLE IF NOT EXISTS result_match_maps (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            match_id INTEGER NOT NULL,
+            map_name TEXT NOT NULL,
+            team1_rounds INTEGER,
+            team2_rounds INTEGER,
+            rounds TEXT
+        )
+    '''),
+    # Профили игроков (раньше - create_players_table.sql)
+    ('players', '''
+        CREATE TABLE IF NOT EXISTS players (
+            player_id INTEGER PRIMARY KEY,
+            player_nickname TEXT,
+            country TEXT,
+            real_name TEXT,
+            age INTEGER,
+            current_team TEXT,
+            prize_money REAL,
+            maps_past3 INTEGER,
+            rating_2_1 REAL,
+            firepower REAL,
+            entrying REAL,
+            trading REAL,
+            opening REAL,
+            clutching REAL,
+            sniping REAL,
+            utility REAL,
+            teams_count INTEGER,
+            days_in_current_team INTEGER,
+            days_in_teams INTEGER,
+            majors_played INTEGER,
+            majors_won INTEGER,
+            lans_played INTEGER,
+            lans_won INTEGER,
+            faceit_url TEXT,
+            faceit_matches INTEGER,
+            faceit_winrate REAL,
+            faceit_winstreak INTEGER,
+            faceit_avgkdr REAL,
+            faceit_headshots REAL,
+            next_update TIMESTAMP,
+            last_update TIMESTAMP
+        )
+    '''),
+    # Прогнозы по матчам
+    ('predict', '''
+        CREATE TABLE IF NOT EXISTS predict (
+            match_id INTEGER PRIMARY KEY,
+            team1_score INTEGER,
+            team2_score INTEGER,
+            team1_score_final INTEGER,
+            team2_score_final INTEGER,
+            model_version TEXT,
+            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    '''),
+    # Прогнозы по картам
+    ('predict_map', '''
+        CREATE TABLE IF NOT EXISTS predict_map (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            match_id INTEGER NOT NULL,
+            map_name TEXT NOT NULL,
+            team1_score INTEGER,
+            team2_score INTEGER,
+            team1_score_final INTEGER,
+            team2_score_final INTEGER,
+            model_version TEXT,
+            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    '''),
+)
+
+# Колонки, которые добавлялись в таблицы после их создания: (таблица, колонка, определение).
+# В ALTER TABLE SQLite не допускает DEFAULT CURRENT_TIMESTAMP, такие колонки заполняются отдельно
+ADDED_COLUMNS = (
+    ('upcoming_match', 'parsed', 'INTEGER DEFAULT 0'),
+    ('upcoming_match', 'last_updated', 'TIMESTAMP'),
+    ('upcoming_urls', 'reParse', 'INTEGER NOT NULL DEFAULT 0'),
+    ('upcoming_urls', 'next_update', 'INTEGER'),
+    ('upcoming_urls', 'last_fetched', 'INTEGER'),
+    ('predict', 'team1_score_final', 'INTEGER'),
+    ('predict', 'team2_score_final', 'INTEGER'),
+    ('predict', 'model_version', 'TEXT'),
+    ('predict_map', 'team1_score_final', 'INTEGER'),
+    ('predict_map', 'team2_score_final', 'INTEGER'),
+    ('predict_map', 'model_version', 'TEXT'),
+)
+
+# Индексы под запросы: (имя, таблица, столбцы или выражения).
+# Выборки по match_id из player_stats, result_match_maps, upcoming_match_players и
+# upcoming_match_streamers идут по уникальным индексам естественных ключей (match_id - их префикс)
+QUERY_INDEXES = (
+    # Бот: события и матчи за период (DISTINCT event_id, event_name - только из индекса),
+    # очистка прошедших предстоящих матчей
+    ('idx_result_match_datetime', 'result_match', 'datetime, event_id, event_name'),
+    ('idx_upcoming_match_datetime', 'upcoming_match', 'datetime, event_id, event_name'),
+    # Бот: матчи события по времени
+    ('idx_result_match_event', 'result_match', 'event_id, datetime'),
+    ('idx_upcoming_match_event', 'upcoming_match', 'event_id, datetime'),
+    # Бот: поиск матчей команды (LOWER(team1_name) = LOWER(?) OR LOWER(team2_name) = LOWER(?))
+    ('idx_result_match_team1', 'result_match', 'LOWER(team1_name), datetime'),
+    ('idx_result_match_team2', 'result_match', 'LOWER(team2_name), datetime'),
+    ('idx_upcoming_match_team1', 'upcoming_match', 'LOWER(team1_name), datetime'),
+    ('idx_upcoming_match_team2', 'upcoming_match', 'LOWER(team2_name), datetime'),
+    # DatabaseService.get_match_ids_for_parsing: status, порядок по datetime, фильтр parsed
+    # без обращения к таблице (match_id - rowid); бот: предстоящие матчи со status = 'upcoming' за период
+    ('idx_upcoming_match_status_datetime', 'upcoming_match', 'status, datetime, parsed'),
+    # Парсер и планировщик: ссылки на результаты, ожидающие загрузки
+    ('idx_result_urls_to_parse', 'result_urls', 'toParse'),
+)
+
+# Журнал загрузки (src.db.load_journal): пачки, зафиксированные загрузчиками, и их источники
+JOURNAL_TABLES = (
+    ('load_batches', '''
+        CREATE TABLE IF NOT EXISTS load_batches (
+            batch_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            stream TEXT NOT NULL,
+            records INTEGER NOT NULL,
+            rows INTEGER NOT NULL,
+            errors INTEGER NOT NULL,
+            committed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            cleaned_at TIMESTAMP
+        )
+    '''),
+    # records - сколько записей источника загружено с начала, complete - источник прочитан целиком
+    ('load_batch_files', '''
+        CREATE TABLE IF NOT EXISTS load_batch_files (
+            batch_id INTEGER NOT NULL,
+            stream TEXT NOT NULL,
+            source TEXT NOT NULL,
+            records INTEGER NOT NULL,
+            complete INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (stream, source, batch_id),
+            FOREIGN KEY (batch_id) REFERENCES load_batches (batch_id)
+        )
+    '''),
+)
+
+# Служебные таблицы коллекторов: манифест обработанных страниц (src.collector.manifest)
+# и отпечатки страниц предстоящих матчей (src.utils.page_fingerprint)
+COLLECTOR_TABLES = (
+    ('collect_manifest', '''
+        CREATE TABLE IF NOT EXISTS collect_manifest (
+            kind TEXT NOT NULL,
+            file_name TEXT NOT NULL,
+            size INTEGER,
+            mtime_ns INTEGER,
+            content_hash TEXT NOT NULL,
+            parser_version INTEGER NOT NULL,
+            processed_at TEXT,
+            PRIMARY KEY (kind, file_name)
+        )
+    '''),
+    ('upcoming_fingerprints', '''
+        CREATE TABLE IF NOT EXISTS upcoming_fingerprints (
+            match_id INTEGER PRIMARY KEY,
+            fingerprint TEXT,
+            etag TEXT,
+            last_modified TEXT,
+            updated_at TEXT
+        )
+    '''),
+)
+
+
+def _column_names(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def _create_tables(conn):
+    for table, sql in TABLES:
+        conn.execute(sql)
+
+
+def _add_columns(conn):
+    for table, column, definition in ADDED_COLUMNS:
+        if column in _column_names(conn, table):
+            continue
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        logger.info(f"Добавлена колонка {table}.{column}")
+    conn.execute("UPDATE upcoming_match SET last_updated = datetime('now') WHERE last_updated IS NULL")
+
+
+def _create_query_indexes(conn):
+    for index_name, table, columns in QUERY_INDEXES:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table} ({columns})")
+
+
+def _create_journal_tables(conn):
+    for table, sql in JOURNAL_TABLES:
+        conn.execute(sql)
+
+
+def _create_collector_tables(conn):
+    for table, sql in COLLECTOR_TABLES:
+        conn.execute(sql)
+
+
+# Миграции: (версия, описание, функция(conn)). Порядок и номера не меняются
+MIGRATIONS = (
+    (1, 'Таблицы', _create_tables),
+    (2, 'Колонки, добавленные после создания таблиц', _add_columns),
+    (3, 'Уникальные индексы естественных ключей', ensure_natural_keys),
+    (4, 'Индексы под запросы бота, парсера и загрузчиков', _create_query_indexes),
+    (5, 'Журнал загрузки', _create_journal_tables),
+    (6, 'Манифест коллекторов и отпечатки страниц', _create_collector_tables),
+)
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+# Базы, уже приведенные к SCHEMA_VERSION в этом процессе
+_migrated = set()
+
+
+def get_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate_connection(conn):
+    """
+    Применяет к базе недостающие миграции
+
+    Каждая миграция выполняется в транзакции BEGIN IMMEDIATE вместе с записью
+    PRAGMA user_version; версия перечитывается внутри транзакции, поэтому два
+    процесса, запущенные одновременно, не применят одну миграцию дважды.
+
+    Args:
+        conn: Открытое соединение без незавершенной транзакции
+
+    Returns:
+        int: Количество примененных миграций
+    """
+    applied = 0
+    for version, description, apply in MIGRATIONS:
+        if get_version(conn) >= version:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if get_version(conn) >= version:
+                conn.rollback()
+                continue
+            apply(conn)
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied += 1
+        logger.info(f"Схема базы: миграция {version} ({description}) применена")
+    return applied
+
+
+def migrate(db_path=DATABASE_FILE):
+    """
+    Приводит схему базы к SCHEMA_VERSION (в процессе - один раз на базу)
+
+    Args:
+        db_path (str): Путь к файлу базы данных
+
+    Returns:
+        int: Количество примененных миграций
+    """
+    key = os.path.abspath(db_path)
+    if key in _migrated:
+        return 0
+    conn = connect(db_path)
+    try:
+        applied = migrate_connection(conn)
+    finally:
+        conn.close()
+    _migrated.add(key)
+    return applied
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Миграции схемы базы данных')
+    parser.add_argument('--db-path', type=str, default=DATABASE_FILE, help='Путь к файлу базы данных')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    applied = migrate(args.db_path)
+    logger.info(f"{args.db_path}: применено миграций {applied}, версия схемы {SCHEMA_VERSION}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
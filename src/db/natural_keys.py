@@ -0,0 +1,123 @@
+"""
+Естественные ключи таблиц и запись через UPSERT
+
+Таблицы строк матча (статистика игроков, карты, составы и стримы предстоящих
+матчей, прогнозы по картам) имеют суррогатный id AUTOINCREMENT. Раньше загрузчики
+перезаписывали строки матча удалением и повторной вставкой, а списки матчей
+проверялись SELECT на каждую строку. Теперь у каждой такой таблицы есть
+уникальный индекс по естественному ключу, и запись идет одним
+INSERT ... ON CONFLICT(<ключ>) DO UPDATE: повторная загрузка той же страницы
+обновляет строки на месте и не создает дублей.
+
+Индекс на существующей базе создается ensure_natural_keys(); дубли, оставленные
+прежними загрузчиками, перед этим удаляются (остается последняя вставленная строка).
+
+Строка без значения ключа (игрок без ID, стрим без ссылки) пишется с NULL, а не с
+0 или пустой строкой: NULL в уникальном индексе не конфликтует, поэтому такие строки
+не сливаются в одну, а prune_match_rows() удаляет их перед каждой перезаписью матча.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Таблица: (имя уникального индекса, столбцы естественного ключа)
+NATURAL_KEYS = {
+    'player_stats': ('ux_player_stats_match_player', ('match_id', 'player_id')),
+    'result_match_maps': ('ux_result_match_maps_match_map', ('match_id', 'map_name')),
+    'upcoming_match_players': ('ux_upcoming_match_players_match_player', ('match_id', 'player_id')),
+    'upcoming_match_streamers': ('ux_upcoming_match_streamers_match_url', ('match_id', 'url')),
+    'predict_map': ('ux_predict_map_match_map', ('match_id', 'map_name')),
+}
+
+# ID в одном запросе IN (...) (SQLite до 3.32 допускает не больше 999 параметров)
+ID_CHUNK_SIZE = 500
+
+
+def ensure_natural_keys(conn, tables=None):
+    """
+    Создает уникальные индексы естественных ключей (фиксация - на вызывающем)
+
+    Args:
+        conn: Открытое соединение
+        tables (iterable, optional): Таблицы из NATURAL_KEYS (по умолчанию все);
+            отсутствующие в базе таблицы пропускаются
+    """
+    for table in tables or NATURAL_KEYS:
+        index_name, columns = NATURAL_KEYS[table]
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone():
+            continue
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (index_name,)).fetchone():
+            continue
+        key = ", ".join(columns)
+        not_null = " AND ".join(f"{column} IS NOT NULL" for column in columns)
+        # NULL в ключе не конфликтует в уникальном индексе, такие строки не трогаем
+        removed = conn.execute(f'''
+            DELETE FROM {table}
+            WHERE {not_null} AND id NOT IN (SELECT MAX(id) FROM {table} WHERE {not_null} GROUP BY {key})
+        ''').rowcount
+        conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {index_name} ON {table} ({key})")
+        logger.info(f"Создан индекс {index_name} ({table}: {key}), удалено дублей: {removed}")
+
+
+def upsert_sql(table, columns, update_columns=None):
+    """
+    INSERT ... ON CONFLICT(<естественный ключ>) DO UPDATE для executemany
+
+    Args:
+        table (str): Таблица из NATURAL_KEYS
+        columns (tuple): Вставляемые столбцы (параметры в том же порядке)
+        update_columns (tuple, optional): Столбцы, обновляемые при конфликте
+            (по умолчанию все, кроме ключа)
+
+    Returns:
+        str: SQL-запрос
+    """
+    key = NATURAL_KEYS[table][1]
+    if update_columns is None:
+        update_columns = [column for column in columns if column not in key]
+    return (
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+        f"ON CONFLICT({', '.join(key)}) DO UPDATE SET "
+        + ", ".join(f"{column} = excluded.{column}" for column in update_columns)
+    )
+
+
+def prune_match_rows(cursor, table, match_id, keep):
+    """
+    Удаляет строки матча, которых нет в новых данных (игрок заменен, стрим снят)
+
+    Строки с NULL в ключе удаляются всегда: UPSERT их не находит.
+
+    Args:
+        cursor: Курсор открытого соединения
+        table (str): Таблица из NATURAL_KEYS (ключ - match_id и один столбец)
+        match_id (int): ID матча
+        keep (list): Значения второго столбца ключа, которые остаются
+    """
+    column = NATURAL_KEYS[table][1][1]
+    keep = [value for value in keep if value is not None]
+    cursor.execute(
+        f"DELETE FROM {table} WHERE match_id = ? AND ({column} IS NULL OR {column} NOT IN ({','.join('?' * len(keep))}))",
+        [match_id] + keep
+    )
+
+
+def id_chunks(ids):
+    """Разбивает ID на списки не длиннее ID_CHUNK_SIZE"""
+    ids = list(ids)
+    for start in range(0, len(ids), ID_CHUNK_SIZE):
+        yield ids[start:start + ID_CHUNK_SIZE]
+
+
+def existing_ids(cursor, table, column, ids):
+    """
+    ID, которые уже есть в таблице (один запрос на ID_CHUNK_SIZE ID вместо SELECT на строку)
+
+    Returns:
+        set: Найденные ID
+    """
+    found = set()
+    for chunk in id_chunks(ids):
+        cursor.execute(f"SELECT {column} FROM {table} WHERE {column} IN ({','.join('?' * len(chunk))})", chunk)
+        found.update(row[0] for row in cursor.fetchall())
+    return found
@@ -3,12 +3,16 @@
 Модуль для загрузки деталей матчей и статистики игроков из JSON в базу данных
 """
 import os
-import json
+import time
 import logging
-import sqlite3
-import glob
 from datetime import datetime
 
+from src.config import LOADER_BATCH_SIZE
+from src.db.connection import PROFILE_BULK_LOAD, connect
+from src.db.load_journal import load_stream
+from src.db.migrations import migrate
+from src.db.natural_keys import existing_ids, prune_match_rows, upsert_sql
+
 # Setting up logging
 logging.basicConfig(
     level=logging.INFO,
@@ -23,12 +27,40 @@ PLAYER_STATS_JSON_DIR = os.path.join(JSON_OUTPUT_DIR, "player_stats")
 RESULT_MAPS_JSON_DIR = os.path.join(JSON_OUTPUT_DIR, "result_maps")
 DATABASE_FILE = "hltv.db"
 
+PLAYER_STATS_COLUMNS = (
+    'match_id', 'team_id', 'player_id', 'player_nickname',
+    'fullName', 'nickName', 'kills', 'deaths', 'kd_ratio',
+    'plus_minus', 'adr', 'kast', 'rating'
+)
+
+MATCH_MAPS_COLUMNS = ('match_id', 'map_name', 'team1_rounds', 'team2_rounds', 'rounds')
+
+# result_match columns written by the loader (besides match_id)
+MATCH_DETAILS_COLUMNS = (
+    'url', 'datetime',
+    'team1_id', 'team1_name', 'team1_score', 'team1_rank',
+    'team2_id', 'team2_name', 'team2_score', 'team2_rank',
+    'event_id', 'event_name', 'demo_id',
+    'head_to_head_team1_wins', 'head_to_head_team2_wins',
+    'parsed_at'
+)
+
 class MatchDetailsLoader:
     """
     Class for loading match details from JSON to database
     """
-    def __init__(self, db_path=DATABASE_FILE):
+    def __init__(self, db_path=DATABASE_FILE, json_dir=JSON_OUTPUT_DIR, batch_size=None):
+        """
+        Args:
+            db_path (str): Path to the database
+            json_dir (str): Directory with the result_match, player_stats and result_maps streams
+            batch_size (int, optional): Records per transaction (LOADER_BATCH_SIZE by default)
+        """
         self.db_path = db_path
+        self.match_details_dir = os.path.join(json_dir, "result_match")
+        self.player_stats_dir = os.path.join(json_dir, "player_stats")
+        self.maps_dir = os.path.join(json_dir, "result_maps")
+        self.batch_size = batch_size or LOADER_BATCH_SIZE
         
     def load_all(self):
         """
@@ -37,68 +69,16 @@ class MatchDetailsLoader:
         Returns:
             dict: Loading statistics
         """
-        stats = {
-            'match_details_processed': 0,
-            'match_details_success': 0,
-            'match_details_error': 0,
-            'player_stats_processed': 0,
-            'player_stats_success': 0,
-            'player_stats_error': 0,
-            'maps_processed': 0,
-            'maps_success': 0,
-            'maps_error': 0
-        }
-        
-        # Load match details
-        match_details_files = glob.glob(os.path.join(MATCH_DETAILS_JSON_DIR, "*.json"))
-        logger.info(f"Found {len(match_details_files)} files with match details")
-        
-        for file_path in match_details_files:
-            try:
-                stats['match_details_processed'] += 1
-                self._load_match_details(file_path)
-                stats['match_details_success'] += 1
-                os.remove(file_path)
-                logger.info(f"File {os.path.basename(file_path)} deleted after processing")
-            except Exception as e:
-                logger.error(f"Error loading match details from {file_path}: {str(e)}")
-                stats['match_details_error'] += 1
-        
-        # Load player statistics
-        player_stats_files = glob.glob(os.path.join(PLAYER_STATS_JSON_DIR, "*.json"))
-        logger.info(f"Found {len(player_stats_files)} files with player statistics")
-        
-        for file_path in player_stats_files:
-            try:
-                stats['player_stats_processed'] += 1
-                self._load_player_stats(file_path)
-                stats['player_stats_success'] += 1
-                os.remove(file_path)
-                logger.info(f"File {os.path.basename(file_path)} deleted after processing")
-            except Exception as e:
-                logger.error(f"Error loading player statistics from {file_path}: {str(e)}")
-                stats['player_stats_error'] += 1
-        
-        # Load match maps
-        maps_files = glob.glob(os.path.join(RESULT_MAPS_JSON_DIR, "*.json"))
-        logger.info(f"Found {len(maps_files)} files with match maps")
-        for file_path in maps_files:
-            try:
-                stats['maps_processed'] += 1
-                self._load_match_maps(file_path)
-                stats['maps_success'] += 1
-                os.remove(file_path)
-                logger.info(f"File {os.path.basename(file_path)} deleted after processing (maps)")
-            except Exception as e:
-                stats['maps_error'] += 1
-                logger.error(f"Error loading match maps from {file_path}: {str(e)}")
-        
-        return stats
+        return self.load_match_details_and_stats()
     
     def load_match_details_and_stats(self, skip_match_details=False, skip_player_stats=False):
         """
         Loads data from JSON files to database with the ability to skip certain types of data
         
+        Records of each kind are read from the JSONL segments and then from legacy
+        per-match files, grouped into batches of batch_size and written with executemany,
+        one transaction per batch (with its load journal entry) on a single connection.
+        
         Args:
             skip_match_details (bool): Skip loading match details
             skip_player_stats (bool): Skip loading player statistics
@@ -110,402 +90,312 @@ class MatchDetailsLoader:
             'match_details_processed': 0,
             'match_details_success': 0,
             'match_details_error': 0,
+            'match_details_rows': 0,
             'player_stats_processed': 0,
             'player_stats_success': 0,
             'player_stats_error': 0,
+            'player_stats_rows': 0,
             'maps_processed': 0,
             'maps_success': 0,
-            'maps_error': 0
+            'maps_error': 0,
+            'maps_rows': 0,
+            'seconds': 0.0
         }
         
-        # Load match details
-        if not skip_match_details:
-            match_details_files = glob.glob(os.path.join(MATCH_DETAILS_JSON_DIR, "*.json"))
-            logger.info(f"Found {len(match_details_files)} files with match details")
-            
-            for file_path in match_details_files:
-                try:
-                    stats['match_details_processed'] += 1
-                    self._load_match_details(file_path)
-                    stats['match_details_success'] += 1
-                    os.remove(file_path)
-                    logger.info(f"File {os.path.basename(file_path)} deleted after processing")
-                except Exception as e:
-                    logger.error(f"Error loading match details from {file_path}: {str(e)}")
-                    stats['match_details_error'] += 1
+        started = time.perf_counter()
+        # Natural-key unique indexes used by the batch writers come with the schema
+        migrate(self.db_path)
+        conn = connect(self.db_path, PROFILE_BULK_LOAD)
+        try:
+            if not skip_match_details:
+                self._bulk_load(conn, stats, 'match_details', self.match_details_dir,
+                                self._normalize_match_details, self._write_match_details_batch)
+            if not skip_player_stats:
+                self._bulk_load(conn, stats, 'player_stats', self.player_stats_dir,
+                                self._normalize_player_stats, self._write_player_stats_batch)
+            self._bulk_load(conn, stats, 'maps', self.maps_dir,
+                            self._normalize_match_maps, self._write_match_maps_batch)
+        finally:
+            conn.close()
+        stats['seconds'] = time.perf_counter() - started
         
-        # Load player statistics
-        if not skip_player_stats:
-            player_stats_files = glob.glob(os.path.join(PLAYER_STATS_JSON_DIR, "*.json"))
-            logger.info(f"Found {len(player_stats_files)} files with player statistics")
+        rows = stats['match_details_rows'] + stats['player_stats_rows'] + stats['maps_rows']
+        if rows:
+            logger.info(f"Loaded {rows} rows in {stats['seconds']:.2f}s ({rows / max(stats['seconds'], 1e-9):.0f} rows/s)")
+        return stats
+    
+    def _bulk_load(self, conn, stats, prefix, stream_dir, normalize, write_batch):
+        """
+        Loads one kind of records from a stream directory in batches and adds the counts to stats
+        
+        Each batch is committed together with its load journal entry (src.db.load_journal);
+        segments and legacy files read completely are deleted after the commit. Records
+        that failed are carried into a new segment, a legacy file that failed stays in place.
+        A run interrupted by a crash is resumed from the last committed batch.
+        
+        Args:
+            conn: Open connection
+            stats (dict): Loading statistics with <prefix>_processed/_success/_error/_rows keys
+            prefix (str): Statistics key prefix
+            stream_dir (str): Stream directory
+            normalize (callable): (data, match_id from the file name or None) -> (match_id, payload)
+            write_batch (callable): (cursor, list of (match_id, payload)) -> number of written rows
+        """
+        started = time.perf_counter()
+        counts = load_stream(
+            conn, stream_dir, write_batch,
+            normalize=lambda data, file_path: normalize(data, self._file_match_id(file_path) if file_path else None),
+            batch_size=self.batch_size
+        )
+        
+        for key in ('processed', 'success', 'error', 'rows'):
+            stats[f'{prefix}_{key}'] += counts[key]
+        if counts['processed']:
+            elapsed = time.perf_counter() - started
+            logger.info(f"{prefix}: loaded {counts['success']} of {counts['processed']} records "
+                        f"({counts['segments']} segments, {counts['files']} files), {counts['rows']} rows "
+                        f"in {elapsed:.2f}s ({counts['rows'] / max(elapsed, 1e-9):.0f} rows/s)")
+    
+    @staticmethod
+    def _file_match_id(file_path):
+        """Match ID from a legacy file name (<match_id>.json), None if the name is not a number"""
+        try:
+            return int(os.path.splitext(os.path.basename(file_path))[0])
+        except ValueError:
+            return None
+    
+    def _normalize_match_details(self, match_data, match_id=None):
+        """
+        Match details of a JSON file (ID from the file name) or a JSONL record (ID in 'match_id')
+        
+        Returns:
+            tuple: (match_id, match_data)
+        """
+        if match_id is None:
+            match_id = match_data['match_id']
+        return match_id, match_data
+    
+    def _normalize_player_stats(self, stats_data, match_id=None):
+        """
+        Player statistics in the old ('teams') or new ('players') format
+        
+        Args:
+            stats_data (dict): Player statistics
+            match_id (int, optional): Match ID from the file name; JSONL records carry it in 'match_id'
             
-            for file_path in player_stats_files:
-                try:
-                    stats['player_stats_processed'] += 1
-                    self._load_player_stats(file_path)
-                    stats['player_stats_success'] += 1
-                    os.remove(file_path)
-                    logger.info(f"File {os.path.basename(file_path)} deleted after processing")
-                except Exception as e:
-                    logger.error(f"Error loading player statistics from {file_path}: {str(e)}")
-                    stats['player_stats_error'] += 1
+        Returns:
+            tuple: (match_id, list of player dicts with team_id)
+        """
+        if 'teams' in stats_data:
+            # Старый формат: игроки сгруппированы по командам
+            players = [
+                dict(player_data, team_id=team_data['team_id'])
+                for team_data in stats_data['teams']
+                for player_data in team_data['players']
+            ]
+            return stats_data['match_id'], players
         
-        # Load match maps
-        maps_files = glob.glob(os.path.join(RESULT_MAPS_JSON_DIR, "*.json"))
-        logger.info(f"Found {len(maps_files)} files with match maps")
-        for file_path in maps_files:
-            try:
-                stats['maps_processed'] += 1
-                self._load_match_maps(file_path)
-                stats['maps_success'] += 1
-                os.remove(file_path)
-                logger.info(f"File {os.path.basename(file_path)} deleted after processing (maps)")
-            except Exception as e:
-                stats['maps_error'] += 1
-                logger.error(f"Error loading match maps from {file_path}: {str(e)}")
+        if 'players' in stats_data:
+            # Новый формат - список игроков без группировки по командам
+            # match_id из имени файла, из записи JSONL или из первого игрока
+            players = stats_data['players']
+            if match_id is None:
+                match_id = stats_data.get('match_id')
+            if match_id is None:
+                if players:
+                    match_id = players[0]['match_id']
+                else:
+                    raise ValueError("Cannot determine match_id from file or data")
+            for player_data in players:
+                player_match_id = player_data.get('match_id', match_id)
+                if player_match_id != match_id:
+                    logger.warning(f"Player match_id {player_match_id} differs from file match_id {match_id}")
+            return match_id, players
         
-        return stats
+        raise ValueError("Unknown player stats format - neither 'teams' nor 'players' found")
+    
+    def _normalize_match_maps(self, maps_data, match_id=None):
+        """
+        Played maps of a JSON file (a list, ID from the file name) or a JSONL record
+        
+        Returns:
+            tuple: (match_id, list of map dicts)
+        """
+        if match_id is None:
+            return maps_data['match_id'], maps_data['maps']
+        return match_id, maps_data
     
     def _create_tables(self):
-        """Creates necessary tables in the database"""
+        """Creates necessary tables in the database (schema is owned by src.db.migrations)"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Create result_match table if it doesn't exist
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS result_match (
-                    match_id INTEGER PRIMARY KEY,
-                    url TEXT,
-                    datetime INTEGER,
-                    team1_id INTEGER,
-                    team1_name TEXT,
-                    team1_score INTEGER,
-                    team1_rank INTEGER,
-                    team2_id INTEGER,
-                    team2_name TEXT,
-                    team2_score INTEGER,
-                    team2_rank INTEGER,
-                    event_id INTEGER,
-                    event_name TEXT,
-                    demo_id INTEGER,
-                    head_to_head_team1_wins INTEGER,
-                    head_to_head_team2_wins INTEGER,
-                    parsed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Create player_stats table if it doesn't exist
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS player_stats (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    match_id INTEGER NOT NULL,
-                    team_id INTEGER,
-                    player_id INTEGER,
-                    player_nickname TEXT,
-                    fullName TEXT,
-                    nickName TEXT,
-                    kills INTEGER,
-                    deaths INTEGER,
-                    kd_ratio REAL,
-                    plus_minus INTEGER,
-                    adr REAL,
-                    kast REAL,
-                    rating REAL,
-                    FOREIGN KEY (match_id) REFERENCES result_match (match_id)
-                )
-            ''')
-            
-            conn.commit()
-            conn.close()
+            migrate(self.db_path)
             logger.info("Tables successfully created/verified")
             
         except Exception as e:
             logger.error(f"Error creating tables: {str(e)}")
             raise
     
-    def _load_match_details(self, file_path):
+    def load_records(self, records):
         """
-        Loads match details from a JSON file to the database
+        Writes records extracted by the collector in fused mode, in one transaction
         
         Args:
-            file_path (str): Path to JSON file
+            records (list): Dicts with 'match', 'players' and 'maps' as produced by
+                MatchDetailsCollector.extract_file
+                
+        Returns:
+            dict: Number of inserted and updated matches
         """
+        stats = {'inserted': 0, 'updated': 0}
+        migrate(self.db_path)
+        conn = connect(self.db_path, PROFILE_BULK_LOAD)
         try:
-            # Read file
-            with open(file_path, 'r', encoding='utf-8') as f:
-                match_data = json.load(f)
-            
-            # Extract match ID from file name
-            file_name = os.path.basename(file_path)
-            match_id = int(os.path.splitext(file_name)[0])
-            
-            conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
-            
-            # Check if match details already exist
-            cursor.execute('SELECT match_id FROM result_match WHERE match_id = ?', (match_id,))
-            exists = cursor.fetchone()
-            
-            if exists:
-                # Update existing record
-                cursor.execute('''
-                    UPDATE result_match SET
-                        url = ?,
-                        datetime = ?,
-                        team1_id = ?,
-                        team1_name = ?,
-                        team1_score = ?,
-                        team1_rank = ?,
-                        team2_id = ?,
-                        team2_name = ?,
-                        team2_score = ?,
-                        team2_rank = ?,
-                        event_id = ?,
-                        event_name = ?,
-                        demo_id = ?,
-                        head_to_head_team1_wins = ?,
-                        head_to_head_team2_wins = ?,
-                        parsed_at = ?
-                    WHERE match_id = ?
-                ''', (
-                    match_data.get('url', ''),
-                    match_data.get('datetime', 0),
-                    match_data.get('team1_id', 0),
-                    match_data.get('team1_name', ''),
-                    match_data.get('team1_score', 0),
-                    match_data.get('team1_rank', 0),
-                    match_data.get('team2_id', 0),
-                    match_data.get('team2_name', ''),
-                    match_data.get('team2_score', 0),
-                    match_data.get('team2_rank', 0),
-                    match_data.get('event_id', 0),
-                    match_data.get('event_name', ''),
-                    match_data.get('demo_id', 0),
-                    match_data.get('head_to_head_team1_wins', 0),
-                    match_data.get('head_to_head_team2_wins', 0),
-                    match_data.get('parsed_at', datetime.now().isoformat()),
-                    match_id
-                ))
-                logger.info(f"Updated match details for ID {match_id}")
-            else:
-                # Insert new record
-                cursor.execute('''
-                    INSERT INTO result_match (
-                        match_id, url, datetime, 
-                        team1_id, team1_name, team1_score, team1_rank,
-                        team2_id, team2_name, team2_score, team2_rank,
-                        event_id, event_name, demo_id,
-                        head_to_head_team1_wins, head_to_head_team2_wins,
-                        parsed_at
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    match_id,
-                    match_data.get('url', ''),
-                    match_data.get('datetime', 0),
-                    match_data.get('team1_id', 0),
-                    match_data.get('team1_name', ''),
-                    match_data.get('team1_score', 0),
-                    match_data.get('team1_rank', 0),
-                    match_data.get('team2_id', 0),
-                    match_data.get('team2_name', ''),
-                    match_data.get('team2_score', 0),
-                    match_data.get('team2_rank', 0),
-                    match_data.get('event_id', 0),
-                    match_data.get('event_name', ''),
-                    match_data.get('demo_id', 0),
-                    match_data.get('head_to_head_team1_wins', 0),
-                    match_data.get('head_to_head_team2_wins', 0),
-                    match_data.get('parsed_at', datetime.now().isoformat())
-                ))
-                logger.info(f"Inserted match details for ID {match_id}")
-            
+            self._write_match_details_batch(
+                cursor, [(record['match']['match_id'], record['match']) for record in records], stats)
+            self._write_player_stats_batch(
+                cursor, [(record['match']['match_id'], record['players']) for record in records if record['players']])
+            self._write_match_maps_batch(
+                cursor, [(record['match']['match_id'], record['maps']) for record in records if record['maps']])
             conn.commit()
-            conn.close()
-
-            # --- Новый блок: загрузка сыгранных карт ---
-            if 'maps' in match_data and match_data['maps']:
-                try:
-                    conn2 = sqlite3.connect(self.db_path)
-                    cursor2 = conn2.cursor()
-                    cursor2.execute('DELETE FROM result_match_maps WHERE match_id = ?', (match_id,))
-                    for m in match_data['maps']:
-                        cursor2.execute(
-                            '''
-                            INSERT INTO result_match_maps (match_id, map_name, team1_rounds, team2_rounds, rounds)
-                            VALUES (?, ?, ?, ?, ?)
-                            ''',
-                            (
-                                match_id,
-                                m.get('map_name', ''),
-                                m.get('team1_rounds', 0),
-                                m.get('team2_rounds', 0),
-                                m.get('rounds', '')
-                            )
-                        )
-                    conn2.commit()
-                    conn2.close()
-                    logger.info(f"Loaded {len(match_data['maps'])} maps for match ID {match_id}")
-                except Exception as e:
-                    logger.error(f"Error loading maps for match {match_id}: {str(e)}")
-            # --- Конец нового блока ---
-            
-        except Exception as e:
-            logger.error(f"Error processing match details from {file_path}: {str(e)}")
+        except Exception:
+            conn.rollback()
             raise
+        finally:
+            conn.close()
+        logger.info(f"Wrote {len(records)} matches in one transaction "
+                    f"(inserted: {stats['inserted']}, updated: {stats['updated']})")
+        return stats
     
-    def _load_player_stats(self, file_path):
+    @staticmethod
+    def _match_details_values(match_id, match_data):
+        """Parameters of MATCH_DETAILS_COLUMNS followed by match_id"""
+        return (
+            match_data.get('url', ''),
+            match_data.get('datetime', 0),
+            match_data.get('team1_id', 0),
+            match_data.get('team1_name', ''),
+            match_data.get('team1_score', 0),
+            match_data.get('team1_rank', 0),
+            match_data.get('team2_id', 0),
+            match_data.get('team2_name', ''),
+            match_data.get('team2_score', 0),
+            match_data.get('team2_rank', 0),
+            match_data.get('event_id', 0),
+            match_data.get('event_name', ''),
+            match_data.get('demo_id', 0),
+            match_data.get('head_to_head_team1_wins', 0),
+            match_data.get('head_to_head_team2_wins', 0),
+            match_data.get('parsed_at', datetime.now().isoformat()),
+            match_id
+        )
+    
+    def _write_match_details_batch(self, cursor, entries, stats=None):
         """
-        Loads player statistics from a JSON file to the database
+        Inserts or updates result_match rows
         
         Args:
-            file_path (str): Path to JSON file
-        """
-        try:
-            # Read file
-            with open(file_path, 'r', encoding='utf-8') as f:
-                stats_data = json.load(f)
-            
-            # Изменение: Проверяем формат файла и извлекаем match_id по-разному
-            # в зависимости от структуры
-            if 'match_id' in stats_data:
-                # Старый формат
-                match_id = stats_data['match_id']
-                team_players = stats_data['teams']
-                
-                conn = sqlite3.connect(self.db_path)
-                cursor = conn.cursor()
-                
-                # Delete existing stats for this match if any
-                cursor.execute('DELETE FROM player_stats WHERE match_id = ?', (match_id,))
-                
-                # Process each team
-                for team_data in team_players:
-                    team_id = team_data['team_id']
-                    
-                    # Process each player
-                    for player_data in team_data['players']:
-                        cursor.execute('''
-                            INSERT INTO player_stats (
-                                match_id, team_id, player_id, player_nickname,
-                                fullName, nickName, kills, deaths, kd_ratio,
-                                plus_minus, adr, kast, rating
-                            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        ''', (
-                            match_id,
-                            team_id,
-                            player_data.get('player_id', 0),
-                            player_data.get('player_nickname', ''),
-                            player_data.get('fullName', ''),
-                            player_data.get('nickName', ''),
-                            player_data.get('kills', 0),
-                            player_data.get('deaths', 0),
-                            player_data.get('kd_ratio', 0.0),
-                            player_data.get('plus_minus', 0),
-                            player_data.get('adr', 0.0),
-                            player_data.get('kast', 0.0),
-                            player_data.get('rating', 0.0)
-                        ))
-                
-                conn.commit()
-                conn.close()
-                
-                logger.info(f"Loaded player statistics for match ID {match_id}, teams: {len(team_players)}")
+            cursor: Cursor of an open connection (the caller commits)
+            entries (list): (match_id, match_data) pairs; the last one of a match wins
+            stats (dict, optional): Gets the number of 'inserted' and 'updated' matches added
             
-            elif 'players' in stats_data:
-                # Новый формат - список игроков без группировки по командам
-                # Получим match_id из имени файла или из первого игрока
-                file_name = os.path.basename(file_path)
-                try:
-                    match_id = int(os.path.splitext(file_name)[0])
-                except ValueError:
-                    # Если не удалось получить из имени файла, берем из первого игрока
-                    if stats_data['players']:
-                        match_id = stats_data['players'][0]['match_id']
-                    else:
-                        raise ValueError("Cannot determine match_id from file or data")
-                
-                players = stats_data['players']
-                
-                conn = sqlite3.connect(self.db_path)
-                cursor = conn.cursor()
-                
-                # Delete existing stats for this match if any
-                cursor.execute('DELETE FROM player_stats WHERE match_id = ?', (match_id,))
-                
-                # Process each player directly
-                for player_data in players:
-                    # Проверяем, что match_id у игрока соответствует тому, что мы используем
-                    player_match_id = player_data.get('match_id', match_id)
-                    if player_match_id != match_id:
-                        logger.warning(f"Player match_id {player_match_id} differs from file match_id {match_id}")
-                        
-                    cursor.execute('''
-                        INSERT INTO player_stats (
-                            match_id, team_id, player_id, player_nickname,
-                            fullName, nickName, kills, deaths, kd_ratio,
-                            plus_minus, adr, kast, rating
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        match_id,
-                        player_data.get('team_id', 0),
-                        player_data.get('player_id', 0),
-                        player_data.get('player_nickname', ''),
-                        player_data.get('fullName', ''),
-                        player_data.get('nickName', ''),
-                        player_data.get('kills', 0),
-                        player_data.get('deaths', 0),
-                        player_data.get('kd_ratio', 0.0),
-                        player_data.get('plus_minus', 0),
-                        player_data.get('adr', 0.0),
-                        player_data.get('kast', 0.0),
-                        player_data.get('rating', 0.0)
-                    ))
-                
-                conn.commit()
-                conn.close()
-                
-                logger.info(f"Loaded player statistics for match ID {match_id}, players: {len(players)}")
-            
-            else:
-                raise ValueError("Unknown player stats format - neither 'match_id' nor 'players' found")
+        Returns:
+            int: Number of written rows (maps embedded in match details included)
+        """
+        latest = dict(entries)
+        if stats is not None:
+            existing = existing_ids(cursor, 'result_match', 'match_id', latest)
+            stats['updated'] += len(existing)
+            stats['inserted'] += len(latest) - len(existing)
+        
+        cursor.executemany(f'''
+            INSERT INTO result_match ({", ".join(MATCH_DETAILS_COLUMNS)}, match_id)
+            VALUES ({", ".join("?" * (len(MATCH_DETAILS_COLUMNS) + 1))})
+            ON CONFLICT(match_id) DO UPDATE SET
+                {", ".join(f"{column} = excluded.{column}" for column in MATCH_DETAILS_COLUMNS)}
+        ''', [self._match_details_values(match_id, data) for match_id, data in latest.items()])
+        rows = len(latest)
+        
+        # Match details of older collectors carry the played maps
+        embedded_maps = [(match_id, data['maps']) for match_id, data in latest.items() if data.get('maps')]
+        if embedded_maps:
+            try:
+                rows += self._write_match_maps_batch(cursor, embedded_maps)
+            except Exception as e:
+                logger.error(f"Error loading maps embedded in match details: {str(e)}")
+        return rows
+    
+    def _write_player_stats_batch(self, cursor, entries):
+        """
+        Upserts player statistics of matches by (match_id, player_id) and removes
+        players that are no longer in the match
+        
+        A player without a parsed ID (missing, None or 0) is keyed on NULL: the unique
+        index does not merge such rows, each is inserted as its own row and replaced on
+        the next load of the match (prune_match_rows removes NULL-key rows first).
+        
+        Args:
+            cursor: Cursor of an open connection (the caller commits)
+            entries (list): (match_id, players) pairs, players with team_id; the last one of a match wins
             
-        except Exception as e:
-            logger.error(f"Error processing player statistics from {file_path}: {str(e)}")
-            raise
-
-    def _load_match_maps(self, file_path):
+        Returns:
+            int: Number of written rows
+        """
+        rows = []
+        for match_id, players in dict(entries).items():
+            match_rows = [
+                (
+                    match_id,
+                    player_data.get('team_id', 0),
+                    player_data.get('player_id') or None,
+                    player_data.get('player_nickname', ''),
+                    player_data.get('fullName', ''),
+                    player_data.get('nickName', ''),
+                    player_data.get('kills', 0),
+                    player_data.get('deaths', 0),
+                    player_data.get('kd_ratio', 0.0),
+                    player_data.get('plus_minus', 0),
+                    player_data.get('adr', 0.0),
+                    player_data.get('kast', 0.0),
+                    player_data.get('rating', 0.0)
+                )
+                for player_data in players
+            ]
+            prune_match_rows(cursor, 'player_stats', match_id, [row[2] for row in match_rows])
+            rows.extend(match_rows)
+        if rows:
+            cursor.executemany(upsert_sql('player_stats', PLAYER_STATS_COLUMNS), rows)
+        return len(rows)
+    
+    def _write_match_maps_batch(self, cursor, entries):
         """
-        Loads played maps for a match from a JSON file to the database
+        Upserts played maps of matches by (match_id, map_name) and removes maps
+        that are no longer in the match
+        
         Args:
-            file_path (str): Path to JSON file
+            cursor: Cursor of an open connection (the caller commits)
+            entries (list): (match_id, maps) pairs; the last one of a match wins
+            
+        Returns:
+            int: Number of written rows
         """
-        try:
-            match_id = int(os.path.splitext(os.path.basename(file_path))[0])
-            with open(file_path, "r", encoding="utf-8") as f:
-                maps = json.load(f)
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM result_match_maps WHERE match_id = ?", (match_id,))
-            for m in maps:
-                cursor.execute(
-                    '''
-                    INSERT INTO result_match_maps (match_id, map_name, team1_rounds, team2_rounds, rounds)
-                    VALUES (?, ?, ?, ?, ?)
-                    ''',
-                    (
-                        match_id,
-                        m.get('map_name', ''),
-                        m.get('team1_rounds', 0),
-                        m.get('team2_rounds', 0),
-                        m.get('rounds', '')
-                    )
+        rows = []
+        for match_id, maps in dict(entries).items():
+            match_rows = [
+                (
+                    match_id,
+                    m.get('map_name', ''),
+                    m.get('team1_rounds', 0),
+                    m.get('team2_rounds', 0),
+                    m.get('rounds', '')
                 )
-            conn.commit()
-            conn.close()
-            logger.info(f"Loaded {len(maps)} maps for match ID {match_id}")
-        except Exception as e:
-            logger.error(f"Error loading maps for match {match_id}: {str(e)}")
+                for m in maps
+            ]
+            prune_match_rows(cursor, 'result_match_maps', match_id, [row[1] for row in match_rows])
+            rows.extend(match_rows)
+        if rows:
+            cursor.executemany(upsert_sql('result_match_maps', MATCH_MAPS_COLUMNS), rows)
+        return len(rows)
 
 if __name__ == "__main__":
     loader = MatchDetailsLoader()
@@ -1,9 +1,12 @@
 import os
-import json
 import logging
-import sqlite3
 from datetime import datetime
 
+from src.db.connection import PROFILE_BULK_LOAD, connect
+from src.db.migrations import migrate
+from src.db.natural_keys import existing_ids
+from src.utils import json_io
+
 # Setting up logging
 logging.basicConfig(
     level=logging.INFO,
@@ -76,33 +79,9 @@ class MatchesLoader:
         return stats
     
     def _create_tables(self):
-        """Creates necessary tables in the database"""
+        """Creates necessary tables in the database (schema is owned by src.db.migrations)"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Create table for upcoming matches if it doesn't exist
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS upcoming_urls (
-                    id INTEGER PRIMARY KEY,
-                    url TEXT NOT NULL,
-                    date INTEGER NOT NULL,
-                    toParse INTEGER NOT NULL DEFAULT 1,
-                    reParse INTEGER NOT NULL DEFAULT 0
-                )
-            ''')
-            
-            # Create table for match results if it doesn't exist
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS result_urls (
-                    id INTEGER PRIMARY KEY,
-                    url TEXT NOT NULL,
-                    toParse INTEGER NOT NULL DEFAULT 1
-                )
-            ''')
-            
-            conn.commit()
-            conn.close()
+            migrate(self.db_path)
             logger.info("Tables successfully created/verified")
             
         except Exception as e:
@@ -115,8 +94,7 @@ class MatchesLoader:
         """
         try:
             # Read file
-            with open(UPCOMING_MATCHES_JSON_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            data = json_io.load_file(UPCOMING_MATCHES_JSON_FILE)
             
             if 'matches' not in data or not data['matches']:
                 logger.warning(f"No data about upcoming matches in file {UPCOMING_MATCHES_JSON_FILE}")
@@ -124,7 +102,7 @@ class MatchesLoader:
                 
             matches = data['matches']
             
-            conn = sqlite3.connect(self.db_path)
+            conn = connect(self.db_path, PROFILE_BULK_LOAD)
             cursor = conn.cursor()
             
             # Get list of all match IDs in current data
@@ -146,34 +124,19 @@ class MatchesLoader:
                 deleted_count = cursor.rowcount
                 logger.info(f"Deleted {deleted_count} obsolete matches from upcoming_urls table")
             
-            # Process each match
-            new_count = 0
-            updated_count = 0
+            # Existing IDs are already known from the query above
+            db_ids = set(db_match_ids)
+            new_count = sum(1 for match in matches if match['id'] not in db_ids)
+            updated_count = len(matches) - new_count
             
-            for match in matches:
-                # Check if match exists in database
-                cursor.execute('SELECT toParse FROM upcoming_urls WHERE id = ?', (match['id'],))
-                result = cursor.fetchone()
-                
-                if result is not None:
-                    # Update existing match (preserve current toParse value)
-                    to_parse = result[0]
-                    cursor.execute('''
-                        UPDATE upcoming_urls SET date = ?, toParse = ?, reParse = ?
-                        WHERE id = ?
-                    ''', (match['date'], to_parse, 0, match['id']))
-                    updated_count += 1
-                else:
-                    # Add new match
-                    to_parse = match.get('toParse', 1)  # Use value from JSON or 1 by default
-                    cursor.execute('''
-                        INSERT INTO upcoming_urls (id, url, date, toParse, reParse)
-                        VALUES (?, ?, ?, ?, ?)
-                    ''', (match['id'], match['url'], match['date'], to_parse, 0))
-                    new_count += 1
-                
-                # Delete duplicate entries from results table (if match moved)
-                cursor.execute('DELETE FROM result_urls WHERE id = ?', (match['id'],))
+            # New matches take toParse from JSON (1 by default), existing ones keep their toParse
+            cursor.executemany('''
+                INSERT INTO upcoming_urls (id, url, date, toParse, reParse) VALUES (?, ?, ?, ?, 0)
+                ON CONFLICT(id) DO UPDATE SET date = excluded.date, reParse = 0
+            ''', [(match['id'], match['url'], match['date'], match.get('toParse', 1)) for match in matches])
+            
+            # Delete duplicate entries from results table (if match moved)
+            cursor.executemany('DELETE FROM result_urls WHERE id = ?', [(match['id'],) for match in matches])
             
             conn.commit()
             conn.close()
@@ -190,8 +153,7 @@ class MatchesLoader:
         """
         try:
             # Read file
-            with open(PAST_MATCHES_JSON_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            data = json_io.load_file(PAST_MATCHES_JSON_FILE)
             
             if 'matches' not in data or not data['matches']:
                 logger.warning(f"No data about past matches in file {PAST_MATCHES_JSON_FILE}")
@@ -199,38 +161,24 @@ class MatchesLoader:
                 
             matches = data['matches']
             
-            conn = sqlite3.connect(self.db_path)
+            conn = connect(self.db_path, PROFILE_BULK_LOAD)
             cursor = conn.cursor()
             
-            # Process each match
-            new_count = 0
-            updated_count = 0
+            # One query per chunk of IDs instead of a SELECT per match
+            existing = existing_ids(cursor, 'result_urls', 'id', [match['id'] for match in matches])
+            new_ids = [match['id'] for match in matches if match['id'] not in existing]
+            new_count = len(new_ids)
+            updated_count = len(matches) - new_count
             
-            for match in matches:
-                # Check if match exists in database
-                cursor.execute('SELECT toParse FROM result_urls WHERE id = ?', (match['id'],))
-                result = cursor.fetchone()
-                
-                if result is not None:
-                    # Match already exists, update toParse if needed
-                    to_parse = result[0]
-                    if to_parse != match.get('toParse', 1):
-                        cursor.execute('''
-                            UPDATE result_urls SET toParse = ?
-                            WHERE id = ?
-                        ''', (match['toParse'], match['id']))
-                    updated_count += 1
-                else:
-                    # Add new match
-                    to_parse = match.get('toParse', 1)  # Use value from JSON or 1 by default
-                    cursor.execute('''
-                        INSERT INTO result_urls (id, url, toParse)
-                        VALUES (?, ?, ?)
-                    ''', (match['id'], match['url'], to_parse))
-                    new_count += 1
-                    
-                    # Delete match from upcoming if it moved to results
-                    cursor.execute('DELETE FROM upcoming_urls WHERE id = ?', (match['id'],))
+            # New matches take toParse from JSON (1 by default); existing ones get toParse
+            # only if JSON has it
+            cursor.executemany('''
+                INSERT INTO result_urls (id, url, toParse) VALUES (?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET toParse = COALESCE(?, toParse)
+            ''', [(match['id'], match['url'], match.get('toParse', 1), match.get('toParse')) for match in matches])
+            
+            # Delete matches from upcoming if they moved to results
+            cursor.executemany('DELETE FROM upcoming_urls WHERE id = ?', [(match_id,) for match_id in new_ids])
             
             conn.commit()
             conn.close()
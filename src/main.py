@@ -74,6 +74,9 @@ def parse_arguments():
     parser.add_argument('--write-db-upcoming-list', action='store_true', help='Write upcoming matches list to DB')
     parser.add_argument('--download-upcoming-match-page', action='store_true', help='Download upcoming match details pages from DB')
     parser.add_argument('--write-json-upcoming-match-page', action='store_true', help='Write upcoming match details JSON to DB')
+    parser.add_argument('--from-archive', action='store_true', help='Also reprocess match pages stored in the page archive (with --write-json-*)')
+    parser.add_argument('--direct-db', action='store_true', default=None,
+                        help='With --write-json-match-page: write result pages straight to the DB in batches, without JSON for the loader')
     
     return parser.parse_args()
 
@@ -174,7 +177,7 @@ def main():
             if args.write_json_match_page:
                 logger.info("Запущен режим write-json-match-page: будет выполнен парсинг HTML-файлов матчей из папки result и запись в БД/JSON.")
             logger.info("Collecting data from match details HTML...")
-            details_stats = collector_manager.collect_results_details()
+            details_stats = collector_manager.collect_results_details(from_archive=args.from_archive, direct_db=args.direct_db)
             logger.info(f"Match details collection completed: {details_stats}")
             
         # Handle new commands
@@ -253,7 +256,7 @@ def main():
         
         if args.write_json_upcoming_match_page:
             logger.info("Запущен режим write-json-upcoming-match-page: будет выполнен парсинг HTML-файлов предстоящих матчей и сохранение в JSON.")
-            count = collector_manager.collect_upcoming_match_details()
+            count = collector_manager.collect_upcoming_match_details(from_archive=args.from_archive)
             logger.info(f"Upcoming match details parsing completed. Successfully parsed: {count}")
             return
         
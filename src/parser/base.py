@@ -2,10 +2,10 @@
 Базовый класс для парсеров HLTV
 """
 import os
-import json
 import time
 import random
 import logging
+import threading
 from datetime import datetime, timedelta
 from abc import ABC, abstractmethod
 from selenium import webdriver
@@ -30,17 +30,61 @@ from src.config import (
     COOKIES_EXPIRY_DAYS,
     LOG_LEVEL,
     LOG_FORMAT,
-    LOG_FILE
+    LOG_FILE,
+    BROWSER_SESSION_MAX_PAGES,
+    BROWSER_SESSION_MAX_AGE,
+    BROWSER_SESSION_RECYCLE_ON_CLOUDFLARE,
+    BROWSER_USER_AGENT,
+    HTTP_FIRST_ENABLED,
+    FETCH_PROFILES,
+    DOWNLOAD_REQUESTS_PER_MINUTE,
+    DOWNLOAD_BURST,
+    DOWNLOAD_JITTER,
+    DOWNLOAD_RETRIES,
+    DOWNLOAD_BACKOFF_BASE,
+    DOWNLOAD_BACKOFF_MAX
 )
 from src.parser.cloudflare import CloudflareHandler
+from src.parser.http_fetcher import HttpFetcher
+from src.parser.rate_limit import TokenBucket, call_with_backoff
+from src.parser.shared_limiter import CircuitOpenError, get_shared_state
+from src.parser.browser_daemon import BrowserDaemonError, fetch_via_daemon
+from src.utils import json_io
 
 class BaseParser(ABC):
+    # Путь к chromedriver кэшируется на весь процесс, чтобы перезапуск браузера
+    # не вызывал ChromeDriverManager().install() повторно
+    _driver_path = None
+    # Парсеры, страницы которых можно получить обычным HTTP-запросом, выставляют True
+    http_first = False
+    # Профиль загрузки из FETCH_PROFILES: блокируемые ресурсы и селектор готовности
+    fetch_profile = 'default'
+    # Откат на браузер сначала пробует резидентный демон (src.parser.browser_daemon)
+    use_browser_daemon = True
+
     def __init__(self):
         self._setup_logging()
         self.driver = None
-        self._setup_driver()
+        # Политика перезапуска долгоживущей сессии браузера
+        self.session_max_pages = BROWSER_SESSION_MAX_PAGES
+        self.session_max_age = BROWSER_SESSION_MAX_AGE
+        self.session_recycle_on_cloudflare = BROWSER_SESSION_RECYCLE_ON_CLOUDFLARE
+        self._session_pages = 0
+        self._session_started_at = None
+        self._session_recycle_reason = None
         self._ensure_storage_dir(COOKIES_FILE)
         self.cloudflare = CloudflareHandler(self.driver, self.logger)
+        self.http = HttpFetcher(self.logger) if self.http_first and HTTP_FIRST_ENABLED else None
+        # Бюджет запросов общий для всех потоков парсера, браузер используется одним потоком за раз
+        self.rate_limiter = TokenBucket(DOWNLOAD_REQUESTS_PER_MINUTE, DOWNLOAD_BURST, DOWNLOAD_JITTER)
+        # Бюджет и пауза после Cloudflare, общие для всех процессов-парсеров
+        self.shared = get_shared_state()
+        self._browser_lock = threading.RLock()
+        # Крайний срок загрузки текущей страницы (time.monotonic); None - только SELENIUM_PAGE_LOAD_TIMEOUT
+        self._page_deadline = None
+        # При HTTP-first браузер запускается только при первом откате на Selenium
+        if not self.http:
+            self._setup_driver()
 
     def _setup_logging(self):
         """Настройка логирования"""
@@ -54,6 +98,13 @@ class BaseParser(ABC):
         )
         self.logger = logging.getLogger(self.__class__.__name__)
 
+    @classmethod
+    def _get_driver_path(cls):
+        """Путь к chromedriver (устанавливается один раз на процесс)"""
+        if BaseParser._driver_path is None:
+            BaseParser._driver_path = ChromeDriverManager().install()
+        return BaseParser._driver_path
+
     def _setup_driver(self):
         """Настройка Selenium WebDriver"""
         try:
@@ -71,7 +122,7 @@ class BaseParser(ABC):
             options.add_argument('--disable-popup-blocking')
             
             # Добавляем user-agent
-            options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36')
+            options.add_argument(f'--user-agent={BROWSER_USER_AGENT}')
             
             # Добавляем дополнительные настройки для предотвращения обнаружения
             options.add_argument('--disable-gpu')
@@ -83,11 +134,14 @@ class BaseParser(ABC):
             options.add_experimental_option('excludeSwitches', ['enable-automation'])
             options.add_experimental_option('useAutomationExtension', False)
             
+            # Не ждем загрузки всех ресурсов: готовность страницы определяет _wait_for_page_load
+            options.page_load_strategy = 'eager'
+            
             # Устанавливаем путь к бинарному файлу, если он указан
             options.binary_location = 'C:/Program Files/Google/Chrome/Application/chrome.exe'
             
             # Устанавливаем размер окна
-            self.driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+            self.driver = webdriver.Chrome(service=Service(self._get_driver_path()), options=options)
             
             # Устанавливаем размер окна
             self.driver.set_window_size(*SELENIUM_WINDOW_SIZE)
@@ -98,7 +152,7 @@ class BaseParser(ABC):
             
             # Выполняем CDP команды для предотвращения обнаружения
             self.driver.execute_cdp_cmd('Network.setUserAgentOverride', {
-                "userAgent": 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.36'
+                "userAgent": BROWSER_USER_AGENT
             })
             self.driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
                 'source': '''
@@ -117,12 +171,218 @@ class BaseParser(ABC):
                 '''
             })
             
+            # Блокируем рекламу, трекеры, медиа и шрифты согласно профилю парсера
+            blocked_urls = FETCH_PROFILES[self.fetch_profile]['blocked_urls']
+            if blocked_urls:
+                self.driver.execute_cdp_cmd('Network.enable', {})
+                self.driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': blocked_urls})
+            
+            # Начинаем новую сессию браузера
+            self._session_pages = 0
+            self._session_started_at = time.time()
+            self._session_recycle_reason = None
+            self.cloudflare.driver = self.driver
+            
             self.logger.info("Chrome driver initialized successfully")
             
         except Exception as e:
             self.logger.error(f"Failed to initialize Chrome driver: {str(e)}")
             raise
 
+    def _is_driver_alive(self):
+        """Проверка, что браузер запущен и отвечает на команды"""
+        if not self.driver:
+            return False
+        try:
+            self.driver.execute_script('return 1')
+            return True
+        except Exception as e:
+            msg = str(e).splitlines()[0] if str(e) else type(e).__name__
+            self.logger.warning(f"Browser health check failed: {msg}")
+            return False
+
+    def _get_session_recycle_reason(self):
+        """
+        Определяет, нужно ли перезапустить браузер перед следующей страницей
+        
+        Returns:
+            str or None: Причина перезапуска или None, если сессию можно использовать дальше
+        """
+        if not self.driver:
+            return "browser is not started"
+        if self._session_recycle_reason:
+            return self._session_recycle_reason
+        if self.session_max_pages and self._session_pages >= self.session_max_pages:
+            return f"page limit reached ({self._session_pages})"
+        if self.session_max_age and self._session_started_at and time.time() - self._session_started_at >= self.session_max_age:
+            return f"session age limit reached ({int(time.time() - self._session_started_at)}s)"
+        if not self._is_driver_alive():
+            return "health check failed"
+        return None
+
+    def _ensure_driver(self):
+        """
+        Возвращает рабочий драйвер, перезапуская браузер согласно политике сессии
+        
+        Returns:
+            WebDriver: Готовый к работе драйвер
+        """
+        reason = self._get_session_recycle_reason()
+        if reason:
+            if self.driver:
+                self.logger.info(f"Recycling browser session: {reason}")
+            self.close()
+            self._setup_driver()
+        return self.driver
+
+    def _is_challenge_page(self, content):
+        """Страница-заглушка Cloudflare: слишком маленькая и содержит признаки проверки"""
+        return bool(content) and len(content) < MIN_PAGE_SIZE and self.cloudflare.is_cloudflare_page(content)
+
+    def _register_page(self, content):
+        """
+        Учитывает загруженную страницу в счетчике текущей сессии браузера
+        
+        Args:
+            content (str): HTML загруженной страницы
+        """
+        self._session_pages += 1
+        if self._is_challenge_page(content):
+            self.report_challenge()
+
+    def report_challenge(self):
+        """Получена страница-проверка Cloudflare: перезапуск браузера и общая пауза для всех парсеров"""
+        if self.session_recycle_on_cloudflare:
+            self.logger.warning("Cloudflare challenge page received, browser session will be recycled")
+            self._session_recycle_reason = "cloudflare challenge"
+        if self.shared:
+            self.shared.record_challenge()
+
+    def _fetch_http(self, url, marker=None):
+        """
+        Пробует получить страницу без браузера
+        
+        Args:
+            url (str): Адрес страницы
+            marker (str, optional): Строка, которая обязана присутствовать в HTML
+            
+        Returns:
+            str or None: HTML страницы или None, если нужен откат на Selenium
+        """
+        if not self.http:
+            return None
+        
+        html = self.http.get(url)
+        # Заглушки Cloudflare отсекаются по статусу ответа в HttpFetcher и по размеру здесь:
+        # полные страницы HLTV сами содержат скрипты Cloudflare, поиск индикаторов по ним ложно срабатывает
+        if html is None or not self._is_valid_page(html) or (marker and marker not in html):
+            self.http.record_fallback()
+            return None
+        
+        self.http.record_hit()
+        return html
+
+    def _fetch_page(self, url, marker=None, profile=None):
+        """
+        Загружает страницу: сначала по HTTP, при неудаче через Selenium
+        
+        Args:
+            url (str): Адрес страницы
+            marker (str, optional): Строка, которая обязана присутствовать в HTML при загрузке по HTTP
+            profile (str, optional): Профиль из FETCH_PROFILES (по умолчанию профиль парсера)
+            
+        Returns:
+            str: HTML страницы
+        """
+        html = self._fetch_http(url, marker)
+        if html is not None:
+            self.logger.debug(f"Page fetched via HTTP: {url}")
+            if self.shared:
+                self.shared.record_success()
+            return html
+        
+        html = self._fetch_via_daemon(url, profile)
+        if html is not None:
+            return html
+        
+        with self._browser_lock:
+            self._ensure_driver()
+            self.driver.get(url)
+            html = self._wait_for_page_load(FETCH_PROFILES[profile or self.fetch_profile]['ready_selector'])
+            self._register_page(html)
+            if self.shared and not self._is_challenge_page(html):
+                self.shared.record_success()
+            
+            if self.http and not self._is_challenge_page(html):
+                # Cookies браузера (в т.ч. cf_clearance) пригодятся следующим HTTP-запросам
+                self._save_cookies()
+                self.http.load_cookies()
+        return html
+
+    def _fetch_via_daemon(self, url, profile=None):
+        """
+        Загружает страницу через браузерный демон, если он запущен
+        
+        Args:
+            url (str): Адрес страницы
+            profile (str, optional): Профиль из FETCH_PROFILES (по умолчанию профиль парсера)
+            
+        Returns:
+            str or None: HTML страницы или None, если демон недоступен, не смог загрузить
+            страницу или вернул проверку Cloudflare (тогда страница загружается своим браузером)
+        """
+        if not self.use_browser_daemon:
+            return None
+        try:
+            html = fetch_via_daemon(url, profile or self.fetch_profile)
+        except BrowserDaemonError as e:
+            self.logger.warning(f"Browser daemon failed, falling back to local browser: {str(e)}")
+            return None
+        if html is None:
+            return None
+        if self._is_challenge_page(html):
+            # Паузу для всех парсеров объявляет воркер демона, получивший проверку
+            self.logger.warning(f"Browser daemon returned Cloudflare challenge page, falling back to local browser: {url}")
+            return None
+        
+        self.logger.debug(f"Page fetched via browser daemon: {url}")
+        if self.shared:
+            self.shared.record_success()
+        if self.http:
+            # Демон сохраняет cookies своей сессии в общий файл
+            self.http.load_cookies()
+        return html
+
+    def _download(self, url, marker=None, profile=None):
+        """
+        Загрузка страницы в рамках бюджета запросов с повторами и экспоненциальной задержкой
+        
+        Args:
+            url (str): Адрес страницы
+            marker (str, optional): Строка, которая обязана присутствовать в HTML при загрузке по HTTP
+            profile (str, optional): Профиль из FETCH_PROFILES (по умолчанию профиль парсера)
+            
+        Returns:
+            str: HTML страницы
+        """
+        def _attempt():
+            if self.shared:
+                self.shared.check_circuit()
+            self.rate_limiter.acquire()
+            if self.shared:
+                self.shared.acquire()
+            return self._fetch_page(url, marker, profile)
+        
+        # Пока запросы приостановлены после Cloudflare, повторять загрузку бессмысленно
+        return call_with_backoff(
+            _attempt,
+            retries=DOWNLOAD_RETRIES,
+            base_delay=DOWNLOAD_BACKOFF_BASE,
+            max_delay=DOWNLOAD_BACKOFF_MAX,
+            logger=self.logger,
+            fatal=(CircuitOpenError,)
+        )
+
     def _save_cookies(self):
         """Сохранение cookies в файл"""
         try:
@@ -139,8 +399,7 @@ class BaseParser(ABC):
                 'expiry': (datetime.now() + timedelta(days=COOKIES_EXPIRY_DAYS)).isoformat()
             }
             
-            with open(COOKIES_FILE, 'w') as f:
-                json.dump(cookie_data, f)
+            json_io.save_file(COOKIES_FILE, cookie_data)
                 
             self.logger.info("Cookies saved successfully")
             
@@ -153,8 +412,7 @@ class BaseParser(ABC):
             if not os.path.exists(COOKIES_FILE):
                 return False
             
-            with open(COOKIES_FILE, 'r') as f:
-                cookie_data = json.load(f)
+            cookie_data = json_io.load_file(COOKIES_FILE)
             
             # Проверяем, не истекли ли cookies
             expiry = datetime.fromisoformat(cookie_data['expiry'])
@@ -199,25 +457,62 @@ class BaseParser(ABC):
             
         return True
 
-    def _wait_for_page_load(self):
-        """Ожидание полной загрузки страницы"""
+    def _page_load_timeout(self):
+        """
+        Таймаут ожидания страницы с учетом крайнего срока запроса
+        
+        Returns:
+            float: Секунды до SELENIUM_PAGE_LOAD_TIMEOUT или до _page_deadline, если он ближе
+            
+        Raises:
+            TimeoutException: Крайний срок запроса уже прошел
+        """
+        if self._page_deadline is None:
+            return SELENIUM_PAGE_LOAD_TIMEOUT
+        remaining = self._page_deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutException("Page load deadline exceeded")
+        return min(remaining, SELENIUM_PAGE_LOAD_TIMEOUT)
+
+    def _wait_for_page_load(self, ready_selector=None):
+        """
+        Ожидание готовности страницы
+        
+        Args:
+            ready_selector (str, optional): CSS-селектор нужного контента. Страница считается готовой,
+                как только он появился, или после полной загрузки документа
+            
+        Returns:
+            str: Единственный снимок HTML страницы
+        """
         try:
-            WebDriverWait(self.driver, SELENIUM_PAGE_LOAD_TIMEOUT).until(
-                lambda driver: driver.execute_script('return document.readyState') == 'complete'
-            )
+            if ready_selector:
+                WebDriverWait(self.driver, self._page_load_timeout()).until(
+                    lambda driver: driver.execute_script(
+                        "return document.querySelector(arguments[0]) !== null || document.readyState === 'complete'",
+                        ready_selector
+                    )
+                )
+            else:
+                WebDriverWait(self.driver, self._page_load_timeout()).until(
+                    lambda driver: driver.execute_script('return document.readyState') == 'complete'
+                )
             
             # Временно отключаем проверку Cloudflare
-            # content = self.driver.page_source
             # if not self.cloudflare.handle_cloudflare(content):
             #     raise TimeoutException("Cloudflare protection still present after waiting")
             
-            # Проверяем валидность страницы без вывода содержимого
-            content_length = len(self.driver.page_source)
-            self.logger.debug(f"Page loaded, content length: {content_length} bytes")
+            # Один снимок страницы: page_source сериализует весь DOM
+            content = self.driver.page_source
+            self.logger.debug(f"Page loaded, content length: {len(content)} bytes")
             
             # Проверяем валидность страницы
-            if not self._is_valid_page(self.driver.page_source):
+            if not self._is_valid_page(content):
+                if self._is_challenge_page(content):
+                    self.report_challenge()
                 raise TimeoutException("Invalid page content")
+            
+            return content
                 
         except TimeoutException as e:
             self.logger.error(f"Page load timeout: {str(e)}")
@@ -0,0 +1,225 @@
+"""
+Резидентный браузерный воркер для всех скриптов
+
+Демон держит пул заранее запущенных сессий Chrome (драйвер устанавливается один раз)
+и отдает HTML страниц по локальному сокету. Короткоживущие команды (src.main,
+live_matches_parser, download_players_html) получают страницу без холодного старта
+браузера, cookies хранятся в одном месте. Бюджет запросов и пауза после Cloudflare
+общие для процессов (shared_limiter), поэтому вежливость соблюдается и с демоном.
+
+Протокол: одна строка JSON на запрос и на ответ
+    -> {"url": "...", "profile": "match_result", "timeout": 120}
+    <- {"ok": true, "html": "..."} или {"ok": false, "error": "..."}
+
+Сокет Unix (BROWSER_DAEMON_SOCKET), на системах без AF_UNIX - TCP на 127.0.0.1.
+
+Запуск:
+    python -m src.parser.browser_daemon
+"""
+import os
+import time
+import queue
+import socket
+import logging
+import socketserver
+
+from src.config.constants import BROWSER_DAEMON_SOCKET
+from src.config import (
+    BROWSER_DAEMON_ENABLED,
+    BROWSER_DAEMON_PORT,
+    BROWSER_DAEMON_POOL_SIZE,
+    BROWSER_DAEMON_TIMEOUT,
+    FETCH_PROFILES
+)
+from src.utils import json_io
+
+HAS_UNIX_SOCKETS = hasattr(socket, "AF_UNIX") and hasattr(socketserver, "ThreadingUnixStreamServer")
+
+
+class BrowserDaemonError(Exception):
+    """Демон не смог загрузить страницу"""
+
+
+def fetch_via_daemon(url, profile=None, timeout=BROWSER_DAEMON_TIMEOUT):
+    """
+    Загружает страницу через браузерный демон
+
+    Args:
+        url (str): Адрес страницы
+        profile (str, optional): Профиль из FETCH_PROFILES
+        timeout (int): Таймаут запроса в секундах: ожидание свободной сессии и загрузка страницы в демоне
+
+    Returns:
+        str or None: HTML страницы или None, если демон не запущен
+
+    Raises:
+        BrowserDaemonError: Демон ответил ошибкой, не ответил за timeout или оборвал соединение
+    """
+    if not BROWSER_DAEMON_ENABLED:
+        return None
+    try:
+        if HAS_UNIX_SOCKETS:
+            if not os.path.exists(BROWSER_DAEMON_SOCKET):
+                return None
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(timeout)
+            sock.connect(BROWSER_DAEMON_SOCKET)
+        else:
+            sock = socket.create_connection(("127.0.0.1", BROWSER_DAEMON_PORT), timeout=timeout)
+    except OSError:
+        return None
+
+    try:
+        with sock:
+            request = {"url": url, "profile": profile, "timeout": timeout}
+            sock.sendall(json_io.dumpb(request) + b"\n")
+            with sock.makefile("rb") as reader:
+                line = reader.readline()
+    except OSError as e:
+        # Таймаут ответа (socket.timeout - подкласс OSError) или обрыв соединения
+        raise BrowserDaemonError(f"Browser daemon failed while fetching {url}: {str(e)}") from e
+    if not line:
+        raise BrowserDaemonError(f"Browser daemon closed connection while fetching {url}")
+    try:
+        response = json_io.loads(line)
+    except ValueError as e:
+        raise BrowserDaemonError(f"Invalid browser daemon response for {url}: {str(e)}") from e
+    if not response.get("ok"):
+        raise BrowserDaemonError(response.get("error", "unknown error"))
+    return response["html"]
+
+
+class BrowserDaemonHandler(socketserver.StreamRequestHandler):
+    """
+    Обработка одного запроса: берет свободную сессию из пула и загружает страницу
+    """
+
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            request = json_io.loads(line)
+            html = self.server.fetch(request["url"], request.get("profile"), request.get("timeout") or BROWSER_DAEMON_TIMEOUT)
+            response = {"ok": True, "html": html}
+        except Exception as e:
+            response = {"ok": False, "error": str(e)}
+        self.wfile.write(json_io.dumpb(response) + b"\n")
+
+
+class _BrowserDaemonMixin:
+    """
+    Пул браузерных сессий демона
+    """
+    daemon_threads = True
+
+    def _init_pool(self, pool_size):
+        # BaseParser импортируется только в процессе демона: клиентам selenium не нужен
+        from src.parser.base import BaseParser
+
+        class BrowserWorker(BaseParser):
+            """Одна сессия Chrome из пула демона"""
+            use_browser_daemon = False
+
+            def fetch(self, url, profile, deadline):
+                profile = profile or self.fetch_profile
+                with self._browser_lock:
+                    self._ensure_driver()
+                    # Блокируемые ресурсы задаются профилем запроса, а не профилем воркера
+                    blocked_urls = FETCH_PROFILES[profile]['blocked_urls']
+                    if blocked_urls != self._blocked_urls:
+                        self.driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': blocked_urls})
+                        self._blocked_urls = blocked_urls
+                    # Загрузка и ожидание ready_selector укладываются в оставшееся время запроса
+                    self._page_deadline = deadline
+                    try:
+                        self.driver.set_page_load_timeout(self._page_load_timeout())
+                        html = self._fetch_page(url, profile=profile)
+                    finally:
+                        self._page_deadline = None
+                    self._save_cookies()
+                return html
+
+            def _setup_driver(self):
+                super()._setup_driver()
+                self._blocked_urls = FETCH_PROFILES[self.fetch_profile]['blocked_urls']
+
+            def parse(self):
+                pass
+
+        self.logger = logging.getLogger("BrowserDaemon")
+        self.workers = []
+        self.idle = queue.Queue()
+        for _ in range(pool_size):
+            worker = BrowserWorker()
+            self.workers.append(worker)
+            self.idle.put(worker)
+        self.logger.info(f"Browser daemon started with {pool_size} warm sessions")
+
+    def fetch(self, url, profile, timeout):
+        """
+        Загружает страницу в свободной сессии пула
+
+        Args:
+            url (str): Адрес страницы
+            profile (str): Профиль из FETCH_PROFILES
+            timeout (int): Таймаут запроса: ожидание свободной сессии и загрузка страницы
+
+        Returns:
+            str: HTML страницы
+        """
+        deadline = time.monotonic() + timeout
+        try:
+            worker = self.idle.get(timeout=timeout)
+        except queue.Empty:
+            raise BrowserDaemonError("No free browser session")
+        try:
+            self.logger.info(f"Fetching {url} (profile: {profile or 'default'})")
+            return worker.fetch(url, profile, deadline)
+        except Exception:
+            # Сессия после ошибки перезапускается при следующем запросе
+            worker.close()
+            raise
+        finally:
+            self.idle.put(worker)
+
+    def close_pool(self):
+        for worker in self.workers:
+            worker.close()
+
+
+if HAS_UNIX_SOCKETS:
+    class BrowserDaemon(_BrowserDaemonMixin, socketserver.ThreadingUnixStreamServer):
+        def __init__(self, pool_size=BROWSER_DAEMON_POOL_SIZE):
+            if os.path.exists(BROWSER_DAEMON_SOCKET):
+                os.remove(BROWSER_DAEMON_SOCKET)
+            os.makedirs(os.path.dirname(BROWSER_DAEMON_SOCKET), exist_ok=True)
+            self._init_pool(pool_size)
+            super().__init__(BROWSER_DAEMON_SOCKET, BrowserDaemonHandler)
+
+        def server_close(self):
+            super().server_close()
+            if os.path.exists(BROWSER_DAEMON_SOCKET):
+                os.remove(BROWSER_DAEMON_SOCKET)
+else:
+    class BrowserDaemon(_BrowserDaemonMixin, socketserver.ThreadingTCPServer):
+        allow_reuse_address = True
+
+        def __init__(self, pool_size=BROWSER_DAEMON_POOL_SIZE):
+            self._init_pool(pool_size)
+            super().__init__(("127.0.0.1", BROWSER_DAEMON_PORT), BrowserDaemonHandler)
+
+
+def main():
+    daemon = BrowserDaemon()
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.server_close()
+        daemon.close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+HTTP-загрузчик страниц HLTV без браузера
+
+Использует общий requests.Session (keep-alive, сжатие, cookies из браузера).
+Если страница не получена или похожа на проверку Cloudflare, вызывающий код
+переходит на Selenium.
+"""
+import os
+import logging
+import threading
+from datetime import datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.config import (
+    COOKIES_FILE,
+    BROWSER_USER_AGENT,
+    HTTP_TIMEOUT,
+    HTTP_POOL_SIZE
+)
+from src.utils import json_io
+
+try:
+    import brotli  # noqa: F401  requests распаковывает br только при установленном brotli
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    ACCEPT_ENCODING = 'gzip, deflate'
+
+# Коды ответа, которые Cloudflare отдает вместо страницы
+CHALLENGE_STATUS_CODES = (403, 429, 503)
+
+
+class HttpFetcher:
+    """
+    Загрузчик страниц через пул HTTP-соединений с учетом попаданий и откатов на браузер
+    """
+
+    def __init__(self, logger=None, timeout=HTTP_TIMEOUT, pool_size=HTTP_POOL_SIZE):
+        """
+        Инициализация HTTP-загрузчика
+
+        Args:
+            logger: Logger для записи событий
+            timeout (int): Таймаут запроса в секундах
+            pool_size (int): Размер пула соединений
+        """
+        self.logger = logger or logging.getLogger(self.__class__.__name__)
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'User-Agent': BROWSER_USER_AGENT,
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+            'Accept-Language': 'en-US,en;q=0.9',
+            'Accept-Encoding': ACCEPT_ENCODING,
+            'Connection': 'keep-alive'
+        })
+        self.stats = {'requests': 0, 'http_hits': 0, 'fallbacks': 0}
+        self._stats_lock = threading.Lock()
+        # ETag/Last-Modified последних успешных ответов по URL
+        self.validators = {}
+        self.load_cookies()
+
+    def load_cookies(self) -> bool:
+        """Загрузка cookies, сохраненных браузером (BaseParser._save_cookies)"""
+        try:
+            if not os.path.exists(COOKIES_FILE):
+                return False
+
+            cookie_data = json_io.load_file(COOKIES_FILE)
+
+            if datetime.now() > datetime.fromisoformat(cookie_data['expiry']):
+                return False
+
+            for cookie in cookie_data['cookies']:
+                self.session.cookies.set(
+                    cookie['name'],
+                    cookie['value'],
+                    domain=cookie.get('domain'),
+                    path=cookie.get('path', '/')
+                )
+            return True
+
+        except Exception as e:
+            self.logger.warning(f"Failed to load cookies for HTTP session: {str(e)}")
+            return False
+
+    def get(self, url):
+        """
+        Загружает страницу обычным HTTP-запросом
+
+        Args:
+            url (str): Адрес страницы
+
+        Returns:
+            str or None: HTML страницы или None, если ответ непригоден
+        """
+        with self._stats_lock:
+            self.stats['requests'] += 1
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+        except requests.RequestException as e:
+            self.logger.info(f"HTTP fetch failed for {url}: {str(e)}")
+            return None
+
+        if response.status_code in CHALLENGE_STATUS_CODES or response.headers.get('cf-mitigated') == 'challenge':
+            self.logger.info(f"HTTP fetch blocked for {url}: status {response.status_code}")
+            return None
+        if response.status_code != 200:
+            self.logger.info(f"HTTP fetch returned status {response.status_code} for {url}")
+            return None
+
+        with self._stats_lock:
+            self.validators[url] = (response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        return response.text
+
+    def is_not_modified(self, url, etag=None, last_modified=None) -> bool:
+        """
+        Условный запрос: проверяет, изменилась ли страница с момента прошлой загрузки
+
+        Args:
+            url (str): Адрес страницы
+            etag (str, optional): ETag прошлого ответа
+            last_modified (str, optional): Last-Modified прошлого ответа
+
+        Returns:
+            bool: True, если сервер ответил 304 Not Modified
+        """
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        if not headers:
+            return False
+
+        with self._stats_lock:
+            self.stats['requests'] += 1
+        try:
+            response = self.session.head(url, headers=headers, timeout=self.timeout, allow_redirects=True)
+        except requests.RequestException as e:
+            self.logger.info(f"Conditional HTTP request failed for {url}: {str(e)}")
+            return False
+        return response.status_code == 304
+
+    def record_hit(self):
+        """Страница получена по HTTP без браузера"""
+        with self._stats_lock:
+            self.stats['http_hits'] += 1
+
+    def record_fallback(self):
+        """Страница потребовала загрузки через браузер"""
+        with self._stats_lock:
+            self.stats['fallbacks'] += 1
+
+    def hit_ratio(self):
+        """Доля страниц, полученных без браузера"""
+        total = self.stats['http_hits'] + self.stats['fallbacks']
+        return self.stats['http_hits'] / total if total else 0.0
+
+    def log_stats(self):
+        """Вывод статистики попаданий и откатов на браузер"""
+        total = self.stats['http_hits'] + self.stats['fallbacks']
+        if not total:
+            return
+        self.logger.info(
+            f"HTTP fetch stats: {self.stats['http_hits']}/{total} pages via HTTP "
+            f"({self.hit_ratio():.0%}), {self.stats['fallbacks']} fallbacks to browser"
+        )
+
+    def close(self):
+        """Закрытие пула соединений"""
+        self.session.close()
@@ -4,15 +4,21 @@
 Извлекает из базы данных matches с date = 0 и скачивает их HTML-страницы
 """
 import os
-import sqlite3
 import time
 import logging
 import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from urllib.parse import urljoin, urlparse
 
 from src.parser.base import BaseParser
 from src.config.constants import BASE_URL as HLTV_BASE_URL, HTML_DIR as HTML_STORAGE_DIR, MATCH_UPCOMING_DIR
+from src.config import BROWSER_SESSION_REUSE, DOWNLOAD_MAX_IN_FLIGHT, FETCH_SCHEDULER_ENABLED
+from src.parser.scheduler import FetchScheduler
+from src.parser.shared_limiter import CircuitOpenError
+from src.utils.page_archive import KIND_RESULT, KIND_UPCOMING, archive_page
+from src.utils.page_fingerprint import FingerprintStore
+from src.db.connection import connect
 
 
 class MatchDetailsParser(BaseParser):
@@ -20,8 +26,11 @@ class MatchDetailsParser(BaseParser):
     Парсер для скачивания страниц деталей матчей
     Использует список URL-адресов из базы данных
     """
+    http_first = True
+    fetch_profile = 'match_result'
     
-    def __init__(self, db_path="hltv.db", limit=10, parse_past=True, parse_upcoming=False):
+    def __init__(self, db_path="hltv.db", limit=10, parse_past=True, parse_upcoming=False,
+                 reuse_browser=BROWSER_SESSION_REUSE, session_max_pages=None, max_in_flight=DOWNLOAD_MAX_IN_FLIGHT):
         """
         Инициализация парсера деталей матчей
         
@@ -30,13 +39,25 @@ class MatchDetailsParser(BaseParser):
             limit (int): Максимальное количество матчей для обработки за один запуск
             parse_past (bool): Парсить прошедшие матчи
             parse_upcoming (bool): Парсить предстоящие матчи
+            reuse_browser (bool): Использовать один браузер для всех страниц (с перезапуском по политике)
+            session_max_pages (int, optional): Перезапуск браузера после N страниц (по умолчанию из конфига)
+            max_in_flight (int): Максимум одновременных загрузок (1 - последовательно)
         """
         super().__init__()
         self.db_path = db_path
         self.limit = limit
         self.parse_past = parse_past
         self.parse_upcoming = parse_upcoming
-        self.logger.info(f"MatchDetailsParser инициализирован, лимит: {limit} матчей")
+        self.reuse_browser = reuse_browser
+        self.max_in_flight = max_in_flight
+        # ETag/Last-Modified страниц предстоящих матчей для условных запросов
+        self.fingerprints = FingerprintStore(db_path) if parse_upcoming else None
+        # Порядок загрузки по времени до начала матча, давности загрузки и составам
+        self.scheduler = FetchScheduler(db_path, self.logger) if FETCH_SCHEDULER_ENABLED else None
+        if session_max_pages is not None:
+            self.session_max_pages = session_max_pages
+        self.logger.info(f"MatchDetailsParser инициализирован, лимит: {limit} матчей, "
+                         f"переиспользование браузера: {'да' if reuse_browser else 'нет'}")
         
     def _get_matches_to_parse(self):
         """
@@ -45,8 +66,15 @@ class MatchDetailsParser(BaseParser):
         Returns:
             list: Список словарей с информацией о матчах (id, url)
         """
+        if self.scheduler:
+            try:
+                return self.scheduler.next_batch(self.limit, self.parse_past, self.parse_upcoming)
+            except Exception as e:
+                self.logger.error(f"Ошибка при получении списка матчей: {str(e)}")
+                return []
+        
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = connect(self.db_path)
             cursor = conn.cursor()
             
             matches = []
@@ -111,7 +139,7 @@ class MatchDetailsParser(BaseParser):
             status (int): Новый статус (0 - обработан, 1 - требует обработки)
         """
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = connect(self.db_path)
             cursor = conn.cursor()
             table_name = "result_urls" if is_past else "upcoming_urls"
             if not is_past:
@@ -217,7 +245,7 @@ class MatchDetailsParser(BaseParser):
             if os.path.exists(file_path):
                 # Проверяем, что у предстоящего матча стоит toParse = 0
                 if not is_past:
-                    conn = sqlite3.connect(self.db_path)
+                    conn = connect(self.db_path)
                     cursor = conn.cursor()
                     cursor.execute("SELECT toParse FROM upcoming_urls WHERE id = ?", (match_id,))
                     result = cursor.fetchone()
@@ -225,19 +253,24 @@ class MatchDetailsParser(BaseParser):
                     
                     if result and result[0] == 0:
                         self.logger.info(f"Файл для предстоящего матча ID {match_id} уже существует и toParse = 0. Пропускаем скачивание.")
+                        # Иначе last_fetched не меняется и планировщик выбирает матч снова при каждом запуске
+                        if self.scheduler:
+                            self.scheduler.mark_fetched(match_id)
                         return True
                 else:
                     self.logger.info(f"Файл для прошедшего матча ID {match_id} уже существует: {file_path}. Пропускаем скачивание.")
                     return True
                 
-            self.logger.info(f"Загрузка страницы матча ID {match_id}: {full_url}")
+            # Страница предстоящего матча не изменилась с прошлой загрузки - не скачиваем её заново
+            if not is_past and self._is_page_not_modified(match_id, full_url):
+                self.logger.info(f"Страница предстоящего матча ID {match_id} не изменилась (304). Пропускаем скачивание.")
+                self._mark_upcoming_downloaded(match_id)
+                return True
             
-            # Загружаем страницу
-            self.driver.get(full_url)
-            self._wait_for_page_load()
+            self.logger.info(f"Загрузка страницы матча ID {match_id}: {full_url}")
             
-            # Получаем HTML-контент
-            html = self.driver.page_source
+            # Загружаем страницу (HTTP, при неудаче браузер)
+            html = self._download(full_url, profile='match_result' if is_past else 'match_upcoming')
             
             if len(html) < 1000:
                 self.logger.warning(f"Получен слишком маленький HTML для матча {match_id} ({len(html)} байт)")
@@ -253,26 +286,101 @@ class MatchDetailsParser(BaseParser):
                 
             self.logger.info(f"Сохранена страница матча ID {match_id} в {file_path}")
             
-            # Если reParse == 0, обновляем статус
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("SELECT reParse FROM upcoming_urls WHERE id = ?", (match_id,))
-            row = cursor.fetchone()
-            reParse = row[0] if row else 0
-            conn.close()
-            if not is_past and reParse == 0:
-                self._update_match_status(match_id, is_past, 0)
+            # Сжатая копия в архиве страниц
+            archive_page(KIND_RESULT if is_past else KIND_UPCOMING, file_name, html, match_id)
+            
+            if not is_past:
+                # Запоминаем валидаторы ответа для следующего условного запроса
+                if self.http and self.fingerprints:
+                    etag, last_modified = self.http.validators.get(full_url, (None, None))
+                    if etag or last_modified:
+                        self.fingerprints.save_validators(match_id, etag, last_modified)
+                self._mark_upcoming_downloaded(match_id)
             
             return True
             
+        except CircuitOpenError:
+            raise
         except Exception as e:
             self.logger.error(f"Ошибка при загрузке страницы матча {match_id}: {str(e)}")
             return False
     
+    def _is_page_not_modified(self, match_id, url):
+        """
+        Проверяет условным HTTP-запросом, изменилась ли страница предстоящего матча
+        
+        Args:
+            match_id (int): ID матча
+            url (str): URL матча
+            
+        Returns:
+            bool: True, если сервер подтвердил, что страница не изменилась
+        """
+        if not self.http or not self.fingerprints:
+            return False
+        saved = self.fingerprints.get(match_id)
+        if not saved or not (saved['etag'] or saved['last_modified']):
+            return False
+        self.rate_limiter.acquire()
+        return self.http.is_not_modified(url, saved['etag'], saved['last_modified'])
+    
+    def _mark_upcoming_downloaded(self, match_id):
+        """
+        Снимает флаг toParse у предстоящего матча, если он не стоит на периодическом обновлении (reParse = 0)
+        
+        Args:
+            match_id (int): ID матча
+        """
+        if self.scheduler:
+            self.scheduler.mark_fetched(match_id)
+        conn = connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute("SELECT reParse FROM upcoming_urls WHERE id = ?", (match_id,))
+        row = cursor.fetchone()
+        reParse = row[0] if row else 0
+        conn.close()
+        if reParse == 0:
+            self._update_match_status(match_id, False, 0)
+    
+    def _process_match(self, match):
+        """
+        Скачивает страницу одного матча и обновляет его статус
+        
+        Args:
+            match (dict): Информация о матче (id, url, is_past)
+            
+        Returns:
+            bool: True если страница успешно скачана
+        """
+        try:
+            # Браузер запускается в _fetch_page только при необходимости
+            # и при reuse_browser перезапускается лишь по политике сессии
+            if not self._parse_match_page(match):
+                return False
+            # Если успешно и это прошедший матч, обновляем статус
+            if match.get("is_past", True):
+                self._update_match_status(match["id"], True, 0)
+            return True
+        except CircuitOpenError as e:
+            # Браузер исправен, просто HLTV временно недоступен для всех парсеров
+            self.logger.warning(f"Матч {match['id']} пропущен: {str(e)}")
+            return False
+        except Exception as e:
+            self.logger.error(f"Ошибка при обработке матча {match['id']}: {str(e)}")
+            with self._browser_lock:
+                self.close()  # Убеждаемся, что браузер закрыт, следующая страница начнет новую сессию
+            return False
+        finally:
+            if not self.reuse_browser:
+                with self._browser_lock:
+                    self.close()
+    
     def parse(self):
         """
         Основной метод парсинга
-        Получает список матчей из БД и скачивает их страницы
+        Получает список матчей из БД и скачивает их страницы.
+        Страницы загружаются параллельно (до max_in_flight одновременно)
+        в рамках общего бюджета запросов rate_limiter.
         
         Returns:
             int: Количество успешно скачанных страниц
@@ -288,33 +396,25 @@ class MatchDetailsParser(BaseParser):
             
         successful = 0
         
-        # Парсим каждый матч
-        for match in matches:
-            try:
-                # Инициализируем новый драйвер для каждого матча
-                self._setup_driver()
-                
-                # Парсим страницу
-                if self._parse_match_page(match):
-                    # Если успешно и это прошедший матч, обновляем статус
-                    if match.get("is_past", True):
-                        self._update_match_status(match["id"], True, 0)
+        if self.max_in_flight <= 1:
+            for match in matches:
+                if self._process_match(match):
                     successful += 1
-                
-                # Закрываем браузер
-                self.close()
-                
-                # Небольшая задержка между запросами
-                time.sleep(2)
-                
-            except Exception as e:
-                self.logger.error(f"Ошибка при обработке матча {match['id']}: {str(e)}")
-                self.close()  # Убеждаемся, что браузер закрыт
+        else:
+            self.logger.info(f"Параллельная загрузка: до {self.max_in_flight} страниц одновременно")
+            with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+                futures = [executor.submit(self._process_match, match) for match in matches]
+                for done, future in enumerate(as_completed(futures), 1):
+                    if future.result():
+                        successful += 1
+                    if done % 10 == 0:
+                        self.logger.info(f"Обработано {done} из {len(matches)} матчей")
         
+        if self.http:
+            self.http.log_stats()
         self.logger.info(f"Завершено скачивание страниц матчей. Успешно: {successful} из {len(matches)}")
         return successful
 
-
 if __name__ == "__main__":
     # Для автономного запуска
     import sys
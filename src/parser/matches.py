@@ -14,6 +14,8 @@ import time
 import random
 
 class MatchesParser(BaseParser):
+    fetch_profile = 'matches'
+
     def parse(self):
         """
         Парсинг страницы матчей
@@ -0,0 +1,99 @@
+"""
+Ограничение частоты запросов к HLTV
+
+TokenBucket задает бюджет запросов в минуту для всех потоков процесса,
+call_with_backoff повторяет загрузку с экспоненциальной задержкой.
+"""
+import time
+import random
+import threading
+import logging
+
+
+class TokenBucket:
+    """
+    Потокобезопасный token bucket: rate_per_minute запросов в минуту с запасом burst
+    """
+
+    def __init__(self, rate_per_minute, burst=1, jitter=0.0):
+        """
+        Инициализация лимитера
+
+        Args:
+            rate_per_minute (float): Допустимое количество запросов в минуту
+            burst (int): Сколько запросов можно выполнить подряд без ожидания
+            jitter (float): Максимальная случайная добавка к паузе в секундах
+        """
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self.jitter = jitter
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        """Пополнение токенов за прошедшее время"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self):
+        """
+        Ожидание свободного токена
+
+        Returns:
+            float: Сколько секунд пришлось ждать
+        """
+        waited = 0.0
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    break
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+        # Случайная пауза, чтобы запросы не шли строго по расписанию
+        if self.jitter:
+            delay = random.uniform(0, self.jitter)
+            time.sleep(delay)
+            waited += delay
+        return waited
+
+
+def call_with_backoff(func, *args, retries=3, base_delay=2.0, max_delay=60.0, logger=None, fatal=(), **kwargs):
+    """
+    Вызов функции с повторами и экспоненциальной задержкой между попытками
+
+    Args:
+        func: Вызываемая функция
+        retries (int): Количество попыток
+        base_delay (float): Задержка перед второй попыткой в секундах
+        max_delay (float): Максимальная задержка в секундах
+        fatal (tuple): Исключения, при которых повторять бессмысленно
+
+    Returns:
+        Результат func
+
+    Raises:
+        Exception: Последняя ошибка, если все попытки неудачны
+    """
+    logger = logger or logging.getLogger(__name__)
+    last_error = None
+
+    for attempt in range(retries):
+        try:
+            return func(*args, **kwargs)
+        except fatal:
+            raise
+        except Exception as e:
+            last_error = e
+            if attempt < retries - 1:
+                delay = min(max_delay, base_delay * (2 ** attempt))
+                delay += random.uniform(0, delay / 2)
+                logger.warning(f"Attempt {attempt + 1} failed: {str(e)}. Retry in {delay:.1f}s")
+                time.sleep(delay)
+
+    raise last_error
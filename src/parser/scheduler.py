@@ -0,0 +1,187 @@
+"""
+Приоритетная очередь загрузки страниц матчей
+
+Страница предстоящего матча считается "просроченной", когда с прошлой загрузки
+прошло больше интервала обновления. Интервал зависит от времени до начала матча
+(FETCH_REFRESH_INTERVALS) и сокращается, пока составы еще TBD. Приоритет -
+во сколько раз интервал превышен, поэтому матчи ближайшего часа обновляются
+первыми, а дальние - редко. В рамках лимита загрузок выбираются самые приоритетные страницы.
+"""
+import math
+import time
+import heapq
+import logging
+import sqlite3
+
+from src.config import FETCH_REFRESH_INTERVALS, FETCH_TBD_INTERVAL_FACTOR
+from src.db.connection import connect
+from src.db.migrations import migrate
+
+# Приоритет прошедших матчей: загружаются после просроченных предстоящих
+PAST_MATCH_PRIORITY = 1.0
+# Полный состав матча: 5 игроков на команду
+FULL_LINEUP_SIZE = 10
+
+
+def refresh_interval(time_to_start, lineups_tbd=False):
+    """
+    Интервал обновления страницы предстоящего матча
+
+    Args:
+        time_to_start (int): Секунд до начала матча
+        lineups_tbd (bool): Составы (или команды) еще не определены
+
+    Returns:
+        float: Интервал в секундах
+    """
+    interval = FETCH_REFRESH_INTERVALS[-1][1]
+    for max_time_to_start, value in FETCH_REFRESH_INTERVALS:
+        if max_time_to_start is None or time_to_start <= max_time_to_start:
+            interval = value
+            break
+    if lineups_tbd:
+        interval *= FETCH_TBD_INTERVAL_FACTOR
+    return interval
+
+
+def fetch_priority(start_time, last_fetched, lineups_tbd, now):
+    """
+    Приоритет загрузки страницы предстоящего матча
+
+    Args:
+        start_time (int): Время начала матча (unix)
+        last_fetched (int or None): Время прошлой загрузки (unix) или None, если страница не скачивалась
+        lineups_tbd (bool): Составы еще не определены
+        now (int): Текущее время (unix)
+
+    Returns:
+        float: Отношение времени с прошлой загрузки к интервалу обновления (>= 1 - пора обновлять)
+    """
+    if not last_fetched:
+        return math.inf
+    interval = refresh_interval(max(0, start_time - now), lineups_tbd)
+    return (now - last_fetched) / interval
+
+
+class FetchScheduler:
+    """
+    Выбирает страницы матчей для загрузки в порядке приоритета
+    """
+
+    def __init__(self, db_path="hltv.db", logger=None):
+        """
+        Инициализация планировщика
+
+        Args:
+            db_path (str): Путь к файлу базы данных
+            logger: Logger для записи событий
+        """
+        self.db_path = db_path
+        self.logger = logger or logging.getLogger(self.__class__.__name__)
+        self._ensure_columns()
+
+    def _ensure_columns(self):
+        """Приводит схему базы к текущей версии (колонка last_fetched в upcoming_urls - в src.db.migrations)"""
+        migrate(self.db_path)
+
+    def _get_full_lineup_match_ids(self, cursor):
+        """
+        ID предстоящих матчей, у которых уже известны обе команды и полные составы
+
+        Returns:
+            set: ID матчей
+        """
+        try:
+            cursor.execute('''
+                SELECT m.match_id
+                FROM upcoming_match m
+                JOIN upcoming_match_players p ON p.match_id = m.match_id
+                WHERE m.team1_name != 'TBD' AND m.team2_name != 'TBD'
+                GROUP BY m.match_id
+                HAVING COUNT(p.id) >= ?
+            ''', (FULL_LINEUP_SIZE,))
+            return {row[0] for row in cursor.fetchall()}
+        except sqlite3.OperationalError:
+            # Таблиц предстоящих матчей еще нет - составы неизвестны
+            return set()
+
+    def _upcoming_candidates(self, cursor, now):
+        """
+        Предстоящие матчи с приоритетом загрузки
+
+        Returns:
+            list: Кортежи (priority, start_time, match)
+        """
+        full_lineup_ids = self._get_full_lineup_match_ids(cursor)
+        cursor.execute('''
+            SELECT id, url, date, toParse, last_fetched FROM upcoming_urls
+            WHERE toParse = 1 OR date > ?
+        ''', (now,))
+
+        candidates = []
+        for match_id, url, start_time, to_parse, last_fetched in cursor.fetchall():
+            start_time = start_time or now
+            # Матч еще не скачивался или явно помечен к загрузке
+            if to_parse == 1 and not last_fetched:
+                priority = math.inf
+            else:
+                # Матч без данных в upcoming_match считаем матчем с неизвестными составами
+                priority = fetch_priority(start_time, last_fetched, match_id not in full_lineup_ids, now)
+            if priority < 1 and to_parse != 1:
+                continue
+            candidates.append((priority, start_time, {"id": match_id, "url": url, "is_past": False}))
+        return candidates
+
+    def next_batch(self, limit=None, include_past=True, include_upcoming=True):
+        """
+        Выбирает страницы для загрузки в пределах лимита
+
+        Args:
+            limit (int, optional): Сколько страниц можно загрузить (None - без ограничения)
+            include_past (bool): Учитывать прошедшие матчи (result_urls.toParse = 1)
+            include_upcoming (bool): Учитывать предстоящие матчи
+
+        Returns:
+            list: Словари (id, url, is_past) от самого приоритетного к наименее
+        """
+        now = int(time.time())
+        conn = connect(self.db_path)
+        try:
+            cursor = conn.cursor()
+            candidates = []
+            if include_upcoming:
+                candidates.extend(self._upcoming_candidates(cursor, now))
+            if include_past:
+                cursor.execute('SELECT id, url FROM result_urls WHERE toParse = 1')
+                candidates.extend(
+                    (PAST_MATCH_PRIORITY, 0, {"id": row[0], "url": row[1], "is_past": True})
+                    for row in cursor.fetchall()
+                )
+        finally:
+            conn.close()
+
+        # Самый высокий приоритет, при равенстве - матч, который начнется раньше
+        key = lambda item: (-item[0], item[1])
+        if limit is None:
+            selected = sorted(candidates, key=key)
+        else:
+            selected = heapq.nsmallest(limit, candidates, key=key)
+
+        upcoming_count = sum(1 for _, _, match in selected if not match["is_past"])
+        self.logger.info(f"Планировщик: выбрано {len(selected)} из {len(candidates)} страниц "
+                         f"(предстоящих: {upcoming_count}, прошедших: {len(selected) - upcoming_count})")
+        return [match for _, _, match in selected]
+
+    def mark_fetched(self, match_id):
+        """
+        Запоминает время загрузки страницы предстоящего матча
+
+        Args:
+            match_id (int): ID матча
+        """
+        conn = connect(self.db_path)
+        try:
+            conn.execute("UPDATE upcoming_urls SET last_fetched = ? WHERE id = ?", (int(time.time()), match_id))
+            conn.commit()
+        finally:
+            conn.close()
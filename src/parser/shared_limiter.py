@@ -0,0 +1,240 @@
+"""
+Общий для всех процессов бюджет запросов к HLTV и автомат защиты от Cloudflare
+
+Live-парсер, загрузчик игроков и ежечасные парсеры запускаются отдельными
+процессами. Состояние (токены общего bucket'а и автомата) хранится в JSON-файле
+SCRAPER_STATE_FILE, доступ к нему сериализуется блокировкой файла.
+
+Автомат (circuit breaker):
+    closed    - запросы разрешены
+    open      - кто-то получил страницу-проверку Cloudflare, все парсеры ждут
+                окончания паузы; пауза удваивается с каждой новой проверкой
+    half_open - пауза прошла, один процесс делает пробный запрос; успех
+                закрывает автомат, новая проверка снова открывает его
+"""
+import os
+import time
+import random
+import logging
+from contextlib import contextmanager
+
+from src.config.constants import SCRAPER_STATE_FILE, MIN_PAGE_SIZE
+from src.config import (
+    SHARED_REQUESTS_PER_MINUTE,
+    SHARED_BURST,
+    CIRCUIT_COOLDOWN_BASE,
+    CIRCUIT_COOLDOWN_MAX,
+    CIRCUIT_PROBE_TIMEOUT,
+    CIRCUIT_MAX_WAIT,
+    CLOUDFLARE_INDICATORS,
+    SHARED_RATE_LIMIT_ENABLED
+)
+from src.utils import json_io
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Запросы к HLTV приостановлены после проверки Cloudflare"""
+
+    def __init__(self, retry_in):
+        super().__init__(f"HLTV requests paused after Cloudflare challenge, retry in {retry_in:.0f}s")
+        self.retry_in = retry_in
+
+
+def is_challenge_html(html):
+    """
+    Страница-проверка Cloudflare вместо запрошенной страницы
+
+    Args:
+        html (str): HTML-содержимое
+
+    Returns:
+        bool: True для короткой страницы с признаками Cloudflare
+    """
+    return len(html) < MIN_PAGE_SIZE and any(indicator in html for indicator in CLOUDFLARE_INDICATORS)
+
+
+@contextmanager
+def _file_lock(path):
+    """
+    Эксклюзивная блокировка файла, общая для всех процессов
+
+    Args:
+        path (str): Путь к файлу блокировки
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a+b") as f:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK сдается через ~10 секунд, продолжаем ждать
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class SharedScraperState:
+    """
+    Общий для процессов token bucket и circuit breaker
+    """
+
+    def __init__(self, state_file=SCRAPER_STATE_FILE, rate_per_minute=SHARED_REQUESTS_PER_MINUTE,
+                 burst=SHARED_BURST, logger=None):
+        """
+        Инициализация общего состояния
+
+        Args:
+            state_file (str): JSON-файл состояния
+            rate_per_minute (float): Общий для всех процессов бюджет запросов в минуту
+            burst (int): Сколько запросов можно выполнить подряд без ожидания
+            logger: Logger для записи событий
+        """
+        self.state_file = state_file
+        self.lock_file = f"{state_file}.lock"
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self.logger = logger or logging.getLogger(self.__class__.__name__)
+
+    def _read(self):
+        try:
+            return json_io.load_file(self.state_file)
+        except (OSError, ValueError):
+            return {
+                "tokens": float(self.capacity),
+                "updated_at": time.time(),
+                "circuit": STATE_CLOSED,
+                "failures": 0,
+                "open_until": 0,
+                "probe_until": 0
+            }
+
+    def _write(self, state):
+        tmp_path = f"{self.state_file}.tmp{os.getpid()}"
+        json_io.save_file(tmp_path, state)
+        os.replace(tmp_path, self.state_file)
+
+    @contextmanager
+    def _state(self):
+        """Чтение и запись состояния под блокировкой"""
+        with _file_lock(self.lock_file):
+            state = self._read()
+            before = dict(state)
+            yield state
+            if state != before:
+                self._write(state)
+
+    def check_circuit(self):
+        """
+        Проверяет, можно ли сейчас обращаться к HLTV
+
+        Короткую паузу выжидает, длинную - сообщает исключением, чтобы процесс
+        не висел часами.
+
+        Raises:
+            CircuitOpenError: Запросы приостановлены дольше CIRCUIT_MAX_WAIT
+        """
+        while True:
+            now = time.time()
+            with self._state() as state:
+                circuit = state.get("circuit", STATE_CLOSED)
+                if circuit == STATE_CLOSED:
+                    return
+                if circuit == STATE_OPEN and now >= state["open_until"]:
+                    # Пауза прошла: этот процесс делает пробный запрос
+                    state["circuit"] = STATE_HALF_OPEN
+                    state["probe_until"] = now + CIRCUIT_PROBE_TIMEOUT
+                    self.logger.info("Circuit half-open: sending probe request to HLTV")
+                    return
+                if circuit == STATE_HALF_OPEN and now >= state["probe_until"]:
+                    # Пробный запрос другого процесса не завершился - пробуем сами
+                    state["probe_until"] = now + CIRCUIT_PROBE_TIMEOUT
+                    return
+                wait = (state["open_until"] if circuit == STATE_OPEN else state["probe_until"]) - now
+
+            if wait > CIRCUIT_MAX_WAIT:
+                raise CircuitOpenError(wait)
+            self.logger.info(f"HLTV requests paused, waiting {wait:.0f}s")
+            time.sleep(wait + random.uniform(0, 1))
+
+    def acquire(self):
+        """
+        Ожидание свободного токена общего бюджета
+
+        Returns:
+            float: Сколько секунд пришлось ждать
+        """
+        waited = 0.0
+        while True:
+            with self._state() as state:
+                now = time.time()
+                tokens = min(self.capacity, state["tokens"] + max(0.0, now - state["updated_at"]) * self.rate)
+                state["updated_at"] = now
+                if tokens >= 1:
+                    state["tokens"] = tokens - 1
+                    return waited
+                state["tokens"] = tokens
+                delay = (1 - tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def record_success(self):
+        """Страница получена: закрывает автомат после успешной пробы"""
+        with self._state() as state:
+            if state.get("circuit", STATE_CLOSED) != STATE_CLOSED:
+                self.logger.info("Circuit closed: HLTV responds normally again")
+            state["circuit"] = STATE_CLOSED
+            state["failures"] = 0
+
+    def record_challenge(self):
+        """
+        Получена страница-проверка Cloudflare: открывает автомат для всех процессов
+
+        Returns:
+            float: Длительность паузы в секундах
+        """
+        with self._state() as state:
+            now = time.time()
+            if state.get("circuit") == STATE_OPEN and now < state["open_until"]:
+                # Пауза уже идет: одновременные проверки в других потоках ее не удлиняют
+                return state["open_until"] - now
+            failures = state.get("failures", 0) + 1
+            cooldown = min(CIRCUIT_COOLDOWN_MAX, CIRCUIT_COOLDOWN_BASE * (2 ** (failures - 1)))
+            state["circuit"] = STATE_OPEN
+            state["failures"] = failures
+            state["open_until"] = now + cooldown
+        self.logger.warning(f"Cloudflare challenge: all scrapers paused for {cooldown:.0f}s (challenge #{failures})")
+        return cooldown
+
+
+_shared_state = None
+
+
+def get_shared_state():
+    """Общий экземпляр состояния для процесса (None, если отключено в конфиге)"""
+    global _shared_state
+    if not SHARED_RATE_LIMIT_ENABLED:
+        return None
+    if _shared_state is None:
+        _shared_state = SharedScraperState()
+    return _shared_state
@@ -0,0 +1,117 @@
+"""
+Микробенчмарк скомпилированного плана извлечения страниц результатов
+
+Для каждой страницы корпуса замеряет время разбора документа и извлечения данных
+прежним способом (_parse_match_details, _parse_player_stats и _parse_maps по всему
+документу) и планом ExtractionPlan, а также проверяет, что результаты совпадают.
+Печатает среднее и медианное время на страницу до и после.
+Код возврата 1, если хотя бы одна страница извлечена иначе.
+
+Использование:
+    python -m src.scripts.bench_extraction_plan
+    python -m src.scripts.bench_extraction_plan --from-archive --limit 200 --repeat 5 --backend lxml
+"""
+import sys
+import time
+import logging
+import argparse
+import statistics
+
+from src.config.constants import MATCH_RESULT_DIR
+from src.collector.match_details import MatchDetailsCollector
+from src.collector.html_backend import parse_html, resolve_backend
+from src.scripts.check_parser_backends import load_corpus, diff
+
+logger = logging.getLogger("bench_extraction_plan")
+
+
+def extract_legacy(collector, soup, match_id):
+    return (
+        collector._parse_match_details(soup, match_id),
+        collector._parse_player_stats(soup, match_id),
+        collector._parse_maps(soup)
+    )
+
+
+def extract_plan(collector, soup, match_id):
+    return collector.extraction_plan.extract(soup, match_id)
+
+
+def best_time(func, repeat):
+    """
+    Лучшее время из нескольких повторов
+
+    Returns:
+        tuple: (секунды, результат последнего вызова)
+    """
+    best = None
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def report(name, parse_times, extract_times):
+    totals = [p + e for p, e in zip(parse_times, extract_times)]
+    logger.info(
+        f"{name}: извлечение {statistics.mean(extract_times) * 1000:.2f} мс "
+        f"(медиана {statistics.median(extract_times) * 1000:.2f}), "
+        f"разбор + извлечение {statistics.mean(totals) * 1000:.2f} мс на страницу"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Микробенчмарк плана извлечения страниц результатов')
+    parser.add_argument('--html-dir', type=str, default=MATCH_RESULT_DIR, help='Директория со страницами результатов')
+    parser.add_argument('--from-archive', action='store_true', help='Добавить страницы из архива')
+    parser.add_argument('--limit', type=int, default=None, help='Ограничить количество страниц')
+    parser.add_argument('--repeat', type=int, default=3, help='Повторов замера на страницу (берется лучшее время)')
+    parser.add_argument('--backend', type=str, default=None, help='Бэкенд разбора HTML (по умолчанию из конфига)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    # Коллектор и план подробно логируют каждую страницу
+    logging.getLogger("src.collector.match_details").setLevel(logging.ERROR)
+    logging.getLogger("src.collector.extraction_plan").setLevel(logging.ERROR)
+
+    corpus = load_corpus(args.html_dir, args.from_archive, args.limit)
+    if not corpus:
+        logger.error(f"Корпус пуст: нет страниц в {args.html_dir}")
+        return 1
+
+    backend = resolve_backend(args.backend)
+    collector = MatchDetailsCollector(html_dir=args.html_dir, parser_backend=backend)
+    logger.info(f"Страниц в корпусе: {len(corpus)}, бэкенд: {backend}, повторов: {args.repeat}")
+
+    parse_times, legacy_times, plan_times = [], [], []
+    mismatches = 0
+    for file_name, html in corpus:
+        match_id = collector._extract_match_id_from_filename(file_name)
+        parse_time, soup = best_time(lambda: parse_html(html, backend), args.repeat)
+        legacy_time, legacy = best_time(lambda: extract_legacy(collector, soup, match_id), args.repeat)
+        plan_time, planned = best_time(lambda: extract_plan(collector, soup, match_id), args.repeat)
+        parse_times.append(parse_time)
+        legacy_times.append(legacy_time)
+        plan_times.append(plan_time)
+
+        differences = diff(list(legacy), list(planned))
+        if differences:
+            mismatches += 1
+            logger.warning(f"{file_name} - {len(differences)} расхождений")
+            for line in differences[:10]:
+                logger.warning(f"    {line}")
+
+    logger.info(f"Разбор документа: {statistics.mean(parse_times) * 1000:.2f} мс на страницу")
+    report("До (запросы по всему документу)", parse_times, legacy_times)
+    report("После (скомпилированный план)", parse_times, plan_times)
+    speedup = sum(legacy_times) / sum(plan_times) if sum(plan_times) else 0
+    logger.info(f"Ускорение извлечения x{speedup:.1f}, страниц с расхождениями: {mismatches}")
+
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,357 @@
+"""
+Бенчмарк парсеров на замороженном корпусе HTML-страниц
+
+Корпус (BENCH_CORPUS_DIR) - обезличенные копии страниц по видам: result, upcoming,
+live, results (список результатов), matches (список матчей) и player. Команда freeze
+собирает его из storage/html и архива страниц: из страниц удаляются содержимое
+скриптов, токены Cloudflare, nonce и адреса почты, разметка остается как есть.
+
+Команда run замеряет каждую точку входа разбора на своем виде страниц: пропускную
+способность (страниц в секунду, лучший из повторов) и пиковую память на страницу
+(tracemalloc, отдельным проходом, чтобы не искажать время). Коллекторы работают во
+временной директории со своей БД, поэтому корпус и рабочие данные не меняются.
+С --save-baseline результаты сохраняются в BENCH_BASELINE_FILE, иначе сравниваются
+с ним: код возврата 1, если пропускная способность упала больше чем на --threshold.
+Корпус и базовые значения в репозиторий не входят: они снимаются на своей машине,
+без них run завершается с кодом 1 еще до замеров.
+
+Использование:
+    python -m src.scripts.bench_parsers freeze --per-kind 20
+    python -m src.scripts.bench_parsers run --save-baseline
+    python -m src.scripts.bench_parsers run --threshold 0.15
+"""
+import os
+import re
+import sys
+import glob
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import tracemalloc
+from datetime import datetime
+
+from src.config.constants import (
+    BENCH_CORPUS_DIR,
+    BENCH_BASELINE_FILE,
+    HTML_DIR,
+    LOG_DIR,
+    MATCH_RESULT_DIR,
+    MATCH_UPCOMING_DIR,
+    PLAYER_HTML_DIR
+)
+from src.utils.page_archive import KIND_RESULT, KIND_UPCOMING, KIND_PLAYER, get_archive, read_page
+from src.utils import json_io
+from src.utils.jsonl_segments import commit_all
+
+logger = logging.getLogger("bench_parsers")
+
+# Источники корпуса: вид -> (директория, шаблон имени, вид страниц в архиве)
+CORPUS_SOURCES = {
+    'result': (MATCH_RESULT_DIR, 'match_*.html', KIND_RESULT),
+    'upcoming': (MATCH_UPCOMING_DIR, 'match_*.html', KIND_UPCOMING),
+    'live': (f"{HTML_DIR}/live", 'live_matches.html', None),
+    'results': (HTML_DIR, 'results.html', None),
+    'matches': (HTML_DIR, 'matches.html', None),
+    'player': (PLAYER_HTML_DIR, '*.html', KIND_PLAYER),
+}
+
+# Что удаляется из страниц при заморозке корпуса
+ANONYMIZE_PATTERNS = (
+    (re.compile(r'(<script\b[^>]*>).*?(</script>)', re.S | re.I), r'\1\2'),
+    (re.compile(r'\s(?:nonce|data-cf-beacon|data-cfemail)="[^"]*"', re.I), ''),
+    (re.compile(r'(__cf_chl_\w*|cf_clearance|__cf_bm)=[\w.\-]+', re.I), r'\1=x'),
+    (re.compile(r'[\w.+\-]+@[\w\-]+\.[\w.\-]+'), 'user@example.com'),
+)
+
+DEFAULT_THRESHOLD = 0.15
+
+
+def anonymize(html):
+    """
+    Удаляет из страницы данные, не нужные для разбора и не подлежащие хранению в репозитории
+
+    Args:
+        html (str): HTML-содержимое
+
+    Returns:
+        str: Обезличенное содержимое
+    """
+    for pattern, replacement in ANONYMIZE_PATTERNS:
+        html = pattern.sub(replacement, html)
+    return html
+
+
+def freeze(per_kind, corpus_dir=BENCH_CORPUS_DIR):
+    """
+    Собирает корпус из скачанных страниц и архива
+
+    Args:
+        per_kind (int): Сколько страниц каждого вида взять
+        corpus_dir (str): Директория корпуса
+
+    Returns:
+        dict: Вид -> количество замороженных страниц
+    """
+    archive = get_archive()
+    frozen = {}
+    for kind, (source_dir, pattern, archive_kind) in CORPUS_SOURCES.items():
+        paths = sorted(glob.glob(os.path.join(source_dir, pattern)))
+        if archive and archive_kind:
+            on_disk = {os.path.basename(path) for path in paths}
+            paths.extend(os.path.join(source_dir, name) for name in archive.list_files(archive_kind) if name not in on_disk)
+        paths = paths[:per_kind]
+
+        kind_dir = os.path.join(corpus_dir, kind)
+        os.makedirs(kind_dir, exist_ok=True)
+        for path in paths:
+            if archive_kind:
+                html = read_page(path, archive_kind)
+            else:
+                with open(path, 'r', encoding='utf-8') as f:
+                    html = f.read()
+            with open(os.path.join(kind_dir, os.path.basename(path)), 'w', encoding='utf-8') as f:
+                f.write(anonymize(html))
+        frozen[kind] = len(paths)
+        logger.info(f"{kind}: заморожено {len(paths)} страниц")
+    return frozen
+
+
+def _copy_pages(paths, target_dir):
+    os.makedirs(target_dir, exist_ok=True)
+    copies = []
+    for path in paths:
+        copy = os.path.join(target_dir, os.path.basename(path))
+        shutil.copyfile(path, copy)
+        copies.append(copy)
+    return copies
+
+
+def _read_pages(paths):
+    pages = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            pages.append((os.path.basename(path), f.read()))
+    return pages
+
+
+def _prepare_result(paths, workspace):
+    from src.collector.match_details import MatchDetailsCollector
+    collector = MatchDetailsCollector(html_dir=os.path.join(workspace, 'result'), db_path=os.path.join(workspace, 'bench.db'), workers=1)
+    return [lambda path=path: collector.process_file(path) for path in _copy_pages(paths, collector.html_dir)]
+
+
+def _prepare_upcoming(paths, workspace):
+    from src.collector import match_upcoming
+    for json_dir in (match_upcoming.UPCOMING_MATCH_JSON_DIR, match_upcoming.UPCOMING_PLAYERS_JSON_DIR,
+                     match_upcoming.UPCOMING_STREAMERS_JSON_DIR):
+        os.makedirs(json_dir, exist_ok=True)
+    collector = match_upcoming.MatchUpcomingCollector(html_dir=os.path.join(workspace, 'upcoming'), db_path=os.path.join(workspace, 'bench.db'), workers=1)
+    return [lambda path=path: collector.process_file(path) for path in _copy_pages(paths, collector.html_dir)]
+
+
+def _prepare_results_list(paths, workspace):
+    from bs4 import BeautifulSoup
+    from src.collector.matches import MatchesCollector
+    collector = MatchesCollector(html_dir=workspace, db_path=os.path.join(workspace, 'bench.db'))
+    return [lambda html=html: collector._parse_results_file(BeautifulSoup(html, 'html.parser')) for _, html in _read_pages(paths)]
+
+
+def _prepare_matches_list(paths, workspace):
+    from bs4 import BeautifulSoup
+    from src.collector.matches import MatchesCollector
+    collector = MatchesCollector(html_dir=workspace, db_path=os.path.join(workspace, 'bench.db'))
+    return [lambda html=html: collector._parse_matches_file(BeautifulSoup(html, 'html.parser')) for _, html in _read_pages(paths)]
+
+
+def _prepare_results_stream(paths, workspace):
+    from src.collector.matches import MatchesCollector
+    from src.collector.listing_stream import LISTING_RESULTS
+    collector = MatchesCollector(html_dir=workspace, db_path=os.path.join(workspace, 'bench.db'))
+    return [lambda path=path: list(collector._iter_listing_matches(path, LISTING_RESULTS)) for path in paths]
+
+
+def _prepare_matches_stream(paths, workspace):
+    from src.collector.matches import MatchesCollector
+    from src.collector.listing_stream import LISTING_MATCHES
+    collector = MatchesCollector(html_dir=workspace, db_path=os.path.join(workspace, 'bench.db'))
+    return [lambda path=path: list(collector._iter_listing_matches(path, LISTING_MATCHES)) for path in paths]
+
+
+def _prepare_live(paths, workspace):
+    from src.scripts.live_matches_parser import parse_live_matches
+    return [lambda html=html: parse_live_matches(html) for _, html in _read_pages(paths)]
+
+
+def _prepare_player(paths, workspace):
+    from src.scripts.parse_players_html_to_json import parse_player_html
+    return [lambda name=name, html=html: parse_player_html(html, name.replace('.html', '')) for name, html in _read_pages(paths)]
+
+
+# Точки входа: (имя, вид страниц корпуса, подготовка вызовов для страниц)
+ENTRY_POINTS = (
+    ('MatchDetailsCollector.process_file', 'result', _prepare_result),
+    ('MatchUpcomingCollector.process_file', 'upcoming', _prepare_upcoming),
+    ('MatchesCollector._parse_results_file', 'results', _prepare_results_list),
+    ('MatchesCollector._parse_matches_file', 'matches', _prepare_matches_list),
+    ('MatchesCollector._iter_listing_matches(results)', 'results', _prepare_results_stream),
+    ('MatchesCollector._iter_listing_matches(matches)', 'matches', _prepare_matches_stream),
+    ('parse_live_matches', 'live', _prepare_live),
+    ('parse_player_html', 'player', _prepare_player),
+)
+
+
+def _import_entry_points():
+    """Импортирует модули точек входа до смены рабочей директории"""
+    # Модуль live-парсера при импорте открывает лог в LOG_DIR
+    os.makedirs(LOG_DIR, exist_ok=True)
+    import src.collector.match_details
+    import src.collector.match_upcoming
+    import src.collector.matches
+    import src.scripts.live_matches_parser
+    import src.scripts.parse_players_html_to_json
+    # Импорт live-парсера настраивает корневой логгер, подробные логи разбора не нужны
+    logging.getLogger().setLevel(logging.WARNING)
+
+
+def _run_pass(prepare, paths, measure_memory=False):
+    """
+    Один проход точки входа по всем страницам в чистой временной директории
+
+    Returns:
+        tuple: (секунды, максимальный пик памяти на страницу в байтах или None)
+    """
+    cwd = os.getcwd()
+    workspace = tempfile.mkdtemp(prefix="hltv_bench_")
+    os.chdir(workspace)
+    try:
+        calls = prepare(paths, workspace)
+        peak = None
+        if measure_memory:
+            tracemalloc.start()
+            peak = 0
+            for call in calls:
+                tracemalloc.reset_peak()
+                before = tracemalloc.get_traced_memory()[0]
+                call()
+                peak = max(peak, tracemalloc.get_traced_memory()[1] - before)
+            tracemalloc.stop()
+            return None, peak
+        started = time.perf_counter()
+        for call in calls:
+            call()
+        return time.perf_counter() - started, peak
+    finally:
+        # Сегменты JSONL пишутся по относительным путям внутри временной директории
+        commit_all()
+        os.chdir(cwd)
+        shutil.rmtree(workspace, ignore_errors=True)
+
+
+def run(repeat, corpus_dir=BENCH_CORPUS_DIR):
+    """
+    Замеряет все точки входа на корпусе
+
+    Args:
+        repeat (int): Количество проходов по корпусу для замера времени
+        corpus_dir (str): Директория корпуса
+
+    Returns:
+        dict: Имя точки входа -> pages, pages_per_sec, peak_kb
+    """
+    _import_entry_points()
+    results = {}
+    for name, kind, prepare in ENTRY_POINTS:
+        paths = sorted(glob.glob(os.path.join(os.path.abspath(corpus_dir), kind, '*.html')))
+        if not paths:
+            logger.warning(f"{name}: нет страниц вида {kind} в корпусе, пропускаем")
+            continue
+        best = min(_run_pass(prepare, paths)[0] for _ in range(repeat))
+        _, peak = _run_pass(prepare, paths, measure_memory=True)
+        results[name] = {
+            'pages': len(paths),
+            'pages_per_sec': round(len(paths) / best, 2) if best else 0.0,
+            'peak_kb': round(peak / 1024, 1)
+        }
+        logger.info(f"{name}: {results[name]['pages_per_sec']} стр/с на {len(paths)} страницах, "
+                    f"пик памяти {results[name]['peak_kb']} КБ на страницу")
+    return results
+
+
+def compare_with_baseline(results, baseline, threshold):
+    """
+    Сравнивает пропускную способность с сохраненной базовой
+
+    Args:
+        results (dict): Текущие результаты run()
+        baseline (dict): Сохраненные результаты
+        threshold (float): Допустимое падение (0.15 - на 15%)
+
+    Returns:
+        list: Имена точек входа с регрессией
+    """
+    regressions = []
+    for name, result in results.items():
+        saved = baseline.get(name)
+        if not saved or not saved.get('pages_per_sec'):
+            logger.info(f"{name}: нет базового значения")
+            continue
+        change = result['pages_per_sec'] / saved['pages_per_sec'] - 1
+        status = "OK"
+        if change < -threshold:
+            status = "РЕГРЕССИЯ"
+            regressions.append(name)
+        logger.info(f"{name}: {saved['pages_per_sec']} -> {result['pages_per_sec']} стр/с ({change:+.1%}) {status}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк парсеров на замороженном корпусе страниц')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    freeze_parser = subparsers.add_parser('freeze', help='Собрать корпус из storage/html и архива страниц')
+    freeze_parser.add_argument('--per-kind', type=int, default=20, help='Страниц каждого вида')
+    freeze_parser.add_argument('--corpus-dir', type=str, default=BENCH_CORPUS_DIR, help='Директория корпуса')
+
+    run_parser = subparsers.add_parser('run', help='Замерить точки входа и сравнить с базовыми значениями')
+    run_parser.add_argument('--corpus-dir', type=str, default=BENCH_CORPUS_DIR, help='Директория корпуса')
+    run_parser.add_argument('--repeat', type=int, default=3, help='Проходов для замера времени (берется лучший)')
+    run_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='Допустимое падение пропускной способности')
+    run_parser.add_argument('--baseline', type=str, default=BENCH_BASELINE_FILE, help='Файл базовых значений')
+    run_parser.add_argument('--save-baseline', action='store_true', help='Сохранить результаты как базовые')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    logger.setLevel(logging.INFO)
+
+    if args.command == 'freeze':
+        frozen = freeze(args.per_kind, args.corpus_dir)
+        return 0 if any(frozen.values()) else 1
+
+    if not args.save_baseline and not os.path.exists(args.baseline):
+        # Без базовых значений регрессию не обнаружить: такой запуск не должен выглядеть успешным
+        logger.error(f"Нет файла базовых значений {args.baseline} (сначала запустите run --save-baseline)")
+        return 1
+
+    results = run(args.repeat, args.corpus_dir)
+    if not results:
+        logger.error(f"Корпус пуст: нет страниц в {args.corpus_dir} (соберите его командой freeze)")
+        return 1
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        json_io.save_file(args.baseline, {'recorded_at': datetime.now().isoformat(), 'results': results}, indent=2)
+        logger.info(f"Базовые значения сохранены в {args.baseline}")
+        return 0
+
+    baseline = json_io.load_file(args.baseline)['results']
+    regressions = compare_with_baseline(results, baseline, args.threshold)
+    if regressions:
+        logger.error(f"Падение пропускной способности больше {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
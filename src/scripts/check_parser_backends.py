@@ -0,0 +1,143 @@
+"""
+Проверка совпадения бэкендов разбора HTML с эталонным BeautifulSoup
+
+Для каждой страницы корпуса (storage/html/result и, с --from-archive, архив страниц)
+извлекает детали матча, статистику игроков и карты всеми доступными бэкендами
+и сравнивает с результатом bs4. Печатает расхождения и время разбора.
+Код возврата 1, если хотя бы одна страница разобрана иначе.
+
+Совпадение на контрольной странице из tests/fixtures проверяет tests/test_parser_backends.py;
+этот скрипт - для прогона по собственному корпусу страниц.
+
+Использование:
+    python -m src.scripts.check_parser_backends
+    python -m src.scripts.check_parser_backends --from-archive --limit 500 --backends lxml selectolax
+"""
+import os
+import sys
+import glob
+import time
+import logging
+import argparse
+
+from src.config.constants import MATCH_RESULT_DIR
+from src.collector.match_details import MatchDetailsCollector
+from src.collector.html_backend import BACKEND_BS4, available_backends, parse_html
+from src.utils.page_archive import KIND_RESULT, get_archive, read_page
+
+logger = logging.getLogger("check_parser_backends")
+
+
+def load_corpus(html_dir, from_archive=False, limit=None):
+    """
+    Страницы результатов для проверки
+
+    Returns:
+        list: Пары (имя файла, HTML)
+    """
+    paths = sorted(glob.glob(os.path.join(html_dir, "match_*.html")))
+    if from_archive:
+        archive = get_archive()
+        if archive:
+            on_disk = {os.path.basename(path) for path in paths}
+            paths.extend(os.path.join(html_dir, name) for name in archive.list_files(KIND_RESULT) if name not in on_disk)
+    if limit:
+        paths = paths[:limit]
+    return [(os.path.basename(path), read_page(path, KIND_RESULT)) for path in paths]
+
+
+def extract(collector, html, backend, match_id):
+    """
+    Все данные, которые коллектор извлекает из страницы
+
+    Returns:
+        dict: match, players, maps
+    """
+    soup = parse_html(html, backend)
+    return {
+        'match': collector._parse_match_details(soup, match_id),
+        'players': collector._parse_player_stats(soup, match_id),
+        'maps': collector._parse_maps(soup)
+    }
+
+
+def diff(reference, candidate, path=""):
+    """
+    Расхождения двух результатов извлечения
+
+    Returns:
+        list: Строки вида "players[3].kills: 21 != 12"
+    """
+    if isinstance(reference, dict) and isinstance(candidate, dict):
+        result = []
+        for key in sorted(set(reference) | set(candidate), key=str):
+            result.extend(diff(reference.get(key), candidate.get(key), f"{path}.{key}" if path else str(key)))
+        return result
+    if isinstance(reference, list) and isinstance(candidate, list):
+        if len(reference) != len(candidate):
+            return [f"{path}: {len(reference)} элементов != {len(candidate)}"]
+        result = []
+        for index, (ref_item, cand_item) in enumerate(zip(reference, candidate)):
+            result.extend(diff(ref_item, cand_item, f"{path}[{index}]"))
+        return result
+    return [] if reference == candidate else [f"{path}: {reference!r} != {candidate!r}"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Проверка совпадения бэкендов разбора HTML с bs4')
+    parser.add_argument('--html-dir', type=str, default=MATCH_RESULT_DIR, help='Директория со страницами результатов')
+    parser.add_argument('--from-archive', action='store_true', help='Добавить страницы из архива')
+    parser.add_argument('--limit', type=int, default=None, help='Ограничить количество страниц')
+    parser.add_argument('--backends', nargs='+', default=None, help='Проверяемые бэкенды (по умолчанию все доступные)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    # Коллектор подробно логирует каждую страницу
+    logging.getLogger("src.collector.match_details").setLevel(logging.ERROR)
+
+    backends = [b for b in (args.backends or available_backends()) if b != BACKEND_BS4]
+    missing = [b for b in backends if b not in available_backends()]
+    if missing:
+        logger.error(f"Не установлены зависимости бэкендов: {', '.join(missing)}")
+        return 1
+    if not backends:
+        logger.error("Нет быстрых бэкендов для проверки (установите lxml и cssselect или selectolax)")
+        return 1
+
+    corpus = load_corpus(args.html_dir, args.from_archive, args.limit)
+    if not corpus:
+        logger.error(f"Корпус пуст: нет страниц в {args.html_dir}")
+        return 1
+    logger.info(f"Страниц в корпусе: {len(corpus)}, бэкенды: {', '.join(backends)}")
+
+    collector = MatchDetailsCollector(html_dir=args.html_dir, parser_backend=BACKEND_BS4)
+    timings = {backend: 0.0 for backend in [BACKEND_BS4] + backends}
+    mismatches = {backend: 0 for backend in backends}
+
+    for file_name, html in corpus:
+        match_id = collector._extract_match_id_from_filename(file_name)
+        started = time.perf_counter()
+        reference = extract(collector, html, BACKEND_BS4, match_id)
+        timings[BACKEND_BS4] += time.perf_counter() - started
+
+        for backend in backends:
+            started = time.perf_counter()
+            candidate = extract(collector, html, backend, match_id)
+            timings[backend] += time.perf_counter() - started
+            differences = diff(reference, candidate)
+            if differences:
+                mismatches[backend] += 1
+                logger.warning(f"{backend}: {file_name} - {len(differences)} расхождений")
+                for line in differences[:10]:
+                    logger.warning(f"    {line}")
+
+    for backend, seconds in timings.items():
+        speedup = timings[BACKEND_BS4] / seconds if seconds else 0
+        status = "эталон" if backend == BACKEND_BS4 else f"расхождений: {mismatches[backend]}, ускорение x{speedup:.1f}"
+        logger.info(f"{backend}: {seconds:.2f} с на {len(corpus)} страниц ({status})")
+
+    return 1 if any(mismatches.values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""
+Проверка планов частых запросов к hltv.db
+
+Для запросов бота, парсера, планировщика и загрузчиков выполняет EXPLAIN QUERY
+PLAN и проверяет, что каждый из них идет по индексу из миграций схемы
+(src.db.migrations), а не полным просмотром таблицы. По умолчанию проверяется
+новая временная база, созданная миграциями; с --db-path - существующая база
+(открывается только на чтение, миграции к ней не применяются - база должна
+быть уже приведена к SCHEMA_VERSION). Для новой базы те же проверки выполняет
+tests/test_migrations.py; скрипт нужен прежде всего для рабочей базы.
+Код возврата 1, если хотя бы один запрос не использует ожидаемый индекс.
+
+Использование:
+    python -m src.scripts.check_query_plans
+    python -m src.scripts.check_query_plans --db-path hltv.db --verbose
+"""
+import os
+import sys
+import sqlite3
+import logging
+import pathlib
+import argparse
+import tempfile
+
+from src.db.migrations import SCHEMA_VERSION, get_version, migrate
+
+logger = logging.getLogger("check_query_plans")
+
+# Запросы: (где выполняется, SQL, ожидаемые индексы)
+HOT_QUERIES = (
+    ('бот: события прошедших матчей за неделю', '''
+        SELECT DISTINCT event_id, event_name FROM result_match
+        WHERE datetime BETWEEN ? AND ? AND event_id IS NOT NULL AND event_name IS NOT NULL
+        ORDER BY event_name
+    ''', ('idx_result_match_datetime',)),
+    ('бот: события предстоящих матчей', '''
+        SELECT DISTINCT event_id, event_name FROM upcoming_match
+        WHERE datetime BETWEEN ? AND ? AND event_id IS NOT NULL AND event_name IS NOT NULL
+        ORDER BY event_name
+    ''', ('idx_upcoming_match_datetime',)),
+    ('бот: название события', '''
+        SELECT event_name FROM result_match WHERE event_id = ? LIMIT 1
+    ''', ('idx_result_match_event',)),
+    ('бот: прошедшие матчи события', '''
+        SELECT match_id, datetime, team1_id, team1_name, team1_score, team2_id, team2_name, team2_score
+        FROM result_match WHERE event_id = ? ORDER BY datetime
+    ''', ('idx_result_match_event',)),
+    ('бот: предстоящие матчи события', '''
+        SELECT match_id, datetime, team1_id, team1_name, team2_id, team2_name
+        FROM upcoming_match WHERE event_id = ? ORDER BY datetime
+    ''', ('idx_upcoming_match_event',)),
+    ('бот: прошедшие матчи команды', '''
+        SELECT match_id, datetime, team1_name, team2_name FROM result_match
+        WHERE (LOWER(team1_name) = LOWER(?) OR LOWER(team2_name) = LOWER(?))
+        ORDER BY datetime DESC LIMIT 10
+    ''', ('idx_result_match_team1', 'idx_result_match_team2')),
+    ('бот: предстоящие матчи команды', '''
+        SELECT match_id, datetime, team1_name, team2_name FROM upcoming_match
+        WHERE (LOWER(team1_name) = LOWER(?) OR LOWER(team2_name) = LOWER(?))
+        ORDER BY datetime ASC LIMIT 10
+    ''', ('idx_upcoming_match_team1', 'idx_upcoming_match_team2')),
+    ('бот: прошедшие матчи за период', '''
+        SELECT m.match_id, m.datetime, m.team1_name, m.team2_name, m.event_id, m.event_name
+        FROM result_match m WHERE m.datetime BETWEEN ? AND ? ORDER BY m.event_id, m.datetime
+    ''', ('idx_result_match_datetime',)),
+    ('бот: предстоящие матчи за период', '''
+        SELECT m.match_id, m.datetime, m.team1_name, m.team2_name, m.event_id, m.event_name
+        FROM upcoming_match m WHERE m.datetime BETWEEN ? AND ? AND m.status = 'upcoming'
+        ORDER BY m.event_id, m.datetime
+    ''', ('idx_upcoming_match_status_datetime',)),
+    ('бот: статистика игроков матча', '''
+        SELECT p.nickname, p.team_id, p.kills, p.deaths, p.kd_ratio, p.adr, p.kast, p.rating
+        FROM player_stats p WHERE p.match_id = ? ORDER BY p.team_id, p.rating DESC
+    ''', ('ux_player_stats_match_player',)),
+    ('бот: составы предстоящего матча', '''
+        SELECT p.player_nickname as nickname, p.team_id
+        FROM upcoming_match_players p WHERE p.match_id = ? ORDER BY p.team_id
+    ''', ('ux_upcoming_match_players_match_player',)),
+    ('бот: карты матча', '''
+        SELECT map_name, team1_rounds, team2_rounds, rounds FROM result_match_maps WHERE match_id = ? ORDER BY id
+    ''', ('ux_result_match_maps_match_map',)),
+    ('бот: стримы матча', '''
+        SELECT name, lang, url FROM upcoming_match_streamers WHERE match_id = ?
+    ''', ('ux_upcoming_match_streamers_match_url',)),
+    ('DatabaseService.get_match_ids_for_parsing', '''
+        SELECT match_id FROM upcoming_match WHERE status = ? AND parsed = 0 ORDER BY datetime DESC
+    ''', ('idx_upcoming_match_status_datetime',)),
+    ('load_upcoming_matches: прошедшие предстоящие матчи', '''
+        SELECT match_id FROM upcoming_match WHERE datetime < ?
+    ''', ('idx_upcoming_match_datetime',)),
+    ('парсер: результаты для загрузки', '''
+        SELECT id, url FROM result_urls WHERE toParse = 1
+    ''', ('idx_result_urls_to_parse',)),
+    ('планировщик: матчи с полными составами', '''
+        SELECT m.match_id FROM upcoming_match m
+        JOIN upcoming_match_players p ON p.match_id = m.match_id
+        WHERE m.team1_name != 'TBD' AND m.team2_name != 'TBD'
+        GROUP BY m.match_id HAVING COUNT(p.id) >= ?
+    ''', ('ux_upcoming_match_players_match_player',)),
+)
+
+
+def query_plan(conn, sql):
+    """
+    План запроса
+
+    Returns:
+        list: Строки detail из EXPLAIN QUERY PLAN
+    """
+    params = [None] * sql.count('?')
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def check_plan(plan, indexes):
+    """
+    Проблемы плана: ожидаемые индексы, которых в плане нет
+
+    Returns:
+        list: Имена неиспользованных индексов
+    """
+    text = "\n".join(plan)
+    return [index for index in indexes if index not in text]
+
+
+def check(conn, verbose=False):
+    """
+    Проверяет планы HOT_QUERIES
+
+    Returns:
+        int: Количество запросов, не использующих ожидаемые индексы
+    """
+    failures = 0
+    for name, sql, indexes in HOT_QUERIES:
+        plan = query_plan(conn, sql)
+        missing = check_plan(plan, indexes)
+        if missing:
+            failures += 1
+            logger.warning(f"{name}: не используется {', '.join(missing)}")
+        elif verbose:
+            logger.info(f"{name}: ok")
+        if missing or verbose:
+            for line in plan:
+                logger.info(f"    {line}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Проверка планов частых запросов')
+    parser.add_argument('--db-path', type=str, default=None,
+                        help='Существующая база (по умолчанию - новая временная база из миграций)')
+    parser.add_argument('--verbose', action='store_true', help='Печатать планы всех запросов')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    logging.getLogger("src.db.migrations").setLevel(logging.WARNING)
+    logging.getLogger("src.db.natural_keys").setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory(prefix="hltv_query_plans_") as workspace:
+        db_path = args.db_path
+        if db_path is None:
+            db_path = os.path.join(workspace, "hltv.db")
+            migrate(db_path)
+        elif not os.path.exists(db_path):
+            logger.error(f"База {db_path} не найдена")
+            return 1
+        conn = sqlite3.connect(f"{pathlib.Path(db_path).resolve().as_uri()}?mode=ro", uri=True)
+        try:
+            version = get_version(conn)
+            if version < SCHEMA_VERSION:
+                logger.error(f"Версия схемы {version} из {SCHEMA_VERSION}, сначала: python -m src.db.migrations --db-path {db_path}")
+                return 1
+            failures = check(conn, args.verbose)
+        finally:
+            conn.close()
+
+    logger.info(f"Запросов: {len(HOT_QUERIES)}, без ожидаемого индекса: {failures}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
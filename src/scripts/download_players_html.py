@@ -1,22 +1,27 @@
 import os
-import sqlite3
 from datetime import datetime, timedelta
 from src.parser.base import BaseParser
-import time
+from src.parser.rate_limit import TokenBucket
+from src.parser.shared_limiter import CircuitOpenError
+from src.utils.page_archive import KIND_PLAYER, archive_page
+from src.config import PLAYER_DOWNLOAD_REQUESTS_PER_MINUTE, DOWNLOAD_JITTER, DOWNLOAD_MAX_IN_FLIGHT, HLTV_BASE_URL
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
 import logging
 from src.utils.telegram_log_handler import TelegramLogHandler
-import json
+from src.utils import json_io
+from src.db.connection import connect
+from src.db.migrations import migrate
 
 DB_PATH = 'hltv.db'
 HTML_DIR = 'storage/html/player'
 os.makedirs(HTML_DIR, exist_ok=True)
 
-PLAYER_URL = 'https://www.hltv.org/player/{player_id}/{player_nickname}'
+PLAYER_URL = HLTV_BASE_URL + '/player/{player_id}/{player_nickname}'
 
 # Настройка Telegram логгера
 try:
-    with open("src/bots/config/dev_bot_config.json", encoding="utf-8") as f:
-        dev_bot_config = json.load(f)
+    dev_bot_config = json_io.load_file("src/bots/config/dev_bot_config.json")
     dev_bot_token = dev_bot_config["token"]
     telegram_handler = TelegramLogHandler(dev_bot_token, chat_id="7146832422")
     telegram_handler.setLevel(logging.INFO)
@@ -28,10 +33,16 @@ except Exception as e:
 
 # Класс для скачивания HTML через BaseParser
 class PlayerHTMLDownloader(BaseParser):
+    http_first = True
+    fetch_profile = 'player'
+
+    def __init__(self):
+        super().__init__()
+        # Для страниц игроков свой, более строгий бюджет запросов
+        self.rate_limiter = TokenBucket(PLAYER_DOWNLOAD_REQUESTS_PER_MINUTE, 1, DOWNLOAD_JITTER)
+
     def download_html(self, url):
-        self.driver.get(url)
-        self._wait_for_page_load()
-        return self.driver.page_source
+        return self._download(url)
     def parse(self):
         pass  # Не используется, но требуется для абстрактного класса
 
@@ -60,13 +71,22 @@ def update_player_dates(conn, player_id, next_update, last_update):
     conn.commit()
 
 
-def main():
-    conn = sqlite3.connect(DB_PATH)
-    players = get_upcoming_players(conn)
-    now = datetime.now()
-    updated = 0
+def is_cloudflare_block(html):
+    """Страница-заглушка Cloudflare вместо профиля игрока"""
+    return '<a rel="noopener noreferrer"' in html and '>Cloudflare<' in html
+
+
+def save_player_html(player_id, html):
+    html_path = os.path.join(HTML_DIR, f'{player_id}.html')
+    with open(html_path, 'w', encoding='utf-8') as f:
+        f.write(html)
+
+
+# Отбор игроков, чьи страницы пора скачать (новые игроки сразу добавляются в players)
+def get_players_to_download(conn, now):
+    to_download = []
     skipped = 0
-    for player_id, player_nickname in players:
+    for player_id, player_nickname in get_upcoming_players(conn):
         if not player_id or not player_nickname:
             continue
         row = get_player_row(conn, player_id)
@@ -86,47 +106,76 @@ def main():
                 except Exception:
                     need_download = True
         if need_download:
-            url = PLAYER_URL.format(player_id=player_id, player_nickname=player_nickname)
-            try:
-                with PlayerHTMLDownloader() as parser:
-                    html = parser.download_html(url)
-                    # Проверка на Cloudflare
-                    if '<a rel="noopener noreferrer"' in html and '>Cloudflare<' in html:
-                        html_path = os.path.join(HTML_DIR, f'{player_id}.html')
-                        with open(html_path, 'w', encoding='utf-8') as f:
-                            f.write(html)
-                        logger.warning("При парсинге игроков уперлись в защиту", extra={"telegram_firstline": True})
-                        if hasattr(telegram_handler, 'send_buffer'):
-                            telegram_handler.send_buffer()
-                        print(f'[ERR] Cloudflare detected for {player_nickname} ({player_id}), process stopped.')
-                        break
-                    html_path = os.path.join(HTML_DIR, f'{player_id}.html')
-                    with open(html_path, 'w', encoding='utf-8') as f:
-                        f.write(html)
+            to_download.append((player_id, player_nickname))
+        else:
+            skipped += 1
+    return to_download, skipped
+
+
+def download_player(parser, player_id, player_nickname, stop_event):
+    """
+    Скачивает страницу игрока. Возвращает 'ok', 'cloudflare', 'circuit', 'error' или 'stopped'
+    """
+    if stop_event.is_set():
+        return 'stopped'
+    url = PLAYER_URL.format(player_id=player_id, player_nickname=player_nickname)
+    try:
+        # Повторы при временных ошибках делает call_with_backoff внутри _download
+        html = parser.download_html(url)
+    except CircuitOpenError as e:
+        # Запросы к HLTV приостановлены для всех парсеров - остальные загрузки тоже не пройдут
+        print(f'[ERR] Requests paused, stopping at {player_nickname} ({player_id}): {e}')
+        stop_event.set()
+        return 'circuit'
+    except Exception as e:
+        # Драйвер общий для потоков загрузки, в нем может быть уже страница другого игрока,
+        # поэтому частичный HTML не сохраняем: игрок будет скачан при следующем запуске
+        print(f'[ERR] Failed to download HTML for {player_nickname} ({player_id}): {e}')
+        return 'error'
+    save_player_html(player_id, html)
+    if is_cloudflare_block(html):
+        # Пауза после Cloudflare общая для всех парсеров
+        parser.report_challenge()
+        stop_event.set()
+        return 'cloudflare'
+    archive_page(KIND_PLAYER, f'{player_id}.html', html, player_id)
+    return 'ok'
+
+
+def main():
+    migrate(DB_PATH)
+    conn = connect(DB_PATH)
+    now = datetime.now()
+    updated = 0
+    players, skipped = get_players_to_download(conn, now)
+    if not players:
+        print(f'Done. Downloaded: {updated}, Skipped: {skipped}')
+        conn.close()
+        return
+
+    # Паузы между запросами задает rate_limiter парсера, а не фиксированный sleep
+    stop_event = threading.Event()
+    with PlayerHTMLDownloader() as parser:
+        with ThreadPoolExecutor(max_workers=DOWNLOAD_MAX_IN_FLIGHT) as executor:
+            futures = {
+                executor.submit(download_player, parser, player_id, player_nickname, stop_event): (player_id, player_nickname)
+                for player_id, player_nickname in players
+            }
+            for future in as_completed(futures):
+                player_id, player_nickname = futures[future]
+                status = future.result()
+                if status == 'ok':
                     # next_update через 7 дней, last_update сейчас
                     next_update_val = (now + timedelta(days=7)).isoformat()
                     last_update_val = now.isoformat()
                     update_player_dates(conn, player_id, next_update_val, last_update_val)
                     print(f'[OK] Downloaded {player_nickname} ({player_id})')
                     updated += 1
-            except Exception as e:
-                # Сохраняем html даже при ошибке, если возможно
-                html = None
-                try:
-                    html = parser.driver.page_source
-                except Exception:
-                    pass
-                if html:
-                    html_path = os.path.join(HTML_DIR, f'{player_id}.html')
-                    with open(html_path, 'w', encoding='utf-8') as f:
-                        f.write(html)
-                    print(f'[ERR] Saved partial HTML for {player_nickname} ({player_id}) due to error: {e}')
-                else:
-                    print(f'[ERR] Failed to download and save HTML for {player_nickname} ({player_id}): {e}')
-                break  # Останавливаем процесс
-            time.sleep(25)  # Таймаут между запросами
-        else:
-            skipped += 1
+                elif status == 'cloudflare':
+                    logger.warning("При парсинге игроков уперлись в защиту", extra={"telegram_firstline": True})
+                    if hasattr(telegram_handler, 'send_buffer'):
+                        telegram_handler.send_buffer()
+                    print(f'[ERR] Cloudflare detected for {player_nickname} ({player_id}), process stopped.')
     print(f'Done. Downloaded: {updated}, Skipped: {skipped}')
     conn.close()
 
@@ -1,14 +1,15 @@
-import sqlite3
 import pandas as pd
 from datetime import datetime, timedelta
 import argparse
 import os
 
+from src.db.connection import PROFILE_READ, connect
+
 LOG_PATH = 'logs/eval_predictions.log'
 DB_PATH = 'hltv.db'
 
 def evaluate(period='all'):
-    with sqlite3.connect(DB_PATH) as conn:
+    with connect(DB_PATH, PROFILE_READ) as conn:
         # Матчи
         matches = pd.read_sql_query('SELECT match_id, datetime, team1_score, team2_score FROM result_match', conn)
         preds = pd.read_sql_query('SELECT match_id, team1_score_final, team2_score_final FROM predict', conn)
@@ -0,0 +1,346 @@
+"""
+Локальный стенд HLTV: запись ответов и их воспроизведение по HTTP
+
+Позволяет запускать ResultsParser, MatchesParser, MatchDetailsParser,
+SimpleHTMLParser и загрузчик игроков без доступа к сайту: для замеров
+пропускной способности загрузки и проверки изменений в параллельной загрузке.
+
+Набор ответов (bundle) - директория с manifest.json и сжатыми gzip телами:
+    manifest.json: {"/matches/2382239": {"file": "<sha256>.html.gz", "status": 200, "recorded_at": "..."}}
+Страницы матчей и игроков хранятся по ключу без slug (/matches/<id>, /player/<id>),
+поэтому стенд отдает их по любому URL с тем же ID.
+
+Использование:
+    # Записать ответы с сайта
+    python -m src.scripts.hltv_replay record --paths /results /matches /matches/2382239/a-vs-b
+    # Собрать набор из уже скачанных страниц (storage/html и архив страниц)
+    python -m src.scripts.hltv_replay import
+    # Запустить стенд и направить на него парсеры
+    python -m src.scripts.hltv_replay serve --port 8765 --latency 0.05 0.3 --error-rate 0.02 --challenge-rate 0.01
+    HLTV_BASE_URL=http://127.0.0.1:8765 python -m src.main --download-result-match-page
+"""
+import os
+import re
+import gzip
+import time
+import random
+import hashlib
+import logging
+import argparse
+import threading
+from datetime import datetime
+from urllib.parse import urlparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.config.constants import (
+    REPLAY_FIXTURES_DIR,
+    RESULTS_HTML_FILE,
+    MATCHES_HTML_FILE,
+    MATCH_RESULT_DIR,
+    MATCH_UPCOMING_DIR,
+    PLAYER_HTML_DIR
+)
+from src.utils import json_io
+
+logger = logging.getLogger("hltv_replay")
+
+MANIFEST_FILE = "manifest.json"
+
+# Заглушка, которую отдает Cloudflare вместо страницы (содержит признаки из CLOUDFLARE_INDICATORS)
+CHALLENGE_PAGE = (
+    '<!DOCTYPE html><html><head><title>Just a moment...</title></head>'
+    '<body><div id="cf-please-wait">Checking your browser before accessing hltv.org.</div>'
+    '<script src="/cdn-cgi/challenge-platform/h/g/orchestrate/chl_page/v1"></script>'
+    '<a rel="noopener noreferrer" href="https://www.cloudflare.com">Cloudflare</a></body></html>'
+)
+
+_ID_PATH = re.compile(r'^/(matches|player)/(\d+)(?:/.*)?$')
+
+
+def fixture_key(path):
+    """
+    Ключ страницы в наборе: путь без query, для матчей и игроков - без slug
+
+    Args:
+        path (str): Путь или полный URL
+
+    Returns:
+        str: Ключ вида /results, /matches/2382239, /player/7998
+    """
+    path = urlparse(path).path or "/"
+    match = _ID_PATH.match(path)
+    if match:
+        return f"/{match.group(1)}/{match.group(2)}"
+    return path.rstrip("/") or "/"
+
+
+class FixtureBundle:
+    """
+    Набор записанных ответов HLTV
+    """
+
+    def __init__(self, root=REPLAY_FIXTURES_DIR):
+        self.root = root
+        self.manifest_path = os.path.join(root, MANIFEST_FILE)
+        os.makedirs(root, exist_ok=True)
+        self.manifest = {}
+        if os.path.exists(self.manifest_path):
+            self.manifest = json_io.load_file(self.manifest_path)
+
+    def add(self, path, html, status=200):
+        """
+        Добавляет ответ в набор
+
+        Args:
+            path (str): Путь или URL страницы
+            html (str): Тело ответа
+            status (int): HTTP-статус ответа
+        """
+        data = html.encode("utf-8")
+        file_name = f"{hashlib.sha256(data).hexdigest()}.html.gz"
+        file_path = os.path.join(self.root, file_name)
+        if not os.path.exists(file_path):
+            with open(file_path, "wb") as f:
+                f.write(gzip.compress(data, compresslevel=6))
+        self.manifest[fixture_key(path)] = {
+            "file": file_name,
+            "status": status,
+            "recorded_at": datetime.now().isoformat()
+        }
+
+    def save(self):
+        """Сохраняет manifest.json"""
+        json_io.save_file(self.manifest_path, self.manifest, indent=2, sort_keys=True)
+
+    def load_body(self, key):
+        """
+        Сжатое тело ответа и его метаданные
+
+        Returns:
+            tuple or None: (gzip-байты, запись manifest) или None, если страницы нет
+        """
+        entry = self.manifest.get(key)
+        if not entry:
+            return None
+        with open(os.path.join(self.root, entry["file"]), "rb") as f:
+            return f.read(), entry
+
+
+def record(bundle, paths, base_url):
+    """
+    Записывает ответы живого сайта (HTTP, при неудаче браузер)
+
+    Args:
+        bundle (FixtureBundle): Набор ответов
+        paths (list): Пути страниц (/results, /matches/<id>/<slug>, ...)
+        base_url (str): Адрес сайта
+    """
+    # BaseParser импортируется только для записи: стенду selenium не нужен
+    from src.parser.base import BaseParser
+
+    class RecordingFetcher(BaseParser):
+        http_first = True
+
+        def parse(self):
+            pass
+
+    recorded = 0
+    with RecordingFetcher() as fetcher:
+        for path in paths:
+            url = path if path.startswith("http") else f"{base_url}{path}"
+            try:
+                html = fetcher._download(url)
+            except Exception as e:
+                logger.error(f"Не удалось записать {url}: {str(e)}")
+                continue
+            bundle.add(path, html)
+            recorded += 1
+            logger.info(f"Записано {fixture_key(path)} ({len(html)} байт)")
+    bundle.save()
+    logger.info(f"Записано страниц: {recorded} из {len(paths)}")
+
+
+def import_storage(bundle):
+    """
+    Собирает набор из уже скачанных страниц: storage/html и архива страниц
+    """
+    from src.utils.page_archive import KIND_RESULT, KIND_UPCOMING, KIND_PLAYER, get_archive
+
+    def _read(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    imported = 0
+    for file_path, key in ((RESULTS_HTML_FILE, "/results"), (MATCHES_HTML_FILE, "/matches")):
+        if os.path.exists(file_path):
+            bundle.add(key, _read(file_path))
+            imported += 1
+
+    # Имена файлов: match_<id>-<slug>.html для матчей, <id>.html для игроков
+    id_pattern = re.compile(r'^(?:match_)?(\d+)')
+    sources = (
+        (MATCH_RESULT_DIR, KIND_RESULT, "/matches"),
+        (MATCH_UPCOMING_DIR, KIND_UPCOMING, "/matches"),
+        (PLAYER_HTML_DIR, KIND_PLAYER, "/player"),
+    )
+    archive = get_archive()
+    for directory, kind, prefix in sources:
+        names = set(os.listdir(directory)) if os.path.isdir(directory) else set()
+        archived = set(archive.list_files(kind)) if archive else set()
+        for file_name in sorted(names | archived):
+            match = id_pattern.match(file_name)
+            if not match:
+                continue
+            if file_name in names:
+                html = _read(os.path.join(directory, file_name))
+            else:
+                html = archive.latest(kind, file_name)
+            if html:
+                bundle.add(f"{prefix}/{match.group(1)}", html)
+                imported += 1
+    bundle.save()
+    logger.info(f"Импортировано страниц: {imported}")
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    """
+    Отдает записанные ответы с задержкой, ошибками и страницами-проверками Cloudflare
+    """
+    server_version = "cloudflare"
+
+    def _send(self, status, body=b"", headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _handle(self):
+        server = self.server
+        delay = random.uniform(*server.latency)
+        if delay:
+            time.sleep(delay)
+
+        roll = random.random()
+        if roll < server.challenge_rate:
+            server.count("challenge")
+            self._send(403, CHALLENGE_PAGE.encode("utf-8"), {
+                "Content-Type": "text/html; charset=UTF-8",
+                "cf-mitigated": "challenge"
+            })
+            return
+        if roll < server.challenge_rate + server.error_rate:
+            server.count("error")
+            self._send(503, b"Service Unavailable", {"Content-Type": "text/plain"})
+            return
+
+        loaded = server.bundle.load_body(fixture_key(self.path))
+        if not loaded:
+            server.count("missing")
+            self._send(404, b"Not Found", {"Content-Type": "text/plain"})
+            return
+
+        body, entry = loaded
+        etag = f'"{entry["file"][:16]}"'
+        if self.headers.get("If-None-Match") == etag:
+            server.count("not_modified")
+            self._send(304, headers={"ETag": etag})
+            return
+
+        headers = {"Content-Type": "text/html; charset=utf-8", "ETag": etag}
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            headers["Content-Encoding"] = "gzip"
+        else:
+            body = gzip.decompress(body)
+        server.count("ok")
+        self._send(entry.get("status", 200), body, headers)
+
+    def do_GET(self):
+        self._handle()
+
+    def do_HEAD(self):
+        self._handle()
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+
+class ReplayServer(ThreadingHTTPServer):
+    """
+    HTTP-сервер стенда со счетчиками ответов
+    """
+    daemon_threads = True
+
+    def __init__(self, address, bundle, latency=(0.0, 0.0), error_rate=0.0, challenge_rate=0.0):
+        super().__init__(address, ReplayHandler)
+        self.bundle = bundle
+        self.latency = latency
+        self.error_rate = error_rate
+        self.challenge_rate = challenge_rate
+        self.stats = {"ok": 0, "not_modified": 0, "missing": 0, "error": 0, "challenge": 0}
+        self._stats_lock = threading.Lock()
+
+    def count(self, outcome):
+        with self._stats_lock:
+            self.stats[outcome] += 1
+
+
+def serve(bundle, host, port, latency, error_rate, challenge_rate):
+    """
+    Запускает стенд до Ctrl+C
+
+    Args:
+        bundle (FixtureBundle): Набор ответов
+        host (str): Адрес
+        port (int): Порт
+        latency (tuple): Диапазон задержки ответа в секундах
+        error_rate (float): Доля ответов 503
+        challenge_rate (float): Доля страниц-проверок Cloudflare
+    """
+    server = ReplayServer((host, port), bundle, latency, error_rate, challenge_rate)
+    logger.info(f"Стенд HLTV: {len(bundle.manifest)} страниц, http://{host}:{port}")
+    logger.info(f"Для парсеров: HLTV_BASE_URL=http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        logger.info(f"Ответы стенда: {server.stats}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Запись и воспроизведение ответов HLTV')
+    parser.add_argument('--bundle', type=str, default=REPLAY_FIXTURES_DIR, help='Директория набора ответов')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    record_parser = subparsers.add_parser('record', help='Записать ответы живого сайта')
+    record_parser.add_argument('--paths', nargs='+', required=True, help='Пути страниц, например /results /matches/2382239/a-vs-b')
+    record_parser.add_argument('--base-url', type=str, default="https://www.hltv.org", help='Адрес сайта')
+
+    subparsers.add_parser('import', help='Собрать набор из storage/html и архива страниц')
+
+    serve_parser = subparsers.add_parser('serve', help='Запустить локальный стенд')
+    serve_parser.add_argument('--host', type=str, default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=8765)
+    serve_parser.add_argument('--latency', type=float, nargs=2, default=(0.0, 0.0), metavar=('MIN', 'MAX'),
+                              help='Диапазон задержки ответа в секундах')
+    serve_parser.add_argument('--error-rate', type=float, default=0.0, help='Доля ответов 503')
+    serve_parser.add_argument('--challenge-rate', type=float, default=0.0, help='Доля страниц-проверок Cloudflare')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    bundle = FixtureBundle(args.bundle)
+
+    if args.command == 'record':
+        record(bundle, args.paths, args.base_url.rstrip('/'))
+    elif args.command == 'import':
+        import_storage(bundle)
+    else:
+        serve(bundle, args.host, args.port, tuple(args.latency), args.error_rate, args.challenge_rate)
+
+
+if __name__ == '__main__':
+    main()
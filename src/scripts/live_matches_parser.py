@@ -5,7 +5,6 @@
 import os
 import sys
 import time
-import json
 import logging
 import requests
 from bs4 import BeautifulSoup
@@ -14,6 +13,10 @@ import threading
 from src.bots.notify import send_telegram_message
 from src.parser.matches import MatchesParser
 from src.parser.simple_html import SimpleHTMLParser
+from src.config import MATCHES_URL
+from src.parser.shared_limiter import CircuitOpenError, get_shared_state, is_challenge_html
+from src.parser.browser_daemon import BrowserDaemonError, fetch_via_daemon
+from src.utils import json_io
 
 # Отключаем лишние логи
 logging.getLogger("tensorflow").setLevel(logging.ERROR)
@@ -44,12 +47,10 @@ logging.getLogger("webdriver_manager").setLevel(logging.WARNING)
 def load_json(path, default=None):
     if not os.path.exists(path):
         return default if default is not None else []
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return json_io.load_file(path)
 
 def save_json(path, data):
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    json_io.save_file(path, data)
 
 def get_all_subscribed_match_ids():
     subs = load_json(SUBS_JSON, default={})
@@ -269,10 +270,33 @@ def handle_new_subscription(match_id, user_id):
 
 def download_live_page():
     os.makedirs(HTML_DIR, exist_ok=True)
-    parser = SimpleHTMLParser()
+    # Бюджет запросов и пауза после Cloudflare общие с остальными парсерами
+    shared = get_shared_state()
+    if shared:
+        try:
+            shared.check_circuit()
+        except CircuitOpenError as e:
+            logger.warning(f"Skip live update: {str(e)}")
+            return None
+        shared.acquire()
     try:
         logger.info("Download html")
-        html = parser.get_html("https://www.hltv.org/matches")
+        # Резидентный браузерный демон, если запущен, иначе свой Chrome
+        try:
+            html = fetch_via_daemon(MATCHES_URL, profile='live')
+        except BrowserDaemonError as e:
+            logger.warning(f"Browser daemon failed, falling back to local browser: {str(e)}")
+            html = None
+        if html is not None and is_challenge_html(html):
+            logger.warning("Browser daemon returned Cloudflare challenge page, falling back to local browser")
+            html = None
+        if html is None:
+            html = SimpleHTMLParser().get_html(MATCHES_URL)
+        if shared:
+            if is_challenge_html(html):
+                shared.record_challenge()
+                return None
+            shared.record_success()
         with open(HTML_PATH, "w", encoding="utf-8") as f:
             f.write(html)
         return HTML_PATH
@@ -327,6 +351,10 @@ def clean_dead_live_subscriptions():
 def main_loop():
     while True:
         html_path = download_live_page()
+        if not html_path:
+            subscriber_event.clear()
+            subscriber_event.wait(timeout=60)
+            continue
         with open(html_path, "r", encoding="utf-8") as f:
             html = f.read()
         new_matches = parse_live_matches(html)
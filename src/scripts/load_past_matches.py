@@ -7,7 +7,7 @@ import os
 import sys
 import logging
 import argparse
-import json
+from src.utils import json_io
 from src.utils.telegram_log_handler import TelegramLogHandler
 
 # Добавляем корневую директорию проекта в sys.path
@@ -28,8 +28,7 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-with open("src/bots/config/dev_bot_config.json", encoding="utf-8") as f:
-    dev_bot_config = json.load(f)
+dev_bot_config = json_io.load_file("src/bots/config/dev_bot_config.json")
 dev_bot_token = dev_bot_config["token"]
 telegram_handler = TelegramLogHandler(dev_bot_token, chat_id="7146832422")
 telegram_handler.setLevel(logging.INFO)
@@ -1,13 +1,13 @@
-import os
-import json
-import sqlite3
 from datetime import datetime
+from src.db.connection import PROFILE_BULK_LOAD, connect
+from src.db.load_journal import load_stream
+from src.db.migrations import migrate
 
 DB_PATH = 'hltv.db'
 JSON_DIR = 'storage/json/player'
 
-def update_player(conn, data):
-    cursor = conn.cursor()
+def write_player(cursor, data):
+    """Обновляет профиль игрока в таблице players (без фиксации транзакции)"""
     fields = [
         "country", "real_name", "age", "current_team", "prize_money", "maps_past3",
         "rating_2_1", "firepower", "entrying", "trading", "opening", "clutching",
@@ -19,30 +19,22 @@ def update_player(conn, data):
     values = [data.get(f) for f in fields] + [datetime.now().isoformat(), data["player_id"]]
     sql = f"UPDATE players SET {set_clause} WHERE player_id=?"
     cursor.execute(sql, values)
-    conn.commit()
+
+def write_players(cursor, records):
+    for data in records:
+        write_player(cursor, data)
+    return len(records)
 
 def main():
-    conn = sqlite3.connect(DB_PATH)
-    processed = 0
-    success = 0
-    error = 0
-    for filename in os.listdir(JSON_DIR):
-        if not filename.endswith('.json'):
-            continue
-        json_path = os.path.join(JSON_DIR, filename)
-        try:
-            with open(json_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            update_player(conn, data)
-            print(f"[OK] Updated player {data['player_id']}")
-            os.remove(json_path)
-            success += 1
-        except Exception as e:
-            print(f"[ERR] Failed to update from {filename}: {e}")
-            error += 1
-        processed += 1
-    conn.close()
-    print(f"Загрузка игроков завершена. Всего: {processed}, успешно: {success}, ошибок: {error}")
+    # Журнал загрузки (src.db.load_journal) создается миграциями схемы
+    migrate(DB_PATH)
+    conn = connect(DB_PATH, PROFILE_BULK_LOAD)
+    try:
+        # Сначала сегменты JSONL, затем отдельные файлы прежнего формата; файлы удаляются после фиксации пачки
+        stats = load_stream(conn, JSON_DIR, write_players)
+    finally:
+        conn.close()
+    print(f"Загрузка игроков завершена. Всего: {stats['processed']}, успешно: {stats['success']}, ошибок: {stats['error']}")
 
 if __name__ == '__main__':
     main() 
\ No newline at end of file
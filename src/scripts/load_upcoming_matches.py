@@ -7,7 +7,6 @@ import os
 import sys
 import logging
 import argparse
-import sqlite3
 from datetime import datetime
 import time
 from src.utils.telegram_log_handler import TelegramLogHandler
@@ -17,6 +16,11 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(
 
 from src.loader.matches_loader import MatchesLoader
 from src.config.constants import DATABASE_FILE
+from src.db.connection import PROFILE_BULK_LOAD, connect
+from src.db.load_journal import load_stream
+from src.db.migrations import migrate
+from src.db.natural_keys import prune_match_rows, upsert_sql
+from src.utils.page_fingerprint import FINGERPRINT_FIELD, save_loaded_fingerprint
 
 # Настройка логирования
 logging.basicConfig(
@@ -30,9 +34,8 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Получить токен dev_bot из конфига
-import json
-with open("src/bots/config/dev_bot_config.json", encoding="utf-8") as f:
-    dev_bot_config = json.load(f)
+from src.utils import json_io
+dev_bot_config = json_io.load_file("src/bots/config/dev_bot_config.json")
 dev_bot_token = dev_bot_config["token"]
 
 # Указать user_id нужного пользователя (7146832422)
@@ -42,6 +45,10 @@ formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
 telegram_handler.setFormatter(formatter)
 logger.addHandler(telegram_handler)
 
+# Столбцы, которые пишут _write_upcoming_players и _write_upcoming_streamers
+UPCOMING_PLAYERS_COLUMNS = ('match_id', 'team_id', 'player_id', 'player_nickname', 'team_position')
+UPCOMING_STREAMERS_COLUMNS = ('match_id', 'name', 'lang', 'url')
+
 def parse_arguments():
     """Парсинг аргументов командной строки"""
     parser = argparse.ArgumentParser(description='Загрузка предстоящих матчей из JSON в базу данных')
@@ -51,33 +58,82 @@ def parse_arguments():
 
 def create_upcoming_match_players_table(db_path):
     """
-    Создает таблицу upcoming_match_players, если она не существует
+    Создает таблицу upcoming_match_players, если она не существует (схемой владеет src.db.migrations)
     """
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        # Создаем таблицу для игроков предстоящих матчей
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS upcoming_match_players (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                match_id INTEGER NOT NULL,
-                team_id INTEGER,
-                player_id INTEGER,
-                player_nickname TEXT,
-                team_position INTEGER,
-                FOREIGN KEY (match_id) REFERENCES upcoming_urls (id)
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
+        migrate(db_path)
         logger.info("Таблица upcoming_match_players успешно создана/проверена", extra={"no_telegram": True})
         
     except Exception as e:
         logger.error(f"Ошибка при создании таблицы upcoming_match_players: {str(e)}")
         raise
 
+def _write_upcoming_players(cursor, data):
+    """
+    Записывает игроков одного предстоящего матча (файл или запись сегмента JSONL)
+    
+    Raises:
+        ValueError: Нет необходимых данных или матча нет в upcoming_urls
+    """
+    if 'match_id' not in data or 'players' not in data:
+        raise ValueError("отсутствуют необходимые данные")
+    
+    match_id = data['match_id']
+    
+    # Проверяем, существует ли матч в базе данных
+    cursor.execute('SELECT 1 FROM upcoming_urls WHERE id = ?', (match_id,))
+    if not cursor.fetchone():
+        raise ValueError(f"матч с ID {match_id} не найден в базе данных")
+    
+    rows = [
+        (
+            match_id,
+            player.get('team_id'),
+            # Игрок без ID получает NULL в ключе: отдельная строка, а не слияние с другими игроками без ID
+            player.get('player_id') or None,
+            player.get('player_nickname'),
+            player.get('team_position', 0)
+        )
+        for player in data['players']
+    ]
+    # Игроки, которых больше нет в составе, удаляются, остальные обновляются на месте
+    prune_match_rows(cursor, 'upcoming_match_players', match_id, [row[2] for row in rows])
+    if rows:
+        cursor.executemany(upsert_sql('upcoming_match_players', UPCOMING_PLAYERS_COLUMNS), rows)
+    return match_id
+
+def _load_stream(db_path, stream_dir, write):
+    """
+    Загружает поток (сегменты JSONL, затем файлы прежнего формата) пачками с журналом загрузки
+    
+    Пачка фиксируется одной транзакцией вместе с записью журнала, файлы и сегменты
+    удаляются после фиксации; прерванная загрузка продолжается при следующем запуске
+    (src.db.load_journal). Файл, запись которого не прошла (например, матча нет в
+    upcoming_urls), остается на месте, запись сегмента переносится в новый сегмент.
+    
+    Args:
+        db_path (str): Путь к базе данных
+        stream_dir (str): Директория потока
+        write (callable): Запись одной записи через курсор
+        
+    Returns:
+        dict: processed, success, error
+    """
+    def write_batch(cursor, records):
+        for record in records:
+            write(cursor, record)
+        return len(records)
+    
+    migrate(db_path)
+    conn = connect(db_path, PROFILE_BULK_LOAD)
+    try:
+        counts = load_stream(conn, stream_dir, write_batch)
+    finally:
+        conn.close()
+    logger.info(f"{stream_dir}: загружено {counts['success']} из {counts['processed']} записей "
+                f"({counts['segments']} сегментов, {counts['files']} файлов)", extra={"no_telegram": True})
+    return {"processed": counts['processed'], "success": counts['success'], "error": counts['error']}
+
 def load_upcoming_players(db_path):
     """
     Загружает список игроков предстоящих матчей из JSON в базу данных
@@ -89,133 +145,58 @@ def load_upcoming_players(db_path):
             logger.info(f"Директория {players_json_dir} не существует, пропускаем загрузку игроков", extra={"no_telegram": True})
             return {"processed": 0, "success": 0, "error": 0}
         
-        import json
-        import glob
-        
-        stats = {"processed": 0, "success": 0, "error": 0}
-        
-        # Получаем все JSON-файлы в директории
-        json_files = glob.glob(os.path.join(players_json_dir, "*.json"))
-        logger.info(f"Найдено {len(json_files)} файлов с игроками предстоящих матчей", extra={"no_telegram": True})
-        
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        for file_path in json_files:
-            try:
-                stats["processed"] += 1
-                
-                # Читаем JSON-файл
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                
-                if 'match_id' not in data or 'players' not in data:
-                    logger.warning(f"В файле {file_path} отсутствуют необходимые данные", extra={"no_telegram": True})
-                    stats["error"] += 1
-                    continue
-                
-                match_id = data['match_id']
-                
-                # Проверяем, существует ли матч в базе данных
-                cursor.execute('SELECT 1 FROM upcoming_urls WHERE id = ?', (match_id,))
-                if not cursor.fetchone():
-                    logger.warning(f"Матч с ID {match_id} не найден в базе данных, пропускаем", extra={"no_telegram": True})
-                    stats["error"] += 1
-                    continue
-                
-                # Удаляем существующие записи для этого матча
-                cursor.execute('DELETE FROM upcoming_match_players WHERE match_id = ?', (match_id,))
-                
-                # Добавляем игроков
-                for player in data['players']:
-                    cursor.execute('''
-                        INSERT INTO upcoming_match_players (
-                            match_id, team_id, player_id, player_nickname, team_position
-                        ) VALUES (?, ?, ?, ?, ?)
-                    ''', (
-                        match_id,
-                        player.get('team_id'),
-                        player.get('player_id'),
-                        player.get('player_nickname'),
-                        player.get('team_position', 0)
-                    ))
-                
-                conn.commit()
-                stats["success"] += 1
-                logger.info(f"Загружены игроки для матча {match_id}", extra={"no_telegram": True})
-                
-                # Удаляем обработанный файл
-                os.remove(file_path)
-                logger.info(f"Файл {os.path.basename(file_path)} удален после обработки", extra={"no_telegram": True})
-                
-            except Exception as e:
-                logger.error(f"Ошибка при загрузке игроков матча из {file_path}: {str(e)}", extra={"no_telegram": True})
-                stats["error"] += 1
-        
-        conn.close()
-        return stats
+        return _load_stream(db_path, players_json_dir, _write_upcoming_players)
         
     except Exception as e:
         logger.error(f"Ошибка при загрузке игроков предстоящих матчей: {str(e)}", extra={"no_telegram": True})
-        return {"processed": 0, "success": 0, "error": len(json_files) if 'json_files' in locals() else 0}
+        return {"processed": 0, "success": 0, "error": 0}
+
+def _write_upcoming_match(cursor, match):
+    """
+    Записывает один предстоящий матч (файл или запись сегмента JSONL) и отпечаток его страницы
+    """
+    cursor.execute('''
+        INSERT INTO upcoming_match (
+            match_id, datetime, team1_id, team1_name, team1_rank,
+            team2_id, team2_name, team2_rank, event_id, event_name,
+            head_to_head_team1_wins, head_to_head_team2_wins, status, parsed, last_updated
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0, CURRENT_TIMESTAMP)
+        ON CONFLICT(match_id) DO UPDATE SET
+            datetime = excluded.datetime, team1_id = excluded.team1_id, team1_name = excluded.team1_name,
+            team1_rank = excluded.team1_rank, team2_id = excluded.team2_id, team2_name = excluded.team2_name,
+            team2_rank = excluded.team2_rank, event_id = excluded.event_id, event_name = excluded.event_name,
+            head_to_head_team1_wins = excluded.head_to_head_team1_wins,
+            head_to_head_team2_wins = excluded.head_to_head_team2_wins,
+            status = excluded.status, parsed = 0, last_updated = CURRENT_TIMESTAMP
+    ''', (
+        match['match_id'],
+        match.get('datetime'),
+        match.get('team1_id'),
+        match.get('team1_name'),
+        match.get('team1_rank'),
+        match.get('team2_id'),
+        match.get('team2_name'),
+        match.get('team2_rank'),
+        match.get('event_id'),
+        match.get('event_name'),
+        match.get('head_to_head_team1_wins'),
+        match.get('head_to_head_team2_wins'),
+        match.get('status', 'upcoming')
+    ))
+    if match.get(FINGERPRINT_FIELD):
+        # Отпечаток страницы фиксируется вместе с матчем: коллектор пропустит страницу, только если ее данные в базе
+        save_loaded_fingerprint(cursor, match['match_id'], match[FINGERPRINT_FIELD])
 
 def load_upcoming_matches_from_files(db_path):
     """
     Загружает предстоящие матчи из отдельных JSON-файлов в storage/json/upcoming_match/
     """
-    import glob
-    import json
-
     matches_json_dir = "storage/json/upcoming_match"
     if not os.path.exists(matches_json_dir):
         logger.info(f"Директория {matches_json_dir} не существует, пропускаем загрузку матчей", extra={"no_telegram": True})
         return {"processed": 0, "success": 0, "error": 0}
 
-    stats = {"processed": 0, "success": 0, "error": 0}
-    json_files = glob.glob(os.path.join(matches_json_dir, "*.json"))
-    logger.info(f"Найдено {len(json_files)} файлов с предстоящими матчами", extra={"no_telegram": True})
-
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-
-    for file_path in json_files:
-        try:
-            stats["processed"] += 1
-            with open(file_path, 'r', encoding='utf-8') as f:
-                match = json.load(f)
-            cursor.execute('''
-                INSERT OR REPLACE INTO upcoming_match (
-                    match_id, datetime, team1_id, team1_name, team1_rank,
-                    team2_id, team2_name, team2_rank, event_id, event_name,
-                    head_to_head_team1_wins, head_to_head_team2_wins, status, parsed, last_updated
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0, CURRENT_TIMESTAMP)
-            ''', (
-                match['match_id'],
-                match.get('datetime'),
-                match.get('team1_id'),
-                match.get('team1_name'),
-                match.get('team1_rank'),
-                match.get('team2_id'),
-                match.get('team2_name'),
-                match.get('team2_rank'),
-                match.get('event_id'),
-                match.get('event_name'),
-                match.get('head_to_head_team1_wins'),
-                match.get('head_to_head_team2_wins'),
-                match.get('status', 'upcoming')
-            ))
-            conn.commit()
-            stats["success"] += 1
-            logger.info(f"Загружен матч {match['match_id']}", extra={"no_telegram": True})
-            # Удаляем файл после успешной загрузки
-            os.remove(file_path)
-            logger.info(f"Файл {os.path.basename(file_path)} удален после загрузки", extra={"no_telegram": True})
-        except Exception as e:
-            logger.error(f"Ошибка при загрузке матча из {file_path}: {str(e)}", extra={"no_telegram": True})
-            stats["error"] += 1
-
-    conn.close()
-    return stats
+    return _load_stream(db_path, matches_json_dir, _write_upcoming_match)
 
 def cleanup_expired_upcoming_matches(db_path):
     """
@@ -223,7 +204,7 @@ def cleanup_expired_upcoming_matches(db_path):
     и связанные с ними записи из upcoming_match_players и upcoming_match_streamers
     Возвращает кортеж (кол-во матчей, кол-во игроков, кол-во стримов)
     """
-    conn = sqlite3.connect(db_path)
+    conn = connect(db_path)
     cursor = conn.cursor()
     now = int(time.time())
     two_hours_ago = now - 2 * 60 * 60
@@ -255,28 +236,43 @@ def cleanup_expired_upcoming_matches(db_path):
 
 def create_upcoming_match_streamers_table(db_path):
     """
-    Создает таблицу upcoming_match_streamers, если она не существует
+    Создает таблицу upcoming_match_streamers, если она не существует (схемой владеет src.db.migrations)
     """
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS upcoming_match_streamers (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                match_id INTEGER NOT NULL,
-                name TEXT,
-                lang TEXT,
-                url TEXT,
-                FOREIGN KEY (match_id) REFERENCES upcoming_urls (id)
-            )
-        ''')
-        conn.commit()
-        conn.close()
+        migrate(db_path)
         logger.info("Таблица upcoming_match_streamers успешно создана/проверена", extra={"no_telegram": True})
     except Exception as e:
         logger.error(f"Ошибка при создании таблицы upcoming_match_streamers: {str(e)}", extra={"no_telegram": True})
         raise
 
+def _write_upcoming_streamers(cursor, data):
+    """
+    Записывает стримеров одного предстоящего матча (файл или запись сегмента JSONL)
+    
+    Raises:
+        ValueError: Нет необходимых данных или матча нет в upcoming_urls
+    """
+    if 'match_id' not in data or 'streams' not in data:
+        raise ValueError("отсутствуют необходимые данные")
+    match_id = data['match_id']
+    cursor.execute('SELECT 1 FROM upcoming_urls WHERE id = ?', (match_id,))
+    if not cursor.fetchone():
+        raise ValueError(f"матч с ID {match_id} не найден в базе данных")
+    rows = [
+        (
+            match_id,
+            streamer.get('name'),
+            streamer.get('lang'),
+            # Стрим без ссылки - NULL в ключе, иначе все такие стримы матча слились бы в одну строку
+            streamer.get('url') or None
+        )
+        for streamer in data['streams']
+    ]
+    prune_match_rows(cursor, 'upcoming_match_streamers', match_id, [row[3] for row in rows])
+    if rows:
+        cursor.executemany(upsert_sql('upcoming_match_streamers', UPCOMING_STREAMERS_COLUMNS), rows)
+    return match_id
+
 def load_upcoming_streamers(db_path):
     """
     Загружает список стримеров предстоящих матчей из JSON в базу данных
@@ -286,57 +282,14 @@ def load_upcoming_streamers(db_path):
         if not os.path.exists(streamers_json_dir):
             logger.info(f"Директория {streamers_json_dir} не существует, пропускаем загрузку стримеров", extra={"no_telegram": True})
             return {"processed": 0, "success": 0, "error": 0}
-        import json
-        import glob
-        stats = {"processed": 0, "success": 0, "error": 0}
-        json_files = glob.glob(os.path.join(streamers_json_dir, "*.json"))
-        logger.info(f"Найдено {len(json_files)} файлов со стримерами предстоящих матчей", extra={"no_telegram": True})
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        for file_path in json_files:
-            try:
-                stats["processed"] += 1
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                if 'match_id' not in data or 'streams' not in data:
-                    logger.warning(f"В файле {file_path} отсутствуют необходимые данные", extra={"no_telegram": True})
-                    stats["error"] += 1
-                    continue
-                match_id = data['match_id']
-                cursor.execute('SELECT 1 FROM upcoming_urls WHERE id = ?', (match_id,))
-                if not cursor.fetchone():
-                    logger.warning(f"Матч с ID {match_id} не найден в базе данных, пропускаем", extra={"no_telegram": True})
-                    stats["error"] += 1
-                    continue
-                cursor.execute('DELETE FROM upcoming_match_streamers WHERE match_id = ?', (match_id,))
-                for streamer in data['streams']:
-                    cursor.execute('''
-                        INSERT INTO upcoming_match_streamers (
-                            match_id, name, lang, url
-                        ) VALUES (?, ?, ?, ?)
-                    ''', (
-                        match_id,
-                        streamer.get('name'),
-                        streamer.get('lang'),
-                        streamer.get('url')
-                    ))
-                conn.commit()
-                stats["success"] += 1
-                logger.info(f"Загружены стримеры для матча {match_id}", extra={"no_telegram": True})
-                os.remove(file_path)
-                logger.info(f"Файл {os.path.basename(file_path)} удален после обработки", extra={"no_telegram": True})
-            except Exception as e:
-                logger.error(f"Ошибка при загрузке стримеров матча из {file_path}: {str(e)}", extra={"no_telegram": True})
-                stats["error"] += 1
-        conn.close()
-        return stats
+        return _load_stream(db_path, streamers_json_dir, _write_upcoming_streamers)
     except Exception as e:
         logger.error(f"Ошибка при загрузке стримеров предстоящих матчей: {str(e)}", extra={"no_telegram": True})
-        return {"processed": 0, "success": 0, "error": len(json_files) if 'json_files' in locals() else 0}
+        return {"processed": 0, "success": 0, "error": 0}
 
 def update_upcoming_urls_to_parse(db_path):
     import math
-    conn = sqlite3.connect(db_path)
+    conn = connect(db_path)
     cursor = conn.cursor()
     now = int(time.time())
     three_days_sec = 3 * 24 * 3600
@@ -395,10 +348,11 @@ def main():
     try:
         logger.info("Загрузка БУДУЩИХ матчей", extra={"telegram_firstline": True})
         logger.info("Начало загрузки предстоящих матчей из JSON в базу данных", extra={"no_telegram": True})
+        # Создаем таблицы игроков и стримеров предстоящих матчей (и их уникальные индексы)
+        create_upcoming_match_players_table(args.db_path)
+        create_upcoming_match_streamers_table(args.db_path)
         # Удаляем устаревшие матчи и игроков
         deleted_matches, deleted_players, deleted_streams = cleanup_expired_upcoming_matches(args.db_path)
-        # Создаем таблицу для игроков предстоящих матчей
-        create_upcoming_match_players_table(args.db_path)
         # Загружаем предстоящие матчи из отдельных файлов
         matches_stats = load_upcoming_matches_from_files(args.db_path)
         # После загрузки матчей обновляем toParse в upcoming_urls
@@ -1,76 +1,215 @@
 import os
-import json
-from bs4 import BeautifulSoup
+import argparse
+from src.utils.page_archive import KIND_PLAYER, get_archive, read_page
+from src.config import JSONL_INTERMEDIATE_ENABLED, PLAYERS_DIRECT_TO_DB, PLAYERS_DB_BATCH_SIZE
+from src.utils import json_io
+from src.utils.jsonl_segments import append_record, commit_all
+from src.collector.html_backend import CompiledSelector, parse_html, resolve_backend
+from src.collector.parallel import iter_process_results
+from src.db.connection import PROFILE_BULK_LOAD, connect
+from src.scripts.load_players_json_to_db import DB_PATH, write_player
 
 HTML_DIR = 'storage/html/player'
 JSON_DIR = 'storage/json/player'
 os.makedirs(JSON_DIR, exist_ok=True)
 
-# Функция для парсинга одного HTML профиля игрока
-def parse_player_html(html, player_id):
-    soup = BeautifulSoup(html, "html.parser")
-    def safe_text(sel, attr=None):
-        el = soup.select_one(sel)
-        if not el:
-            return None
-        if attr:
-            return el.get(attr)
-        return el.text.strip()
-    def safe_num(sel, attr=None, cast=int):
-        val = safe_text(sel, attr)
-        if val is None:
-            return None
-        try:
-            return cast(''.join(c for c in val if c.isdigit() or c in '.,' or c == '-').replace(',', '.'))
-        except Exception:
-            return None
-    data = {
-        "player_id": int(player_id),
-        # player_nickname не трогаем, он уже есть в базе
-        "country": safe_text('img.flag', 'title'),
-        "real_name": safe_text('.playerRealname'),
-        "age": safe_num('.playerAge span[itemprop="text"]'),
-        "current_team": safe_text('.playerTeam a'),
-        "prize_money": safe_num('.playerPrizeMoney .listRight', cast=float),
-        "maps_past3": safe_num('.stats-matches .stats-window'),
-        "rating_2_1": safe_num('.playerpage-container-attributes .player-stat:nth-child(1) .statsVal p', cast=float),
-        "firepower": safe_num('.playerpage-container-attributes .player-stat:nth-child(2) .statsVal b', cast=float),
-        "entrying": safe_num('.playerpage-container-attributes .player-stat:nth-child(3) .statsVal b', cast=float),
-        "trading": safe_num('.playerpage-container-attributes .player-stat:nth-child(4) .statsVal b', cast=float),
-        "opening": safe_num('.playerpage-container-attributes .player-stat:nth-child(5) .statsVal b', cast=float),
-        "clutching": safe_num('.playerpage-container-attributes .player-stat:nth-child(6) .statsVal b', cast=float),
-        "sniping": safe_num('.playerpage-container-attributes .player-stat:nth-child(7) .statsVal b', cast=float),
-        "utility": safe_num('.playerpage-container-attributes .player-stat:nth-child(8) .statsVal b', cast=float),
-        "teams_count": safe_num('#teamsBox .highlighted-stat:nth-child(1) .stat'),
-        "days_in_current_team": safe_num('#teamsBox .highlighted-stat:nth-child(2) .stat'),
-        "days_in_teams": safe_num('#teamsBox .highlighted-stat:nth-child(3) .stat'),
-        "majors_played": safe_num('#achievementBox #majorAchievement .highlighted-stat:nth-child(2) .stat'),
-        "majors_won": safe_num('#achievementBox #majorAchievement .highlighted-stat:nth-child(1) .stat'),
-        "lans_played": safe_num('#lanAchievement .highlighted-stat:nth-child(2) .stat'),
-        "lans_won": safe_num('#lanAchievement .highlighted-stat:nth-child(1) .stat'),
-        "faceit_url": (soup.select_one('.socialMediaButtons a[href*="faceit.com"]').get('href') if soup.select_one('.socialMediaButtons a[href*="faceit.com"]') else None),
-        "faceit_matches": safe_num('#faceitBox .all-time-stat:nth-child(1) .stat'),
-        "faceit_winrate": safe_num('#faceitBox .all-time-stat:nth-child(2) .stat', cast=float),
-        "faceit_winstreak": safe_num('#faceitBox .all-time-stat:nth-child(3) .stat'),
-        "faceit_avgkdr": safe_num('#faceitBox .all-time-stat:nth-child(4) .stat', cast=float),
-        "faceit_headshots": safe_num('#faceitBox .all-time-stat:nth-child(5) .stat', cast=float),
-    }
-    return data
-
-def main():
-    for filename in os.listdir(HTML_DIR):
-        if not filename.endswith('.html'):
-            continue
-        player_id = filename.replace('.html', '')
-        html_path = os.path.join(HTML_DIR, filename)
-        with open(html_path, 'r', encoding='utf-8') as f:
-            html = f.read()
-        data = parse_player_html(html, player_id)
-        json_path = os.path.join(JSON_DIR, f"{player_id}.json")
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        print(f"[OK] Parsed {player_id}")
+# Области профиля: (ключ, простой селектор или None для всего документа).
+# Все вхождения области находятся один раз, поля ищутся только внутри них
+PLAYER_SCOPES = (
+    ('document', None),
+    ('attributes', '.playerpage-container-attributes'),
+    ('teams', '#teamsBox'),
+    ('achievements', '#achievementBox'),
+    ('lans', '#lanAchievement'),
+    ('faceit', '#faceitBox'),
+    ('social', '.socialMediaButtons'),
+)
+
+# Поля профиля: (поле, область, селектор внутри области, атрибут или None для текста,
+# числовой тип или None для строки). Поле ищется селектором "<область> <селектор>"
+# во всех вхождениях области в порядке документа и берется первое найденное - так же,
+# как select_one() этого селектора по всему документу
+PLAYER_FIELDS = (
+    # player_nickname не трогаем, он уже есть в базе
+    ('country', 'document', 'img.flag', 'title', None),
+    ('real_name', 'document', '.playerRealname', None, None),
+    ('age', 'document', '.playerAge span[itemprop="text"]', None, int),
+    ('current_team', 'document', '.playerTeam a', None, None),
+    ('prize_money', 'document', '.playerPrizeMoney .listRight', None, float),
+    ('maps_past3', 'document', '.stats-matches .stats-window', None, int),
+    ('rating_2_1', 'attributes', '.player-stat:nth-child(1) .statsVal p', None, float),
+    ('firepower', 'attributes', '.player-stat:nth-child(2) .statsVal b', None, float),
+    ('entrying', 'attributes', '.player-stat:nth-child(3) .statsVal b', None, float),
+    ('trading', 'attributes', '.player-stat:nth-child(4) .statsVal b', None, float),
+    ('opening', 'attributes', '.player-stat:nth-child(5) .statsVal b', None, float),
+    ('clutching', 'attributes', '.player-stat:nth-child(6) .statsVal b', None, float),
+    ('sniping', 'attributes', '.player-stat:nth-child(7) .statsVal b', None, float),
+    ('utility', 'attributes', '.player-stat:nth-child(8) .statsVal b', None, float),
+    ('teams_count', 'teams', '.highlighted-stat:nth-child(1) .stat', None, int),
+    ('days_in_current_team', 'teams', '.highlighted-stat:nth-child(2) .stat', None, int),
+    ('days_in_teams', 'teams', '.highlighted-stat:nth-child(3) .stat', None, int),
+    ('majors_played', 'achievements', '#majorAchievement .highlighted-stat:nth-child(2) .stat', None, int),
+    ('majors_won', 'achievements', '#majorAchievement .highlighted-stat:nth-child(1) .stat', None, int),
+    ('lans_played', 'lans', '.highlighted-stat:nth-child(2) .stat', None, int),
+    ('lans_won', 'lans', '.highlighted-stat:nth-child(1) .stat', None, int),
+    ('faceit_url', 'social', 'a[href*="faceit.com"]', 'href', None),
+    ('faceit_matches', 'faceit', '.all-time-stat:nth-child(1) .stat', None, int),
+    ('faceit_winrate', 'faceit', '.all-time-stat:nth-child(2) .stat', None, float),
+    ('faceit_winstreak', 'faceit', '.all-time-stat:nth-child(3) .stat', None, int),
+    ('faceit_avgkdr', 'faceit', '.all-time-stat:nth-child(4) .stat', None, float),
+    ('faceit_headshots', 'faceit', '.all-time-stat:nth-child(5) .stat', None, float),
+)
+
+
+def _to_number(value, cast):
+    if value is None:
+        return None
+    try:
+        return cast(''.join(c for c in value if c.isdigit() or c in '.,' or c == '-').replace(',', '.'))
+    except Exception:
+        return None
+
+
+class PlayerProfilePlan:
+    """
+    Таблица полей профиля, скомпилированная для бэкенда разбора
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        scope_selectors = dict(PLAYER_SCOPES)
+        self._scopes = [(key, CompiledSelector(selector, backend) if selector else None) for key, selector in PLAYER_SCOPES]
+        self._fields = []
+        for field, scope, selector, attr, cast in PLAYER_FIELDS:
+            # Селектор целиком, вместе с областью: поиск внутри области совпадает с поиском по документу
+            if scope_selectors[scope]:
+                selector = f"{scope_selectors[scope]} {selector}"
+            self._fields.append((field, scope, CompiledSelector(selector, backend), attr, cast))
+
+    def extract(self, soup, player_id):
+        scopes = {}
+        for key, compiled in self._scopes:
+            scopes[key] = [soup] if compiled is None else compiled.select(soup)
+        data = {"player_id": int(player_id)}
+        for field, scope, compiled, attr, cast in self._fields:
+            el = None
+            for root in scopes[scope]:
+                el = compiled.select_one(root)
+                if el is not None:
+                    break
+            if el is None:
+                value = None
+            elif attr:
+                value = el.get(attr)
+            else:
+                value = el.text.strip()
+            data[field] = _to_number(value, cast) if cast else value
+        return data
+
+
+# Планы текущего процесса по бэкендам
+_plans = {}
+
+
+def parse_player_html(html, player_id, backend=None):
+    """
+    Разбирает HTML профиля игрока по таблице PLAYER_FIELDS
+
+    Args:
+        html (str): HTML профиля
+        player_id: ID игрока (из имени файла)
+        backend (str, optional): Бэкенд разбора HTML (по умолчанию из конфига)
+
+    Returns:
+        dict: Поля профиля для таблицы players
+    """
+    backend = resolve_backend(backend)
+    plan = _plans.get(backend)
+    if plan is None:
+        plan = _plans[backend] = PlayerProfilePlan(backend)
+    return plan.extract(parse_html(html, backend), player_id)
+
+
+class PlayerProfileParser:
+    """
+    Разбор файлов профилей для пула процессов (см. src.collector.parallel)
+    """
+
+    def __init__(self, parser_backend=None):
+        self.parser_backend = resolve_backend(parser_backend)
+        # Аргументы для создания такого же парсера в процессе пула
+        self.init_kwargs = {'parser_backend': self.parser_backend}
+
+    def parse_file(self, html_path):
+        player_id = os.path.basename(html_path).replace('.html', '')
+        html = read_page(html_path, KIND_PLAYER)
+        return "success", parse_player_html(html, player_id, self.parser_backend)
+
+
+def _remove_html(html_path):
+    if os.path.exists(html_path):
         os.remove(html_path)
 
+
+def _write_batch(conn, batch):
+    """Записывает пачку профилей одной транзакцией и удаляет их HTML после фиксации"""
+    cursor = conn.cursor()
+    for html_path, data in batch:
+        write_player(cursor, data)
+    conn.commit()
+    for html_path, data in batch:
+        _remove_html(html_path)
+    batch.clear()
+
+
+def main(from_archive=False, direct_db=None, workers=None, db_path=DB_PATH):
+    if direct_db is None:
+        direct_db = PLAYERS_DIRECT_TO_DB
+    filenames = [f for f in os.listdir(HTML_DIR) if f.endswith('.html')]
+    # --from-archive: повторно разобрать все профили из архива страниц
+    archive = get_archive() if from_archive else None
+    if archive:
+        on_disk = set(filenames)
+        filenames += [f for f in archive.list_files(KIND_PLAYER) if f not in on_disk]
+    paths = [os.path.join(HTML_DIR, filename) for filename in filenames]
+
+    # Профили разбираются в пуле процессов, запись идет в основном процессе
+    parser = PlayerProfileParser()
+    conn = connect(db_path, PROFILE_BULK_LOAD) if direct_db else None
+    batch = []
+    errors = 0
+    try:
+        for html_path, (status, data) in iter_process_results(parser, paths, workers, method="parse_file",
+                                                             error_result=("error", None)):
+            if status != "success":
+                print(f"[ERR] Failed to parse {html_path}")
+                errors += 1
+                continue
+            if direct_db:
+                batch.append((html_path, data))
+                if len(batch) >= PLAYERS_DB_BATCH_SIZE:
+                    _write_batch(conn, batch)
+            else:
+                if JSONL_INTERMEDIATE_ENABLED:
+                    append_record(JSON_DIR, data)
+                else:
+                    json_path = os.path.join(JSON_DIR, f"{data['player_id']}.json")
+                    json_io.save_file(json_path, data)
+                _remove_html(html_path)
+            print(f"[OK] Parsed {data['player_id']}")
+        if batch:
+            _write_batch(conn, batch)
+    finally:
+        if conn is not None:
+            conn.close()
+        commit_all()
+    print(f"Разбор профилей завершен. Всего: {len(paths)}, ошибок: {errors}")
+
 if __name__ == '__main__':
-    main() 
\ No newline at end of file
+    arg_parser = argparse.ArgumentParser(description='Разбор HTML профилей игроков')
+    arg_parser.add_argument('--from-archive', action='store_true', help='Повторно разобрать все профили из архива страниц')
+    arg_parser.add_argument('--direct-db', action='store_true', default=None,
+                            help='Писать профили сразу в таблицу players (без JSON и load_players_json_to_db)')
+    arg_parser.add_argument('--workers', type=int, default=None, help='Количество процессов (0 - по числу ядер, 1 - последовательно)')
+    args = arg_parser.parse_args()
+    main(from_archive=args.from_archive, direct_db=args.direct_db, workers=args.workers)
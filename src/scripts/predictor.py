@@ -1,7 +1,9 @@
 import os
 import sys
-import json
-import sqlite3
+from src.utils import json_io
+from src.db.connection import connect
+from src.db.migrations import migrate
+from src.db.natural_keys import upsert_sql
 import pandas as pd
 import numpy as np
 from datetime import datetime
@@ -22,6 +24,8 @@ FEATURES_DIR = 'storage/json/predict_features'
 LOG_PATH = 'logs/predict.log'
 MODEL_PATH = 'storage/model_predictor.pkl'
 MODEL_VERSION = 'v1.0'
+PREDICT_MAP_COLUMNS = ('match_id', 'map_name', 'team1_score', 'team2_score', 'team1_score_final',
+                       'team2_score_final', 'model_version', 'last_updated')
 
 os.makedirs(FEATURES_DIR, exist_ok=True)
 os.makedirs('logs', exist_ok=True)
@@ -31,14 +35,13 @@ logger.add(LOG_PATH, rotation="1 week", retention="4 weeks")
 
 # --- Вспомогательные функции ---
 def fetch_df(query, db_path=DB_PATH):
-    with sqlite3.connect(db_path) as conn:
+    with connect(db_path) as conn:
         return pd.read_sql_query(query, conn)
 
 def save_features_json(match_id, features, map_name=None):
     fname = f"{match_id}.json" if map_name is None else f"{match_id}_{map_name}.json"
     path = os.path.join(FEATURES_DIR, fname)
-    with open(path, 'w', encoding='utf-8') as f:
-        json.dump(features, f, ensure_ascii=False, indent=2)
+    json_io.save_file(path, features)
 
 def save_model(model, path=MODEL_PATH):
     joblib.dump(model, path)
@@ -148,8 +151,7 @@ class Predictor:
         save_model(self.model)
         # Сохраняем список признаков
         feature_list = list(X.columns)
-        with open('storage/model_features.json', 'w') as f:
-            json.dump(feature_list, f)
+        json_io.save_file('storage/model_features.json', feature_list)
         logger.info('Модель и признаки сохранены.')
 
     def postprocess_score(self, score, max_score):
@@ -210,13 +212,13 @@ class Predictor:
 
     def predict_upcoming(self):
         logger.info('Прогноз для будущих матчей...')
+        migrate(self.db_path)
         self.load_data()
         self.feature_engineering(for_train=False)
         # Загружаем список признаков
-        with open('storage/model_features.json') as f:
-            feature_list = json.load(f)
+        feature_list = json_io.load_file('storage/model_features.json')
         # Для simplicity: прогнозируем только для матчей, которых нет в predict
-        with sqlite3.connect(self.db_path) as conn:
+        with connect(self.db_path) as conn:
             existing = pd.read_sql_query('SELECT match_id FROM predict', conn)
         to_predict = self.upcoming_features[~self.upcoming_features['match_id'].isin(existing['match_id'])]
         results = []
@@ -231,7 +233,7 @@ class Predictor:
             team2_score = float(self.model[1].predict(feats)[0])
             team1_score_final, team2_score_final = self.postprocess_bo3(team1_score, team2_score)
             save_features_json(match_id, feats.iloc[0].to_dict())
-            with sqlite3.connect(self.db_path) as conn:
+            with connect(self.db_path) as conn:
                 conn.execute('''INSERT INTO predict (match_id, team1_score, team2_score, team1_score_final, team2_score_final, model_version, last_updated) VALUES (?, ?, ?, ?, ?, ?, ?)''',
                              (match_id, team1_score, team2_score, team1_score_final, team2_score_final, self.model_version, datetime.now().isoformat()))
                 conn.commit()
@@ -239,7 +241,7 @@ class Predictor:
         logger.info(f'Сделано прогнозов: {len(results)}')
         # Прогноз по картам (перезаписываем старые значения)
         map_names = ['Nuke', 'Mirage', 'Inferno', 'Ancient', 'Anubis', 'Vertigo', 'Overpass', 'Dust2']
-        with sqlite3.connect(self.db_path) as conn:
+        with connect(self.db_path) as conn:
             for _, match in self.upcoming.iterrows():
                 match_id = match['match_id']
                 t1_players = self.upcoming_players[(self.upcoming_players['match_id'] == match_id) & (self.upcoming_players['team_id'] == match['team1_id'])]['player_id'].tolist()
@@ -260,9 +262,8 @@ class Predictor:
                     team2_score = float(self.model[1].predict(feats_df)[0])
                     team1_score_final, team2_score_final = self.postprocess_map_score(team1_score, team2_score, max_score=13)
                     save_features_json(f"{match_id}_{map_name}", feats_df.iloc[0].to_dict(), map_name=map_name)
-                    # Удаляем старый прогноз для этой пары (match_id, map_name)
-                    conn.execute('DELETE FROM predict_map WHERE match_id = ? AND map_name = ?', (match_id, map_name))
-                    conn.execute('''INSERT INTO predict_map (match_id, map_name, team1_score, team2_score, team1_score_final, team2_score_final, model_version, last_updated) VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+                    # Прогноз для пары (match_id, map_name) перезаписывается на месте
+                    conn.execute(upsert_sql('predict_map', PREDICT_MAP_COLUMNS),
                                  (match_id, map_name, team1_score, team2_score, team1_score_final, team2_score_final, self.model_version, datetime.now().isoformat()))
             conn.commit()
         logger.info(f'Сделано прогнозов по картам для всех матчей.')
@@ -3,11 +3,12 @@ Helper utility functions for HLTV Parser
 """
 import os
 import re
-import json
 import logging
 from datetime import datetime
 from typing import Dict, Any, Optional, Union
 
+from src.utils import json_io
+
 logger = logging.getLogger(__name__)
 
 def ensure_dir_exists(directory: str) -> None:
@@ -34,8 +35,7 @@ def save_to_json(data: Any, filepath: str) -> bool:
     """
     try:
         ensure_dir_exists(os.path.dirname(filepath))
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        json_io.save_file(filepath, data, indent=2)
         return True
     except Exception as e:
         logger.error(f"Error saving JSON file {filepath}: {e}")
@@ -56,8 +56,7 @@ def load_from_json(filepath: str) -> Optional[Any]:
             logger.warning(f"File doesn't exist: {filepath}")
             return None
             
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return json_io.load_file(filepath)
     except Exception as e:
         logger.error(f"Error loading JSON file {filepath}: {e}")
         return None
@@ -0,0 +1,128 @@
+"""
+Единый слой сериализации JSON
+
+Все чтение и запись JSON в конвейере идет через этот модуль. Если установлен
+orjson, используется он (в разы быстрее стандартного json на кодировании и
+разборе), иначе стандартный json с теми же параметрами. Значения, которые orjson
+не кодирует (например, целые больше 64 бит), кодируются стандартным json.
+
+Служебные файлы (промежуточные данные коллекторов, состояние live-парсера,
+признаки предиктора) пишутся компактно, без отступов, если не включен
+JSON_PRETTY_MACHINE_FILES. Файлы, которые правят руками (конфиги ботов),
+передают indent явно.
+
+Ключи словаря не строки (int) приводятся к строкам, как в json, а numpy-значения
+кодируются как числа. NaN и Infinity orjson пишет как null (стандартный json -
+как невалидный для других разборщиков NaN). Такие значения в уже записанных
+файлах orjson не разбирает, поэтому при ошибке разбора данные разбираются
+стандартным json.
+"""
+import json
+
+from src.config import JSON_PRETTY_MACHINE_FILES
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Отступ служебных файлов
+MACHINE_INDENT = 2 if JSON_PRETTY_MACHINE_FILES else None
+
+# Ошибка разбора (orjson.JSONDecodeError - ее подкласс)
+JSONDecodeError = json.JSONDecodeError
+
+if orjson is not None:
+    _BASE_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def backend_name():
+    """Имя используемой библиотеки"""
+    return "orjson" if orjson is not None else "json"
+
+
+def dumpb(data, indent=None, sort_keys=False):
+    """
+    Кодирует данные в JSON
+
+    Args:
+        data: Данные
+        indent (int, optional): Отступ; None - компактно
+        sort_keys (bool): Сортировать ключи
+
+    Returns:
+        bytes: JSON в UTF-8
+    """
+    # orjson умеет только отступ 2
+    if orjson is not None and indent in (None, 2):
+        options = _BASE_OPTIONS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        if sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(data, option=options)
+        except orjson.JSONEncodeError:
+            pass
+    separators = None if indent else (',', ':')
+    return json.dumps(data, ensure_ascii=False, indent=indent, sort_keys=sort_keys,
+                      separators=separators).encode("utf-8")
+
+
+def dumps(data, indent=None, sort_keys=False):
+    """
+    Кодирует данные в строку JSON (параметры как у dumpb)
+
+    Returns:
+        str: JSON
+    """
+    return dumpb(data, indent, sort_keys).decode("utf-8")
+
+
+def loads(data):
+    """
+    Разбирает JSON
+
+    Args:
+        data (str | bytes): JSON
+
+    Returns:
+        Разобранные данные
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # NaN и Infinity из файлов, записанных стандартным json; невалидный JSON
+            # стандартный json тоже не разберет и выбросит JSONDecodeError
+            pass
+    return json.loads(data)
+
+
+def load_file(path):
+    """
+    Читает JSON-файл
+
+    Args:
+        path (str): Путь к файлу
+
+    Returns:
+        Разобранные данные
+    """
+    with open(path, "rb") as f:
+        return loads(f.read())
+
+
+def save_file(path, data, indent=MACHINE_INDENT, sort_keys=False):
+    """
+    Записывает данные в JSON-файл
+
+    Args:
+        path (str): Путь к файлу
+        data: Данные
+        indent (int, optional): Отступ; по умолчанию - как у служебных файлов
+        sort_keys (bool): Сортировать ключи
+    """
+    payload = dumpb(data, indent, sort_keys)
+    with open(path, "wb") as f:
+        f.write(payload)
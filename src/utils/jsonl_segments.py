@@ -0,0 +1,225 @@
+"""
+Пакетный промежуточный формат JSONL
+
+Коллекторы раньше писали по отдельному JSON-файлу на матч или игрока, а загрузчики
+перебирали директории через glob, и на больших загрузках основное время уходило на
+создание, открытие и удаление тысяч мелких файлов. Теперь записи одного вида
+(поток - директория storage/json/<вид>) дописываются построчно в сегменты:
+
+    <время в нс>-<pid>-<номер>.jsonl[.gz].open  - сегмент, в который идет запись
+    <время в нс>-<pid>-<номер>.jsonl[.gz]       - зафиксированный сегмент
+
+Сегмент фиксируется атомарным переименованием при ротации (JSONL_SEGMENT_MAX_RECORDS
+записей) и при завершении процесса. Загрузчики читают только зафиксированные
+сегменты, потоково, и удаляют сегмент после обработки всех его записей. Сегменты
+.open, которые не менялись дольше JSONL_STALE_SEGMENT_SECONDS (процесс упал),
+фиксируются при чтении; оборванная последняя строка пропускается.
+"""
+import os
+import gzip
+import glob
+import time
+import atexit
+import logging
+import multiprocessing.util
+
+from src.config import JSONL_SEGMENT_MAX_RECORDS, JSONL_COMPRESS, JSONL_STALE_SEGMENT_SECONDS
+from src.utils import json_io
+
+logger = logging.getLogger(__name__)
+
+OPEN_SUFFIX = ".open"
+
+
+class SegmentWriter:
+    """
+    Запись потока в сегменты JSONL одного процесса
+    """
+
+    def __init__(self, stream_dir, max_records=JSONL_SEGMENT_MAX_RECORDS, compress=JSONL_COMPRESS):
+        """
+        Args:
+            stream_dir (str): Директория потока
+            max_records (int): Записей в сегменте до ротации
+            compress (bool): Сжимать сегменты gzip
+        """
+        self.stream_dir = stream_dir
+        self.max_records = max_records
+        self.compress = compress
+        self._file = None
+        self._path = None
+        self._records = 0
+        self._seq = 0
+
+    def _open(self):
+        os.makedirs(self.stream_dir, exist_ok=True)
+        self._seq += 1
+        ext = ".jsonl.gz" if self.compress else ".jsonl"
+        name = f"{time.time_ns()}-{os.getpid()}-{self._seq:04d}{ext}"
+        self._path = os.path.join(self.stream_dir, name + OPEN_SUFFIX)
+        if self.compress:
+            self._file = gzip.open(self._path, "at", encoding="utf-8", compresslevel=6)
+        else:
+            self._file = open(self._path, "a", encoding="utf-8")
+        self._records = 0
+
+    def append(self, record):
+        """
+        Дописывает запись в текущий сегмент
+
+        Args:
+            record (dict): JSON-сериализуемая запись
+        """
+        if self._file is None:
+            self._open()
+        self._file.write(json_io.dumps(record) + "\n")
+        # Запись сбрасывается в ОС сразу: HTML-страница удаляется после сохранения данных
+        self._file.flush()
+        self._records += 1
+        if self._records >= self.max_records:
+            self.commit()
+
+    def commit(self):
+        """Фиксирует текущий сегмент (пустой сегмент удаляется)"""
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        if self._records:
+            os.replace(self._path, self._path[:-len(OPEN_SUFFIX)])
+        else:
+            os.remove(self._path)
+        self._path = None
+
+
+# Писатели текущего процесса по директориям потоков
+_writers = {}
+# Процесс, которому принадлежат _writers и для которого зарегистрирована фиксация при завершении
+_writers_pid = None
+# Писатели, унаследованные процессом пула при fork. Их сегменты пишет и фиксирует родитель,
+# поэтому здесь они не используются и не закрываются (закрытие gzip дописало бы в чужой файл)
+_inherited_writers = []
+
+
+def append_record(stream_dir, record):
+    """
+    Дописывает запись в поток общим писателем процесса
+
+    Сегменты фиксируются при ротации, в commit_all() и при завершении процесса,
+    в том числе процесса пула ProcessPoolExecutor. Процесс, созданный fork, не
+    продолжает сегменты родителя: первая запись открывает его собственные.
+
+    Args:
+        stream_dir (str): Директория потока
+        record (dict): Запись
+    """
+    global _writers, _writers_pid
+    if _writers_pid != os.getpid():
+        if _writers:
+            _inherited_writers.append(_writers)
+            _writers = {}
+        # Finalize срабатывает при штатном завершении процессов multiprocessing, atexit - в основном процессе.
+        # Реестр Finalize в процессе пула очищается, поэтому регистрация - в каждом процессе
+        multiprocessing.util.Finalize(None, commit_all, exitpriority=10)
+        atexit.register(commit_all)
+        _writers_pid = os.getpid()
+    writer = _writers.get(stream_dir)
+    if writer is None:
+        writer = _writers[stream_dir] = SegmentWriter(stream_dir)
+    writer.append(record)
+
+
+def commit_all():
+    """Фиксирует открытые сегменты всех потоков текущего процесса"""
+    if _writers_pid != os.getpid():
+        # Писатели унаследованы от родителя (или записей еще не было): фиксировать нечего
+        return
+    for writer in _writers.values():
+        try:
+            writer.commit()
+        except Exception as e:
+            logger.error(f"Ошибка при фиксации сегмента потока {writer.stream_dir}: {str(e)}")
+
+
+def _commit_stale(stream_dir):
+    """Фиксирует брошенные сегменты процессов, завершившихся без фиксации"""
+    deadline = time.time() - JSONL_STALE_SEGMENT_SECONDS
+    for path in glob.glob(os.path.join(stream_dir, "*" + OPEN_SUFFIX)):
+        try:
+            if os.path.getmtime(path) < deadline:
+                os.replace(path, path[:-len(OPEN_SUFFIX)])
+                logger.warning(f"Зафиксирован брошенный сегмент {os.path.basename(path)}")
+        except OSError as e:
+            logger.warning(f"Не удалось зафиксировать сегмент {path}: {str(e)}")
+
+
+def committed_segments(stream_dir):
+    """
+    Зафиксированные сегменты потока в порядке записи
+
+    Returns:
+        list: Пути к сегментам
+    """
+    if not os.path.isdir(stream_dir):
+        return []
+    _commit_stale(stream_dir)
+    segments = glob.glob(os.path.join(stream_dir, "*.jsonl")) + glob.glob(os.path.join(stream_dir, "*.jsonl.gz"))
+    return sorted(segments, key=os.path.basename)
+
+
+def read_segment(path):
+    """
+    Читает записи сегмента потоково
+
+    Args:
+        path (str): Путь к сегменту
+
+    Yields:
+        dict: Записи; оборванная последняя строка (или сжатый поток) пропускается
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        try:
+            for line in f:
+                if not line.endswith("\n"):
+                    logger.warning(f"Оборванная запись в конце сегмента {os.path.basename(path)} пропущена")
+                    break
+                yield json_io.loads(line)
+        except (EOFError, gzip.BadGzipFile):
+            logger.warning(f"Сегмент {os.path.basename(path)} оборван, прочитаны записи до обрыва")
+
+
+def consume_stream(stream_dir, handler):
+    """
+    Обрабатывает все записи потока и удаляет обработанные сегменты
+
+    Записи, на которых handler упал, переносятся в новый сегмент и будут
+    обработаны при следующем запуске (как раньше оставался необработанный файл).
+
+    Args:
+        stream_dir (str): Директория потока
+        handler (callable): Функция записи; исключение означает ошибку загрузки
+
+    Returns:
+        dict: processed, success, error
+    """
+    stats = {"processed": 0, "success": 0, "error": 0}
+    segments = committed_segments(stream_dir)
+    if not segments:
+        return stats
+    logger.info(f"Найдено {len(segments)} сегментов в {stream_dir}")
+
+    retry = SegmentWriter(stream_dir)
+    for segment in segments:
+        for record in read_segment(segment):
+            stats["processed"] += 1
+            try:
+                handler(record)
+                stats["success"] += 1
+            except Exception as e:
+                logger.error(f"Ошибка при загрузке записи из {os.path.basename(segment)}: {str(e)}")
+                stats["error"] += 1
+                retry.append(record)
+        retry.commit()
+        os.remove(segment)
+    return stats
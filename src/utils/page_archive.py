@@ -0,0 +1,328 @@
+"""
+Архив скачанных HTML-страниц
+
+Страницы хранятся сжатыми (zstd или gzip) и адресуются по SHA-256 содержимого,
+поэтому одинаковые повторные загрузки занимают место один раз. Небольшой индекс
+(kind, match_id, file_name, hash, fetched_at) позволяет найти последнюю версию
+страницы и перечитать историю без повторного скачивания.
+
+Страницы предстоящих матчей перекачиваются, пока меняются, поэтому для каждой
+страницы хранятся только PAGE_ARCHIVE_KEEP_VERSIONS последних версий: при
+сохранении новой версии старые записи индекса удаляются, а объекты, на которые
+больше никто не ссылается, удаляются с диска.
+"""
+import os
+import gzip
+import hashlib
+import logging
+from datetime import datetime
+from typing import List, Optional
+
+from src.config.constants import (
+    PAGE_ARCHIVE_DIR, PAGE_ARCHIVE_COMPRESSION, PAGE_ARCHIVE_ENABLED, PAGE_ARCHIVE_KEEP_VERSIONS
+)
+from src.db.connection import connect
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Виды страниц совпадают с подкаталогами storage/html
+KIND_RESULT = "result"
+KIND_UPCOMING = "upcoming"
+KIND_PLAYER = "player"
+
+
+class PageArchive:
+    """
+    Content-addressed архив страниц с индексом в SQLite
+    """
+
+    def __init__(self, root: str = PAGE_ARCHIVE_DIR, compression: str = PAGE_ARCHIVE_COMPRESSION,
+                 keep_versions: int = PAGE_ARCHIVE_KEEP_VERSIONS):
+        """
+        Инициализация архива
+
+        Args:
+            root (str): Корневая директория архива
+            compression (str): "zstd" или "gzip"; zstd используется только при установленном zstandard
+            keep_versions (int): Сколько последних версий каждой страницы хранить (0 - все)
+        """
+        self.root = root
+        self.keep_versions = keep_versions
+        self.objects_dir = os.path.join(root, "objects")
+        self.index_path = os.path.join(root, "index.db")
+        if compression == "zstd" and zstandard is None:
+            compression = "gzip"
+        self.compression = compression
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self._create_index()
+
+    def _connect(self):
+        return connect(self.index_path)
+
+    def _create_index(self):
+        """Создание таблицы индекса, если ее нет"""
+        conn = self._connect()
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS pages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT NOT NULL,
+                    match_id INTEGER,
+                    file_name TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    size INTEGER,
+                    fetched_at TEXT NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_pages_kind_file ON pages (kind, file_name)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_pages_kind_match ON pages (kind, match_id)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_pages_hash ON pages (content_hash)')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _object_path(self, content_hash: str, compression: str) -> str:
+        ext = "zst" if compression == "zstd" else "gz"
+        return os.path.join(self.objects_dir, content_hash[:2], f"{content_hash}.html.{ext}")
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.compression == "zstd":
+            return zstandard.ZstdCompressor(level=10).compress(data)
+        return gzip.compress(data, compresslevel=6)
+
+    def put(self, kind: str, file_name: str, html: str, match_id: Optional[int] = None) -> str:
+        """
+        Сохраняет страницу в архив
+
+        Args:
+            kind (str): Вид страницы (result, upcoming, player)
+            file_name (str): Имя файла страницы в storage/html/<kind>
+            html (str): HTML-содержимое
+            match_id (int, optional): ID матча или игрока
+
+        Returns:
+            str: SHA-256 содержимого
+        """
+        data = html.encode("utf-8")
+        content_hash = hashlib.sha256(data).hexdigest()
+        compressed = None if self._find_object(content_hash) else self._compress(data)
+
+        conn = self._connect()
+        try:
+            # Запись объекта, индекса и удаление старых версий - под блокировкой записи индекса,
+            # чтобы другой процесс не удалил объект, на который только что сослались
+            conn.execute('BEGIN IMMEDIATE')
+            # Одинаковое содержимое хранится один раз
+            if not self._find_object(content_hash):
+                if compressed is None:
+                    compressed = self._compress(data)
+                path = self._object_path(content_hash, self.compression)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.tmp{os.getpid()}"
+                with open(tmp_path, "wb") as f:
+                    f.write(compressed)
+                os.replace(tmp_path, path)
+
+            conn.execute('''
+                INSERT INTO pages (kind, match_id, file_name, content_hash, size, fetched_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (kind, match_id, file_name, content_hash, len(data), datetime.now().isoformat()))
+            if self.keep_versions:
+                self._prune_versions(conn, kind, file_name)
+            conn.commit()
+        finally:
+            conn.close()
+
+        logger.debug(f"Страница {kind}/{file_name} сохранена в архив ({content_hash[:12]})")
+        return content_hash
+
+    def _prune_versions(self, conn, kind: str, file_name: str):
+        """
+        Удаляет версии страницы старше keep_versions последних и объекты без ссылок
+
+        Args:
+            conn: Соединение с индексом в открытой транзакции
+            kind (str): Вид страницы
+            file_name (str): Имя файла страницы
+        """
+        stale = conn.execute('''
+            SELECT id, content_hash FROM pages
+            WHERE kind = ? AND file_name = ?
+            ORDER BY id DESC LIMIT -1 OFFSET ?
+        ''', (kind, file_name, self.keep_versions)).fetchall()
+        if not stale:
+            return
+        conn.executemany('DELETE FROM pages WHERE id = ?', [(row[0],) for row in stale])
+        for content_hash in {row[1] for row in stale}:
+            if conn.execute('SELECT 1 FROM pages WHERE content_hash = ? LIMIT 1', (content_hash,)).fetchone():
+                continue
+            path = self._find_object(content_hash)
+            if path:
+                os.remove(path)
+        logger.debug(f"Удалено старых версий страницы {kind}/{file_name}: {len(stale)}")
+
+    def _find_object(self, content_hash: str) -> Optional[str]:
+        for compression in ("zstd", "gzip"):
+            path = self._object_path(content_hash, compression)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def get(self, content_hash: str) -> Optional[str]:
+        """
+        Читает страницу по хэшу содержимого
+
+        Args:
+            content_hash (str): SHA-256 содержимого
+
+        Returns:
+            str or None: HTML или None, если объекта нет
+        """
+        path = self._find_object(content_hash)
+        if not path:
+            return None
+        with open(path, "rb") as f:
+            data = f.read()
+        if path.endswith(".zst"):
+            if zstandard is None:
+                logger.error(f"Для чтения {path} требуется пакет zstandard")
+                return None
+            data = zstandard.ZstdDecompressor().decompress(data)
+        else:
+            data = gzip.decompress(data)
+        return data.decode("utf-8")
+
+    def latest_hash(self, kind: str, file_name: str) -> Optional[str]:
+        """
+        Хэш последней сохраненной версии страницы
+
+        Args:
+            kind (str): Вид страницы
+            file_name (str): Имя файла страницы
+
+        Returns:
+            str or None: SHA-256 содержимого или None, если страницы нет в архиве
+        """
+        conn = self._connect()
+        try:
+            row = conn.execute('''
+                SELECT content_hash FROM pages
+                WHERE kind = ? AND file_name = ?
+                ORDER BY id DESC LIMIT 1
+            ''', (kind, file_name)).fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else None
+
+    def latest(self, kind: str, file_name: str) -> Optional[str]:
+        """
+        Последняя сохраненная версия страницы
+
+        Args:
+            kind (str): Вид страницы
+            file_name (str): Имя файла страницы
+
+        Returns:
+            str or None: HTML или None, если страницы нет в архиве
+        """
+        content_hash = self.latest_hash(kind, file_name)
+        return self.get(content_hash) if content_hash else None
+
+    def history(self, kind: str, match_id: int) -> List[dict]:
+        """
+        Все сохраненные версии страницы матча/игрока, от старых к новым
+
+        Returns:
+            list: Записи индекса (file_name, content_hash, size, fetched_at)
+        """
+        conn = self._connect()
+        try:
+            rows = conn.execute('''
+                SELECT file_name, content_hash, size, fetched_at FROM pages
+                WHERE kind = ? AND match_id = ?
+                ORDER BY id
+            ''', (kind, match_id)).fetchall()
+        finally:
+            conn.close()
+        return [
+            {"file_name": r[0], "content_hash": r[1], "size": r[2], "fetched_at": r[3]}
+            for r in rows
+        ]
+
+    def list_files(self, kind: str) -> List[str]:
+        """
+        Имена всех страниц данного вида, имеющихся в архиве
+
+        Args:
+            kind (str): Вид страницы
+
+        Returns:
+            list: Имена файлов
+        """
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                'SELECT DISTINCT file_name FROM pages WHERE kind = ? ORDER BY file_name', (kind,)
+            ).fetchall()
+        finally:
+            conn.close()
+        return [r[0] for r in rows]
+
+
+_archive = None
+
+
+def get_archive() -> Optional[PageArchive]:
+    """Общий экземпляр архива (None, если архив отключен в конфиге)"""
+    global _archive
+    if not PAGE_ARCHIVE_ENABLED:
+        return None
+    if _archive is None:
+        _archive = PageArchive()
+    return _archive
+
+
+def archive_page(kind: str, file_name: str, html: str, match_id: Optional[int] = None) -> Optional[str]:
+    """
+    Сохраняет страницу в архив, не прерывая работу при ошибке
+
+    Returns:
+        str or None: Хэш содержимого или None
+    """
+    archive = get_archive()
+    if not archive:
+        return None
+    try:
+        return archive.put(kind, file_name, html, match_id)
+    except Exception as e:
+        logger.warning(f"Не удалось сохранить страницу {kind}/{file_name} в архив: {str(e)}")
+        return None
+
+
+def read_page(file_path: str, kind: str) -> str:
+    """
+    Читает HTML-страницу с диска, а если файла уже нет - последнюю версию из архива
+
+    Args:
+        file_path (str): Путь к файлу в storage/html/<kind>
+        kind (str): Вид страницы
+
+    Returns:
+        str: HTML-содержимое
+
+    Raises:
+        FileNotFoundError: Страницы нет ни на диске, ни в архиве
+    """
+    if os.path.exists(file_path):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return f.read()
+    archive = get_archive()
+    html = archive.latest(kind, os.path.basename(file_path)) if archive else None
+    if html is None:
+        raise FileNotFoundError(file_path)
+    return html
@@ -0,0 +1,109 @@
+"""
+Отпечатки страниц предстоящих матчей
+
+Отпечаток строится по извлекаемым полям (команды, составы, рейтинги, h2h, стримы),
+поэтому изменения рекламы, счетчиков и прочей разметки его не меняют. Вместе с
+отпечатком хранятся валидаторы HTTP (ETag/Last-Modified) для условных запросов.
+
+Сохраненный отпечаток означает "эти данные уже в базе": коллектор передает его в
+записи матча (поле FINGERPRINT_FIELD), а загрузчик сохраняет save_loaded_fingerprint()
+в той же транзакции, что и сам матч. Если загрузка не прошла или запись потеряна,
+отпечатка нет и следующий сбор снова запишет данные страницы.
+"""
+import json
+import hashlib
+import logging
+from datetime import datetime
+from typing import Optional
+
+from src.db.connection import connect
+from src.db.migrations import migrate
+
+logger = logging.getLogger(__name__)
+
+# Поле записи матча в storage/json/upcoming_match, в котором отпечаток передается загрузчику
+FINGERPRINT_FIELD = 'fingerprint'
+
+# Поля, которые не описывают содержимое страницы
+VOLATILE_FIELDS = ('parsed_at', FINGERPRINT_FIELD)
+
+
+def compute_fingerprint(match_data: dict, players: list, streamers: list) -> str:
+    """
+    Вычисляет отпечаток извлеченных данных предстоящего матча
+
+    Args:
+        match_data (dict): Данные матча
+        players (list): Игроки матча
+        streamers (list): Стримы матча
+
+    Returns:
+        str: SHA-256 от канонического JSON
+    """
+    payload = {
+        'match': {k: v for k, v in match_data.items() if k not in VOLATILE_FIELDS},
+        'players': players or [],
+        'streamers': streamers or []
+    }
+    # Стандартный json, а не json_io: сохраненные отпечатки не должны зависеть от того,
+    # установлен ли orjson (форматирование чисел у них различается)
+    canonical = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class FingerprintStore:
+    """
+    Хранилище отпечатков и HTTP-валидаторов страниц в таблице upcoming_fingerprints
+    """
+
+    def __init__(self, db_path: str = "hltv.db"):
+        self.db_path = db_path
+        # Таблицей владеют миграции схемы
+        migrate(db_path)
+
+    def get(self, match_id: int) -> Optional[dict]:
+        """
+        Возвращает сохраненный отпечаток и валидаторы матча
+
+        Returns:
+            dict or None: {'fingerprint', 'etag', 'last_modified'}
+        """
+        conn = connect(self.db_path)
+        try:
+            row = conn.execute(
+                'SELECT fingerprint, etag, last_modified FROM upcoming_fingerprints WHERE match_id = ?',
+                (match_id,)
+            ).fetchone()
+        finally:
+            conn.close()
+        if not row:
+            return None
+        return {'fingerprint': row[0], 'etag': row[1], 'last_modified': row[2]}
+
+    def save_validators(self, match_id: int, etag: Optional[str], last_modified: Optional[str]):
+        """Сохраняет ETag/Last-Modified последнего ответа сервера"""
+        conn = connect(self.db_path)
+        try:
+            conn.execute('''
+                INSERT INTO upcoming_fingerprints (match_id, etag, last_modified, updated_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT(match_id) DO UPDATE SET etag = excluded.etag, last_modified = excluded.last_modified,
+                    updated_at = excluded.updated_at
+            ''', (match_id, etag, last_modified, datetime.now().isoformat()))
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def save_loaded_fingerprint(cursor, match_id: int, fingerprint: str):
+    """
+    Сохраняет отпечаток загруженных данных матча (в транзакции загрузчика, без фиксации)
+
+    Args:
+        cursor: Курсор соединения загрузчика
+        match_id (int): ID матча
+        fingerprint (str): Отпечаток из записи матча
+    """
+    cursor.execute('''
+        INSERT INTO upcoming_fingerprints (match_id, fingerprint, updated_at) VALUES (?, ?, ?)
+        ON CONFLICT(match_id) DO UPDATE SET fingerprint = excluded.fingerprint, updated_at = excluded.updated_at
+    ''', (match_id, fingerprint, datetime.now().isoformat()))
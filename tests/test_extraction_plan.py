@@ -0,0 +1,96 @@
+"""
+Тесты плана извлечения страницы результата (src.collector.extraction_plan)
+
+План должен давать то же, что методы коллектора _parse_match_details,
+_parse_player_stats и _parse_maps, на каждом установленном бэкенде разбора.
+"""
+import os
+
+import pytest
+
+pytest.importorskip("bs4")
+
+from src.collector.html_backend import available_backends, parse_html
+from src.collector.match_details import MatchDetailsCollector
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+RESULT_PAGE = "match_2370001-alpha-vs-bravo.html"
+
+# Первые вхождения областей не содержат искомых полей: время, счет, рейтинги,
+# событие и очные встречи находятся только в следующих вхождениях
+REPEATED_SCOPES_PAGE = """
+<html><body>
+<div class="timeAndEvent"><div class="countdown">LIVE</div></div>
+<div class="team1-gradient"><a href="/team/1/first"><div class="teamName">First</div></a></div>
+<div class="team2-gradient"><div class="teamName">TBD</div></div>
+<div class="lineups"><div class="lineup"><div class="teamRanking">Unranked</div></div></div>
+<div class="head-to-head"><div class="flexbox-column">No meetings</div></div>
+<a class="stream-box" href="/stream">Stream</a>
+<div class="match">
+  <div class="timeAndEvent">
+    <div class="time" data-unix="1700000000000">12:00</div>
+    <div class="event"><a href="/events/42/major">Major</a></div>
+  </div>
+  <div class="team1-gradient"><a href="/team/2/second"><div class="teamName">Second</div></a><div class="lost">0</div></div>
+  <div class="team2-gradient"><a href="/team/3/third"><div class="teamName">Third</div></a><div class="won">2</div></div>
+  <a class="stream-box" data-demo-link="/download/demo/555">Demo</a>
+  <div class="lineups">
+    <div class="lineup"><div class="teamRanking"><a href="/ranking">World rank: #3</a></div></div>
+    <div class="separator"></div>
+    <div class="lineup"><div class="teamRanking"><a href="/ranking">World rank: #9</a></div></div>
+  </div>
+  <div class="head-to-head">
+    <div class="right-border"><div class="bold">2</div></div>
+    <div class="left-border"><div class="bold">5</div></div>
+  </div>
+</div>
+<div class="stats-content"><p>No stats</p></div>
+<div class="stats-content">
+  <table class="totalstats"><tbody><tr><td><a href="/player/7/a">a</a></td><td>10-5</td><td>+5</td><td>80.0</td><td>70.0%</td><td>1.10</td></tr></tbody></table>
+  <table class="totalstats"><tbody><tr><td><a href="/player/8/b">b</a></td><td>5-10</td><td>-5</td><td>50.0</td><td>60.0%</td><td>0.80</td></tr></tbody></table>
+</div>
+<div class="mapholder"><div class="mapname">Dust2</div>
+  <div class="results played"><div class="results-left"><div class="results-team-score">13</div></div>
+  <div class="results-right"><div class="results-team-score">7</div></div></div>
+</div>
+</body></html>
+"""
+
+
+def _read_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.fixture(scope="module", params=available_backends())
+def collector(request, tmp_path_factory):
+    db_path = str(tmp_path_factory.mktemp("plan") / "hltv.db")
+    return MatchDetailsCollector(html_dir=FIXTURES_DIR, db_path=db_path, parser_backend=request.param, workers=1)
+
+
+@pytest.mark.parametrize("html", [_read_fixture(RESULT_PAGE), REPEATED_SCOPES_PAGE], ids=["result", "repeated-scopes"])
+def test_plan_matches_collector_methods(collector, html):
+    """План извлекает то же, что _parse_match_details, _parse_player_stats и _parse_maps"""
+    soup = parse_html(html, collector.parser_backend)
+    expected = (
+        collector._parse_match_details(soup, 100),
+        collector._parse_player_stats(soup, 100),
+        collector._parse_maps(soup)
+    )
+    assert collector.extraction_plan.extract(soup, 100) == expected
+
+
+def test_plan_searches_all_scope_occurrences(collector):
+    """Поля, которых нет в первом вхождении области, берутся из следующих, как soup.select_one()"""
+    soup = parse_html(REPEATED_SCOPES_PAGE, collector.parser_backend)
+    match_data, players_data, maps = collector.extraction_plan.extract(soup, 100)
+
+    assert match_data['datetime'] == 1700000000
+    assert (match_data['team1_id'], match_data['team1_name'], match_data['team1_score']) == (1, "First", 0)
+    assert (match_data['team2_id'], match_data['team2_score']) == (None, 2)
+    assert (match_data['team1_rank'], match_data['team2_rank']) == (3, 9)
+    assert (match_data['event_id'], match_data['demo_id']) == (42, 555)
+    assert (match_data['head_to_head_team1_wins'], match_data['head_to_head_team2_wins']) == (2, 5)
+    # Статистика - из первого .stats-content, как soup.select_one('.stats-content'): в нем нет таблиц
+    assert players_data == collector._parse_player_stats(soup, 100)
+    assert [m['map_name'] for m in maps] == ["Dust2"]
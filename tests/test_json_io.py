@@ -0,0 +1,46 @@
+"""
+Тесты слоя сериализации JSON (src.utils.json_io)
+"""
+import json
+import math
+
+import pytest
+
+from src.utils import json_io
+
+
+@pytest.fixture
+def legacy_file(tmp_path):
+    # Файл, записанный стандартным json: NaN и Infinity в нем не по стандарту JSON
+    path = tmp_path / "features.json"
+    path.write_text(json.dumps({'rating': float('nan'), 'adr': float('inf'), 'kills': 21}), encoding="utf-8")
+    return str(path)
+
+
+def _check(data):
+    assert math.isnan(data['rating'])
+    assert data['adr'] == float('inf')
+    assert data['kills'] == 21
+
+
+def test_load_file_with_nan(legacy_file):
+    """NaN и Infinity из файлов стандартного json читаются при любой библиотеке"""
+    _check(json_io.load_file(legacy_file))
+
+
+def test_orjson_falls_back_to_json(legacy_file):
+    """orjson не разбирает NaN, load_file разбирает такой файл стандартным json"""
+    orjson = pytest.importorskip("orjson")
+    with open(legacy_file, "rb") as f:
+        with pytest.raises(orjson.JSONDecodeError):
+            orjson.loads(f.read())
+    assert json_io.backend_name() == "orjson"
+    _check(json_io.load_file(legacy_file))
+
+
+def test_invalid_json_still_fails(tmp_path):
+    """Невалидный JSON по-прежнему дает JSONDecodeError"""
+    path = tmp_path / "broken.json"
+    path.write_text('{"kills": ', encoding="utf-8")
+    with pytest.raises(json_io.JSONDecodeError):
+        json_io.load_file(str(path))
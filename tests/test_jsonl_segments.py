@@ -0,0 +1,53 @@
+"""
+Тесты сегментов JSONL (src.utils.jsonl_segments)
+"""
+import os
+import glob
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from src.utils import jsonl_segments
+from src.utils.jsonl_segments import append_record, commit_all, committed_segments, read_segment
+
+
+def _append_in_worker(stream_dir, value):
+    append_record(stream_dir, {'value': value, 'pid': os.getpid()})
+
+
+def _read_stream(stream_dir):
+    return [record for segment in committed_segments(stream_dir) for record in read_segment(segment)]
+
+
+@pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(), reason="нужен fork")
+def test_pool_workers_commit_own_segments_after_fork(tmp_path):
+    """Процессы пула, созданные fork при открытом сегменте родителя, фиксируют свои сегменты"""
+    stream_dir = str(tmp_path / "stream")
+    append_record(stream_dir, {'value': 'parent'})
+    try:
+        with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context('fork')) as pool:
+            list(pool.map(_append_in_worker, [stream_dir] * 6, range(6)))
+        append_record(stream_dir, {'value': 'parent-after'})
+    finally:
+        commit_all()
+
+    assert glob.glob(os.path.join(stream_dir, "*" + jsonl_segments.OPEN_SUFFIX)) == []
+    records = _read_stream(stream_dir)
+    assert sorted(str(record['value']) for record in records) == sorted(['parent', 'parent-after'] + [str(i) for i in range(6)])
+    # Каждая запись - в сегменте своего процесса (pid в имени сегмента), а не в сегменте родителя
+    for segment in committed_segments(stream_dir):
+        writer_pid = os.path.basename(segment).split('-')[1]
+        for record in read_segment(segment):
+            assert writer_pid == str(record.get('pid', os.getpid()))
+
+
+def test_commit_all_commits_open_segments(tmp_path):
+    """commit_all() фиксирует сегменты всех потоков процесса"""
+    first, second = str(tmp_path / "first"), str(tmp_path / "second")
+    append_record(first, {'value': 1})
+    append_record(second, {'value': 2})
+    commit_all()
+
+    assert [record['value'] for record in _read_stream(first)] == [1]
+    assert [record['value'] for record in _read_stream(second)] == [2]
@@ -0,0 +1,116 @@
+"""
+Тесты потокового разбора страниц-списков (src.collector.listing_stream)
+
+Матчи, которые MatchesCollector извлекает потоково (_iter_listing_matches),
+сравниваются с разбором через дерево BeautifulSoup (_parse_matches_file,
+_parse_results_file) на небольших страницах с неаккуратной разметкой.
+"""
+import pytest
+
+bs4 = pytest.importorskip("bs4")
+
+from src.collector import matches as matches_module
+from src.collector.listing_stream import LISTING_MATCHES, LISTING_RESULTS, iter_listing
+from src.collector.matches import MatchesCollector
+
+MATCH_URL = "/matches/{id}/team{id}a-vs-team{id}b-test-cup"
+
+MATCHES_PAGES = {
+    # Незакрытые <a>, <span> и <p> внутри элементов матчей
+    "unclosed-tags": f"""
+        <div class="mainContent">
+          <div class="match"><a href="{MATCH_URL.format(id=1)}"><span class="time" data-unix="1700000000000">10:00
+          <div class="match"><a href="{MATCH_URL.format(id=2)}"><p>no time
+          </div>
+          <div class="match"><a href="{MATCH_URL.format(id=3)}"></a><div data-unix="1700000300000"></div></div>
+        </div>
+    """,
+    # Закрывающие теги без открытых: </span> игнорируется, лишний </div> закрывает ближайший <div>
+    "stray-end-tags": f"""
+        </section>
+        <div class="mainContent"></span>
+          <div class="match"><a href="{MATCH_URL.format(id=4)}"></a></b><div class="date" data-unix="1700000400000"></div></div>
+          <div class="wrapper"></div></div>
+          <div class="match"><a href="{MATCH_URL.format(id=5)}"></a><div data-unix="1700000500000"></div></div>
+        </div>
+    """,
+    # Учитывается только первый .mainContent, .match до него тоже не учитывается
+    "second-main-content": f"""
+        <div class="match"><a href="{MATCH_URL.format(id=6)}"></a><div data-unix="1700000600000"></div></div>
+        <div class="mainContent">
+          <div class="match"><a href="{MATCH_URL.format(id=7)}"></a><div data-unix="1700000700000"></div></div>
+        </div>
+        <div class="mainContent">
+          <div class="match"><a href="{MATCH_URL.format(id=8)}"></a><div data-unix="1700000800000"></div></div>
+        </div>
+    """,
+    # Элемент без ссылки пропускается; без времени - текущее время; пустой data-unix - время по классу;
+    # ссылка и время - первые среди потомков: внешний .match получает ссылку вложенного
+    "missing-link-or-time": f"""
+        <div class="mainContent">
+          <div class="match"><div class="time" data-unix="1700000900000"></div></div>
+          <div class="match"><a href="{MATCH_URL.format(id=10)}">no time</a></div>
+          <div class="match"><a href="{MATCH_URL.format(id=11)}"></a><span data-unix=""></span>
+            <div class="matchTime" data-unix="1700001100000"></div></div>
+          <div class="match"><div data-unix="1700001200000"></div>
+            <div class="match"><a href="{MATCH_URL.format(id=12)}"></a></div></div>
+          <div class="match"><a href="/events/1/test-cup">not a match</a></div>
+        </div>
+    """,
+}
+
+RESULTS_PAGES = {
+    "unclosed-and-stray": """
+        <div class="results"></p>
+          <div class="result-con"><a class="a-reset" href="/matches/21/a-vs-b"><div class="result">2-0
+          <div class="result-con"><a href="/matches/22/c-vs-d"></a></div>
+          <div class="result-con"><span><a class="a-reset" href="/matches/23/e-vs-f"></span></a></div>
+        </div>
+        <div class="results">
+          <div class="result-con"><a class="a-reset" href="/matches/24/g-vs-h"></a></div>
+        </div>
+    """,
+}
+
+
+@pytest.fixture
+def collector(tmp_path, monkeypatch):
+    # Коллектор создает storage/json в текущей директории; матчи без времени получают текущее время
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(matches_module.time, "time", lambda: 1700009999)
+    return MatchesCollector(html_dir=str(tmp_path), db_path=str(tmp_path / "hltv.db"))
+
+
+def _compare(collector, tmp_path, html, kind):
+    path = tmp_path / f"{kind}.html"
+    path.write_text(html, encoding="utf-8")
+    soup = bs4.BeautifulSoup(html, "html.parser")
+    if kind == LISTING_MATCHES:
+        reference = collector._parse_matches_file(soup)
+    else:
+        reference = collector._parse_results_file(soup)
+
+    assert list(collector._iter_listing_matches(str(path), kind)) == reference
+    # Границы кусков чтения не влияют на результат
+    assert list(iter_listing(str(path), kind, chunk_size=7)) == list(iter_listing(str(path), kind))
+    return reference
+
+
+@pytest.mark.parametrize("name", sorted(MATCHES_PAGES))
+def test_matches_page_matches_tree_parsing(collector, tmp_path, name):
+    """Потоковый разбор matches.html дает те же матчи, что и дерево BeautifulSoup"""
+    assert _compare(collector, tmp_path, MATCHES_PAGES[name], LISTING_MATCHES)
+
+
+@pytest.mark.parametrize("name", sorted(RESULTS_PAGES))
+def test_results_page_matches_tree_parsing(collector, tmp_path, name):
+    """Потоковый разбор results.html дает те же матчи, что и дерево BeautifulSoup"""
+    assert _compare(collector, tmp_path, RESULTS_PAGES[name], LISTING_RESULTS)
+
+
+def test_missing_link_or_time(collector, tmp_path):
+    """Матч без ссылки пропускается, без времени получает текущее, пустой data-unix заменяется временем по классу"""
+    found = _compare(collector, tmp_path, MATCHES_PAGES["missing-link-or-time"], LISTING_MATCHES)
+    assert [(match['id'], match['date']) for match in found] == [
+        (10, 1700009999), (11, 1700001100000), (12, 1700001200000), (12, 1700009999)
+    ]
@@ -0,0 +1,236 @@
+"""
+Тесты продолжения загрузки после сбоя (журнал загрузки src.db.load_journal)
+
+Синтетические данные коллектора результатов (часть матчей - файлами прежнего
+формата, остальные - сегментами JSONL) загружаются MatchDetailsLoader без сбоя
+и со сбоем: посреди пачки (транзакция не фиксируется) и после фиксации пачки,
+но до удаления ее файлов. После сбоя
+загрузка запускается заново и должна дать те же таблицы, не оставив файлов в
+потоках и незавершенных источников в журнале.
+"""
+import os
+import glob
+import random
+import sqlite3
+
+import pytest
+
+from src.db.load_journal import LoadJournal, load_stream
+from src.db.migrations import migrate
+from src.loader.match_details_loader import MatchDetailsLoader
+from src.utils import json_io
+from src.utils.jsonl_segments import SegmentWriter
+
+RECORDS = 300
+FILES = 20
+BATCH_SIZE = 25
+
+TABLE_QUERIES = (
+    "SELECT * FROM result_match ORDER BY match_id",
+    "SELECT match_id, team_id, player_id, player_nickname, fullName, nickName, kills, deaths, "
+    "kd_ratio, plus_minus, adr, kast, rating FROM player_stats ORDER BY match_id, player_id, player_nickname",
+    "SELECT match_id, map_name, team1_rounds, team2_rounds, rounds FROM result_match_maps ORDER BY match_id, id",
+)
+
+
+class SimulatedCrash(BaseException):
+    """Сбой процесса: не перехватывается обработчиками Exception загрузчика"""
+
+
+def crash_after(function, calls):
+    """Обертка, которая падает SimulatedCrash на вызове номер calls + 1"""
+    state = {'calls': 0}
+
+    def wrapper(*args, **kwargs):
+        state['calls'] += 1
+        if state['calls'] > calls:
+            raise SimulatedCrash()
+        return function(*args, **kwargs)
+    return wrapper
+
+
+@pytest.fixture(scope="module")
+def records():
+    return make_result_records(random.Random(1), RECORDS)
+
+
+def make_result_records(rng, count):
+    """
+    Промежуточные записи коллектора результатов
+
+    Returns:
+        list: (вид, имя файла, данные)
+    """
+    records = []
+    for i in range(count):
+        match_id = 2370000 + i
+        records.append(('result_match', f"{match_id}.json", {
+            'match_id': match_id, 'datetime': 1700000000 + i * 3600,
+            'team1_id': rng.randint(1, 12000), 'team1_name': f"Team {rng.randint(1, 500)}",
+            'team1_score': rng.randint(0, 2), 'team1_rank': rng.randint(1, 300),
+            'team2_id': rng.randint(1, 12000), 'team2_name': f"Команда {rng.randint(1, 500)}",
+            'team2_score': rng.randint(0, 2), 'team2_rank': rng.randint(1, 300),
+            'event_id': rng.randint(1, 8000), 'event_name': f"Турнир {rng.randint(1, 50)}",
+            'demo_id': rng.randint(1, 10 ** 5), 'head_to_head_team1_wins': rng.randint(0, 9),
+            'head_to_head_team2_wins': rng.randint(0, 9), 'url': None, 'maps': [],
+            'parsed_at': '2026-10-17T12:00:00.000000'
+        }))
+        players = []
+        for p in range(10):
+            players.append({
+                'match_id': match_id, 'team_id': rng.randint(1, 12000), 'player_id': rng.randint(1, 25000),
+                'player_nickname': f"player{p}", 'fullName': f"Игрок {p}", 'nickName': f"player{p}",
+                'kills': rng.randint(5, 40), 'deaths': rng.randint(5, 40), 'kd_ratio': round(rng.uniform(0.3, 2.5), 2),
+                'plus_minus': rng.randint(-20, 20), 'adr': round(rng.uniform(40, 130), 1),
+                'kast': round(rng.uniform(40, 90), 1), 'rating': round(rng.uniform(0.4, 1.9), 2)
+            })
+        records.append(('player_stats', f"{match_id}.json", {'parsed_at': '2026-10-17T12:00:00.000000', 'players': players}))
+        maps = [{'map_name': rng.choice(['Mirage', 'Inferno', 'Nuke', 'Ancient']), 'team1_rounds': rng.randint(0, 16),
+                 'team2_rounds': rng.randint(0, 16), 'rounds': '(7:5; 6:7)'} for _ in range(rng.randint(1, 3))]
+        records.append(('result_maps', f"{match_id}.json", maps))
+    return records
+
+
+def write_inputs(json_dir, records, files):
+    """Раскладывает записи по потокам: первые files матчей - файлами прежнего формата, остальные - в сегменты"""
+    writers = {}
+    legacy_ids = set()
+    for kind, file_name, data in records:
+        stream_dir = os.path.join(json_dir, kind)
+        os.makedirs(stream_dir, exist_ok=True)
+        match_id = int(os.path.splitext(file_name)[0])
+        if len(legacy_ids) < files or match_id in legacy_ids:
+            legacy_ids.add(match_id)
+            json_io.save_file(os.path.join(stream_dir, file_name), data)
+            continue
+        writer = writers.get(kind)
+        if writer is None:
+            writer = writers[kind] = SegmentWriter(stream_dir)
+        if kind == 'player_stats':
+            record = dict(data, match_id=match_id)
+        elif kind == 'result_maps':
+            record = {'match_id': match_id, 'maps': data}
+        else:
+            record = data
+        writer.append(record)
+    for writer in writers.values():
+        writer.commit()
+
+
+def dump_tables(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return [conn.execute(query).fetchall() for query in TABLE_QUERIES]
+    finally:
+        conn.close()
+
+
+def _prepare(root, records):
+    json_dir = os.path.join(root, "json")
+    write_inputs(json_dir, records, FILES)
+    return os.path.join(root, "hltv.db"), json_dir
+
+
+def _load(db_path, json_dir):
+    return MatchDetailsLoader(db_path=db_path, json_dir=json_dir, batch_size=BATCH_SIZE).load_all()
+
+
+def _leftovers(db_path, json_dir):
+    files = [path for path in glob.glob(os.path.join(json_dir, "*", "*")) if os.path.isfile(path)]
+    conn = sqlite3.connect(db_path)
+    try:
+        pending = conn.execute("SELECT COUNT(*) FROM load_batch_files").fetchone()[0]
+    finally:
+        conn.close()
+    return files, pending
+
+
+@pytest.fixture(scope="module")
+def expected(records, tmp_path_factory):
+    db_path, json_dir = _prepare(str(tmp_path_factory.mktemp("reference")), records)
+    _load(db_path, json_dir)
+    return dump_tables(db_path)
+
+
+@pytest.mark.parametrize("crash_after_batches", [0, 3, 11])
+def test_resume_after_crash_mid_batch(records, expected, tmp_path, monkeypatch, crash_after_batches):
+    """Сбой посреди пачки: пачка откатывается, повторный запуск догружает все без потерь и дублей"""
+    db_path, json_dir = _prepare(str(tmp_path), records)
+    monkeypatch.setattr(MatchDetailsLoader, '_write_player_stats_batch',
+                        crash_after(MatchDetailsLoader._write_player_stats_batch, crash_after_batches))
+    with pytest.raises(SimulatedCrash):
+        _load(db_path, json_dir)
+    monkeypatch.undo()
+
+    _load(db_path, json_dir)
+    assert dump_tables(db_path) == expected
+    assert _leftovers(db_path, json_dir) == ([], 0)
+
+
+@pytest.mark.parametrize("crash_after_batches", [0, 3, 11])
+def test_resume_after_crash_between_commit_and_cleanup(records, expected, tmp_path, monkeypatch, crash_after_batches):
+    """Сбой после фиксации пачки, до удаления ее файлов: повторный запуск дочищает их и продолжает"""
+    db_path, json_dir = _prepare(str(tmp_path), records)
+    monkeypatch.setattr(LoadJournal, 'cleanup', crash_after(LoadJournal.cleanup, crash_after_batches))
+    with pytest.raises(SimulatedCrash):
+        _load(db_path, json_dir)
+    monkeypatch.undo()
+
+    _load(db_path, json_dir)
+    assert dump_tables(db_path) == expected
+    assert _leftovers(db_path, json_dir) == ([], 0)
+
+
+def test_resume_skips_committed_records_of_segment(tmp_path):
+    """Повторный запуск не пишет заново записи сегмента из зафиксированных пачек"""
+    stream_dir = str(tmp_path / "stream")
+    db_path = str(tmp_path / "hltv.db")
+    writer = SegmentWriter(stream_dir)
+    for value in range(10):
+        writer.append({'value': value})
+    writer.commit()
+    migrate(db_path)
+    written = []
+
+    def write_batch(cursor, entries):
+        written.extend(entry['value'] for entry in entries)
+        return len(entries)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        with pytest.raises(SimulatedCrash):
+            load_stream(conn, stream_dir, crash_after(write_batch, 2), batch_size=3)
+        conn.rollback()
+        load_stream(conn, stream_dir, write_batch, batch_size=3)
+    finally:
+        conn.close()
+    assert written == list(range(10))
+    assert os.listdir(stream_dir) == []
+
+
+def test_failed_records_are_kept(tmp_path):
+    """Запись сегмента с ошибкой переносится в новый сегмент, файл прежнего формата с ошибкой остается"""
+    stream_dir = str(tmp_path / "stream")
+    db_path = str(tmp_path / "hltv.db")
+    os.makedirs(stream_dir)
+    for value in range(3):
+        json_io.save_file(os.path.join(stream_dir, f"{value}.json"), {'value': value})
+    writer = SegmentWriter(stream_dir)
+    for value in range(10, 14):
+        writer.append({'value': value})
+    writer.commit()
+    migrate(db_path)
+
+    def write_batch(cursor, entries):
+        if any(entry['value'] in (1, 12) for entry in entries):
+            raise ValueError("bad record")
+        return len(entries)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        counts = load_stream(conn, stream_dir, write_batch, batch_size=2)
+    finally:
+        conn.close()
+    assert (counts['processed'], counts['success'], counts['error']) == (7, 5, 2)
+    remaining = sorted(os.listdir(stream_dir))
+    assert remaining[0] == "1.json" and len(remaining) == 2 and remaining[1].endswith(".jsonl")
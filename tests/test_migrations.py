@@ -0,0 +1,67 @@
+"""
+Тесты миграций схемы (src.db.migrations) и планов частых запросов
+"""
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+from src.db.migrations import MIGRATIONS, SCHEMA_VERSION, get_version, migrate, migrate_connection
+from src.scripts.check_query_plans import HOT_QUERIES, check_plan, query_plan
+
+# База из репозитория: создана до миграций (user_version = 0)
+TRACKED_DB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "hltv.db")
+
+
+def _tables(conn):
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+@pytest.fixture(scope="module")
+def migrated_conn(tmp_path_factory):
+    db_path = str(tmp_path_factory.mktemp("schema") / "hltv.db")
+    migrate(db_path)
+    conn = sqlite3.connect(db_path)
+    yield conn
+    conn.close()
+
+
+def test_new_database_reaches_schema_version(migrated_conn):
+    """Новая база проходит все миграции, повторный запуск ничего не применяет"""
+    assert get_version(migrated_conn) == SCHEMA_VERSION
+    assert migrate_connection(migrated_conn) == 0
+    assert {'result_match', 'load_batches', 'collect_manifest', 'upcoming_fingerprints'} <= _tables(migrated_conn)
+
+
+@pytest.mark.skipif(not os.path.exists(TRACKED_DB), reason="нет hltv.db")
+def test_migrate_tracked_database(tmp_path):
+    """База старой схемы из репозитория приводится к SCHEMA_VERSION без потери строк"""
+    db_path = str(tmp_path / "hltv.db")
+    shutil.copy(TRACKED_DB, db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        start_version = get_version(conn)
+        counts = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in _tables(conn)
+                  if not table.startswith('sqlite_')}
+
+        applied = migrate_connection(conn)
+
+        assert applied == len([version for version, _, _ in MIGRATIONS if version > start_version])
+        assert get_version(conn) == SCHEMA_VERSION
+        upcoming_urls_columns = {row[1] for row in conn.execute("PRAGMA table_info(upcoming_urls)")}
+        assert {'reParse', 'next_update', 'last_fetched'} <= upcoming_urls_columns
+        for table, count in counts.items():
+            # Меньше строк может стать только из-за удаления дублей естественных ключей
+            assert conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] <= count
+        assert counts.get('result_match', 0) == conn.execute("SELECT COUNT(*) FROM result_match").fetchone()[0]
+        assert migrate_connection(conn) == 0
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize("name, sql, indexes", HOT_QUERIES, ids=[query[0] for query in HOT_QUERIES])
+def test_hot_query_uses_index(migrated_conn, name, sql, indexes):
+    """Частые запросы бота, парсера и загрузчиков идут по индексам из миграций"""
+    plan = query_plan(migrated_conn, sql)
+    assert check_plan(plan, indexes) == [], "\n".join(plan)
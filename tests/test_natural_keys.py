@@ -0,0 +1,44 @@
+"""
+Тесты записи строк матча через UPSERT по естественным ключам (src.db.natural_keys)
+"""
+import sqlite3
+
+import pytest
+
+from src.db.migrations import migrate
+from src.loader.match_details_loader import MatchDetailsLoader
+
+
+@pytest.fixture
+def conn(tmp_path):
+    db_path = str(tmp_path / "hltv.db")
+    migrate(db_path)
+    conn = sqlite3.connect(db_path)
+    yield conn
+    conn.close()
+
+
+def _player(nickname, **fields):
+    return dict({'team_id': 1, 'player_nickname': nickname, 'kills': 10}, **fields)
+
+
+def test_players_without_id_are_not_merged(conn):
+    """Игроки без ID (нет ключа, None, 0) остаются отдельными строками, повторная загрузка их не множит"""
+    loader = MatchDetailsLoader(db_path=":memory:")
+    players = [_player('a', player_id=7), _player('b'), _player('c', player_id=None), _player('d', player_id=0)]
+    for _ in range(2):
+        loader._write_player_stats_batch(conn.cursor(), [(100, players)])
+        conn.commit()
+
+    rows = conn.execute("SELECT player_id, player_nickname FROM player_stats WHERE match_id = 100 ORDER BY player_nickname").fetchall()
+    assert rows == [(7, 'a'), (None, 'b'), (None, 'c'), (None, 'd')]
+
+
+def test_player_with_id_is_updated_in_place(conn):
+    """Повторная загрузка игрока с ID обновляет строку, игрок, которого больше нет, удаляется"""
+    loader = MatchDetailsLoader(db_path=":memory:")
+    loader._write_player_stats_batch(conn.cursor(), [(100, [_player('a', player_id=7), _player('b', player_id=8)])])
+    loader._write_player_stats_batch(conn.cursor(), [(100, [_player('a', player_id=7, kills=25)])])
+    conn.commit()
+
+    assert conn.execute("SELECT player_id, kills FROM player_stats WHERE match_id = 100").fetchall() == [(7, 25)]
@@ -0,0 +1,52 @@
+"""
+Тесты архива страниц (src.utils.page_archive)
+"""
+import os
+import glob
+
+import pytest
+
+from src.utils.page_archive import KIND_PLAYER, KIND_UPCOMING, PageArchive
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return PageArchive(root=str(tmp_path / "archive"), compression="gzip", keep_versions=2)
+
+
+def _objects(archive):
+    return glob.glob(os.path.join(archive.objects_dir, "*", "*"))
+
+
+def test_keeps_last_versions_of_page(archive):
+    """Хранятся только keep_versions последних версий страницы, объекты старых удаляются"""
+    hashes = [archive.put(KIND_UPCOMING, "match_1-a-vs-b.html", f"<html>version {version}</html>", 1)
+              for version in range(5)]
+
+    assert [entry['content_hash'] for entry in archive.history(KIND_UPCOMING, 1)] == hashes[-2:]
+    assert archive.latest(KIND_UPCOMING, "match_1-a-vs-b.html") == "<html>version 4</html>"
+    assert len(_objects(archive)) == 2
+
+
+def test_shared_object_is_kept(archive):
+    """Объект, на который ссылается другая страница или оставшаяся версия, не удаляется"""
+    archive.put(KIND_PLAYER, "7.html", "<html>same</html>", 7)
+    for version in range(3):
+        archive.put(KIND_UPCOMING, "match_2-c-vs-d.html", "<html>same</html>" if version == 0 else f"<html>{version}</html>", 2)
+    archive.put(KIND_UPCOMING, "match_3-e-vs-f.html", "<html>2</html>", 3)
+    archive.put(KIND_UPCOMING, "match_3-e-vs-f.html", "<html>2</html>", 3)
+    archive.put(KIND_UPCOMING, "match_3-e-vs-f.html", "<html>2</html>", 3)
+
+    assert archive.latest(KIND_PLAYER, "7.html") == "<html>same</html>"
+    assert len(archive.history(KIND_UPCOMING, 3)) == 2
+    assert archive.latest(KIND_UPCOMING, "match_2-c-vs-d.html") == "<html>2</html>"
+    assert len(_objects(archive)) == 3
+
+
+def test_keep_all_versions(tmp_path):
+    """keep_versions=0 хранит всю историю"""
+    archive = PageArchive(root=str(tmp_path / "archive"), compression="gzip", keep_versions=0)
+    for version in range(4):
+        archive.put(KIND_UPCOMING, "match_1-a-vs-b.html", f"<html>{version}</html>", 1)
+    assert len(archive.history(KIND_UPCOMING, 1)) == 4
+    assert len(_objects(archive)) == 4
@@ -0,0 +1,57 @@
+"""
+Тесты совпадения бэкендов разбора HTML (src.collector.html_backend) с эталонным BeautifulSoup
+
+Страница результата матча из tests/fixtures разбирается коллектором деталей матчей
+через bs4 и через каждый установленный быстрый бэкенд; извлеченные детали матча,
+статистика игроков и карты должны совпадать.
+"""
+import os
+
+import pytest
+
+pytest.importorskip("bs4")
+
+from src.collector.html_backend import BACKEND_BS4, BACKEND_LXML, BACKEND_SELECTOLAX, available_backends
+from src.collector.match_details import MatchDetailsCollector
+from src.scripts.check_parser_backends import diff, extract
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+RESULT_PAGE = "match_2370001-alpha-vs-bravo.html"
+
+
+@pytest.fixture(scope="module")
+def collector(tmp_path_factory):
+    db_path = str(tmp_path_factory.mktemp("backends") / "hltv.db")
+    return MatchDetailsCollector(html_dir=FIXTURES_DIR, db_path=db_path, parser_backend=BACKEND_BS4, workers=1)
+
+
+@pytest.fixture(scope="module")
+def page(collector):
+    with open(os.path.join(FIXTURES_DIR, RESULT_PAGE), encoding="utf-8") as f:
+        html = f.read()
+    return html, collector._extract_match_id_from_filename(RESULT_PAGE)
+
+
+@pytest.fixture(scope="module")
+def reference(collector, page):
+    html, match_id = page
+    return extract(collector, html, BACKEND_BS4, match_id)
+
+
+def test_reference_extraction(reference):
+    """Эталонный разбор извлекает из страницы данные, которые сравниваются с бэкендами"""
+    match = reference['match']
+    assert match['match_id'] == 2370001
+    assert (match['team1_name'], match['team2_name']) == ("Alpha", "Bravo")
+    assert (match['team1_score'], match['team2_score']) == (2, 1)
+    assert [m['map_name'] for m in reference['maps']] == ["Mirage", "Inferno", "Nuke"]
+    assert reference['players']
+
+
+@pytest.mark.parametrize("backend", [BACKEND_LXML, BACKEND_SELECTOLAX])
+def test_backend_matches_bs4(collector, page, reference, backend):
+    """Быстрый бэкенд извлекает из страницы то же, что и bs4"""
+    if backend not in available_backends():
+        pytest.skip(f"бэкенд {backend} не установлен")
+    html, match_id = page
+    assert diff(reference, extract(collector, html, backend, match_id)) == []
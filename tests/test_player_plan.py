@@ -0,0 +1,115 @@
+"""
+Тесты таблицы полей профиля игрока (src.scripts.parse_players_html_to_json)
+
+parse_player_html (поиск внутри областей профиля) должен давать то же, что
+прежний разбор parse_player_html_reference (select_one по всему документу),
+на каждом установленном бэкенде разбора.
+"""
+import pytest
+
+bs4 = pytest.importorskip("bs4")
+
+from src.collector.html_backend import available_backends
+from src.scripts.parse_players_html_to_json import _to_number, parse_player_html
+
+
+# Прежний разбор: отдельный запрос по всему документу на каждое поле
+def parse_player_html_reference(html, player_id):
+    soup = bs4.BeautifulSoup(html, "html.parser")
+    def safe_text(sel, attr=None):
+        el = soup.select_one(sel)
+        if not el:
+            return None
+        if attr:
+            return el.get(attr)
+        return el.text.strip()
+    def safe_num(sel, attr=None, cast=int):
+        return _to_number(safe_text(sel, attr), cast)
+    data = {
+        "player_id": int(player_id),
+        "country": safe_text('img.flag', 'title'),
+        "real_name": safe_text('.playerRealname'),
+        "age": safe_num('.playerAge span[itemprop="text"]'),
+        "current_team": safe_text('.playerTeam a'),
+        "prize_money": safe_num('.playerPrizeMoney .listRight', cast=float),
+        "maps_past3": safe_num('.stats-matches .stats-window'),
+        "rating_2_1": safe_num('.playerpage-container-attributes .player-stat:nth-child(1) .statsVal p', cast=float),
+        "firepower": safe_num('.playerpage-container-attributes .player-stat:nth-child(2) .statsVal b', cast=float),
+        "entrying": safe_num('.playerpage-container-attributes .player-stat:nth-child(3) .statsVal b', cast=float),
+        "trading": safe_num('.playerpage-container-attributes .player-stat:nth-child(4) .statsVal b', cast=float),
+        "opening": safe_num('.playerpage-container-attributes .player-stat:nth-child(5) .statsVal b', cast=float),
+        "clutching": safe_num('.playerpage-container-attributes .player-stat:nth-child(6) .statsVal b', cast=float),
+        "sniping": safe_num('.playerpage-container-attributes .player-stat:nth-child(7) .statsVal b', cast=float),
+        "utility": safe_num('.playerpage-container-attributes .player-stat:nth-child(8) .statsVal b', cast=float),
+        "teams_count": safe_num('#teamsBox .highlighted-stat:nth-child(1) .stat'),
+        "days_in_current_team": safe_num('#teamsBox .highlighted-stat:nth-child(2) .stat'),
+        "days_in_teams": safe_num('#teamsBox .highlighted-stat:nth-child(3) .stat'),
+        "majors_played": safe_num('#achievementBox #majorAchievement .highlighted-stat:nth-child(2) .stat'),
+        "majors_won": safe_num('#achievementBox #majorAchievement .highlighted-stat:nth-child(1) .stat'),
+        "lans_played": safe_num('#lanAchievement .highlighted-stat:nth-child(2) .stat'),
+        "lans_won": safe_num('#lanAchievement .highlighted-stat:nth-child(1) .stat'),
+        "faceit_url": safe_text('.socialMediaButtons a[href*="faceit.com"]', 'href'),
+        "faceit_matches": safe_num('#faceitBox .all-time-stat:nth-child(1) .stat'),
+        "faceit_winrate": safe_num('#faceitBox .all-time-stat:nth-child(2) .stat', cast=float),
+        "faceit_winstreak": safe_num('#faceitBox .all-time-stat:nth-child(3) .stat'),
+        "faceit_avgkdr": safe_num('#faceitBox .all-time-stat:nth-child(4) .stat', cast=float),
+        "faceit_headshots": safe_num('#faceitBox .all-time-stat:nth-child(5) .stat', cast=float),
+    }
+    return data
+
+
+def _stats(tag, values):
+    return "".join(f'<div class="{tag}"><div class="stat">{value}</div></div>' for value in values)
+
+
+PROFILE_PAGE = f"""
+<html><body>
+<div class="playerProfile">
+  <img class="flag" title="Denmark" src="/flag.png">
+  <h1 class="playerNickname">dev</h1>
+  <div class="playerRealname">Test Player</div>
+  <div class="playerAge"><span itemprop="text">24 years</span></div>
+  <div class="playerTeam"><a href="/team/1/alpha">Alpha</a></div>
+  <div class="playerPrizeMoney"><span class="listRight">$1,234</span></div>
+  <div class="stats-matches"><span class="stats-window">57 maps</span></div>
+  <div class="socialMediaButtons"><a href="https://twitter.com/dev">Twitter</a></div>
+  <div class="socialMediaButtons"><a href="https://www.faceit.com/en/players/dev">FACEIT</a></div>
+</div>
+<div class="playerpage-container-attributes"><p>Not enough maps</p></div>
+<div class="playerpage-container-attributes">
+  <div class="player-stat"><div class="statsVal"><p>1.15</p></div></div>
+  <div class="player-stat"><div class="statsVal"><b>72</b></div></div>
+  <div class="player-stat"><div class="statsVal"><b>45</b></div></div>
+  <div class="player-stat"><div class="statsVal"><b>60</b></div></div>
+  <div class="player-stat"><div class="statsVal"><b>38</b></div></div>
+  <div class="player-stat"><div class="statsVal"><b>51</b></div></div>
+  <div class="player-stat"><div class="statsVal"><b>12</b></div></div>
+  <div class="player-stat"><div class="statsVal"><b>66</b></div></div>
+</div>
+<div id="teamsBox"><span>No teams</span></div>
+<div id="teamsBox">{_stats("highlighted-stat", [4, 350, 1500])}</div>
+<div id="majorAchievement">{_stats("highlighted-stat", [9, 9])}</div>
+<div id="achievementBox">
+  <div id="majorAchievement">{_stats("highlighted-stat", [1, 6])}</div>
+</div>
+<div id="lanAchievement">{_stats("highlighted-stat", [3, 20])}</div>
+<div id="faceitBox">{_stats("all-time-stat", [1200, "55%", 7, "1.21", "48%"])}</div>
+</body></html>
+"""
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_plan_matches_reference(backend):
+    """Таблица полей извлекает то же, что и прежний разбор по всему документу"""
+    assert parse_player_html(PROFILE_PAGE, "42", backend) == parse_player_html_reference(PROFILE_PAGE, "42")
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_fields_from_later_containers(backend):
+    """Поля, которых нет в первом контейнере области, берутся из следующего"""
+    data = parse_player_html(PROFILE_PAGE, "42", backend)
+    assert (data['rating_2_1'], data['utility']) == (1.15, 66.0)
+    assert (data['teams_count'], data['days_in_current_team'], data['days_in_teams']) == (4, 350, 1500)
+    assert (data['majors_won'], data['majors_played']) == (1, 6)
+    assert data['faceit_url'] == "https://www.faceit.com/en/players/dev"
+    assert (data['faceit_matches'], data['faceit_winrate']) == (1200, 55.0)